@@ -0,0 +1,50 @@
+"""Add materialized course/module progress counters"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260310_add_progress_counters"
+down_revision = "20260305_merge_progress_pronunciation_heads"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("user_course_progress") as batch:
+        batch.add_column(sa.Column("completed_lessons", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("total_lessons", sa.Integer(), nullable=False, server_default="0"))
+    # Keep the newest row per (user, course) before enforcing uniqueness.
+    op.execute(
+        "DELETE FROM user_course_progress WHERE id NOT IN "
+        "(SELECT MAX(id) FROM user_course_progress GROUP BY user_id, course_id)"
+    )
+    with op.batch_alter_table("user_course_progress") as batch:
+        batch.create_unique_constraint("uq_user_course_progress_user_course", ["user_id", "course_id"])
+    op.create_table(
+        "user_module_progress",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("module_id", sa.Integer(), sa.ForeignKey("modules.id"), nullable=False),
+        sa.Column("percent", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_lessons", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_lessons", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("user_id", "module_id", name="uq_user_module_progress_user_module"),
+    )
+    op.create_index(op.f("ix_user_module_progress_id"), "user_module_progress", ["id"], unique=False)
+    op.create_index(op.f("ix_user_module_progress_user_id"), "user_module_progress", ["user_id"], unique=False)
+    op.create_index(op.f("ix_user_module_progress_module_id"), "user_module_progress", ["module_id"], unique=False)
+    # Counters are filled by `python backfill_progress_counters.py`.
+
+
+def downgrade():
+    op.drop_index(op.f("ix_user_module_progress_module_id"), table_name="user_module_progress")
+    op.drop_index(op.f("ix_user_module_progress_user_id"), table_name="user_module_progress")
+    op.drop_index(op.f("ix_user_module_progress_id"), table_name="user_module_progress")
+    op.drop_table("user_module_progress")
+    with op.batch_alter_table("user_course_progress") as batch:
+        batch.drop_constraint("uq_user_course_progress_user_course", type_="unique")
+        batch.drop_column("total_lessons")
+        batch.drop_column("completed_lessons")
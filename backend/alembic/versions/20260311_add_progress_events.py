@@ -0,0 +1,34 @@
+"""Add append-only progress_events ledger"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260311_add_progress_events"
+down_revision = "20260310_add_progress_counters"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "progress_events",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id"), nullable=True),
+        sa.Column("block_id", sa.Integer(), nullable=True),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(op.f("ix_progress_events_id"), "progress_events", ["id"], unique=False)
+    op.create_index(
+        "ix_progress_events_user_lesson_type", "progress_events", ["user_id", "lesson_id", "event_type"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_progress_events_user_lesson_type", table_name="progress_events")
+    op.drop_index(op.f("ix_progress_events_id"), table_name="progress_events")
+    op.drop_table("progress_events")
@@ -0,0 +1,224 @@
+"""Move lesson_progress.details histories into attempt tables"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260312_add_attempt_tables"
+down_revision = "20260311_add_progress_events"
+branch_labels = None
+depends_on = None
+
+_MIGRATED_KEYS = ("flashcards", "flashcards_summary", "blocks", "audio_tasks", "pronunciation")
+_ITEM_EVENTS = ("flashcard_answered", "block_finished", "audio_task_submitted", "pronunciation_recorded")
+
+
+def _ts(value):
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        return datetime.utcnow()
+
+
+def _attempt_table(name, *columns):
+    return op.create_table(
+        name,
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id"), nullable=False),
+        *columns,
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def _copy_history(bind, flashcards, blocks, audio, pronunciation, lesson_progress, events):
+    rows = {"flashcards": [], "blocks": [], "audio": [], "pronunciation": []}
+    summaries = {}
+    for lp_id, user_id, lesson_id, details in bind.execute(
+        sa.select(lesson_progress.c.id, lesson_progress.c.user_id, lesson_progress.c.lesson_id, lesson_progress.c.details)
+    ):
+        details = details or {}
+        if not isinstance(details, dict) or not any(key in details for key in _MIGRATED_KEYS):
+            continue
+        base = {"user_id": user_id, "lesson_id": lesson_id}
+        for card_id, item in (details.get("flashcards") or {}).items():
+            item = item or {}
+            rows["flashcards"].append(
+                {**base, "card_id": str(card_id), "correct": bool(item.get("correct")), "created_at": _ts(item.get("updated_at"))}
+            )
+        for block_id, item in (details.get("blocks") or {}).items():
+            item = item or {}
+            rows["blocks"].append(
+                {
+                    **base,
+                    "block_id": str(block_id),
+                    "status": item.get("status") or "done",
+                    "time_spent": 0,
+                    "created_at": _ts(item.get("finished_at")),
+                }
+            )
+        for item in details.get("audio_tasks") or []:
+            if str(item.get("block_id") or "").isdigit():
+                rows["audio"].append(
+                    {
+                        **base,
+                        "block_id": int(item["block_id"]),
+                        "answer": item.get("answer"),
+                        "correct": bool(item.get("correct")),
+                        "created_at": _ts(item.get("submitted_at")),
+                    }
+                )
+        for item in details.get("pronunciation") or []:
+            rows["pronunciation"].append(
+                {
+                    **base,
+                    "word": item.get("word"),
+                    "score": item.get("score"),
+                    "status": item.get("status"),
+                    "created_at": _ts(item.get("recorded_at")),
+                }
+            )
+        remaining = {key: value for key, value in details.items() if key not in _MIGRATED_KEYS}
+        summaries[lp_id] = remaining or None
+
+    # Item-level events recorded in progress_events by the previous revision.
+    for user_id, lesson_id, block_id, event_type, payload, created_at in bind.execute(
+        sa.select(
+            events.c.user_id, events.c.lesson_id, events.c.block_id, events.c.event_type, events.c.payload, events.c.created_at
+        )
+        .where(events.c.event_type.in_(_ITEM_EVENTS), events.c.lesson_id.isnot(None))
+        .order_by(events.c.id)
+    ):
+        payload = payload or {}
+        base = {"user_id": user_id, "lesson_id": lesson_id, "created_at": created_at}
+        if event_type == "flashcard_answered":
+            rows["flashcards"].append({**base, "card_id": str(payload.get("card_id")), "correct": bool(payload.get("correct"))})
+        elif event_type == "block_finished":
+            rows["blocks"].append(
+                {
+                    **base,
+                    "block_id": str(payload.get("block", block_id)),
+                    "status": payload.get("status") or "done",
+                    "time_spent": int(payload.get("time_spent") or 0),
+                }
+            )
+        elif event_type == "audio_task_submitted" and block_id is not None:
+            rows["audio"].append({**base, "block_id": block_id, "answer": payload.get("answer"), "correct": bool(payload.get("correct"))})
+        elif event_type == "pronunciation_recorded":
+            rows["pronunciation"].append(
+                {**base, "word": payload.get("word"), "score": payload.get("score"), "status": payload.get("status")}
+            )
+
+    for table, key in ((flashcards, "flashcards"), (blocks, "blocks"), (audio, "audio"), (pronunciation, "pronunciation")):
+        if rows[key]:
+            op.bulk_insert(table, sorted(rows[key], key=lambda row: row["created_at"]))
+    bind.execute(events.delete().where(events.c.event_type.in_(_ITEM_EVENTS)))
+    for lp_id, details in summaries.items():
+        bind.execute(lesson_progress.update().where(lesson_progress.c.id == lp_id).values(details=details))
+
+
+def _fill_summaries(bind):
+    # Attempts for lessons without a lesson_progress row (recorded before it existed).
+    bind.execute(
+        sa.text(
+            "INSERT INTO lesson_progress (user_id, lesson_id, completed, time_spent, "
+            "flashcards_total, flashcards_correct, blocks_completed) "
+            "SELECT DISTINCT a.user_id, a.lesson_id, false, 0, 0, 0, 0 FROM ("
+            "SELECT user_id, lesson_id FROM flashcard_attempts UNION SELECT user_id, lesson_id FROM block_attempts"
+            ") a WHERE NOT EXISTS (SELECT 1 FROM lesson_progress p "
+            "WHERE p.user_id = a.user_id AND p.lesson_id = a.lesson_id)"
+        )
+    )
+    bind.execute(
+        sa.text(
+            "UPDATE lesson_progress SET "
+            "blocks_completed = (SELECT COUNT(DISTINCT b.block_id) FROM block_attempts b "
+            "WHERE b.user_id = lesson_progress.user_id AND b.lesson_id = lesson_progress.lesson_id), "
+            "flashcards_total = (SELECT COUNT(DISTINCT f.card_id) FROM flashcard_attempts f "
+            "WHERE f.user_id = lesson_progress.user_id AND f.lesson_id = lesson_progress.lesson_id), "
+            "flashcards_correct = (SELECT COUNT(*) FROM flashcard_attempts f "
+            "WHERE f.user_id = lesson_progress.user_id AND f.lesson_id = lesson_progress.lesson_id AND f.correct "
+            "AND f.id = (SELECT MAX(g.id) FROM flashcard_attempts g WHERE g.user_id = f.user_id "
+            "AND g.lesson_id = f.lesson_id AND g.card_id = f.card_id))"
+        )
+    )
+
+
+def upgrade():
+    with op.batch_alter_table("lesson_progress") as batch:
+        batch.add_column(sa.Column("flashcards_total", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("flashcards_correct", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("blocks_completed", sa.Integer(), nullable=False, server_default="0"))
+
+    flashcards = _attempt_table(
+        "flashcard_attempts",
+        sa.Column("card_id", sa.String(), nullable=False),
+        sa.Column("correct", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    blocks = _attempt_table(
+        "block_attempts",
+        sa.Column("block_id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="done"),
+        sa.Column("time_spent", sa.Integer(), nullable=False, server_default="0"),
+    )
+    audio = _attempt_table(
+        "audio_task_attempts",
+        sa.Column("block_id", sa.Integer(), nullable=False),
+        sa.Column("answer", sa.Text(), nullable=True),
+        sa.Column("correct", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    pronunciation = _attempt_table(
+        "pronunciation_attempts",
+        sa.Column("word", sa.String(), nullable=True),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+    )
+    for name in ("flashcard_attempts", "block_attempts", "audio_task_attempts", "pronunciation_attempts"):
+        op.create_index(op.f(f"ix_{name}_id"), name, ["id"], unique=False)
+    op.create_index("ix_flashcard_attempts_user_lesson_card", "flashcard_attempts", ["user_id", "lesson_id", "card_id"])
+    op.create_index("ix_block_attempts_user_lesson_block", "block_attempts", ["user_id", "lesson_id", "block_id"])
+    op.create_index("ix_audio_task_attempts_user_lesson", "audio_task_attempts", ["user_id", "lesson_id"])
+    op.create_index(op.f("ix_audio_task_attempts_block_id"), "audio_task_attempts", ["block_id"])
+    op.create_index("ix_pronunciation_attempts_user_lesson", "pronunciation_attempts", ["user_id", "lesson_id"])
+
+    bind = op.get_bind()
+    lesson_progress = sa.table(
+        "lesson_progress",
+        sa.column("id", sa.Integer()),
+        sa.column("user_id", sa.Integer()),
+        sa.column("lesson_id", sa.Integer()),
+        sa.column("details", sa.JSON()),
+    )
+    events = sa.table(
+        "progress_events",
+        sa.column("id", sa.Integer()),
+        sa.column("user_id", sa.Integer()),
+        sa.column("lesson_id", sa.Integer()),
+        sa.column("block_id", sa.Integer()),
+        sa.column("event_type", sa.String()),
+        sa.column("payload", sa.JSON()),
+        sa.column("created_at", sa.DateTime()),
+    )
+    _copy_history(bind, flashcards, blocks, audio, pronunciation, lesson_progress, events)
+    _fill_summaries(bind)
+
+
+def downgrade():
+    # Attempts are not folded back into lesson_progress.details.
+    op.drop_index("ix_pronunciation_attempts_user_lesson", table_name="pronunciation_attempts")
+    op.drop_index(op.f("ix_audio_task_attempts_block_id"), table_name="audio_task_attempts")
+    op.drop_index("ix_audio_task_attempts_user_lesson", table_name="audio_task_attempts")
+    op.drop_index("ix_block_attempts_user_lesson_block", table_name="block_attempts")
+    op.drop_index("ix_flashcard_attempts_user_lesson_card", table_name="flashcard_attempts")
+    for name in ("pronunciation_attempts", "audio_task_attempts", "block_attempts", "flashcard_attempts"):
+        op.drop_index(op.f(f"ix_{name}_id"), table_name=name)
+        op.drop_table(name)
+    with op.batch_alter_table("lesson_progress") as batch:
+        batch.drop_column("blocks_completed")
+        batch.drop_column("flashcards_correct")
+        batch.drop_column("flashcards_total")
@@ -0,0 +1,29 @@
+"""Enforce one user_lesson_progress row per user and lesson for upserts"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20260313_unique_user_lesson_progress"
+down_revision = "20260312_add_attempt_tables"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Prefer a finished row, then the newest one, before enforcing uniqueness.
+    op.execute(
+        "DELETE FROM user_lesson_progress WHERE id NOT IN ("
+        "SELECT keep_id FROM ("
+        "SELECT (SELECT u.id FROM user_lesson_progress u WHERE u.user_id = g.user_id AND u.lesson_id = g.lesson_id "
+        "ORDER BY CASE WHEN u.status = 'finished' THEN 0 ELSE 1 END, u.id DESC LIMIT 1) AS keep_id "
+        "FROM (SELECT DISTINCT user_id, lesson_id FROM user_lesson_progress) g"
+        ") k)"
+    )
+    with op.batch_alter_table("user_lesson_progress") as batch:
+        batch.create_unique_constraint("uq_user_lesson_progress_user_lesson", ["user_id", "lesson_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("user_lesson_progress") as batch:
+        batch.drop_constraint("uq_user_lesson_progress_user_lesson", type_="unique")
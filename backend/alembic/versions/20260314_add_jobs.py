@@ -0,0 +1,37 @@
+"""Add jobs table for asynchronous checks"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260314_add_jobs"
+down_revision = "20260313_unique_user_lesson_progress"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(length=32), primary_key=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False, server_default="queued"),
+        sa.Column("stage", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(op.f("ix_jobs_user_id"), "jobs", ["user_id"], unique=False)
+    op.create_index("ix_jobs_status_created", "jobs", ["status", "created_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_jobs_status_created", table_name="jobs")
+    op.drop_index(op.f("ix_jobs_user_id"), table_name="jobs")
+    op.drop_table("jobs")
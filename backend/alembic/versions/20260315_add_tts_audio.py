@@ -0,0 +1,33 @@
+"""Add tts_audio index for the shared TTS store"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260315_add_tts_audio"
+down_revision = "20260314_add_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tts_audio",
+        sa.Column("key", sa.String(length=64), primary_key=True, nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("lang", sa.String(length=16), nullable=False, server_default="kk"),
+        sa.Column("voice", sa.String(length=32), nullable=False, server_default="default"),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("pinned", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_tts_audio_pinned_last_used", "tts_audio", ["pinned", "last_used_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_tts_audio_pinned_last_used", table_name="tts_audio")
+    op.drop_table("tts_audio")
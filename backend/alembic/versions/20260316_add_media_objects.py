@@ -0,0 +1,32 @@
+"""Add media_objects for the content-addressed upload store"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260316_add_media_objects"
+down_revision = "20260315_add_tts_audio"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "media_objects",
+        sa.Column("sha256", sa.String(length=64), primary_key=True, nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False, server_default=""),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("url", sa.String(), nullable=False, unique=True),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("counted_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_media_objects_ref_count_created", "media_objects", ["ref_count", "created_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_media_objects_ref_count_created", table_name="media_objects")
+    op.drop_table("media_objects")
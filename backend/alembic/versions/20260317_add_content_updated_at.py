@@ -0,0 +1,37 @@
+"""Add updated_at to flashcards, quizzes, modules and courses"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260317_add_content_updated_at"
+down_revision = "20260316_add_media_objects"
+branch_labels = None
+depends_on = None
+
+TABLES = ("flashcards", "quizzes", "modules", "courses")
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == "sqlite"
+    for table in TABLES:
+        # SQLite cannot add a column with a non-constant default; fill it in afterwards.
+        op.add_column(
+            table,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                server_default=None if is_sqlite else sa.func.now(),
+                nullable=True if is_sqlite else False,
+            ),
+        )
+        if is_sqlite:
+            bind.execute(sa.text(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("updated_at")
@@ -0,0 +1,48 @@
+"""Keep lesson step indexes in progress_events.block_id and index them"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260318_index_lesson_steps"
+down_revision = "20260317_add_content_updated_at"
+branch_labels = None
+depends_on = None
+
+STEP_EVENT = "lesson_step_finished"
+
+
+def upgrade():
+    bind = op.get_bind()
+    events = sa.table(
+        "progress_events",
+        sa.column("id", sa.Integer),
+        sa.column("block_id", sa.Integer),
+        sa.column("event_type", sa.String),
+        sa.column("payload", sa.JSON),
+    )
+    # Step events stored the index only in the JSON payload.
+    for event_id, payload in bind.execute(
+        sa.select(events.c.id, events.c.payload).where(events.c.event_type == STEP_EVENT, events.c.block_id.is_(None))
+    ).all():
+        try:
+            index = int((payload or {}).get("block_index"))
+        except (TypeError, ValueError):
+            continue
+        bind.execute(events.update().where(events.c.id == event_id).values(block_id=index))
+
+    op.drop_index("ix_progress_events_user_lesson_type", table_name="progress_events")
+    op.create_index(
+        "ix_progress_events_user_lesson_type_block",
+        "progress_events",
+        ["user_id", "lesson_id", "event_type", "block_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_progress_events_user_lesson_type_block", table_name="progress_events")
+    op.create_index(
+        "ix_progress_events_user_lesson_type", "progress_events", ["user_id", "lesson_id", "event_type"], unique=False
+    )
@@ -0,0 +1,44 @@
+"""Add block_completions, the first completion of each block per user"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260319_add_block_completions"
+down_revision = "20260318_index_lesson_steps"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    completions = op.create_table(
+        "block_completions",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("lesson_id", sa.Integer(), sa.ForeignKey("lessons.id"), nullable=False),
+        sa.Column("block_id", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("user_id", "lesson_id", "block_id", name="uq_block_completions_user_lesson_block"),
+    )
+    op.create_index(op.f("ix_block_completions_id"), "block_completions", ["id"], unique=False)
+
+    attempts = sa.table(
+        "block_attempts",
+        sa.column("user_id", sa.Integer),
+        sa.column("lesson_id", sa.Integer),
+        sa.column("block_id", sa.String),
+        sa.column("created_at", sa.DateTime),
+    )
+    first = (
+        sa.select(attempts.c.user_id, attempts.c.lesson_id, attempts.c.block_id, sa.func.min(attempts.c.created_at))
+        .group_by(attempts.c.user_id, attempts.c.lesson_id, attempts.c.block_id)
+    )
+    op.execute(
+        completions.insert().from_select(["user_id", "lesson_id", "block_id", "created_at"], first)
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_block_completions_id"), table_name="block_completions")
+    op.drop_table("block_completions")
@@ -0,0 +1,38 @@
+"""Add media_objects.last_uploaded_at, the garbage collection grace period anchor"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20260320_add_media_last_uploaded_at"
+down_revision = "20260319_add_block_completions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == "sqlite"
+    # SQLite cannot add a column with a non-constant default; fill it in afterwards.
+    op.add_column(
+        "media_objects",
+        sa.Column(
+            "last_uploaded_at",
+            sa.DateTime(),
+            server_default=None if is_sqlite else sa.func.now(),
+            nullable=True if is_sqlite else False,
+        ),
+    )
+    bind.execute(sa.text("UPDATE media_objects SET last_uploaded_at = created_at WHERE last_uploaded_at IS NULL"))
+    op.drop_index("ix_media_objects_ref_count_created", table_name="media_objects")
+    op.create_index(
+        "ix_media_objects_ref_count_last_uploaded", "media_objects", ["ref_count", "last_uploaded_at"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_media_objects_ref_count_last_uploaded", table_name="media_objects")
+    op.create_index("ix_media_objects_ref_count_created", "media_objects", ["ref_count", "created_at"], unique=False)
+    with op.batch_alter_table("media_objects") as batch:
+        batch.drop_column("last_uploaded_at")
@@ -1,9 +1,14 @@
+from typing import Any, Callable, TypeVar
+
 from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..core.security import get_user_id_from_request
+from ..core.security import get_session_token_from_request, parse_session_token
 from ..core.config import get_settings
-from ..db import get_db
+from ..core.user_cache import cache_user
+from ..db import get_async_db, get_db
 from ..db.models import User
 
 
@@ -12,20 +17,46 @@ def current_db(request: Request, db: Session = Depends(get_db)) -> Session:
     return db
 
 
+async def current_async_db(request: Request, db: AsyncSession = Depends(get_async_db)) -> AsyncSession:
+    request.state.db = db
+    return db
+
+
+# Session of the hot read routes: AsyncSession when ASYNC_DB_ENABLED is set, else the sync one.
+read_db = current_async_db if get_settings().async_db_enabled else current_db
+
+T = TypeVar("T")
+
+
+async def run_db(db: Session | AsyncSession, fn: Callable[..., T], *args: Any) -> T:
+    """Run the sync builder ``fn(session, *args)`` on the async connection or in the threadpool."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+
 def get_current_user(
     request: Request,
     db: Session = Depends(get_db),
     allow_anonymous: bool = False,
 ) -> User | None:
     if getattr(request.state, "user", None):
-        return request.state.user
-
-    user_id = get_user_id_from_request(request)
-    if user_id:
-        user = db.get(User, user_id)
+        # Attach the middleware's detached copy to this session without a SELECT.
+        user = db.merge(request.state.user, load=False)
         request.state.user = user
-        if user:
-            return user
+        return user
+
+    # The middleware already resolved this token (hit or miss); do not query again.
+    if not getattr(request.state, "user_resolved", False):
+        token = get_session_token_from_request(request)
+        user_id = parse_session_token(token) if token else None
+        if user_id:
+            user = db.get(User, user_id)
+            request.state.user = user
+            request.state.user_resolved = True
+            if user:
+                cache_user(token, user)
+                return user
 
     if allow_anonymous:
         return None
@@ -55,4 +86,13 @@ def get_user_or_none(request: Request, db: Session = Depends(get_db)) -> User |
     return get_current_user(request, db=db, allow_anonymous=True)
 
 
-__all__ = ["current_db", "get_current_user", "require_user", "require_admin", "get_user_or_none"]
+__all__ = [
+    "current_db",
+    "current_async_db",
+    "get_current_user",
+    "get_user_or_none",
+    "read_db",
+    "require_admin",
+    "require_user",
+    "run_db",
+]
@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -9,8 +10,12 @@ from ...api import deps
 from ...db import models
 from ...schemas.block import LessonBlockCreate, LessonBlockUpdate, ReorderBlocks, validate_block_payload
 from ...schemas.lesson import LessonCreate, LessonUpdate
+from ...services.job_service import job_runner
+from ...services.lesson_audio_service import JOB_KIND as LESSON_AUDIO_JOB
 from ...services.progress_service import normalize_block, ordered_blocks, serialize_lesson
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/admin/lessons", tags=["admin-lessons"])
 
 # Validation codes for publish readiness
@@ -212,7 +217,16 @@ def publish_lesson(lesson_id: int, db: Session = Depends(deps.current_db), user=
     db.add(lesson)
     db.commit()
     db.refresh(lesson)
-    return serialize_lesson(lesson)
+    result = serialize_lesson(lesson)
+    # Synthesize missing word/transcript audio in the background so students never wait for TTS.
+    try:
+        job = job_runner.submit(db, kind=LESSON_AUDIO_JOB, payload={"lesson_id": lesson.id}, user_id=getattr(user, "id", None))
+    except Exception as exc:  # pragma: no cover - publishing must not fail on the audio job
+        logger.warning("[tts] could not queue audio for lesson=%s: %s", lesson.id, exc)
+        db.rollback()
+    else:
+        result["audio_job_id"] = job.id
+    return result
 
 
 @router.get("/{lesson_id}/blocks")
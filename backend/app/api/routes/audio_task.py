@@ -1,10 +1,9 @@
-from datetime import datetime
-
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from ...api import deps
 from ...db import models
+from ...services import progress_ledger
 
 router = APIRouter(prefix="/api/audio-task", tags=["audio-task"])
 
@@ -41,27 +40,7 @@ def submit_audio_task(payload: dict, request: Request, db: Session = Depends(dep
     correct = user_answer.strip().lower() == correct_answer.strip().lower()
     feedback = data.get("feedback") or ("Верно" if correct else "Попробуйте ещё")
 
-    # persist attempt in LessonProgress
-    lp = (
-        db.query(models.LessonProgress)
-        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not lp:
-        lp = models.LessonProgress(user_id=user.id, lesson_id=lesson_id, completed=False, time_spent=0, details={})
-    details = lp.details or {}
-    attempts = details.get("audio_tasks") or []
-    attempts.append(
-        {
-          "block_id": block_id,
-          "answer": user_answer,
-          "correct": correct,
-          "submitted_at": datetime.utcnow().isoformat(),
-        }
-    )
-    details["audio_tasks"] = attempts[-100:]
-    lp.details = details
-    db.add(lp)
+    progress_ledger.audio_task_submitted(db, user.id, lesson_id, block_id, user_answer, correct)
     db.commit()
 
     return {
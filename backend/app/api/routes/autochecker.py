@@ -1,24 +1,33 @@
 import asyncio
+import csv
+import io
+import json
 import logging
-import re
+import time
 import uuid
+from pathlib import Path
 from string import Template
 from typing import Any
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form, Request, status
-from fastapi.responses import ORJSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, ValidationError
 
 from ...api import deps
+from ...core.llm_cache import llm_result_cache, make_key, template_version
+from ...services import job_service, kazakh_precheck
 from ...services.autochecker_service import AutoCheckerService, AutoCheckerError
 from ...services.free_writing_service import FreeWritingService, FreeWritingResult
-from ...services.llm_client import LLMClient, LLMClientError
+from ...services.kazakh_precheck import COMMON_KK_WORDS, KAZAKH_CHARS  # noqa: F401 - re-exported
+from ...services.kazakh_precheck import looks_like_kazakh as _looks_like_kazakh
+from ...services.llm_client import LLMCircuitOpen, LLMClient, LLMClientError, hedge_stats, single_flight_stats
+from ...services.llm_queue import LLMQueueFull, llm_queue
 
 router = APIRouter(prefix="/api/autochecker", tags=["autochecker"])
 
 service = AutoCheckerService()
 llm_client = LLMClient(timeout_seconds=60)
-free_writing_service = FreeWritingService(client=llm_client)
+free_writing_service = FreeWritingService(client=llm_client, cache=llm_result_cache)
 logger = logging.getLogger(__name__)
 
 LLM_SYSTEM_PROMPT = """
@@ -87,9 +96,6 @@ LLM_SYSTEM_PROMPT = """
 Ты — не чат-бот, ты — строгий, но доброжелательный учитель.
 """
 
-KAZAKH_CHARS = {"ә", "ғ", "қ", "ң", "ө", "ұ", "ү", "һ", "і", "Ә", "Ғ", "Қ", "Ң", "Ө", "Ұ", "Ү", "Һ", "І"}
-COMMON_KK_WORDS = {"сәлем", "қазақ", "үй", "және", "бар", "жоқ", "бүгін", "ертең", "сабағы", "мәтін", "оқушы"}
-
 LEVEL_INSTRUCTIONS = {
     "A1": "Level A1: simplify explanations, avoid linguistic terms, list no more than 7 concise issues, keep guidance short and clear.",
     "A2": "Level A2: give a bit more detail, practical tips, up to 10 issues with short rationales.",
@@ -133,6 +139,7 @@ Rules:
 - Limit issues to $max_issues items; be concise per the level guidance.
 - Tailor strictness to the level (A1 simpler, B1 more detailed).
 
+$local_findings
 User text:
 $user_text
 """
@@ -140,25 +147,6 @@ $user_text
 
 
 
-def _looks_like_kazakh(text: str) -> bool:
-    """Lightweight heuristic to detect Kazakh text."""
-    if not text:
-        return False
-    lowered = text.lower()
-    if any(ch in KAZAKH_CHARS for ch in lowered):
-        return True
-    words = re.findall(r"[a-zа-яёғөңұүқһі]+", lowered)
-    if not words:
-        return False
-    if sum(1 for w in words if w in COMMON_KK_WORDS) >= 2:
-        return True
-    cyrillic_letters = [ch for ch in lowered if "а" <= ch <= "я" or ch in {"ё", "і"}]
-    if not cyrillic_letters:
-        return False
-    kaz_ratio = sum(1 for ch in lowered if ch in {"ә", "ғ", "қ", "ң", "ө", "ұ", "ү", "һ", "і"}) / len(cyrillic_letters)
-    return kaz_ratio >= 0.08
-
-
 def _max_issues_for_level(level: str) -> int:
     if level == "A1":
         return 7
@@ -181,15 +169,24 @@ async def autochecker_health(request: Request, user=Depends(deps.require_admin))
             {"ok": False, "provider": "llm", "key_present": False, "request_id": req_id},
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
         )
-    try:
-        await asyncio.to_thread(llm_client.generate_text, "Say just: OK")
-        return {"ok": True, "provider": "llm", "key_present": True, "request_id": req_id, "model": llm_client.model, "base_url": llm_client.base_url}
-    except Exception as exc:  # pragma: no cover - network errors
-        logger.warning("[autochecker] health req=%s failed: %s", req_id, exc)
-        return ORJSONResponse(
-            {"ok": False, "provider": "llm", "key_present": True, "error": "LLM error", "details": str(exc), "request_id": req_id},
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-        )
+    # Report the circuit breakers fed by real traffic instead of spending an LLM call per probe.
+    providers = llm_client.describe_providers()
+    breaker = providers[0]["breaker"]
+    body = {
+        "ok": any(item["breaker"]["state"] != "open" for item in providers),
+        "provider": "llm",
+        "key_present": True,
+        "request_id": req_id,
+        "model": llm_client.model,
+        "base_url": llm_client.base_url,
+        "breaker": breaker,
+        "providers": providers,
+    }
+    if not body["ok"]:
+        logger.warning("[autochecker] health req=%s circuit open: %s", req_id, breaker["last_error"])
+        body.update({"error": "LLM circuit open", "details": breaker["last_error"]})
+        return ORJSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return body
 
 
 @router.post(
@@ -307,39 +304,122 @@ def _failure_response(message: str = "AI model unavailable") -> dict:
     }
 
 
-async def _call_llm(text: str) -> dict | None:
+def _precheck(text: str, reference: str | None, language: str | None) -> kazakh_precheck.PrecheckResult:
+    """
+    Local Kazakh pre-check. Other input (Russian) only short-circuits on an exact
+    match with the reference; its words are not run through the Kazakh rules.
+    """
+    if language == "kk" or _looks_like_kazakh(text):
+        return kazakh_precheck.precheck(text, reference=reference)
+    if reference and text.split() == reference.split():
+        return kazakh_precheck.precheck(text, reference=reference)
+    return kazakh_precheck.PrecheckResult()
+
+
+def _html_prompt(text: str, report: kazakh_precheck.PrecheckResult | None = None) -> str:
+    hint = report.prompt_hint() if report else ""
+    if hint:
+        return f"{LLM_SYSTEM_PROMPT}\n\n{hint}\n\nText:\n{text}"
+    return f"{LLM_SYSTEM_PROMPT}\n\nText:\n{text}"
+
+
+def _html_cache_key(text: str, model_name: str, reference: str | None = None, language: str | None = None) -> str:
+    version = template_version(LLM_SYSTEM_PROMPT, kazakh_precheck.RULES_VERSION)
+    # The reference shapes the merged local findings, so it is part of the answer.
+    return make_key("autochecker_html", version, model_name, text, reference=reference, language=language)
+
+
+def _local_mistakes(report: kazakh_precheck.PrecheckResult) -> list[dict]:
+    return [
+        {"fragment": f.bad_excerpt, "issue": f.type, "explanation": f.why, "suggestion": f.fix}
+        for f in report.findings
+    ]
+
+
+def _precheck_response(text: str, report: kazakh_precheck.PrecheckResult) -> dict:
+    """Answer for a text the local pre-check resolved without the LLM."""
+    score = report.score or 0
+    return {
+        "ai_used": False,
+        "model": "local-precheck",
+        "overall_score": score,
+        "categories": {"grammar": score, "vocabulary": score, "word_order": score, "clarity": score},
+        "mistakes": _local_mistakes(report),
+        "mentor_feedback": report.message,
+        "improved_version": text,
+        "recommendations": [],
+        "precheck": report.verdict,
+    }
+
+
+def _merge_mistakes(normalized: dict, report: kazakh_precheck.PrecheckResult) -> dict:
+    local = _local_mistakes(report)
+    if not local:
+        return normalized
+    seen = {item["fragment"] for item in local}
+    rest = [item for item in normalized.get("mistakes") or [] if item.get("fragment") not in seen]
+    return {**normalized, "mistakes": local + rest}
+
+
+def _finalize_html(response: Any, model_name: str) -> tuple[dict | None, str | None]:
+    """Validate a raw LLM payload; returns (normalized, None) or (None, error message)."""
+    data = response or {}
+    has_required = (
+        isinstance(data, dict)
+        and "overall_score" in data
+        and "categories" in data
+        and "improved_version" in data
+    )
+    if not has_required:
+        keys = list(data.keys()) if isinstance(data, dict) else type(data).__name__
+        logger.warning("[autochecker] LLM analysis failed: incomplete payload keys=%s", keys)
+        return None, "LLM returned incomplete payload"
+    normalized = _normalize_schema(data, model_name=model_name)
+    if not normalized:
+        logger.warning("[autochecker] LLM analysis failed: normalization returned None")
+        return None, "LLM returned invalid payload"
+    return normalized, None
+
+
+async def _call_llm(
+    text: str, user_id: int | None = None, reference: str | None = None, language: str | None = None
+) -> dict | None:
     model_name = getattr(llm_client, "model", None) or "llm-default"
+    report = _precheck(text, reference, language)
+    if report.resolved:
+        logger.info("[autochecker] resolved locally verdict=%s", report.verdict)
+        return _precheck_response(text, report)
     if not llm_client.is_configured():
         print("[autochecker] LLM skipped: LLM_API_KEY is not configured")
         return _failure_response("LLM_API_KEY is not configured")
 
+    cache_key = _html_cache_key(text, model_name, reference, language)
+    cached = await llm_result_cache.aget(cache_key)
+    if cached:
+        logger.info("[autochecker] LLM cache hit model=%s", model_name)
+        return {**cached, "cached": True}
+
     logger.info("[autochecker] LLM request start model=%s", model_name)
     try:
         response = await asyncio.wait_for(
-            asyncio.to_thread(
-                llm_client.generate_json,
-                f"{LLM_SYSTEM_PROMPT}\n\nText:\n{text}",
-            ),
+            llm_client.agenerate_json(_html_prompt(text, report), dedupe_key=cache_key, user_id=user_id),
             timeout=60,
         )
         raw_preview = str(response)[:200]
         logger.info("[autochecker] LLM raw response model=%s preview=%r", model_name, raw_preview)
-        data = response or {}
-        has_required = (
-            isinstance(data, dict)
-            and "overall_score" in data
-            and "categories" in data
-            and "improved_version" in data
-        )
-        if not has_required:
-            logger.warning("[autochecker] LLM analysis failed: incomplete payload keys=%s", list(data.keys()))
-            return _failure_response("LLM returned incomplete payload")
-        normalized = _normalize_schema(data, model_name=model_name)
+        normalized, error = _finalize_html(response, model_name)
         if not normalized:
-            logger.warning("[autochecker] LLM analysis failed: normalization returned None")
-            return _failure_response("LLM returned invalid payload")
+            return _failure_response(error)
+        normalized = _merge_mistakes(normalized, report)
         logger.info("[autochecker] LLM request succeeded model=%s", model_name)
-        return normalized
+        await llm_result_cache.aput(cache_key, normalized)
+        return {**normalized, "cached": False}
+    except LLMQueueFull:
+        raise
+    except LLMCircuitOpen:
+        # Provider is down: let the caller answer with the local baseline right away.
+        logger.warning("[autochecker] LLM skipped: circuit open model=%s", model_name)
+        return None
     except asyncio.TimeoutError:
         logger.warning("[autochecker] LLM analysis failed: timeout for model=%s", model_name)
         return _failure_response("LLM timeout")
@@ -380,11 +460,14 @@ def _baseline_response(text: str) -> dict:
 @router.post("/html")
 async def autochecker_html(payload: dict, user=Depends(deps.require_user)):
     text = str(payload.get("text") or "").strip()
-    language = str(payload.get("language") or "").strip()
-    del user, language  # reserved for future use
+    language = str(payload.get("language") or "").strip().lower() or None
+    reference = str(payload.get("reference") or "").strip() or None
     if not text:
         return _failure_response("AI model unavailable")
-    llm_result = await _call_llm(text)
+    try:
+        llm_result = await _call_llm(text, getattr(user, "id", None), reference, language)
+    except LLMQueueFull as exc:
+        return _queue_full_response(exc, None)
     if llm_result:
         return llm_result
     return _baseline_response(text)
@@ -402,6 +485,7 @@ class TextCheckPayload(BaseModel):
     language: str = Field(default="kk", pattern="^(kk|ru)$")
     level: str = Field(default="A1", pattern="^(A1|A2|B1)$")
     mode: str = Field(default="full")
+    reference: str | None = None
 
 
 class TextCheckSummary(BaseModel):
@@ -439,6 +523,18 @@ def _free_writing_error(message: str, details: Any, status_code: int, request_id
     return ORJSONResponse(payload, status_code=status_code)
 
 
+def _queue_full_response(exc: LLMQueueFull, request_id: str | None) -> ORJSONResponse:
+    response = _free_writing_error("LLM queue is full", str(exc), status.HTTP_429_TOO_MANY_REQUESTS, request_id)
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+def _circuit_open_response(exc: LLMCircuitOpen, request_id: str | None) -> ORJSONResponse:
+    response = _free_writing_error("LLM unavailable", str(exc), status.HTTP_503_SERVICE_UNAVAILABLE, request_id)
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
 def _normalize_text_response(
     raw: dict,
     *,
@@ -448,6 +544,7 @@ def _normalize_text_response(
     original_text: str,
     enforce_kazakh: bool,
     warning: str | None = None,
+    local_issues: list[dict] | None = None,
 ) -> TextCheckResponse | None:
     if not isinstance(raw, dict):
         return None
@@ -477,11 +574,14 @@ def _normalize_text_response(
     )
 
     issues_raw = raw.get("issues") or []
-    issues: list[TextCheckIssue] = []
+    issues: list[TextCheckIssue] = [TextCheckIssue(**item) for item in local_issues or []]
+    seen = {issue.bad_excerpt for issue in issues}
     if isinstance(issues_raw, (list, tuple)):
         for item in issues_raw:
             if not isinstance(item, dict):
                 continue
+            if str(item.get("bad_excerpt") or item.get("fragment") or "").strip() in seen:
+                continue
             issues.append(
                 TextCheckIssue(
                     type=str(item.get("type") or "grammar"),
@@ -513,6 +613,18 @@ def _normalize_text_response(
     return payload
 
 
+def _free_writing_body(result: FreeWritingResult) -> dict:
+    return {
+        "ok": True,
+        "score": result.score,
+        "level": result.level,
+        "feedback": result.feedback,
+        "corrections": result.corrections or [],
+        "model": result.model,
+        "cached": result.cached,
+    }
+
+
 @router.post("/free-writing/check")
 async def free_writing_check(payload: dict, request: Request, user=Depends(deps.require_user)):
     req_id = _get_request_id(request)
@@ -535,36 +647,28 @@ async def free_writing_check(payload: dict, request: Request, user=Depends(deps.
             rubric=data.rubric,
             language=data.language.lower() if isinstance(data.language, str) else "kk",
             request_id=req_id,
+            user_id=getattr(user, "id", None),
         )
+    except LLMQueueFull as exc:
+        return _queue_full_response(exc, req_id)
+    except LLMCircuitOpen as exc:
+        return _circuit_open_response(exc, req_id)
     except LLMClientError as exc:
         return _free_writing_error("LLM error", str(exc), status.HTTP_503_SERVICE_UNAVAILABLE, req_id)
     except Exception as exc:  # pragma: no cover - defensive
         logger.exception("[autochecker] free-writing req=%s unexpected error", req_id)
         return _free_writing_error("Unexpected error", str(exc), status.HTTP_500_INTERNAL_SERVER_ERROR, req_id)
 
-    return {
-        "ok": True,
-        "score": result.score,
-        "level": result.level,
-        "feedback": result.feedback,
-        "corrections": result.corrections or [],
-        "model": result.model,
-        "request_id": req_id,
-    }
-
-
-@router.post("/text-check")
-async def text_check(payload: dict, request: Request, user=Depends(deps.require_user)):
-    req_id = _get_request_id(request)
-    try:
-        data = TextCheckPayload.model_validate(payload)
-    except ValidationError as exc:
-        return _free_writing_error("Invalid payload", exc.errors(), status.HTTP_400_BAD_REQUEST, req_id)
+    return {**_free_writing_body(result), "request_id": req_id}
 
-    text = (data.text or "").strip()
-    if not text:
-        return _free_writing_error("Text is empty", None, status.HTTP_400_BAD_REQUEST, req_id)
 
+def _prepare_text_check(
+    data: TextCheckPayload, text: str, req_id: str
+) -> tuple[str, dict, kazakh_precheck.PrecheckResult]:
+    """
+    Build the text-check prompt; returns it with the keyword arguments for
+    _normalize_text_response and the local pre-check report.
+    """
     # Guard length
     max_len = 4000
     if len(text) > max_len:
@@ -582,6 +686,7 @@ async def text_check(payload: dict, request: Request, user=Depends(deps.require_
     if level not in {"A1", "A2", "B1"}:
         level = "A1"
 
+    report = _precheck(text, data.reference, language)
     lang_name = "Kazakh" if language == "kk" else "Russian"
     prompt = TEXT_CHECK_PROMPT.safe_substitute(
         lang_code=language,
@@ -590,23 +695,164 @@ async def text_check(payload: dict, request: Request, user=Depends(deps.require_
         request_id=req_id,
         level_rules=LEVEL_INSTRUCTIONS[level],
         max_issues=_max_issues_for_level(level),
+        local_findings=report.prompt_hint(),
         user_text=text,
     )
+    normalize_args = {
+        "req_id": req_id,
+        "language": language,
+        "level": level,
+        "original_text": text,
+        "enforce_kazakh": detected_kazakh,
+        "warning": warning,
+        "local_issues": report.issues(),
+    }
+    return prompt, normalize_args, report
+
+
+def _text_check_local(report: kazakh_precheck.PrecheckResult, normalize_args: dict) -> dict:
+    """/text-check answer for a text the local pre-check resolved without the LLM."""
+    points = 10 if report.score == 100 else 0
+    text = normalize_args["original_text"]
+    payload = TextCheckResponse(
+        request_id=normalize_args["req_id"],
+        language=normalize_args["language"],
+        level=normalize_args["level"],
+        score=report.score or 0,
+        summary=TextCheckSummary(grammar=points, lexicon=points, spelling=points, punctuation=points),
+        issues=[TextCheckIssue(**item) for item in normalize_args["local_issues"]],
+        corrected_text=text,
+        original_text=text,
+        warning=report.message,
+    )
+    return payload.model_dump(exclude_none=True)
+
+
+BATCH_MAX_SUBMISSIONS = 500
+BATCH_MAX_CONCURRENCY = 32
+BATCH_REPORT_FIELDS = ("index", "id", "ok", "score", "level", "feedback", "corrections", "cached", "duplicate_of", "error")
+
+
+def _batch_line(index: int, item: dict, result: FreeWritingResult | Exception, first: int) -> dict:
+    line: dict[str, Any] = {"index": index, "id": item.get("id")}
+    if isinstance(result, Exception):
+        line.update({"ok": False, "error": str(result) or result.__class__.__name__})
+    else:
+        line.update(_free_writing_body(result))
+    if index != first:
+        line["duplicate_of"] = first
+    return line
+
+
+@router.post("/free-writing/batch")
+async def free_writing_batch(payload: dict, request: Request, user=Depends(deps.require_admin)):
+    """
+    Grade many free-writing answers in one request (teachers).
+
+    Body: ``{"submissions": [{id?, prompt, student_answer | answer, rubric?, language?}],
+    "concurrency"?: int, "format"?: "ndjson" | "csv"}``. Identical submissions are
+    graded once. ``ndjson`` streams one line per submission as results arrive and
+    ends with a ``summary`` line; ``csv`` returns a downloadable report.
+    """
+    req_id = _get_request_id(request)
+    raw = payload.get("submissions")
+    if not isinstance(raw, list) or not raw:
+        return _free_writing_error("Invalid payload", "submissions must be a non-empty list", status.HTTP_400_BAD_REQUEST, req_id)
+    if len(raw) > BATCH_MAX_SUBMISSIONS:
+        return _free_writing_error(
+            "Too many submissions", f"at most {BATCH_MAX_SUBMISSIONS} per batch", status.HTTP_400_BAD_REQUEST, req_id
+        )
+    submissions: list[dict] = []
+    errors = []
+    for index, item in enumerate(raw):
+        item = dict(item) if isinstance(item, dict) else {}
+        item.setdefault("student_answer", item.get("answer"))
+        try:
+            data = FreeWritingPayload.model_validate(item)
+        except ValidationError as exc:
+            errors.append({"index": index, "errors": exc.errors(include_url=False)})
+            continue
+        submissions.append({**data.model_dump(), "language": data.language.lower(), "id": item.get("id")})
+    if errors:
+        return _free_writing_error("Invalid payload", errors, status.HTTP_400_BAD_REQUEST, req_id)
+    if not llm_client.is_configured():
+        return _free_writing_error("LLM error", "LLM_API_KEY is not configured", status.HTTP_503_SERVICE_UNAVAILABLE, req_id)
 
     try:
-        raw = await asyncio.to_thread(llm_client.generate_json, prompt, max_retries=2)
-        normalized = _normalize_text_response(
-            raw or {},
-            req_id=req_id,
-            language=language,
-            level=level,
-            original_text=text,
-            enforce_kazakh=detected_kazakh,
-            warning=warning,
+        concurrency = int(payload.get("concurrency") or llm_queue.max_concurrency)
+    except (TypeError, ValueError):
+        concurrency = llm_queue.max_concurrency
+    concurrency = max(1, min(BATCH_MAX_CONCURRENCY, concurrency))
+    user_id = getattr(user, "id", None)
+    logger.info("[autochecker] free-writing batch req=%s size=%s concurrency=%s", req_id, len(submissions), concurrency)
+
+    async def lines():
+        started = time.perf_counter()
+        summary = {"total": len(submissions), "unique": 0, "graded": 0, "failed": 0, "cached": 0}
+        async for indices, result in free_writing_service.check_many(
+            submissions, concurrency=concurrency, user_id=user_id, lane="bulk"
+        ):
+            summary["unique"] += 1
+            if isinstance(result, Exception):
+                summary["failed"] += len(indices)
+            else:
+                summary["graded"] += len(indices)
+                summary["cached"] += int(result.cached)
+            for index in indices:
+                yield _batch_line(index, submissions[index], result, indices[0])
+        elapsed = time.perf_counter() - started
+        summary["elapsed_ms"] = round(elapsed * 1000, 1)
+        summary["per_second"] = round(len(submissions) / elapsed, 2) if elapsed else None
+        yield {"summary": summary, "request_id": req_id}
+
+    if str(payload.get("format") or "ndjson").lower() == "csv":
+        rows = []
+        async for line in lines():
+            if "summary" not in line:
+                rows.append(line)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=BATCH_REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for row in sorted(rows, key=lambda row: row["index"]):
+            writer.writerow({**row, "corrections": " | ".join(row.get("corrections") or [])})
+        return Response(
+            buffer.getvalue(),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="free-writing-report.csv"'},
         )
+
+    async def ndjson():
+        async for line in lines():
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.post("/text-check")
+async def text_check(payload: dict, request: Request, user=Depends(deps.require_user)):
+    req_id = _get_request_id(request)
+    try:
+        data = TextCheckPayload.model_validate(payload)
+    except ValidationError as exc:
+        return _free_writing_error("Invalid payload", exc.errors(), status.HTTP_400_BAD_REQUEST, req_id)
+
+    text = (data.text or "").strip()
+    if not text:
+        return _free_writing_error("Text is empty", None, status.HTTP_400_BAD_REQUEST, req_id)
+    prompt, normalize_args, report = _prepare_text_check(data, text, req_id)
+    if report.resolved:
+        return _text_check_local(report, normalize_args)
+
+    try:
+        raw = await llm_client.agenerate_json(prompt, max_retries=2, user_id=getattr(user, "id", None))
+        normalized = _normalize_text_response(raw or {}, **normalize_args)
         if not normalized:
             raise LLMClientError("LLM returned invalid payload")
         return normalized.model_dump(exclude_none=True)
+    except LLMQueueFull as exc:
+        return _queue_full_response(exc, req_id)
+    except LLMCircuitOpen as exc:
+        return _circuit_open_response(exc, req_id)
     except LLMClientError as exc:
         return _free_writing_error("LLM error", str(exc), status.HTTP_502_BAD_GATEWAY, req_id)
     except Exception as exc:  # pragma: no cover
@@ -614,6 +860,139 @@ async def text_check(payload: dict, request: Request, user=Depends(deps.require_
         return _free_writing_error("Unexpected error", str(exc), status.HTTP_500_INTERNAL_SERVER_ERROR, req_id)
 
 
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _parse_llm_json(text: str) -> Any:
+    """json.loads for a streamed completion, tolerating markdown fences or chatter around the object."""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`").strip()
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    try:
+        return json.loads(cleaned)
+    except ValueError:
+        start, end = cleaned.find("{"), cleaned.rfind("}")
+        if start != -1 and end > start:
+            try:
+                return json.loads(cleaned[start : end + 1])
+            except ValueError:
+                pass
+    return None
+
+
+@router.post("/html/stream")
+async def autochecker_html_stream(payload: dict, user=Depends(deps.require_user)):
+    """
+    SSE variant of /html: ``token`` events carry raw completion deltas as they
+    arrive, then a single ``result`` event holds the payload validated exactly
+    like /html (or its failure response).
+    """
+    text = str(payload.get("text") or "").strip()
+    reference = str(payload.get("reference") or "").strip() or None
+    language = str(payload.get("language") or "").strip().lower() or None
+    model_name = getattr(llm_client, "model", None) or "llm-default"
+    user_id = getattr(user, "id", None)
+
+    async def events():
+        if not text:
+            yield _sse("result", _failure_response("AI model unavailable"))
+            return
+        report = _precheck(text, reference, language)
+        if report.resolved:
+            yield _sse("result", _precheck_response(text, report))
+            return
+        if not llm_client.is_configured():
+            yield _sse("result", _failure_response("LLM_API_KEY is not configured"))
+            return
+        cache_key = _html_cache_key(text, model_name, reference, language)
+        cached = await llm_result_cache.aget(cache_key)
+        if cached:
+            yield _sse("result", {**cached, "cached": True})
+            return
+        chunks: list[str] = []
+        try:
+            async for delta in llm_client.astream_text(_html_prompt(text, report), timeout=60, user_id=user_id):
+                chunks.append(delta)
+                yield _sse("token", {"delta": delta})
+        except LLMQueueFull as exc:
+            yield _sse("error", {"error": "LLM queue is full", "retry_after": exc.retry_after})
+            return
+        except LLMCircuitOpen:
+            yield _sse("result", _baseline_response(text))
+            return
+        except LLMClientError as exc:
+            logger.warning("[autochecker] LLM stream failed: %s", exc)
+            yield _sse("result", _failure_response(f"LLM error: {exc}"))
+            return
+        normalized, error = _finalize_html(_parse_llm_json("".join(chunks)), model_name)
+        if not normalized:
+            yield _sse("result", _failure_response(error))
+            return
+        normalized = _merge_mistakes(normalized, report)
+        await llm_result_cache.aput(cache_key, normalized)
+        yield _sse("result", {**normalized, "cached": False})
+
+    return _sse_response(events())
+
+
+@router.post("/text-check/stream")
+async def text_check_stream(payload: dict, request: Request, user=Depends(deps.require_user)):
+    """SSE variant of /text-check: ``token`` deltas, then ``result`` (validated) or ``error``."""
+    req_id = _get_request_id(request)
+    try:
+        data = TextCheckPayload.model_validate(payload)
+    except ValidationError as exc:
+        return _free_writing_error("Invalid payload", exc.errors(), status.HTTP_400_BAD_REQUEST, req_id)
+    text = (data.text or "").strip()
+    if not text:
+        return _free_writing_error("Text is empty", None, status.HTTP_400_BAD_REQUEST, req_id)
+    prompt, normalize_args, report = _prepare_text_check(data, text, req_id)
+    user_id = getattr(user, "id", None)
+
+    async def events():
+        if report.resolved:
+            yield _sse("result", _text_check_local(report, normalize_args))
+            return
+        chunks: list[str] = []
+        try:
+            async for delta in llm_client.astream_text(prompt, timeout=60, user_id=user_id):
+                chunks.append(delta)
+                yield _sse("token", {"delta": delta})
+        except LLMQueueFull as exc:
+            yield _sse("error", {"ok": False, "error": "LLM queue is full", "retry_after": exc.retry_after, "request_id": req_id})
+            return
+        except LLMCircuitOpen as exc:
+            yield _sse("error", {"ok": False, "error": "LLM unavailable", "retry_after": exc.retry_after, "request_id": req_id})
+            return
+        except LLMClientError as exc:
+            yield _sse("error", {"ok": False, "error": "LLM error", "details": str(exc), "request_id": req_id})
+            return
+        normalized = _normalize_text_response(_parse_llm_json("".join(chunks)) or {}, **normalize_args)
+        if not normalized:
+            yield _sse("error", {"ok": False, "error": "LLM error", "details": "LLM returned invalid payload", "request_id": req_id})
+            return
+        yield _sse("result", normalized.model_dump(exclude_none=True))
+
+    return _sse_response(events())
+
+
+@router.get("/queue")
+def autochecker_queue(user=Depends(deps.require_admin)):
+    """LLM queue depth, rejections, wait and service times per lane."""
+    return {**llm_queue.snapshot(), "single_flight": dict(single_flight_stats), "hedge": dict(hedge_stats)}
+
+
 @router.get("/ping")
 def autochecker_ping():
     return {"status": "ok"}
@@ -644,3 +1023,60 @@ async def autochecker_eval(
         raise HTTPException(status_code=exc.status_code, detail=str(exc))
     except Exception as exc:  # pragma: no cover - defensive
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(exc))
+
+
+def _validate_html_job(payload: dict) -> dict:
+    text = str(payload.get("text") or "").strip()
+    if not text:
+        raise ValueError("text is required")
+    reference = str(payload.get("reference") or "").strip()
+    language = str(payload.get("language") or "").strip().lower()
+    result = {"text": text}
+    if reference:
+        result["reference"] = reference
+    if language:
+        result["language"] = language
+    return result
+
+
+def _validate_free_writing_job(payload: dict) -> dict:
+    return FreeWritingPayload.model_validate(payload).model_dump()
+
+
+@job_service.handler("autochecker_html", validate=_validate_html_job)
+async def _html_job(payload: dict, ctx: job_service.JobContext) -> dict:
+    await ctx.stage("grading")
+    result = await ctx.wait_for_capacity(
+        lambda: _call_llm(payload["text"], ctx.user_id, payload.get("reference"), payload.get("language"))
+    )
+    return result or _baseline_response(payload["text"])
+
+
+@job_service.handler("free_writing", validate=_validate_free_writing_job)
+async def _free_writing_job(payload: dict, ctx: job_service.JobContext) -> dict:
+    await ctx.stage("grading")
+    result: FreeWritingResult = await ctx.wait_for_capacity(
+        lambda: free_writing_service.check(
+            prompt=payload["prompt"],
+            student_answer=payload["student_answer"],
+            rubric=payload.get("rubric"),
+            language=str(payload.get("language") or "kk").lower(),
+            request_id=ctx.job_id,
+            user_id=ctx.user_id,
+        )
+    )
+    return _free_writing_body(result)
+
+
+@job_service.handler("autochecker_eval")
+async def _eval_job(payload: dict, ctx: job_service.JobContext) -> dict:
+    audio_path = Path(ctx.inputs.get("audio_path") or "")
+    try:
+        try:
+            audio_bytes = await asyncio.to_thread(audio_path.read_bytes)
+        except OSError:
+            raise AutoCheckerError("Audio is no longer available, resubmit the recording")
+        await ctx.stage("transcribing")
+        return await service.process_audio(None, audio_bytes, payload["phrase"], mime_type=payload.get("mime_type"))
+    finally:
+        audio_path.unlink(missing_ok=True)
@@ -1,12 +1,12 @@
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session
 
 from ...api import deps
 from ...core.config import get_settings
 from ...db import models
-from ...services.progress_service import calculate_course_progress
+from ...services import catalog_service, progress_counter_service
 
 router = APIRouter(prefix="/api/certificates", tags=["certificates"])
 # Default fallbacks if course-specific mapping is not found
@@ -36,22 +36,12 @@ def generate_certificate(payload: dict, request: Request, db: Session = Depends(
     course_id = payload.get("course_id")
     if not course_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="course_id is required")
-    course = db.get(models.Course, course_id)
+    course = catalog_service.get_catalog(db).course(course_id=int(course_id)) if str(course_id).isdigit() else None
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
     # Compute completion
-    lessons = [l for m in course.modules for l in m.lessons if not getattr(l, "is_deleted", False)]
-    total = len(lessons) or 1
-    done = (
-        db.query(models.UserLessonProgress)
-        .filter(
-            models.UserLessonProgress.user_id == user.id,
-            models.UserLessonProgress.lesson_id.in_([l.id for l in lessons]),
-            models.UserLessonProgress.status == "finished",
-        )
-        .count()
-    )
-    if done < total:
+    counter = progress_counter_service.get_course_counter(db, user.id, course.id)
+    if not counter.total_lessons or counter.completed_lessons < counter.total_lessons:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Course not completed")
     url = f"/static/certificates/{user.id}_{course.id}.pdf"
     cert = models.Certificate(user_id=user.id, course_id=course.id, url=url)
@@ -65,16 +55,13 @@ def generate_certificate(payload: dict, request: Request, db: Session = Depends(
 def my_certificate(request: Request, db: Session = Depends(deps.current_db)):
     user = deps.require_user(request, db=db)
     settings = get_settings()
-    courses = (
-        db.query(models.Course)
-        .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-        .all()
-    )
+    catalog = catalog_service.get_catalog(db)
+    progress = catalog_service.courses_progress(catalog, catalog_service.user_progress_statuses(db, user.id))
 
     certificate_ready = False
     selected_slug: str | None = None
-    for course in courses:
-        percent, _, progress_map = calculate_course_progress(db, user, course)
+    for course in catalog.courses:
+        percent, _, progress_map = progress[course.id]
         if percent >= 100 or (progress_map and all(status == "done" for status in progress_map.values())):
             certificate_ready = True
             selected_slug = getattr(course, "slug", None)
@@ -1,22 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from ...api import deps
 from ...db import models
 from ...schemas.course import CourseOut, CourseWithProgress, CourseCreate, CourseUpdate
-from ...services.progress_service import (
-    calculate_course_progress,
-    list_courses_with_progress,
-    serialize_course,
-    serialize_lesson,
-)
+from ...services import catalog_service, progress_counter_service
+from ...services.progress_service import list_courses_with_progress, serialize_course
 from ...utils.encoding_fix import clean_encoding
 
 router = APIRouter(prefix="/api/courses", tags=["courses"])
 
-
-@router.get("", response_model=dict)
-def list_courses(request: Request, db: Session = Depends(deps.current_db)):
+def _list_courses_payload(db: Session, request: Request) -> dict:
     user = deps.get_current_user(request, db=db, allow_anonymous=True)
     entries = list_courses_with_progress(db, user)
     payload: list[dict] = []
@@ -24,33 +19,39 @@ def list_courses(request: Request, db: Session = Depends(deps.current_db)):
         course = entry["course"]
         if course.slug == "system-unassigned":
             continue
-        data = serialize_course(course)
+        data = dict(course.payload)
         data["progress_percent"] = entry["progress_percent"]
-        data["next_lesson"] = serialize_lesson(entry["next_lesson"]) if entry["next_lesson"] else None
+        data["next_lesson"] = entry["next_lesson"]
         data["progress_map"] = entry.get("progress_map", {})
         payload.append(data)
     return {"courses": payload}
 
 
-@router.get("/{course_id:int}", response_model=CourseWithProgress)
-def course_detail_by_id(course_id: int, request: Request, db: Session = Depends(deps.current_db)):
+def _course_detail_payload(db: Session, request: Request, course) -> dict:
     user = deps.get_current_user(request, db=db, allow_anonymous=True)
-    course = (
-        db.query(models.Course)
-        .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-        .filter(models.Course.id == course_id)
-        .first()
-    )
-    if not course or course.slug == "system-unassigned":
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    progress_percent, next_lesson, progress_map = calculate_course_progress(db, user, course)
-    payload = serialize_course(course)
+    catalog = catalog_service.get_catalog(db)
+    statuses = catalog_service.user_progress_statuses(db, user.id if user else None)
+    progress_percent, next_lesson, progress_map = catalog_service.course_progress(catalog, course, statuses)
+    payload = dict(course.payload)
     payload["progress_percent"] = progress_percent
-    payload["next_lesson"] = serialize_lesson(next_lesson) if next_lesson else None
+    payload["next_lesson"] = next_lesson
     payload["progress_map"] = progress_map
     return payload
 
 
+@router.get("", response_model=dict)
+async def list_courses(request: Request, db: Session | AsyncSession = Depends(deps.read_db)):
+    return await deps.run_db(db, _list_courses_payload, request)
+
+
+@router.get("/{course_id:int}", response_model=CourseWithProgress)
+def course_detail_by_id(course_id: int, request: Request, db: Session = Depends(deps.current_db)):
+    course = catalog_service.get_catalog(db).course(course_id=course_id)
+    if not course or course.slug == "system-unassigned":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    return _course_detail_payload(db, request, course)
+
+
 @router.get("/id/{course_id}", response_model=CourseWithProgress)
 def course_detail_by_id_alias(course_id: int, request: Request, db: Session = Depends(deps.current_db)):
     return course_detail_by_id(course_id, request, db)
@@ -60,42 +61,21 @@ def course_detail_by_id_alias(course_id: int, request: Request, db: Session = De
 def course_detail(slug: str, request: Request, db: Session = Depends(deps.current_db)):
     if slug == "system-unassigned":
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    user = deps.get_current_user(request, db=db, allow_anonymous=True)
-    course = (
-        db.query(models.Course)
-        .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-        .filter(models.Course.slug == slug)
-        .first()
-    )
+    course = catalog_service.get_catalog(db).course(slug=slug)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    progress_percent, next_lesson, progress_map = calculate_course_progress(db, user, course)
-    payload = serialize_course(course)
-    payload["progress_percent"] = progress_percent
-    payload["next_lesson"] = serialize_lesson(next_lesson) if next_lesson else None
-    payload["progress_map"] = progress_map
-    return payload
+    return _course_detail_payload(db, request, course)
 
 
 @router.get("/id/{course_id}/progress")
 def course_progress(course_id: int, request: Request, db: Session = Depends(deps.current_db)):
     user = deps.require_user(request, db=db)
-    course = db.get(models.Course, course_id)
+    course = catalog_service.get_catalog(db).course(course_id=course_id)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    lessons = [l for m in course.modules for l in m.lessons if not getattr(l, "is_deleted", False)]
-    total = len(lessons) or 1
-    done = (
-        db.query(models.UserLessonProgress)
-        .filter(
-            models.UserLessonProgress.user_id == user.id,
-            models.UserLessonProgress.lesson_id.in_([l.id for l in lessons]),
-            models.UserLessonProgress.status == "finished",
-        )
-        .count()
-    )
-    percent = int((done / total) * 100)
-    return {"percent": percent}
+    row = progress_counter_service.get_course_counter(db, user.id, course_id)
+    db.commit()
+    return {"percent": row.percent}
 
 
 # Alias for /api/course/{id}/progress
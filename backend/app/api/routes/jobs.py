@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from ...api import deps
+from ...core.config import get_settings
+from ...db.models import Job, User
+from ...services import job_service
+from ...services.job_service import job_runner
+from ...services.storage_service import stream_to_temp
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+SSE_POLL_SECONDS = 0.5
+SSE_KEEPALIVE_SECONDS = 15
+SSE_MAX_SECONDS = 300
+
+
+def _accepted(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+    }
+
+
+def _get_owned_job(db: Session, job_id: str, user: User) -> Job:
+    job = db.get(Job, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+def submit_job(payload: dict, db: Session = Depends(deps.current_db), user: User = Depends(deps.require_user)):
+    """Queue a check, e.g. {"kind": "free_writing", "payload": {...}}; poll or stream the returned job."""
+    kind = str(payload.get("kind") or "")
+    if not job_service.is_registered(kind):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown job kind: {kind or '-'}")
+    try:
+        body = job_service.validate(kind, payload.get("payload") or {})
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    job = job_runner.submit(db, kind=kind, payload=body, user_id=user.id)
+    return _accepted(job)
+
+
+@router.post("/audio", status_code=status.HTTP_202_ACCEPTED)
+async def submit_audio_job(
+    phrase: str = Form(...),
+    audio: UploadFile = File(...),
+    db: Session = Depends(deps.current_db),
+    user: User = Depends(deps.require_user),
+):
+    """Asynchronous /api/autochecker/eval: the upload waits on disk (not in memory) until the job runs."""
+    tmp_path, size, _ = await stream_to_temp(audio, job_service.input_dir(), get_settings().upload_max_audio_mb)
+    if not size:
+        tmp_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Audio file is empty")
+    try:
+        # The insert and commit block: keep them off the event loop.
+        job = await run_in_threadpool(
+            job_runner.submit,
+            db,
+            kind="autochecker_eval",
+            payload={"phrase": phrase, "mime_type": audio.content_type},
+            user_id=user.id,
+            inputs={"audio_path": str(tmp_path)},
+        )
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return _accepted(job)
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, db: Session = Depends(deps.current_db), user: User = Depends(deps.require_user)):
+    return job_service.serialize(_get_owned_job(db, job_id, user))
+
+
+@router.get("/{job_id}/events")
+async def stream_job(job_id: str, db: Session = Depends(deps.current_db), user: User = Depends(deps.require_user)):
+    """Server-sent events: ``status`` on every stage change, then one ``result`` event."""
+    _get_owned_job(db, job_id, user)
+
+    async def events():
+        last = None
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < SSE_MAX_SECONDS:
+            job = await asyncio.to_thread(job_runner.load, job_id)
+            if job is None:
+                return
+            data = job_service.serialize(job)
+            if job.status in job_service.FINAL_STATUSES:
+                yield f"event: result\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                return
+            if (job.status, job.stage) != last:
+                last = (job.status, job.stage)
+                last_sent = time.monotonic()
+                yield f"event: status\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            elif time.monotonic() - last_sent > SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(SSE_POLL_SECONDS)
+        yield "event: timeout\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
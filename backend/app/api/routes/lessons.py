@@ -2,25 +2,24 @@ from datetime import datetime
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, selectinload
 
 from ...api import deps
 from ...db import models
 from ...schemas.block import validate_block_payload
 from ...schemas.lesson import LessonCreate, LessonUpdate
-from ...services import vocabulary_service
+from ...services import progress_ledger, vocabulary_service
 from ...services.progress_service import (
-    _serialize_flashcard,
-    _serialize_quiz,
     get_lesson_detail,
     normalize_block,
     ordered_blocks,
     serialize_lesson,
+    serialize_lesson_shell,
 )
 
 router = APIRouter(prefix="/api/lessons", tags=["lessons"])
 
-
 def _lesson_query(db: Session, allow_unpublished: bool = False):
     query = (
         db.query(models.Lesson)
@@ -58,8 +57,7 @@ def lessons_list(request: Request, module_id: Optional[int] = None, db: Session
     return [serialize_lesson(l) for l in lessons]
 
 
-@router.get("/{lesson_id}")
-def lesson_detail(lesson_id: int, request: Request, db: Session = Depends(deps.current_db)):
+def _lesson_detail_payload(db: Session, lesson_id: int, request: Request) -> dict:
     preview = request.query_params.get("preview") == "1"
     user = deps.get_current_user(request, db=db, allow_anonymous=preview)
     allow_unpublished = bool(preview or (user and getattr(user, "is_admin", False)))
@@ -69,7 +67,7 @@ def lesson_detail(lesson_id: int, request: Request, db: Session = Depends(deps.c
         detail = get_lesson_detail(db, lesson_id, user, allow_unpublished=allow_unpublished)
         if not detail:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
-        lesson = detail["lesson"]
+        lesson_payload = detail["lesson"]
         blocks = detail["blocks"]
         navigation = detail["navigation"]
         progress_status = detail["progress_status"]
@@ -80,7 +78,9 @@ def lesson_detail(lesson_id: int, request: Request, db: Session = Depends(deps.c
         time_spent = detail.get("time_spent")
         if not preview:
             try:
-                new_words_added = vocabulary_service.sync_lesson_vocabulary(user.id, lesson, blocks, db)
+                new_words_added = vocabulary_service.sync_lesson_vocabulary(
+                    user.id, detail["lesson_id"], detail["course_id"], blocks, db
+                )
             except Exception:
                 # Soft-fail dictionary sync to avoid blocking lesson load
                 import logging
@@ -109,6 +109,7 @@ def lesson_detail(lesson_id: int, request: Request, db: Session = Depends(deps.c
             "prev_lesson_id": ordered[idx - 1].id if idx is not None and idx > 0 else None,
             "next_lesson_id": ordered[idx + 1].id if idx is not None and idx + 1 < len(ordered) else None,
         }
+        lesson_payload = serialize_lesson_shell(lesson, blocks)
         progress_status = "in_progress"
         course_progress = 0
         module_progress = 0
@@ -118,26 +119,7 @@ def lesson_detail(lesson_id: int, request: Request, db: Session = Depends(deps.c
         new_words_added = 0
 
     return {
-        "lesson": {
-            "id": lesson.id,
-            "title": lesson.title,
-            "description": lesson.description,
-            "status": lesson.status,
-            "difficulty": lesson.difficulty,
-            "estimated_time": lesson.estimated_time,
-            "language": lesson.language,
-            "video_type": getattr(lesson, "video_type", None),
-            "video_url": getattr(lesson, "video_url", None),
-            "blocks_order": lesson.blocks_order or [],
-            "module": {
-                "id": lesson.module.id,
-                "order": lesson.module.order,
-                "course": {"slug": lesson.module.course.slug},
-            },
-            "blocks": blocks,
-            "flashcards": [_serialize_flashcard(fc) for fc in lesson.flashcards],
-            "quizzes": [_serialize_quiz(qz) for qz in lesson.quizzes],
-        },
+        "lesson": lesson_payload,
         "progress_status": progress_status,
         "score": score,
         "time_spent": time_spent,
@@ -149,6 +131,11 @@ def lesson_detail(lesson_id: int, request: Request, db: Session = Depends(deps.c
     }
 
 
+@router.get("/{lesson_id}")
+async def lesson_detail(lesson_id: int, request: Request, db: Session | AsyncSession = Depends(deps.read_db)):
+    return await deps.run_db(db, _lesson_detail_payload, lesson_id, request)
+
+
 @router.get("/{lesson_id}/flashcards")
 def lesson_flashcards(lesson_id: int, request: Request, db: Session = Depends(deps.current_db)):
     user = deps.require_user(request, db=db)
@@ -313,7 +300,7 @@ def lesson_complete(
             user_answer = answers.get(str(idx)) or answers.get(idx) or answers.get(question.get("question"))
             q_type = (question.get("type") or "single").lower()
             if q_type in {"audio_repeat", "open"}:
-                # Не считаем в итоговый балл, но сохраняем детали в lp.details
+                # Не считаем в итоговый балл, ответы сохраняются в журнале прогресса
                 continue
             if q_type == "multiple":
                 correct_set = set(map(str, correct_answer if isinstance(correct_answer, list) else [correct_answer]))
@@ -336,47 +323,7 @@ def lesson_complete(
         passing_score = cleaned.get("passing_score") or 0
         passed = score >= passing_score
 
-    entry = (
-        db.query(models.UserProgress)
-        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson_id)
-        .first()
-    )
-    now = datetime.utcnow()
-    if not entry:
-        entry = models.UserProgress(
-            user_id=user.id,
-            lesson_id=lesson_id,
-            status="done" if passed else "in_progress",
-            completed_at=now if passed else None,
-            last_opened_at=now,
-            time_spent=time_spent,
-        )
-    else:
-        entry.status = "done" if passed else "in_progress"
-        entry.completed_at = now if passed else entry.completed_at
-        entry.time_spent = (entry.time_spent or 0) + time_spent
-    db.add(entry)
-
-    lp = (
-        db.query(models.LessonProgress)
-        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not lp:
-        lp = models.LessonProgress(
-            user_id=user.id,
-            lesson_id=lesson_id,
-            completed=passed,
-            score=score,
-            time_spent=time_spent,
-            details={"answers": answers, "total_questions": total_questions, "passed": passed},
-        )
-    else:
-        lp.completed = passed or lp.completed
-        lp.score = score if score is not None else lp.score
-        lp.time_spent = (lp.time_spent or 0) + time_spent
-        lp.details = {"answers": answers, "total_questions": total_questions, "passed": passed}
-    db.add(lp)
+    progress_ledger.lesson_completed(db, user.id, lesson_id, passed, score, time_spent, answers, total_questions)
     db.commit()
 
     next_id = None
@@ -409,42 +356,6 @@ def lesson_progress(
     status_override = payload.get("status")
     score = payload.get("score")
 
-    entry = (
-        db.query(models.UserProgress)
-        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson_id)
-        .first()
-    )
-    now = datetime.utcnow()
-    if not entry:
-        entry = models.UserProgress(
-            user_id=user.id, lesson_id=lesson_id, status=status_override or "in_progress", last_opened_at=now
-        )
-    entry.last_opened_at = now
-    if time_spent:
-        entry.time_spent = (entry.time_spent or 0) + time_spent
-    if status_override:
-        entry.status = status_override
-    db.add(entry)
-
-    lp = (
-        db.query(models.LessonProgress)
-        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not lp:
-        lp = models.LessonProgress(
-            user_id=user.id,
-            lesson_id=lesson_id,
-            completed=entry.status == "done",
-            score=score,
-            time_spent=time_spent,
-        )
-    else:
-        lp.time_spent = (lp.time_spent or 0) + time_spent
-        if score is not None:
-            lp.score = score
-        lp.completed = lp.completed or entry.status == "done"
-    db.add(lp)
-
+    entry = progress_ledger.lesson_progress(db, user.id, lesson_id, time_spent, status_override, score)
     db.commit()
-    return {"ok": True, "status": entry.status, "time_spent": entry.time_spent}
+    return {"ok": True, **entry}
@@ -1,9 +1,7 @@
-import asyncio
-
 from fastapi import APIRouter, status
 from fastapi.responses import ORJSONResponse
 
-from ...services.llm_client import LLMClient, LLMClientError
+from ...services.llm_client import LLMClient
 
 router = APIRouter(prefix="/api/llm", tags=["llm"])
 
@@ -12,13 +10,23 @@ llm_client = LLMClient(timeout_seconds=30)
 
 @router.get("/health")
 async def llm_health():
-    try:
-        text = await asyncio.to_thread(llm_client.generate_text, "Say just: OK")
-        if not text:
-            raise LLMClientError("Empty response")
-        return {"ok": True, "model": llm_client.model, "base_url": llm_client.base_url}
-    except Exception as exc:
+    """Circuit breaker state of each provider, built from real traffic (no LLM call per probe)."""
+    providers = llm_client.describe_providers()
+    breaker = providers[0]["breaker"]
+    body = {
+        "ok": any(item["breaker"]["state"] != "open" for item in providers),
+        "model": llm_client.model,
+        "base_url": llm_client.base_url,
+        "breaker": breaker,
+        "providers": providers,
+    }
+    if not llm_client.is_configured():
         return ORJSONResponse(
-            {"ok": False, "model": llm_client.model, "base_url": llm_client.base_url, "error": str(exc)},
+            {**body, "ok": False, "error": "LLM_API_KEY is not configured"},
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
         )
+    if not body["ok"]:
+        return ORJSONResponse(
+            {**body, "error": breaker["last_error"] or "circuit open"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return body
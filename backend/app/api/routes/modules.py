@@ -1,11 +1,12 @@
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session
 
 from ...api import deps
 from ...db import models
 from ...schemas.module import ModuleCreate, ModuleUpdate, ModuleOut
+from ...services import catalog_service
 from ...services.progress_service import module_with_progress, serialize_lesson, serialize_module
 from ...utils.encoding_fix import clean_encoding
 
@@ -21,34 +22,26 @@ def modules_by_course(
 ):
     user = deps.get_user_or_none(request, db=db)
     include_unpublished = bool(user and getattr(user, "is_admin", False))
+    catalog = catalog_service.get_catalog(db)
+    payload_key = "payload_all" if include_unpublished else "payload"
     # Admin/list-all fallback: no filters -> return all modules
     if course_id is None and course_slug is None:
-        modules = db.query(models.Module).options(selectinload(models.Module.lessons)).all()
-        return [serialize_module(m, include_unpublished=include_unpublished) | {"progress_map": {}} for m in modules]
+        modules = sorted(catalog.modules.values(), key=lambda m: m.id)
+        return [getattr(m, payload_key) | {"progress_map": {}} for m in modules]
 
     course = None
     if course_id:
-        course = db.get(models.Course, course_id)
+        course = catalog.course(course_id=course_id)
     if not course and course_slug:
-        course = (
-            db.query(models.Course)
-            .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-            .filter(models.Course.slug == course_slug)
-            .first()
-        )
+        course = catalog.course(slug=course_slug)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    lesson_ids = [lesson.id for m in course.modules for lesson in m.lessons]
     progress_map = {}
-    if lesson_ids and user:
-        rows = (
-            db.query(models.UserProgress)
-            .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id.in_(lesson_ids))
-            .all()
-        )
-        progress_map = {row.lesson_id: row.status for row in rows}
-    modules = sorted(course.modules, key=lambda m: m.order)
-    return [serialize_module(m, include_unpublished=include_unpublished) | {"progress_map": progress_map} for m in modules]
+    if course.lesson_ids and user:
+        statuses = catalog_service.user_progress_statuses(db, user.id)
+        progress_map = catalog_service.restrict(statuses, course.lesson_ids)
+    modules = sorted(catalog.course_modules(course), key=lambda m: m.order)
+    return [getattr(m, payload_key) | {"progress_map": progress_map} for m in modules]
 
 
 @router.get("/{module_id}")
@@ -1,17 +1,16 @@
-from datetime import datetime
-
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import ProgrammingError
 
 from ...api import deps
 from ...db import models
 from ...schemas.progress import ProgressPayload
+from ...services import catalog_service, progress_counter_service, progress_ledger
 from ...services.progress_service import get_progress_for_user
 
 router = APIRouter(prefix="/api/progress", tags=["progress"])
-
 _progress_tables_checked = False
 
 
@@ -32,8 +31,7 @@ def _ensure_progress_tables(db: Session) -> None:
     _progress_tables_checked = True
 
 
-@router.get("", response_model=ProgressPayload)
-def user_progress(request: Request, db: Session = Depends(deps.current_db)):
+def _user_progress_payload(db: Session, request: Request):
     user = deps.get_user_or_none(request, db=db)
     if not user:
         return ProgressPayload(
@@ -102,19 +100,17 @@ def user_progress(request: Request, db: Session = Depends(deps.current_db)):
     return progress
 
 
+@router.get("", response_model=ProgressPayload)
+async def user_progress(request: Request, db: Session | AsyncSession = Depends(deps.read_db)):
+    return await deps.run_db(db, _user_progress_payload, request)
+
+
 @router.post("/lesson/{lesson_id}/start")
 def lesson_progress_start(lesson_id: int, request: Request, db: Session = Depends(deps.current_db)):
     user = deps.require_user(request, db=db)
-    entry = (
-        db.query(models.UserLessonProgress)
-        .filter(models.UserLessonProgress.user_id == user.id, models.UserLessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not entry:
-        entry = models.UserLessonProgress(user_id=user.id, lesson_id=lesson_id, status="in_progress", completed_blocks=[])
-    db.add(entry)
+    progress_ledger.lesson_started(db, user.id, lesson_id)
     db.commit()
-    return {"status": entry.status, "completed_blocks": entry.completed_blocks or []}
+    return progress_ledger.lesson_state(db, user.id, lesson_id)
 
 
 @router.post("/lesson/{lesson_id}/block-finished")
@@ -123,111 +119,108 @@ def lesson_block_finished(lesson_id: int, payload: dict, request: Request, db: S
     block_idx = payload.get("block_index")
     if block_idx is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="block_index required")
-    entry = (
-        db.query(models.UserLessonProgress)
-        .filter(models.UserLessonProgress.user_id == user.id, models.UserLessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not entry:
-        entry = models.UserLessonProgress(user_id=user.id, lesson_id=lesson_id, status="in_progress", completed_blocks=[])
-    blocks = entry.completed_blocks or []
-    if block_idx not in blocks:
-        blocks.append(block_idx)
-    entry.completed_blocks = blocks
-    db.add(entry)
+    try:
+        block_idx = int(block_idx)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="block_index must be an integer")
+    progress_ledger.lesson_step_finished(db, user.id, lesson_id, block_idx)
     db.commit()
-    return {"status": entry.status, "completed_blocks": blocks}
+    return progress_ledger.lesson_state(db, user.id, lesson_id)
 
 
 @router.post("/lesson/{lesson_id}/finish")
 def lesson_progress_finish(lesson_id: int, request: Request, db: Session = Depends(deps.current_db)):
     user = deps.require_user(request, db=db)
-    entry = (
-        db.query(models.UserLessonProgress)
-        .filter(models.UserLessonProgress.user_id == user.id, models.UserLessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not entry:
-        entry = models.UserLessonProgress(
-            user_id=user.id, lesson_id=lesson_id, status="finished", completed_blocks=[]
-        )
-    entry.status = "finished"
-    db.add(entry)
+    progress_ledger.lesson_finished(db, user.id, lesson_id)
     db.commit()
-    _recompute_course_progress(db, user.id, lesson_id)
-    return {"status": entry.status, "completed_blocks": entry.completed_blocks or []}
-
-
-@router.get("/lesson/{lesson_id}")
-def lesson_progress_get(lesson_id: int, request: Request, db: Session = Depends(deps.current_db)):
+    return progress_ledger.lesson_state(db, user.id, lesson_id)
+
+
+@router.post("/lesson/{lesson_id}/batch")
+def lesson_progress_batch(
+    lesson_id: int,
+    request: Request,
+    payload: dict,
+    db: Session = Depends(deps.current_db),
+):
+    """
+    Apply queued block completions, flashcard answers, player steps and a
+    time-spent delta for one lesson in a single transaction.
+
+    Body (application/json): {"blocks": [{"block_id", "status"?, "time_spent"?}],
+    "flashcards": [{"card_id", "correct"}], "steps": [block_index], "time_spent": seconds}.
+    Beacons cannot set an Authorization header; they are authenticated by the
+    session cookie.
+    """
     user = deps.require_user(request, db=db)
-    entry = (
-        db.query(models.UserLessonProgress)
-        .filter(models.UserLessonProgress.user_id == user.id, models.UserLessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not entry:
-        return {"status": "not_started", "completed_blocks": []}
-    return {"status": entry.status, "completed_blocks": entry.completed_blocks or []}
 
+    blocks = payload.get("blocks") or []
+    flashcards = payload.get("flashcards") or []
+    steps = payload.get("steps") or []
+    if not all(isinstance(item, dict) and item.get("block_id") for item in blocks):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="blocks[].block_id is required")
+    if not all(isinstance(item, dict) and item.get("card_id") is not None for item in flashcards):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="flashcards[].card_id is required")
+    try:
+        time_spent = max(0, int(payload.get("time_spent") or 0))
+        steps = [int(step) for step in steps]
+        blocks = [{**item, "time_spent": max(0, int(item.get("time_spent") or 0))} for item in blocks]
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="time_spent, blocks[].time_spent and steps[] must be integers",
+        )
 
-def _recompute_course_progress(db: Session, user_id: int, lesson_id: int):
     lesson = db.get(models.Lesson, lesson_id)
-    if not lesson or not lesson.module or not lesson.module.course:
-        return
-    course = lesson.module.course
-    lessons = [l for m in course.modules for l in m.lessons if not getattr(l, "is_deleted", False)]
-    total = len(lessons) or 1
-    done = (
-        db.query(models.UserLessonProgress)
-        .filter(
-            models.UserLessonProgress.user_id == user_id,
-            models.UserLessonProgress.lesson_id.in_([l.id for l in lessons]),
-            models.UserLessonProgress.status == "finished",
-        )
-        .count()
-    )
-    percent = int((done / total) * 100)
-    row = (
-        db.query(models.UserCourseProgress)
-        .filter(models.UserCourseProgress.user_id == user_id, models.UserCourseProgress.course_id == course.id)
+    if not lesson or getattr(lesson, "is_deleted", False):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
+
+    lp = progress_ledger.apply_batch(db, user.id, lesson, blocks, flashcards, steps, time_spent)
+    db.commit()
+    up = (
+        db.query(models.UserProgress)
+        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson_id)
         .first()
     )
-    if not row:
-        row = models.UserCourseProgress(user_id=user_id, course_id=course.id, percent=percent)
-    else:
-        row.percent = percent
-    db.add(row)
-    db.commit()
+    return {
+        "ok": True,
+        "status": up.status,
+        "time_spent": up.time_spent,
+        "blocks_completed": lp.blocks_completed,
+        "flashcards": progress_ledger.flashcard_summary(lp),
+        "completed_blocks": progress_ledger.lesson_state(db, user.id, lesson_id)["completed_blocks"],
+    }
+
+
+@router.get("/lesson/{lesson_id}")
+def lesson_progress_get(lesson_id: int, request: Request, db: Session = Depends(deps.current_db)):
+    user = deps.require_user(request, db=db)
+    return progress_ledger.lesson_state(db, user.id, lesson_id)
 
 
 @router.get("/course/{course_id}")
 def course_progress_get(course_id: int, request: Request, db: Session = Depends(deps.current_db)):
     user = deps.require_user(request, db=db)
-    row = (
-        db.query(models.UserCourseProgress)
-        .filter(models.UserCourseProgress.user_id == user.id, models.UserCourseProgress.course_id == course_id)
-        .first()
-    )
-    if row:
-        return {"percent": row.percent}
-    # compute on the fly
-    course = db.get(models.Course, course_id)
+    course = catalog_service.get_catalog(db).course(course_id=course_id)
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
-    lessons = [l for m in course.modules for l in m.lessons if not getattr(l, "is_deleted", False)]
-    total = len(lessons) or 1
-    done = (
-        db.query(models.UserLessonProgress)
-        .filter(
-            models.UserLessonProgress.user_id == user.id,
-            models.UserLessonProgress.lesson_id.in_([l.id for l in lessons]),
-            models.UserLessonProgress.status == "finished",
-        )
-        .count()
-    )
-    percent = int((done / total) * 100)
-    return {"percent": percent}
+    row = progress_counter_service.get_course_counter(db, user.id, course_id)
+    modules = progress_counter_service.get_module_counters(db, user.id, course.module_ids)
+    db.commit()
+    return {
+        "percent": row.percent,
+        "completed_lessons": row.completed_lessons,
+        "total_lessons": row.total_lessons,
+        "modules": [
+            {
+                "module_id": module_id,
+                "percent": m.percent,
+                "completed_lessons": m.completed_lessons,
+                "total_lessons": m.total_lessons,
+            }
+            for module_id, m in modules.items()
+        ],
+    }
 
 
 @router.post("/flashcards")
@@ -244,47 +237,10 @@ def flashcards_progress(payload: dict, request: Request, db: Session = Depends(d
     if not lesson or getattr(lesson, "is_deleted", False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
 
-    # Ensure a base progress row exists for the lesson
-    progress_row = (
-        db.query(models.UserProgress)
-        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson_id)
-        .first()
-    )
-    now = datetime.utcnow()
-    if not progress_row:
-        progress_row = models.UserProgress(
-            user_id=user.id,
-            lesson_id=lesson_id,
-            status="in_progress",
-            last_opened_at=now,
-            time_spent=0,
-        )
-    else:
-        progress_row.last_opened_at = now
-    db.add(progress_row)
-
-    lp = (
-        db.query(models.LessonProgress)
-        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not lp:
-        lp = models.LessonProgress(user_id=user.id, lesson_id=lesson_id, completed=False, time_spent=0)
-
-    details = lp.details or {}
-    flashcards = details.get("flashcards") or {}
-    flashcards[str(card_id)] = {"correct": correct, "updated_at": now.isoformat()}
-    summary = {
-        "total": len(flashcards),
-        "correct": sum(1 for v in flashcards.values() if v.get("correct")),
-    }
-    details["flashcards"] = flashcards
-    details["flashcards_summary"] = summary
-    lp.details = details
-    db.add(lp)
+    lp = progress_ledger.flashcard_answered(db, user.id, lesson, card_id, correct)
     db.commit()
 
-    return {"ok": True, "summary": summary}
+    return {"ok": True, "summary": progress_ledger.flashcard_summary(lp)}
 
 
 @router.post("/block-finished")
@@ -302,42 +258,6 @@ def block_finished(payload: dict, request: Request, db: Session = Depends(deps.c
     if not lesson or getattr(lesson, "is_deleted", False):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
 
-    progress_row = (
-        db.query(models.LessonProgress)
-        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not progress_row:
-        progress_row = models.LessonProgress(user_id=user.id, lesson_id=lesson_id, completed=False, time_spent=0, details={})
-
-    details = progress_row.details or {}
-    blocks = details.get("blocks") or {}
-    normalized_block_id = str(block_id)
-    blocks[normalized_block_id] = {
-        "status": status_payload,
-        "finished_at": datetime.utcnow().isoformat(),
-    }
-    details["blocks"] = blocks
-    progress_row.details = details
-    if time_spent:
-        progress_row.time_spent = (progress_row.time_spent or 0) + int(time_spent)
-    # Mark user_progress row as in_progress/done
-    up = (
-        db.query(models.UserProgress)
-        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson_id)
-        .first()
-    )
-    if not up:
-        up = models.UserProgress(user_id=user.id, lesson_id=lesson_id, status="in_progress", last_opened_at=datetime.utcnow(), time_spent=0)
-    else:
-        up.last_opened_at = datetime.utcnow()
-    lesson_block_ids = [str(b.id) for b in lesson.blocks if not getattr(b, "is_deleted", False)]
-    total_unique_blocks = len(set(lesson_block_ids))
-    completed_known_blocks = len({bid for bid in blocks.keys() if bid in lesson_block_ids})
-    if total_unique_blocks > 0 and completed_known_blocks >= total_unique_blocks:
-        up.status = "done"
-        progress_row.completed = True
-    db.add(progress_row)
-    db.add(up)
+    lp = progress_ledger.block_finished(db, user.id, lesson, block_id, status_payload, time_spent)
     db.commit()
-    return {"ok": True, "status": status_payload, "blocks_completed": len(blocks)}
+    return {"ok": True, "status": status_payload, "blocks_completed": lp.blocks_completed}
@@ -1,5 +1,4 @@
 import uuid
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -9,9 +8,12 @@ from sqlalchemy.orm import Session
 from ...api import deps
 from ...core.config import get_settings
 from ...db import models
+from ...services import progress_ledger
+from ...services.storage_service import AudioUploadRoute, safe_suffix, stream_to_disk
 from ...services.pronunciation_service import evaluate_pronunciation, feedback_for_score, score_to_status
 
-router = APIRouter(prefix="/api/pronunciation", tags=["pronunciation"])
+
+router = APIRouter(prefix="/api/pronunciation", tags=["pronunciation"], route_class=AudioUploadRoute)
 
 
 def _resolve_expected_text(word_obj: Optional[models.VocabularyWord], payload: dict | None) -> str:
@@ -56,23 +58,14 @@ async def pronunciation_check(
     if not expected_text:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="target text is required")
 
-    data = await audio.read()
-    if not data:
+    ext = safe_suffix(audio.filename, ".wav")
+    stored = await stream_to_disk(audio, "pronunciation", f"{uuid.uuid4().hex}{ext}", get_settings().upload_max_audio_mb)
+    if not stored["size"]:
+        Path(stored["path"]).unlink(missing_ok=True)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="audio is empty")
+    audio_url = stored["url"]
 
-    settings = get_settings()
-    upload_root = Path(settings.upload_root or "uploads")
-    target_dir = upload_root / "pronunciation"
-    target_dir.mkdir(parents=True, exist_ok=True)
-    ext = ".wav"
-    if audio.filename and "." in audio.filename:
-        ext = f".{audio.filename.split('.')[-1]}"
-    filename = f"{uuid.uuid4().hex}{ext}"
-    file_path = target_dir / filename
-    file_path.write_bytes(data)
-    audio_url = f"{settings.cdn_base_url}/pronunciation/{filename}"
-
-    score = await evaluate_pronunciation(str(file_path), expected_text)
+    score = await evaluate_pronunciation(stored["path"], expected_text)
     status_label = score_to_status(score)
     feedback = feedback_for_score(score)
 
@@ -87,26 +80,7 @@ async def pronunciation_check(
 
     # Update lesson progress if provided
     if lesson_id:
-        lp = (
-            db.query(models.LessonProgress)
-            .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
-            .first()
-        )
-        if not lp:
-            lp = models.LessonProgress(
-                user_id=user.id,
-                lesson_id=lesson_id,
-                completed=False,
-                score=None,
-                time_spent=0,
-                details={},
-            )
-        details = lp.details or {}
-        attempts = details.get("pronunciation") or []
-        attempts.append({"word": expected_text, "score": score, "recorded_at": datetime.utcnow().isoformat(), "status": status_label})
-        details["pronunciation"] = attempts[-50:]
-        lp.details = details
-        db.add(lp)
+        progress_ledger.pronunciation_recorded(db, user.id, lesson_id, expected_text, score, status_label)
 
     db.commit()
 
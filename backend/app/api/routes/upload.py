@@ -1,63 +1,55 @@
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
 
 from ...api import deps
-from ...services.storage_service import (
-    generate_video_thumbnail,
-    store_upload,
-    validate_audio_file,
-)
+from ...services.media_service import store_upload
+from ...services.storage_service import MediaUploadRoute, generate_video_thumbnail, validate_audio_file
 from ...core.config import get_settings
-from uuid import uuid4
-import os
 
-router = APIRouter(prefix="/api/upload", tags=["upload"])
-admin_router = APIRouter(prefix="/api/admin/upload", tags=["admin-upload"])
+router = APIRouter(prefix="/api/upload", tags=["upload"], route_class=MediaUploadRoute)
+admin_router = APIRouter(prefix="/api/admin/upload", tags=["admin-upload"], route_class=MediaUploadRoute)
 
 
 @router.post("/image")
-async def upload_image(file: UploadFile = File(...), user=Depends(deps.require_admin)):
+async def upload_image(
+    file: UploadFile = File(...), db: Session = Depends(deps.current_db), user=Depends(deps.require_admin)
+):
     if not file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing filename")
     if not (file.content_type or "").startswith("image/"):
         raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported image type")
-    data = await file.read()
-    stored = store_upload("image", file, data)
+    stored = await store_upload(db, "image", file, get_settings().upload_max_image_mb)
     return {"url": stored["url"], "filename": stored["filename"]}
 
 
 @router.post("/audio")
-async def upload_audio(file: UploadFile = File(...), user=Depends(deps.require_admin)):
-    data = await file.read()
-    validate_audio_file(file, len(data))
-    stored = store_upload("audio", file, data)
+async def upload_audio(
+    file: UploadFile = File(...), db: Session = Depends(deps.current_db), user=Depends(deps.require_admin)
+):
+    max_mb = get_settings().upload_max_audio_mb
+    validate_audio_file(file, file.size, max_mb=max_mb)
+    stored = await store_upload(db, "audio", file, max_mb)
     return {"url": stored["url"], "filename": stored["filename"]}
 
 
 @router.post("/video")
-async def upload_video(file: UploadFile = File(...), user=Depends(deps.require_admin)):
+async def upload_video(
+    file: UploadFile = File(...), db: Session = Depends(deps.current_db), user=Depends(deps.require_admin)
+):
     if not (file.content_type or "").startswith("video/"):
         raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported video type")
-    data = await file.read()
-    stored = store_upload("video", file, data)
+    stored = await store_upload(db, "video", file, get_settings().upload_max_video_mb)
     thumb_url = generate_video_thumbnail(Path(stored["path"]))
     return {"url": stored["url"], "filename": stored["filename"], "thumbnail_url": thumb_url}
 
 
 @admin_router.post("")
-async def admin_upload(file: UploadFile = File(...), user=Depends(deps.require_admin)):
+async def admin_upload(
+    file: UploadFile = File(...), db: Session = Depends(deps.current_db), user=Depends(deps.require_admin)
+):
     if not file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing filename")
-    settings = get_settings()
-    ext = Path(file.filename).suffix or ""
-    safe_ext = ext if ext.startswith(".") else f".{ext}" if ext else ""
-    target_name = f"{uuid4().hex}{safe_ext}"
-    target_dir = Path(settings.upload_root or "/app/uploads")
-    target_dir.mkdir(parents=True, exist_ok=True)
-    data = await file.read()
-    target_path = target_dir / target_name
-    with open(target_path, "wb") as fh:
-        fh.write(data)
-    url = f"/uploads/{target_name}"
-    return {"url": url}
+    stored = await store_upload(db, "", file, get_settings().upload_max_file_mb)
+    return {"url": stored["url"]}
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from ...api import deps
 from ...core.security import get_password_hash, verify_password
+from ...core.user_cache import invalidate_user
 from ...db import models
 from ...services.progress_service import recommend_course_slug
 
@@ -155,6 +156,7 @@ def update_me(payload: dict, request: Request, db: Session = Depends(deps.curren
 
     db.add(user)
     db.commit()
+    invalidate_user(user.id)
     db.refresh(user)
     recommended_course = recommend_course_slug(user.age, user.target, getattr(user, "level", None))
     return _serialize_user_profile(user, recommended_course=recommended_course)
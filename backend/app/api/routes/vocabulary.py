@@ -2,17 +2,17 @@ from pathlib import Path
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from fastapi.responses import FileResponse
 from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ...api import deps
+from ...core.media import MediaFileResponse
 from ...db import models
 from ...services import vocabulary_service as vocab
 
 router = APIRouter(prefix="/api/vocabulary", tags=["vocabulary"])
 
-
 def _user_or_first(request: Request, db: Session) -> models.User | None:
     user = deps.get_user_or_none(request, db=db)
     if user:
@@ -20,8 +20,7 @@ def _user_or_first(request: Request, db: Session) -> models.User | None:
     return db.query(models.User).first()
 
 
-@router.get("")
-def list_vocabulary(request: Request, db: Session = Depends(deps.current_db)):
+def _list_vocabulary_payload(db: Session, request: Request) -> list[dict]:
     user = _user_or_first(request, db)
     if not user:
         return []
@@ -29,6 +28,11 @@ def list_vocabulary(request: Request, db: Session = Depends(deps.current_db)):
     return [vocab.serialize_word(w) for w in words]
 
 
+@router.get("")
+async def list_vocabulary(request: Request, db: Session | AsyncSession = Depends(deps.read_db)):
+    return await deps.run_db(db, _list_vocabulary_payload, request)
+
+
 @router.post("", status_code=status.HTTP_201_CREATED)
 def create_vocabulary(
     payload: dict,
@@ -221,7 +225,7 @@ def text_to_speech(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Укажите слово для озвучки.")
 
     try:
-        audio_url = vocab.tts_for_word(user.id, cleaned)
+        audio_url = vocab.tts_for_word(cleaned, db)
     except Exception as exc:  # pragma: no cover - external IO
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"Не удалось сгенерировать аудио: {exc}") from exc
 
@@ -244,4 +248,4 @@ def serve_tts_audio(filename: str):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid file path")
     if not safe_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio not found")
-    return FileResponse(safe_path, media_type="audio/mpeg")
+    return MediaFileResponse(safe_path, media_type="audio/mpeg")
@@ -15,13 +15,61 @@ class Settings(BaseSettings):
     secret_key: str = "change-me"
     database_url: str = DEFAULT_DB_URL
     database_sync_url: str | None = None
+    database_async_url: str | None = None
+    # Serve the hot read paths through AsyncSession instead of the threadpool.
+    async_db_enabled: bool = False
     allowed_origins: list[str] = Field(default_factory=list)
     allowed_origin_regex: str | None = None
     gemini_api_key: str | None = None
     google_speech_api_key: str | None = None
     upload_root: str | None = None
+    # Writable directory for local state such as the on-disk LLM cache; defaults to <tmp>/qazaq.
+    data_dir: str | None = None
     cdn_base_url: str | None = None
+    # Upload size limits (MB); uploads are streamed to disk and aborted once over the limit.
+    upload_max_image_mb: int = 20
+    upload_max_audio_mb: int = 15
+    upload_max_video_mb: int = 1024
+    upload_max_file_mb: int = 1024
+    # Unreferenced media objects younger than this are kept by the garbage collector.
+    media_gc_grace_hours: float = 24.0
     session_cookie: str = "session"
+    user_cache_ttl_seconds: int = 60
+    user_cache_max_entries: int = 4096
+    lesson_cache_max_entries: int = 512
+    catalog_snapshot_ttl_seconds: int = 300
+    # Graded LLM results: "memory" (per process), "sqlite" (on disk, survives restarts) or "none".
+    llm_cache_backend: str = "memory"
+    llm_cache_path: str | None = None
+    llm_cache_ttl_seconds: int = 86400
+    llm_cache_max_entries: int = 2048
+    # Upstream LLM calls in flight at once, and how many may wait before 429.
+    llm_queue_concurrency: int = 8
+    llm_queue_max_waiting: int = 100
+    llm_queue_max_waiting_per_user: int = 5
+    # Circuit breaker per LLM provider: opens when failure_rate of at least min_calls
+    # in the window failed (timeouts, 429, 5xx), refusing calls for open_seconds.
+    llm_breaker_window_seconds: float = 60.0
+    llm_breaker_min_calls: int = 10
+    llm_breaker_failure_rate: float = 0.5
+    llm_breaker_open_seconds: float = 30.0
+    # Per-call timeout = multiplier x p99 of recent successful calls (never below min).
+    llm_timeout_multiplier: float = 3.0
+    llm_timeout_min_seconds: float = 5.0
+    # Shared TTS clip store (static/audio); least recently used unpinned clips are evicted above this size.
+    tts_cache_max_mb: int = 512
+    # Speech engine for TTS clips: gtts | silent (offline stub for tests and local dev).
+    tts_synthesizer: str = "gtts"
+    # Parallel syntheses while pre-generating lesson audio on publish / backfill.
+    tts_pregenerate_workers: int = 4
+    # Background flush of TTS hit counters and eviction runs at most this often.
+    tts_maintenance_seconds: int = 60
+    # Background jobs (/api/jobs) run concurrently per process.
+    job_workers: int = 4
+    # Queued/running jobs not touched by their process for this long are failed (process gone).
+    job_stale_seconds: int = 600
+    # Finished jobs are deleted after this many days.
+    job_retention_days: float = 7.0
     admin_emails_raw: str | None = Field(default=None, alias="ADMIN_EMAILS")
     # Parsed list; alias set to avoid env auto-binding
     admin_emails: list[str] = Field(default_factory=list, alias="ADMIN_EMAILS_PARSED")
@@ -75,12 +123,25 @@ def _normalize_db_url(raw: str) -> tuple[str, str]:
         sync_url = url.set(drivername=driver.replace("+asyncpg", "+psycopg2"))
     elif driver == "postgresql":
         sync_url = url.set(drivername="postgresql+psycopg2")
+    elif driver == "sqlite+aiosqlite":
+        sync_url = url.set(drivername="sqlite")
     # Use render_as_string to avoid password masking ("***") in str(url)
     original = url.render_as_string(hide_password=False)
     sync = sync_url.render_as_string(hide_password=False)
     return original, sync
 
 
+def _async_db_url(raw: str) -> str:
+    """Return the async-driver flavour of a database URL (asyncpg / aiosqlite)."""
+    url = make_url(raw)
+    driver = url.drivername or ""
+    if driver.startswith("postgresql") and "+asyncpg" not in driver:
+        url = url.set(drivername="postgresql+asyncpg")
+    elif driver == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
 def _normalize_upload_root(value: str | None, project_root: Path) -> str:
     if not value:
         # In Docker, use /app/uploads; locally use project_root/uploads
@@ -95,6 +156,14 @@ def _normalize_upload_root(value: str | None, project_root: Path) -> str:
     return str(path)
 
 
+def _normalize_data_dir(value: str | None, project_root: Path) -> str:
+    # Defaults to backend/data (/app/data in Docker), next to the code that owns it.
+    path = Path(value) if value else Path(__file__).resolve().parents[2] / "data"
+    if not path.is_absolute():
+        path = (project_root / path).resolve()
+    return str(path)
+
+
 def _normalize_cdn_base(value: str | None) -> str:
     base = (value or "/uploads").strip() or "/uploads"
     if not base.startswith("/"):
@@ -110,7 +179,9 @@ def get_settings() -> Settings:
     original_url, sync_url = _normalize_db_url(settings.database_url)
     settings.database_url = original_url
     settings.database_sync_url = sync_url
+    settings.database_async_url = _async_db_url(settings.database_async_url or original_url)
     settings.upload_root = _normalize_upload_root(settings.upload_root, project_root)
+    settings.data_dir = _normalize_data_dir(settings.data_dir, project_root)
     settings.cdn_base_url = _normalize_cdn_base(settings.cdn_base_url)
     default_origins = {"http://localhost:3002", "http://127.0.0.1:3002"}
     if not settings.allowed_origins:
@@ -0,0 +1,89 @@
+"""In-process cache of compiled (normalized) lesson payloads.
+
+Block normalization is the same for every student, so the compiled lesson
+shell is stored once per lesson under a key of its version and the
+``updated_at`` stamps (and row counts) of everything it is compiled from:
+blocks, flashcards, quizzes, and the course, modules and lessons used for
+navigation. Only per-user progress is merged per request.
+Entries are treated as read-only by callers.
+
+ORM writes to lessons, blocks and their child rows drop affected entries via
+mapper events; the version/timestamp key also catches edits made by other
+worker processes.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import event
+
+from ..db import models
+from .config import get_settings
+
+
+class LessonPayloadCache:
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[int, tuple[Hashable, dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, lesson_id: int, key: Hashable) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(lesson_id)
+            if not entry:
+                return None
+            cached_key, payload = entry
+            if cached_key != key:
+                self._entries.pop(lesson_id, None)
+                return None
+            self._entries.move_to_end(lesson_id)
+            return payload
+
+    def put(self, lesson_id: int, key: Hashable, payload: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[lesson_id] = (key, payload)
+            self._entries.move_to_end(lesson_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, lesson_id: int | None) -> None:
+        with self._lock:
+            self._entries.pop(lesson_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+lesson_cache = LessonPayloadCache(max_entries=get_settings().lesson_cache_max_entries)
+
+
+def invalidate_lesson(lesson_id: int | None) -> None:
+    if lesson_id is not None:
+        lesson_cache.invalidate(lesson_id)
+
+
+def _on_lesson_child_write(mapper, connection, target) -> None:
+    invalidate_lesson(target.lesson_id)
+
+
+def _on_structure_write(mapper, connection, target) -> None:
+    # Lesson/module/course edits change titles, navigation and course lesson
+    # lists of neighbouring lessons too; these writes are rare, drop everything.
+    lesson_cache.clear()
+
+
+for _model in (models.LessonBlock, models.Flashcard, models.Quiz):
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _evt, _on_lesson_child_write)
+
+for _model in (models.Lesson, models.Module, models.Course, models.AudioTask, models.PronunciationBlock):
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _evt, _on_structure_write)
+
+
+__all__ = ["LessonPayloadCache", "lesson_cache", "invalidate_lesson"]
@@ -0,0 +1,232 @@
+"""Content-addressed cache of graded LLM results.
+
+Keys are a SHA-256 over the prompt template version, the model, the
+normalized student text and whatever else shapes the answer (level, language,
+rubric), so resubmitting the same text costs a dictionary lookup instead of an
+LLM round-trip. Only successful, normalized results are stored.
+
+Two backends share the ``get``/``put``/``clear`` interface: an in-process
+TTL/LRU (default) and an on-disk SQLite store that survives restarts and is
+shared by workers on the same host. Select with ``LLM_CACHE_BACKEND``
+(``memory`` | ``sqlite`` | ``none``). Async callers use ``aget``/``aput``, which
+run the SQLite backend's blocking I/O in a worker thread.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Protocol
+
+from .config import get_settings
+
+
+def normalize_text(text: str | None) -> str:
+    """NFC + collapsed whitespace; case and punctuation are graded, so kept."""
+    value = unicodedata.normalize("NFC", text or "")
+    return " ".join(value.split())
+
+
+def template_version(*templates: str) -> str:
+    """Short digest of prompt templates, so editing a prompt retires old entries."""
+    digest = hashlib.sha256()
+    for template in templates:
+        digest.update(template.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+def make_key(kind: str, version: str, model: str | None, text: str | None, **params: Any) -> str:
+    material = {
+        "kind": kind,
+        "version": version,
+        "model": model or "",
+        "text": normalize_text(text),
+        "params": {name: normalize_text(str(value)) if value is not None else None for name, value in params.items()},
+    }
+    encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str) -> Optional[dict[str, Any]]: ...
+
+    def put(self, key: str, value: dict[str, Any]) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 86400) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            expires_at, raw = entry
+            if expires_at <= now:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+        # Stored serialized so callers can mutate what they get back.
+        return json.loads(raw)
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, raw)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    # File I/O under a lock: keep it off the event loop.
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 50000, ttl_seconds: float = 86400) -> None:
+        self.path = str(path)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._lock = threading.Lock()
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_results_used_at ON llm_results (used_at)")
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM llm_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_results WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_results SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        now = time.time()
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llm_results (key, value, expires_at, used_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, "
+                "expires_at = excluded.expires_at, used_at = excluded.used_at",
+                (key, raw, now + self.ttl_seconds, now),
+            )
+            self._conn.execute("DELETE FROM llm_results WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_results WHERE key IN ("
+                "SELECT key FROM llm_results ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_results")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+
+
+class NullBackend:
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        return None
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        return None
+
+    def clear(self) -> None:
+        return None
+
+
+class LLMResultCache:
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            return self.backend.get(key)
+        except Exception:  # pragma: no cover - a broken cache must not fail grading
+            return None
+
+    def put(self, key: str, value: dict[str, Any]) -> None:
+        try:
+            self.backend.put(key, value)
+        except Exception:  # pragma: no cover - see get()
+            pass
+
+    async def aget(self, key: str) -> Optional[dict[str, Any]]:
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(self.get, key)
+        return self.get(key)
+
+    async def aput(self, key: str, value: dict[str, Any]) -> None:
+        if getattr(self.backend, "blocking", False):
+            await asyncio.to_thread(self.put, key, value)
+        else:
+            self.put(key, value)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def build_backend(name: str, *, path: str | None, max_entries: int, ttl_seconds: float) -> CacheBackend:
+    name = (name or "memory").strip().lower()
+    if name == "none" or ttl_seconds <= 0:
+        return NullBackend()
+    if name == "sqlite":
+        default_path = Path(get_settings().data_dir) / "llm_cache.sqlite3"
+        return SQLiteBackend(path or str(default_path), max_entries=max_entries, ttl_seconds=ttl_seconds)
+    return MemoryBackend(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+
+_settings = get_settings()
+llm_result_cache = LLMResultCache(
+    build_backend(
+        _settings.llm_cache_backend,
+        path=_settings.llm_cache_path,
+        max_entries=_settings.llm_cache_max_entries,
+        ttl_seconds=_settings.llm_cache_ttl_seconds,
+    )
+)
+
+
+__all__ = [
+    "CacheBackend",
+    "LLMResultCache",
+    "MemoryBackend",
+    "NullBackend",
+    "SQLiteBackend",
+    "build_backend",
+    "llm_result_cache",
+    "make_key",
+    "normalize_text",
+    "template_version",
+]
@@ -0,0 +1,107 @@
+"""
+HTTP caching for media files (TTS clips, uploads, /static).
+
+Every response carries a strong ETag, honours ``If-None-Match`` /
+``If-Modified-Since`` with ``304 Not Modified`` and serves ``Range`` requests
+(``206``, see ``FileResponse``) so long audio can be seeked without downloading
+it. A file named by the sha256 of its content (TTS keys, content-addressed
+uploads) uses that hash as its ETag; any other file gets Starlette's ETag from
+its mtime and size, so no file is read to answer a request. Files whose name
+carries a content hash or random token (TTS keys, upload uuids) never change
+under that name and are sent as ``immutable`` for a year; anything else must be
+revalidated, which costs a 304 instead of the body.
+"""
+
+import os
+import re
+from email.utils import parsedate
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# "<name>_1a2b3c4d.mp3", "<uuid hex>.webm", "<sha256>.mp3"
+_HASHED_STEM = re.compile(r"(?:^|[_.-])([0-9a-f]{8,64})$")
+_CONTENT_HASH = re.compile(r"[0-9a-f]{64}")
+
+
+def is_hashed_name(filename: str) -> bool:
+    match = _HASHED_STEM.search(Path(filename).stem)
+    # require a letter so dates and counters ("lesson_20260315") are not taken for hashes
+    return bool(match) and any(ch in "abcdef" for ch in match.group(1))
+
+
+def cache_control_for(filename: str) -> str:
+    return IMMUTABLE_CACHE_CONTROL if is_hashed_name(filename) else REVALIDATE_CACHE_CONTROL
+
+
+def content_hash_etag(filename: str) -> str | None:
+    """ETag for a file named ``<sha256>.<ext>`` (its content hash), else None."""
+    stem = Path(filename).stem
+    return f'"{stem}"' if _CONTENT_HASH.fullmatch(stem) else None
+
+
+def is_not_modified(request_headers: Headers, etag: str, last_modified: str | None) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if_modified_since = parsedate(request_headers.get("if-modified-since") or "")
+    modified = parsedate(last_modified or "")
+    return bool(if_modified_since and modified and if_modified_since >= modified)
+
+
+class MediaFileResponse(FileResponse):
+    """``FileResponse`` with a content-hash or stat ETag, cache policy by file name and conditional GET."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+        filename = os.fspath(self.path)
+        hashed_etag = content_hash_etag(filename)
+        if hashed_etag:
+            self.headers["etag"] = hashed_etag
+        self.headers.setdefault("cache-control", cache_control_for(filename))
+        self.set_stat_headers(self.stat_result)
+        etag = self.headers["etag"]
+        if (
+            scope["type"] == "http"
+            and scope["method"].upper() in {"GET", "HEAD"}
+            and self.status_code == 200
+            and is_not_modified(Headers(scope=scope), etag, self.headers.get("last-modified"))
+        ):
+            await NotModifiedResponse(self.headers)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class MediaStaticFiles(StaticFiles):
+    """``StaticFiles`` serving :class:`MediaFileResponse`."""
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        return MediaFileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+
+__all__ = [
+    "IMMUTABLE_CACHE_CONTROL",
+    "MediaFileResponse",
+    "MediaStaticFiles",
+    "REVALIDATE_CACHE_CONTROL",
+    "cache_control_for",
+    "content_hash_etag",
+    "is_hashed_name",
+    "is_not_modified",
+]
@@ -1,12 +1,15 @@
+import asyncio
 import uuid
 
 from fastapi import Request, Response
 
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..db.session import SessionLocal
+from ..db.session import AsyncSessionLocal, SessionLocal
 from ..db.models.user import User
-from .security import get_user_id_from_request
+from .config import get_settings
+from .security import get_session_token_from_request, parse_session_token
+from .user_cache import cache_user, get_cached_user
 
 
 async def assign_request_id(request: Request, call_next):
@@ -24,18 +27,53 @@ async def enforce_utf8(request: Request, call_next):
     return response
 
 
+def _load_user(token: str, user_id: int) -> User | None:
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if user is None:
+            return None
+        cache_user(token, user)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+async def _aload_user(token: str, user_id: int) -> User | None:
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if user is None:
+            return None
+        cache_user(token, user)
+        db.expunge(user)
+        return user
+
+
 async def load_current_user(request: Request, call_next):
     request.state.user = None
-    user_id = get_user_id_from_request(request)
-    if user_id:
-        db = SessionLocal()
-        try:
-            user = db.get(User, user_id)
-            request.state.user = user
-        except SQLAlchemyError:
-            # If migrations are not applied yet, skip attaching a user
-            request.state.user = None
-        finally:
-            db.close()
+    # ``user_resolved`` tells deps.get_current_user it can trust request.state.user
+    # and skip a second lookup on the request session.
+    request.state.user_resolved = False
+    token = get_session_token_from_request(request)
+    user_id = parse_session_token(token) if token else None
+    if not user_id:
+        request.state.user_resolved = True
+    else:
+        user = get_cached_user(token)
+        if user is None:
+            try:
+                if get_settings().async_db_enabled:
+                    user = await _aload_user(token, user_id)
+                else:
+                    # Blocking DB I/O must not run on the event loop.
+                    user = await asyncio.to_thread(_load_user, token, user_id)
+                request.state.user_resolved = True
+            except SQLAlchemyError:
+                # If migrations are not applied yet, skip attaching a user
+                user = None
+        else:
+            request.state.user_resolved = True
+        request.state.user = user
     response = await call_next(request)
     return response
@@ -74,7 +74,7 @@ def clear_session_cookie(response: Response) -> None:
     response.delete_cookie(AUTH_COOKIE_NAME, path="/")
 
 
-def get_user_id_from_request(request: Request) -> Optional[int]:
+def get_session_token_from_request(request: Request) -> Optional[str]:
     token = (
         request.cookies.get(AUTH_COOKIE_NAME)
         or request.cookies.get("qazaq_session")
@@ -84,6 +84,11 @@ def get_user_id_from_request(request: Request) -> Optional[int]:
     auth_header = request.headers.get("Authorization") or ""
     if auth_header.lower().startswith("bearer "):
         token = auth_header.split(" ", 1)[1].strip()
+    return token or None
+
+
+def get_user_id_from_request(request: Request) -> Optional[int]:
+    token = get_session_token_from_request(request)
     if not token:
         return None
     return parse_session_token(token)
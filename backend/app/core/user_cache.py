@@ -0,0 +1,103 @@
+"""In-process TTL/LRU cache of authenticated users keyed by session token.
+
+Entries hold a plain snapshot of the ``users`` row. Every lookup returns a fresh
+detached ``User`` instance, so requests never share ORM objects across threads
+and a route can still ``db.add(user)`` to persist changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from ..db.models.user import User
+from .config import get_settings
+
+_COLUMN_KEYS = tuple(attr.key for attr in inspect(User).column_attrs)
+
+
+class UserCache:
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 60) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries: "OrderedDict[str, tuple[float, dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[User]:
+        if not token or self.ttl_seconds <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if not entry:
+                return None
+            expires_at, values = entry
+            if expires_at <= now:
+                self._entries.pop(token, None)
+                return None
+            self._entries.move_to_end(token)
+        return _build_detached(values)
+
+    def put(self, token: str, user: User) -> None:
+        if not token or user is None or self.ttl_seconds <= 0:
+            return
+        values = {key: getattr(user, key) for key in _COLUMN_KEYS}
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[token] = (expires_at, values)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            stale = [token for token, (_, values) in self._entries.items() if values.get("id") == user_id]
+            for token in stale:
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _build_detached(values: dict[str, Any]) -> User:
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+_settings = get_settings()
+user_cache = UserCache(
+    max_entries=_settings.user_cache_max_entries,
+    ttl_seconds=_settings.user_cache_ttl_seconds,
+)
+
+
+def get_cached_user(token: str | None) -> Optional[User]:
+    return user_cache.get(token) if token else None
+
+
+def cache_user(token: str | None, user: User | None) -> None:
+    if token and user is not None:
+        user_cache.put(token, user)
+
+
+def invalidate_user(user_id: int | None) -> None:
+    if user_id is not None:
+        user_cache.invalidate_user(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_write(mapper, connection, target) -> None:
+    # Role/email/password changes from any route must not be served stale.
+    invalidate_user(target.id)
+
+
+__all__ = ["UserCache", "user_cache", "get_cached_user", "cache_user", "invalidate_user"]
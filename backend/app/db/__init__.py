@@ -1,7 +1,7 @@
-from .session import SessionLocal, engine, get_db
+from .session import AsyncSessionLocal, SessionLocal, engine, get_async_db, get_db
 from .base import Base
 
 
 from . import models 
 
-__all__ = ["SessionLocal", "engine", "get_db", "Base", "models"]
+__all__ = ["SessionLocal", "AsyncSessionLocal", "engine", "get_db", "get_async_db", "Base", "models"]
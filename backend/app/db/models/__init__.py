@@ -5,8 +5,21 @@ from .lesson import Lesson, Flashcard, Quiz, UserProgress, LessonProgress, Pronu
 from .block import LessonBlock, BLOCK_TYPE_CHOICES, AudioTask, PronunciationBlock
 from .vocabulary import VocabularyWord, WordOfTheWeek, UserDictionary, PronunciationResult
 from .level_test import LevelTestQuestion, LevelTestOption
-from .progress_extra import UserLessonProgress, UserCourseProgress
+from .progress_extra import (
+    UserLessonProgress,
+    UserCourseProgress,
+    UserModuleProgress,
+    ProgressEvent,
+    FlashcardAttempt,
+    BlockAttempt,
+    BlockCompletion,
+    AudioTaskAttempt,
+    PronunciationAttempt,
+)
 from .certificate import Certificate
+from .job import Job
+from .tts import TTSAudio
+from .media import MediaObject
 
 __all__ = [
     "User",
@@ -34,6 +47,16 @@ __all__ = [
     "LevelTestOption",
     "UserLessonProgress",
     "UserCourseProgress",
+    "UserModuleProgress",
+    "ProgressEvent",
+    "FlashcardAttempt",
+    "BlockAttempt",
+    "BlockCompletion",
+    "AudioTaskAttempt",
+    "PronunciationAttempt",
     "Certificate",
+    "Job",
+    "TTSAudio",
+    "MediaObject",
     "BLOCK_TYPE_CHOICES",
 ]
@@ -1,7 +1,8 @@
 from typing import List
 
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, DateTime, Integer, String, Text
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 
 from ..base import Base
 
@@ -15,6 +16,7 @@ class Course(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=False)
     audience = Column(String, nullable=False)  # kids / adult / gov
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     modules: List["Module"] = relationship(
         "Module", back_populates="course", cascade="all, delete-orphan", order_by="Module.order"
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, String, Text, func
+
+from ..base import Base
+
+
+class Job(Base):
+    """A long-running check (LLM/STT) submitted through /api/jobs and run by services.job_service."""
+
+    __tablename__ = "jobs"
+    __allow_unmapped__ = True
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    kind = Column(String, nullable=False)
+    # queued -> running -> done | failed
+    status = Column(String, nullable=False, default="queued")
+    stage = Column(String, nullable=True)
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_jobs_status_created", "status", "created_at"),)
@@ -56,6 +56,7 @@ class Flashcard(Base):
     audio_url = Column(String, nullable=True)
     age_group = Column(String, nullable=True)
     order = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     lesson: "Lesson" = relationship("Lesson", back_populates="flashcards")
 
@@ -88,6 +89,7 @@ class Quiz(Base):
     explanation = Column(Text, nullable=True)
     age_group = Column(String, nullable=True)
     order = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     lesson: "Lesson" = relationship("Lesson", back_populates="quizzes")
 
@@ -121,6 +123,10 @@ class LessonProgress(Base):
     score = Column(Integer, nullable=True)
     time_spent = Column(Integer, nullable=False, default=0)
     details = Column(JSON, nullable=True)
+    # Summaries of the *_attempts tables, maintained with in-SQL increments.
+    flashcards_total = Column(Integer, nullable=False, default=0, server_default="0")
+    flashcards_correct = Column(Integer, nullable=False, default=0, server_default="0")
+    blocks_completed = Column(Integer, nullable=False, default=0, server_default="0")
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     __table_args__ = (UniqueConstraint("user_id", "lesson_id", name="uq_lesson_progress_user_lesson"),)
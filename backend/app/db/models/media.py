@@ -0,0 +1,26 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
+
+from ..base import Base
+
+
+class MediaObject(Base):
+    """One uploaded file in the content-addressed media store (services.media_service)."""
+
+    __tablename__ = "media_objects"
+    __allow_unmapped__ = True
+
+    # sha256 of the file content; the file is <upload_root>/<path>
+    sha256 = Column(String(64), primary_key=True)
+    kind = Column(String(16), nullable=False, default="")
+    path = Column(String, nullable=False)
+    url = Column(String, nullable=False, unique=True)
+    content_type = Column(String, nullable=True)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    # Rows (of any table) mentioning the sha256, as of the last recount
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    # Bumped whenever the same bytes are uploaded again; garbage collection waits its grace period from here
+    last_uploaded_at = Column(DateTime, server_default=func.now(), nullable=False)
+    counted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_media_objects_ref_count_last_uploaded", "ref_count", "last_uploaded_at"),)
@@ -1,7 +1,8 @@
 from typing import List
 
-from sqlalchemy import Column, ForeignKey, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 
 from ..base import Base
 
@@ -15,6 +16,7 @@ class Module(Base):
     name = Column(String, nullable=False)
     order = Column(Integer, nullable=False, default=1)
     description = Column(Text, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
     course: "Course" = relationship("Course", back_populates="modules")
     lessons: List["Lesson"] = relationship(
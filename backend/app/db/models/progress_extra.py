@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, JSON, String, DateTime, func
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 
 from ..base import Base
@@ -16,6 +16,8 @@ class UserLessonProgress(Base):
     started_at = Column(DateTime, server_default=func.now(), nullable=False)
     finished_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (UniqueConstraint("user_id", "lesson_id", name="uq_user_lesson_progress_user_lesson"),)
+
     user = relationship("User")
     lesson = relationship("Lesson")
 
@@ -28,10 +30,140 @@ class UserCourseProgress(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
     percent = Column(Integer, nullable=False, default=0)
+    # Maintained incrementally by services.progress_counter_service.
+    completed_lessons = Column(Integer, nullable=False, default=0)
+    total_lessons = Column(Integer, nullable=False, default=0)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    __table_args__ = (UniqueConstraint("user_id", "course_id", name="uq_user_course_progress_user_course"),)
+
     user = relationship("User")
     course = relationship("Course")
 
 
-__all__ = ["UserLessonProgress", "UserCourseProgress"]
+class UserModuleProgress(Base):
+    __tablename__ = "user_module_progress"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    module_id = Column(Integer, ForeignKey("modules.id"), nullable=False, index=True)
+    percent = Column(Integer, nullable=False, default=0)
+    completed_lessons = Column(Integer, nullable=False, default=0)
+    total_lessons = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (UniqueConstraint("user_id", "module_id", name="uq_user_module_progress_user_module"),)
+
+    user = relationship("User")
+    module = relationship("Module")
+
+
+class ProgressEvent(Base):
+    """Append-only ledger of student interactions; see services.progress_ledger."""
+
+    __tablename__ = "progress_events"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=True)
+    block_id = Column(Integer, nullable=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # block_id last: lesson player steps are read with DISTINCT block_id from this index.
+        Index("ix_progress_events_user_lesson_type_block", "user_id", "lesson_id", "event_type", "block_id"),
+    )
+
+
+class FlashcardAttempt(Base):
+    __tablename__ = "flashcard_attempts"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    card_id = Column(String, nullable=False)
+    correct = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_flashcard_attempts_user_lesson_card", "user_id", "lesson_id", "card_id"),)
+
+
+class BlockAttempt(Base):
+    __tablename__ = "block_attempts"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    # As sent by the client; normally a lesson_blocks id.
+    block_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="done")
+    time_spent = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_block_attempts_user_lesson_block", "user_id", "lesson_id", "block_id"),)
+
+
+class BlockCompletion(Base):
+    """First completion of a block per user; inserted with ON CONFLICT DO NOTHING."""
+
+    __tablename__ = "block_completions"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    block_id = Column(String, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "lesson_id", "block_id", name="uq_block_completions_user_lesson_block"),
+    )
+
+
+class AudioTaskAttempt(Base):
+    __tablename__ = "audio_task_attempts"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    block_id = Column(Integer, nullable=False, index=True)
+    answer = Column(Text, nullable=True)
+    correct = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_audio_task_attempts_user_lesson", "user_id", "lesson_id"),)
+
+
+class PronunciationAttempt(Base):
+    __tablename__ = "pronunciation_attempts"
+    __allow_unmapped__ = True
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    word = Column(String, nullable=True)
+    score = Column(Float, nullable=True)
+    status = Column(String, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_pronunciation_attempts_user_lesson", "user_id", "lesson_id"),)
+
+
+__all__ = [
+    "UserLessonProgress",
+    "UserCourseProgress",
+    "UserModuleProgress",
+    "ProgressEvent",
+    "FlashcardAttempt",
+    "BlockAttempt",
+    "BlockCompletion",
+    "AudioTaskAttempt",
+    "PronunciationAttempt",
+]
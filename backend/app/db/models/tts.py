@@ -0,0 +1,25 @@
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String, Text, func
+
+from ..base import Base
+
+
+class TTSAudio(Base):
+    """One synthesized clip in the shared TTS store (services.tts_service), keyed by text, language and voice."""
+
+    __tablename__ = "tts_audio"
+    __allow_unmapped__ = True
+
+    # sha256 of "lang|voice|normalized text"; the file is AUDIO_DIR/<key>.mp3
+    key = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=False)
+    lang = Column(String(16), nullable=False, default="kk")
+    voice = Column(String(32), nullable=False, default="default")
+    filename = Column(String, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    # Referenced by lesson content: never evicted
+    pinned = Column(Boolean, nullable=False, default=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    __table_args__ = (Index("ix_tts_audio_pinned_last_used", "pinned", "last_used_at"),)
@@ -10,7 +10,7 @@ connect_args = {}
 if settings.database_url.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
 
-db_url = settings.database_url
+db_url = settings.database_sync_url or settings.database_url
 if "+asyncpg" in db_url:
     db_url = db_url.replace("+asyncpg", "+psycopg2")
 elif db_url.startswith("postgresql://"):
@@ -19,12 +19,17 @@ elif db_url.startswith("postgresql://"):
 engine = create_engine(
     db_url,
     connect_args=connect_args,
-    pool_pre_ping=True,  
+    pool_pre_ping=True,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-__all__ = ["SessionLocal", "engine", "Base"]
+# Async engine is created lazily so the sync-only deployment does not need
+# asyncpg/aiosqlite installed unless ASYNC_DB_ENABLED is set.
+_async_engine = None
+_async_session_factory = None
+
+__all__ = ["SessionLocal", "engine", "Base", "get_async_engine", "AsyncSessionLocal", "get_async_db"]
 
 
 def get_db():
@@ -33,3 +38,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(settings.database_async_url, pool_pre_ping=True)
+        _async_session_factory = async_sessionmaker(bind=_async_engine, autocommit=False, autoflush=False)
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,104 @@
+"""
+Dialect-aware single-statement upsert.
+
+``INSERT ... ON CONFLICT (<keys>) DO UPDATE`` (or ``DO NOTHING``) on PostgreSQL
+and SQLite, so
+concurrent writers for the same key neither race on a select-then-insert nor
+trip the unique constraint. Counters are incremented in SQL (``col = col + n``)
+rather than read and written back. Other dialects fall back to
+UPDATE-then-INSERT, which is not race-free.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        return dialect_insert
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+        return dialect_insert
+    return None
+
+
+def upsert(
+    db: Session,
+    model,
+    keys: Dict[str, Any],
+    values: Optional[Dict[str, Any]] = None,
+    update_values: Optional[Dict[str, Any]] = None,
+    increment: Optional[Dict[str, int]] = None,
+    returning: Iterable[str] = ("id",),
+) -> Row:
+    """
+    Insert ``keys`` + ``values`` or, if a row with ``keys`` exists, apply
+    ``update_values`` and ``col = col + n`` for ``increment``. ``keys`` must match
+    a unique constraint. Increment columns default to ``n`` on insert. Returns a
+    row with the ``returning`` columns as stored after the statement.
+
+    ``update_values`` may hold SQL expressions over the existing row (e.g.
+    ``func.coalesce(Model.completed_at, now)``). Columns with an ``onupdate``
+    default (``updated_at``) are refreshed on conflict as the ORM would.
+    """
+    table = model.__table__
+    increment = {name: n for name, n in (increment or {}).items() if n}
+    row = {**(values or {}), **keys}
+    for name, n in increment.items():
+        row.setdefault(name, n)
+
+    set_ = dict(update_values or {})
+    set_.update({name: table.c[name] + n for name, n in increment.items()})
+    for column in table.c:
+        if getattr(column.onupdate, "is_clause_element", False) and column.name not in set_ and set_:
+            set_[column.name] = column.onupdate.arg
+    if not set_:
+        # Still lock and return the existing row.
+        first_key = next(iter(keys))
+        set_ = {first_key: table.c[first_key]}
+    columns = [table.c[name] for name in returning]
+
+    dialect_insert = _dialect_insert(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(**row)
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=set_).returning(*columns)
+        return db.execute(stmt).one()
+
+    where = [table.c[name] == value for name, value in keys.items()]
+    result = db.execute(update(table).where(*where).values(**set_).returning(*columns)).first()
+    if result is None:
+        result = db.execute(insert(table).values(**row).returning(*columns)).one()
+    return result
+
+
+def insert_ignore(db: Session, model, rows: List[Dict[str, Any]], keys: Iterable[str]) -> int:
+    """
+    Insert ``rows``, skipping those whose ``keys`` (a unique constraint) already
+    exist. Returns the number of rows actually inserted, which tells the caller
+    which writes were first without reading the table beforehand.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    keys = list(keys)
+    dialect_insert = _dialect_insert(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(rows).on_conflict_do_nothing(index_elements=keys)
+        return db.execute(stmt).rowcount
+
+    matches = or_(*(and_(*(table.c[name] == row[name] for name in keys)) for row in rows))
+    existing = {tuple(found) for found in db.execute(select(*(table.c[name] for name in keys)).where(matches))}
+    fresh = {tuple(row[name] for name in keys): row for row in rows}
+    fresh = [row for key, row in fresh.items() if key not in existing]
+    if fresh:
+        db.execute(insert(table), fresh)
+    return len(fresh)
+
+
+__all__ = ["insert_ignore", "upsert"]
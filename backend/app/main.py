@@ -2,7 +2,7 @@ import logging
 import os
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
@@ -33,10 +33,15 @@ from .api.routes import (
     users,
     level_test,
     vocabulary,
+    jobs,
 )
 from .core.config import get_settings
+from .core.media import MediaStaticFiles
 from .core.middleware import assign_request_id, enforce_utf8, load_current_user
 from .db.session import SessionLocal
+from .services.job_service import job_runner
+from .services.llm_client import aclose_pools
+from .services.progress_ledger import ProgressConflict
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -112,7 +117,9 @@ BACKEND_STATIC = Path(__file__).resolve().parent / "static"
 
 app.mount("/app/assets", StaticFiles(directory=str(STUDENT_DIST / "assets"), check_dir=False), name="student-assets")
 app.mount("/admin/assets", StaticFiles(directory=str(ADMIN_DIST / "assets"), check_dir=False), name="admin-assets")
-app.mount("/static", StaticFiles(directory=str(BACKEND_STATIC), check_dir=False), name="static")
+app.mount("/static", MediaStaticFiles(directory=str(BACKEND_STATIC), check_dir=False), name="static")
+# Uploaded media (nginx serves this path in Docker; used directly in local runs).
+app.mount("/uploads", MediaStaticFiles(directory=settings.upload_root, check_dir=False), name="uploads")
 
 app.include_router(auth.router)
 app.include_router(autochecker.router)
@@ -138,6 +145,17 @@ app.include_router(vocabulary.router)
 app.include_router(users.router)
 app.include_router(debug.router)
 app.include_router(llm.router)
+app.include_router(jobs.router)
+
+# Fail jobs abandoned by a previous process and expire old ones.
+app.router.on_startup.append(job_runner.start)
+# Close pooled keep-alive connections to the LLM provider.
+app.router.on_shutdown.append(aclose_pools)
+
+
+@app.exception_handler(ProgressConflict)
+async def progress_conflict_handler(request: Request, exc: ProgressConflict):
+    return ORJSONResponse(status_code=409, content={"detail": str(exc)})
 
 
 def _spa_response(dist_dir: Path) -> FileResponse:
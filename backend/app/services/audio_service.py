@@ -1,18 +1,14 @@
 from pathlib import Path
 
-from gtts import gTTS
+from ..db.session import SessionLocal
+from .tts_service import AUDIO_DIR, tts_store
 
-AUDIO_DIR = Path(__file__).resolve().parents[1] / "static" / "audio"
-AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 
-
-def generate_tts(filename: str, text: str, lang: str = "kk") -> Path:
-    """Generate TTS audio and return the file path."""
-    filepath = AUDIO_DIR / filename
-    if not filepath.exists():
-        tts = gTTS(text=text, lang=lang)
-        tts.save(filepath)
-    return filepath
+def generate_tts(text: str, lang: str = "kk") -> Path:
+    """Synthesize (or reuse) audio for ``text`` in the shared TTS store and return the file path."""
+    with SessionLocal() as db:
+        url = tts_store.get_or_create(db, text, lang=lang)
+    return AUDIO_DIR / url.rsplit("/", 1)[-1]
 
 
 __all__ = ["generate_tts", "AUDIO_DIR"]
@@ -0,0 +1,343 @@
+"""
+Immutable in-memory snapshot of the course -> module -> lesson tree.
+
+The catalog is read on almost every learner request but changes only through
+admin routes, so the tree is loaded once, pre-serialized and shared. ORM
+writes to courses/modules/lessons are recorded on the session and applied
+after commit: only the touched courses are reloaded on the next read.
+``catalog_snapshot_ttl_seconds`` bounds staleness for edits made by other
+worker processes.
+
+Progress is then computed as set operations over the snapshot's lesson-id
+tuples and a single per-user progress query.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session, selectinload
+
+from ..core.config import get_settings
+from ..db import models
+from ..utils.encoding_fix import clean_encoding
+
+
+@dataclass(frozen=True)
+class LessonEntry:
+    id: int
+    module_id: int
+    order: int
+    status: str
+    is_deleted: bool
+    title: str
+    payload: dict = field(compare=False, repr=False)
+
+    @property
+    def is_active(self) -> bool:
+        return not self.is_deleted and self.status != "archived"
+
+
+@dataclass(frozen=True)
+class ModuleEntry:
+    id: int
+    course_id: int
+    order: int
+    name: str
+    # All lessons in Lesson.order, including drafts/archived/deleted ones.
+    lesson_ids: Tuple[int, ...]
+    payload: dict = field(compare=False, repr=False)
+    payload_all: dict = field(compare=False, repr=False)
+
+
+@dataclass(frozen=True)
+class CourseEntry:
+    id: int
+    slug: str
+    title: str
+    module_ids: Tuple[int, ...]
+    lesson_ids: Tuple[int, ...]
+    # Not deleted and not archived: the set learner progress is measured on.
+    active_lesson_ids: Tuple[int, ...]
+    payload: dict = field(compare=False, repr=False)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    courses: Tuple[CourseEntry, ...]
+    courses_by_id: Dict[int, CourseEntry]
+    courses_by_slug: Dict[str, CourseEntry]
+    modules: Dict[int, ModuleEntry]
+    lessons: Dict[int, LessonEntry]
+    # Active lesson id -> course id, for bucketing a user's progress rows.
+    active_lesson_course: Dict[int, int]
+    built_at: float
+
+    def course(self, course_id: Optional[int] = None, slug: Optional[str] = None) -> Optional[CourseEntry]:
+        if course_id is not None:
+            return self.courses_by_id.get(course_id)
+        if slug is not None:
+            return self.courses_by_slug.get(slug)
+        return None
+
+    def course_for_lesson(self, lesson_id: int) -> Optional[CourseEntry]:
+        lesson = self.lessons.get(lesson_id)
+        module = self.modules.get(lesson.module_id) if lesson else None
+        return self.courses_by_id.get(module.course_id) if module else None
+
+    def course_modules(self, course: CourseEntry) -> List[ModuleEntry]:
+        return [self.modules[mid] for mid in course.module_ids]
+
+
+def _build_course(course: models.Course) -> Tuple[CourseEntry, List[ModuleEntry], List[LessonEntry]]:
+    # progress_service reads the catalog, so its serializers are imported lazily.
+    from .progress_service import serialize_course, serialize_lesson, serialize_module
+
+    modules: List[ModuleEntry] = []
+    lessons: List[LessonEntry] = []
+    for module in course.modules:
+        for lesson in module.lessons:
+            lessons.append(
+                LessonEntry(
+                    id=lesson.id,
+                    module_id=module.id,
+                    order=lesson.order,
+                    status=getattr(lesson, "status", "draft"),
+                    is_deleted=bool(getattr(lesson, "is_deleted", False)),
+                    title=clean_encoding(lesson.title),
+                    payload=serialize_lesson(lesson),
+                )
+            )
+        modules.append(
+            ModuleEntry(
+                id=module.id,
+                course_id=course.id,
+                order=module.order,
+                name=clean_encoding(module.name),
+                lesson_ids=tuple(l.id for l in module.lessons),
+                payload=serialize_module(module),
+                payload_all=serialize_module(module, include_unpublished=True),
+            )
+        )
+    entry = CourseEntry(
+        id=course.id,
+        slug=course.slug,
+        title=clean_encoding(course.name),
+        module_ids=tuple(m.id for m in modules),
+        lesson_ids=tuple(l.id for l in lessons),
+        active_lesson_ids=tuple(l.id for l in lessons if l.is_active),
+        payload=serialize_course(course),
+    )
+    return entry, modules, lessons
+
+
+def _assemble(
+    courses: Iterable[Tuple[CourseEntry, List[ModuleEntry], List[LessonEntry]]],
+    built_at: Optional[float] = None,
+) -> CatalogSnapshot:
+    ordered = sorted(courses, key=lambda item: item[0].id)
+    return CatalogSnapshot(
+        courses=tuple(c for c, _, _ in ordered),
+        courses_by_id={c.id: c for c, _, _ in ordered},
+        courses_by_slug={c.slug: c for c, _, _ in ordered},
+        modules={m.id: m for _, ms, _ in ordered for m in ms},
+        lessons={l.id: l for _, _, ls in ordered for l in ls},
+        active_lesson_course={lid: c.id for c, _, _ in ordered for lid in c.active_lesson_ids},
+        built_at=time.monotonic() if built_at is None else built_at,
+    )
+
+
+def _load_courses(db: Session, course_ids: Optional[Iterable[int]] = None) -> List[models.Course]:
+    query = db.query(models.Course).options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
+    if course_ids is not None:
+        query = query.filter(models.Course.id.in_(list(course_ids)))
+    return query.all()
+
+
+class CatalogCache:
+    def __init__(self, ttl_seconds: float = 300) -> None:
+        self.ttl_seconds = float(ttl_seconds)
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._pending and not self._expired(snapshot):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            pending, self._pending = self._pending, []
+            if snapshot is None or self._expired(snapshot):
+                snapshot = _assemble(_build_course(c) for c in _load_courses(db))
+            elif pending:
+                snapshot = self._apply(db, snapshot, pending)
+            self._snapshot = snapshot
+            return snapshot
+
+    def _expired(self, snapshot: CatalogSnapshot) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - snapshot.built_at > self.ttl_seconds
+
+    def _apply(self, db: Session, snapshot: CatalogSnapshot, pending: List[tuple]) -> CatalogSnapshot:
+        dirty: set[int] = set()
+        new_modules = {obj_id: parent_id for kind, obj_id, parent_id in pending if kind == "module"}
+        for kind, obj_id, parent_id in pending:
+            if kind == "course":
+                dirty.add(obj_id)
+            elif kind == "module":
+                dirty.add(parent_id)
+                previous = snapshot.modules.get(obj_id)
+                if previous:
+                    dirty.add(previous.course_id)
+            elif kind == "lesson":
+                previous = snapshot.lessons.get(obj_id)
+                for module_id in {parent_id, previous.module_id if previous else None} - {None}:
+                    module = snapshot.modules.get(module_id)
+                    if module is not None:
+                        dirty.add(module.course_id)
+                    elif module_id in new_modules:
+                        dirty.add(new_modules[module_id])
+                    else:
+                        return _assemble(_build_course(c) for c in _load_courses(db))
+        dirty.discard(None)
+        if not dirty:
+            return snapshot
+        kept = [
+            (c, snapshot.course_modules(c), [snapshot.lessons[lid] for lid in c.lesson_ids])
+            for c in snapshot.courses
+            if c.id not in dirty
+        ]
+        rebuilt = [_build_course(c) for c in _load_courses(db, dirty)]
+        return _assemble(kept + rebuilt, built_at=snapshot.built_at)
+
+    def mark(self, changes: Iterable[tuple]) -> None:
+        with self._lock:
+            self._pending.extend(changes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._pending = []
+
+
+catalog_cache = CatalogCache(ttl_seconds=get_settings().catalog_snapshot_ttl_seconds)
+
+
+def get_catalog(db: Session) -> CatalogSnapshot:
+    return catalog_cache.get(db)
+
+
+def user_progress_statuses(db: Session, user_id: Optional[int]) -> Dict[int, str]:
+    """All UserProgress statuses for the user in one query: lesson_id -> status."""
+    if not user_id:
+        return {}
+    rows = (
+        db.query(models.UserProgress.lesson_id, models.UserProgress.status)
+        .filter(models.UserProgress.user_id == user_id)
+        .all()
+    )
+    return {lesson_id: status for lesson_id, status in rows}
+
+
+def restrict(statuses: Dict[int, str], lesson_ids: Iterable[int]) -> Dict[int, str]:
+    return {lid: statuses[lid] for lid in lesson_ids if lid in statuses}
+
+
+def course_progress(
+    catalog: CatalogSnapshot, course: CourseEntry, statuses: Dict[int, str]
+) -> Tuple[int, Optional[dict], Dict[int, str]]:
+    """Percent of active lessons done, next lesson payload and the course progress map."""
+    return courses_progress(catalog, statuses, [course.id])[course.id]
+
+
+def courses_progress(
+    catalog: CatalogSnapshot, statuses: Dict[int, str], course_ids: Optional[Iterable[int]] = None
+) -> Dict[int, Tuple[int, Optional[dict], Dict[int, str]]]:
+    """
+    ``course_progress`` for every course (or only ``course_ids``) at once: the
+    user's statuses are bucketed by course in a single pass instead of being
+    filtered per course.
+    """
+    if course_ids is None:
+        courses = list(catalog.courses)
+    else:
+        courses = [catalog.courses_by_id[cid] for cid in course_ids if cid in catalog.courses_by_id]
+    maps: Dict[int, Dict[int, str]] = {course.id: {} for course in courses}
+    for lesson_id, status in statuses.items():
+        course_id = catalog.active_lesson_course.get(lesson_id)
+        if course_id in maps:
+            maps[course_id][lesson_id] = status
+
+    result: Dict[int, Tuple[int, Optional[dict], Dict[int, str]]] = {}
+    for course in courses:
+        progress_map = maps[course.id]
+        if not course.active_lesson_ids:
+            result[course.id] = (0, None, progress_map)
+            continue
+        done = sum(1 for status in progress_map.values() if status == "done")
+        percent = int((done / len(course.active_lesson_ids)) * 100)
+        next_id = next((lid for lid in course.lesson_ids if progress_map.get(lid) != "done"), None)
+        if next_id is None and course.module_ids:
+            first_module = catalog.modules[course.module_ids[0]]
+            next_id = first_module.lesson_ids[0] if first_module.lesson_ids else None
+        next_lesson = dict(catalog.lessons[next_id].payload) if next_id is not None else None
+        result[course.id] = (percent, next_lesson, progress_map)
+    return result
+
+
+def _record(target, change: tuple) -> None:
+    session = object_session(target)
+    if session is None:
+        catalog_cache.mark([change])
+        return
+    session.info.setdefault("catalog_changes", []).append(change)
+
+
+@event.listens_for(models.Course, "after_insert")
+@event.listens_for(models.Course, "after_update")
+@event.listens_for(models.Course, "after_delete")
+def _course_written(mapper, connection, target) -> None:
+    _record(target, ("course", target.id, None))
+
+
+@event.listens_for(models.Module, "after_insert")
+@event.listens_for(models.Module, "after_update")
+@event.listens_for(models.Module, "after_delete")
+def _module_written(mapper, connection, target) -> None:
+    _record(target, ("module", target.id, target.course_id))
+
+
+@event.listens_for(models.Lesson, "after_insert")
+@event.listens_for(models.Lesson, "after_update")
+@event.listens_for(models.Lesson, "after_delete")
+def _lesson_written(mapper, connection, target) -> None:
+    _record(target, ("lesson", target.id, target.module_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session) -> None:
+    changes = session.info.pop("catalog_changes", None)
+    if changes:
+        catalog_cache.mark(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop("catalog_changes", None)
+
+
+__all__ = [
+    "CatalogSnapshot",
+    "CourseEntry",
+    "ModuleEntry",
+    "LessonEntry",
+    "catalog_cache",
+    "get_catalog",
+    "user_progress_statuses",
+    "restrict",
+    "course_progress",
+    "courses_progress",
+]
@@ -2,10 +2,12 @@ import asyncio
 import logging
 import textwrap
 import uuid
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator
 
-from .llm_client import LLMClient, LLMClientError
+from ..core.llm_cache import LLMResultCache, make_key, template_version
+from .llm_client import LLMCircuitOpen, LLMClient, LLMClientError
+from .llm_queue import LLMQueueFull, wait_for_capacity
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +37,7 @@ class FreeWritingResult:
     model: str | None = None
     error: str | None = None
     details: str | None = None
+    cached: bool = False
 
 
 def _clamp_score(value: Any) -> int:
@@ -67,8 +70,9 @@ def _trim_text(text: str | None, limit: int) -> str:
 
 
 class FreeWritingService:
-    def __init__(self, client: LLMClient | None = None):
+    def __init__(self, client: LLMClient | None = None, cache: LLMResultCache | None = None):
         self.client = client or LLMClient(timeout_seconds=60)
+        self.cache = cache
 
     def _build_prompt(self, prompt: str, answer: str, rubric: str | None, language: str) -> str:
         lang_hint = language if language in {"kk", "ru", "en"} else "kk"
@@ -106,7 +110,29 @@ class FreeWritingService:
             model=model or "llm",
         )
 
-    async def check(self, *, prompt: str, student_answer: str, rubric: str | None, language: str, request_id: str | None = None) -> FreeWritingResult:
+    def cache_key(self, *, prompt: str, student_answer: str, rubric: str | None, language: str) -> str:
+        """Content hash of a submission as graded (after trimming); equal keys get equal results."""
+        return make_key(
+            "free_writing",
+            template_version(FREE_WRITING_SYSTEM_PROMPT),
+            getattr(self.client, "model", None),
+            _trim_text(student_answer, 3500),
+            prompt=_trim_text(prompt, 1500),
+            rubric=_trim_text(rubric, 1200) if rubric else None,
+            language=language,
+        )
+
+    async def check(
+        self,
+        *,
+        prompt: str,
+        student_answer: str,
+        rubric: str | None,
+        language: str,
+        request_id: str | None = None,
+        user_id: int | None = None,
+        lane: str = "interactive",
+    ) -> FreeWritingResult:
         if not self.client.is_configured():
             raise LLMClientError("LLM_API_KEY is not configured")
         req_id = request_id or uuid.uuid4().hex
@@ -122,13 +148,24 @@ class FreeWritingService:
             len(safe_answer),
             len(safe_rubric or ""),
         )
+        model = getattr(self.client, "model", None)
+        cache_key = self.cache_key(prompt=prompt, student_answer=student_answer, rubric=rubric, language=language)
+        cached = await self.cache.aget(cache_key) if self.cache else None
+        if cached:
+            logger.info("[free-writing] req=%s cache hit", req_id)
+            return FreeWritingResult(**{**cached, "cached": True})
+
         full_prompt = self._build_prompt(safe_prompt, safe_answer, safe_rubric, language)
         try:
-            response = await asyncio.to_thread(
-                self.client.generate_json,
+            response = await self.client.agenerate_json(
                 f"{FREE_WRITING_SYSTEM_PROMPT}\n\n{full_prompt}",
                 max_retries=2,
+                dedupe_key=cache_key,
+                user_id=user_id,
+                lane=lane,
             )
+        except (LLMQueueFull, LLMCircuitOpen):
+            raise
         except Exception as exc:  # pragma: no cover - network failures
             logger.warning("[free-writing] req=%s LLM error: %s", req_id, exc)
             raise LLMClientError(str(exc)) from exc
@@ -142,7 +179,61 @@ class FreeWritingService:
         )
         if not isinstance(data, dict) or "score" not in data:
             raise LLMClientError("LLM returned incomplete payload")
-        return self._normalize(data, getattr(self.client, "model", None))
+        result = self._normalize(data, model)
+        if self.cache:
+            await self.cache.aput(cache_key, asdict(result))
+        return result
+
+    async def check_many(
+        self,
+        submissions: list[dict[str, Any]],
+        *,
+        concurrency: int = 8,
+        user_id: int | None = None,
+        lane: str = "bulk",
+    ) -> AsyncIterator[tuple[list[int], FreeWritingResult | Exception]]:
+        """
+        Grade ``submissions`` (dicts with prompt, student_answer, rubric, language)
+        with at most ``concurrency`` checks in flight. Submissions with the same
+        cache key are graded once; each yielded item is (indices sharing that
+        result, result or the exception), in completion order.
+        """
+        groups: dict[str, list[int]] = {}
+        for index, item in enumerate(submissions):
+            key = self.cache_key(
+                prompt=item["prompt"],
+                student_answer=item["student_answer"],
+                rubric=item.get("rubric"),
+                language=item.get("language") or "kk",
+            )
+            groups.setdefault(key, []).append(index)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def grade(indices: list[int]) -> tuple[list[int], FreeWritingResult | Exception]:
+            item = submissions[indices[0]]
+            async with semaphore:
+                try:
+                    result = await wait_for_capacity(
+                        lambda: self.check(
+                            prompt=item["prompt"],
+                            student_answer=item["student_answer"],
+                            rubric=item.get("rubric"),
+                            language=item.get("language") or "kk",
+                            user_id=user_id,
+                            lane=lane,
+                        )
+                    )
+                except Exception as exc:
+                    return indices, exc
+            return indices, result
+
+        tasks = [asyncio.ensure_future(grade(indices)) for indices in groups.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
 
 
 __all__ = ["FreeWritingService", "FreeWritingResult"]
@@ -1,4 +1,3 @@
-import asyncio
 from difflib import SequenceMatcher
 
 from .llm_client import LLMClient, LLMClientError
@@ -39,7 +38,7 @@ class GeminiSpeechClient:
                 f"Score (0-100): {round(score, 1)}\n"
                 "Provide 1-2 short sentences of feedback in Russian, focusing on pronunciation fixes."
             )
-            feedback = await asyncio.to_thread(self.llm_client.generate_text, prompt)
+            feedback = await self.llm_client.agenerate_text(prompt)
             if feedback:
                 return feedback.strip()
         except (LLMClientError, Exception) as exc:  # pragma: no cover - defensive/fallback
@@ -0,0 +1,270 @@
+"""
+Asynchronous jobs for long-running checks (LLM grading, speech-to-text).
+
+``submit`` stores a ``jobs`` row and returns at once; the job then runs on a
+background event loop owned by this process, bounded by ``JOB_WORKERS``
+concurrent jobs. Status, stage and the final result are written back to the
+row, so any web worker can answer ``GET /api/jobs/{id}`` or stream it.
+
+Handlers are registered per ``kind`` with :func:`handler` and receive the JSON
+payload plus a :class:`JobContext`. Inputs that should not be persisted (the
+path of an uploaded recording under :func:`input_dir`) travel in
+``JobContext.inputs`` and are lost if the process restarts.
+
+The runner touches ``updated_at`` of its queued and running jobs every
+``JOB_STALE_SECONDS / 4``. :meth:`JobRunner.sweep` (at startup, then every few
+minutes) fails queued/running jobs whose ``updated_at`` is older than
+``JOB_STALE_SECONDS`` -- their process is gone -- and deletes finished jobs and
+leftover input files older than ``JOB_RETENTION_DAYS``.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..db.models import Job
+from ..db.session import SessionLocal
+from .llm_queue import wait_for_capacity
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+FINAL_STATUSES = ("done", "failed")
+SWEEP_INTERVAL_SECONDS = 300
+ABANDONED_ERROR = "Job was interrupted by a server restart, resubmit it"
+
+
+def input_dir() -> Path:
+    """Where uploads waiting for a job are kept (outside the public upload tree)."""
+    return Path(get_settings().data_dir) / "job_inputs"
+
+
+class JobContext:
+    def __init__(self, runner: "JobRunner", job_id: str, user_id: int | None, inputs: Dict[str, Any]) -> None:
+        self.runner = runner
+        self.job_id = job_id
+        self.user_id = user_id
+        self.inputs = inputs
+
+    async def stage(self, name: str) -> None:
+        """Record progress the SPA can show (e.g. "transcribing", "grading")."""
+        await asyncio.to_thread(self.runner._update, self.job_id, stage=name)
+
+    async def wait_for_capacity(self, factory: Callable[[], Awaitable[Any]], attempts: int = 5) -> Any:
+        """Run ``factory()``; while the LLM queue is full, wait and retry instead of failing the job."""
+        return await wait_for_capacity(factory, attempts, on_wait=lambda: self.stage("queued"))
+
+
+Handler = Callable[[Dict[str, Any], JobContext], Awaitable[Dict[str, Any]]]
+Validator = Callable[[Dict[str, Any]], Dict[str, Any]]
+_handlers: Dict[str, Handler] = {}
+_validators: Dict[str, Validator] = {}
+
+
+def handler(kind: str, validate: Validator | None = None) -> Callable[[Handler], Handler]:
+    """
+    Register the coroutine that runs jobs of ``kind``. ``validate`` runs at submit
+    time, returns the payload to store and raises ValueError for a bad request.
+    """
+
+    def register(func: Handler) -> Handler:
+        _handlers[kind] = func
+        if validate is not None:
+            _validators[kind] = validate
+        return func
+
+    return register
+
+
+def is_registered(kind: str) -> bool:
+    return kind in _handlers
+
+
+def validate(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    check = _validators.get(kind)
+    return check(payload) if check else payload
+
+
+class JobRunner:
+    def __init__(
+        self,
+        workers: int = 4,
+        session_factory: Callable[[], Session] = SessionLocal,
+        stale_seconds: float = 600,
+        retention_days: float = 7,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.session_factory = session_factory
+        self.stale_seconds = float(stale_seconds)
+        self.retention_days = float(retention_days)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        # Jobs submitted by this process that have not finished yet.
+        self._active: set[str] = set()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.workers)
+                thread = threading.Thread(target=loop.run_forever, name="job-runner", daemon=True)
+                thread.start()
+                self._loop = loop
+                asyncio.run_coroutine_threadsafe(self._maintain(), loop)
+            return self._loop
+
+    def start(self) -> None:
+        """Start the job loop with its heartbeat and sweep ahead of the first submit (app startup)."""
+        self._ensure_loop()
+
+    async def _maintain(self) -> None:
+        next_sweep = 0.0
+        while True:
+            try:
+                await asyncio.to_thread(self.heartbeat)
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+                    await asyncio.to_thread(self.sweep)
+            except Exception as exc:  # pragma: no cover - retried on the next tick
+                logger.warning("[jobs] maintenance failed: %s", exc)
+            await asyncio.sleep(max(1.0, self.stale_seconds / 4))
+
+    def heartbeat(self) -> None:
+        """Touch ``updated_at`` of this process's unfinished jobs so :meth:`sweep` leaves them alone."""
+        active = list(self._active)
+        if not active:
+            return
+        with self.session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.id.in_(active), Job.status.in_(ACTIVE_STATUSES))
+                .values(updated_at=datetime.utcnow())
+            )
+            db.commit()
+
+    def sweep(self, now: datetime | None = None) -> Dict[str, int]:
+        """Fail abandoned queued/running jobs and delete finished jobs past retention."""
+        now = now or datetime.utcnow()
+        stale_before = now - timedelta(seconds=self.stale_seconds)
+        expired_before = now - timedelta(days=self.retention_days)
+        with self.session_factory() as db:
+            failed = db.execute(
+                update(Job)
+                .where(
+                    Job.status.in_(ACTIVE_STATUSES),
+                    Job.updated_at < stale_before,
+                    Job.id.notin_(list(self._active)),
+                )
+                .values(status="failed", stage="failed", error=ABANDONED_ERROR, finished_at=now, updated_at=now)
+            ).rowcount
+            removed = db.execute(
+                delete(Job).where(Job.status.in_(FINAL_STATUSES), Job.finished_at < expired_before)
+            ).rowcount
+            db.commit()
+        directory = input_dir()
+        if directory.is_dir():
+            for path in directory.iterdir():
+                if datetime.utcfromtimestamp(path.stat().st_mtime) < expired_before:
+                    path.unlink(missing_ok=True)
+        if failed or removed:
+            logger.info("[jobs] sweep failed_stale=%s removed=%s", failed, removed)
+        return {"failed": failed, "removed": removed}
+
+    def submit(
+        self,
+        db: Session,
+        *,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: int | None = None,
+        inputs: Optional[Dict[str, Any]] = None,
+    ) -> Job:
+        if kind not in _handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            kind=kind,
+            status="queued",
+            stage="queued",
+            payload=payload,
+            updated_at=datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        self._active.add(job.id)
+        asyncio.run_coroutine_threadsafe(self._run(job.id, kind, payload, user_id, inputs or {}), self._ensure_loop())
+        return job
+
+    async def _run(self, job_id: str, kind: str, payload: Dict[str, Any], user_id: int | None, inputs: Dict[str, Any]) -> None:
+        assert self._semaphore is not None
+        async with self._semaphore:
+            await asyncio.to_thread(self._update, job_id, status="running", stage="running", started_at=datetime.utcnow())
+            try:
+                result = await _handlers[kind](payload, JobContext(self, job_id, user_id, inputs))
+            except Exception as exc:
+                logger.warning("[jobs] job=%s kind=%s failed: %s", job_id, kind, exc)
+                values = {"status": "failed", "stage": "failed", "error": str(exc) or exc.__class__.__name__}
+            else:
+                values = {"status": "done", "stage": "done", "result": result}
+            await asyncio.to_thread(self._update, job_id, finished_at=datetime.utcnow(), **values)
+            self._active.discard(job_id)
+
+    def _update(self, job_id: str, **values: Any) -> None:
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == job_id).values(updated_at=datetime.utcnow(), **values))
+            db.commit()
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self.session_factory() as db:
+            job = db.get(Job, job_id)
+            if job is not None:
+                db.expunge(job)
+            return job
+
+
+def serialize(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "stage": job.stage,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+_settings = get_settings()
+job_runner = JobRunner(
+    workers=_settings.job_workers,
+    stale_seconds=_settings.job_stale_seconds,
+    retention_days=_settings.job_retention_days,
+)
+
+
+__all__ = [
+    "ACTIVE_STATUSES",
+    "FINAL_STATUSES",
+    "JobContext",
+    "JobRunner",
+    "handler",
+    "input_dir",
+    "is_registered",
+    "job_runner",
+    "serialize",
+    "validate",
+]
@@ -0,0 +1,349 @@
+"""
+Local rule-based pre-check for Kazakh learner texts.
+
+Runs before the LLM in the autochecker and either resolves a request on its own
+(empty or very short text, no Cyrillic at all, text identical to the known-correct
+reference) or returns findings that are merged into the final answer and listed
+in the prompt so the model does not spend tokens repeating them:
+
+* Latin letters inside Cyrillic words (``сaлем`` with a Latin ``a`` for ``ә``);
+* Russian-keyboard substitutes for Kazakh letters (``салем`` → ``сәлем``,
+  ``кал`` → ``қал``), when the corrected word is in the lexicon;
+* case and plural endings (септік жалғаулары) that break vowel harmony or the
+  voiced/voiceless consonant rule (``мектепқа`` → ``мектепке``).
+
+Rules only fire on words they can segment against the built-in lexicon, so
+unknown words are left to the LLM rather than guessed.
+"""
+
+import itertools
+import re
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+# Bump when rules or the lexicon change; part of the LLM cache key via the prompt.
+RULES_VERSION = "1"
+
+MIN_WORDS = 2
+
+KAZAKH_CHARS = {"ә", "ғ", "қ", "ң", "ө", "ұ", "ү", "һ", "і", "Ә", "Ғ", "Қ", "Ң", "Ө", "Ұ", "Ү", "Һ", "І"}
+COMMON_KK_WORDS = {"сәлем", "қазақ", "үй", "және", "бар", "жоқ", "бүгін", "ертең", "сабағы", "мәтін", "оқушы"}
+
+# Nouns and adjectives that take case/plural endings directly.
+NOUN_STEMS = frozenset(
+    """
+    үй мектеп сабақ кітап дәптер қалам бала ана әке апа аға іні қарындас дос мұғалім оқушы студент
+    жұмыс қала ауыл көше дүкен нан су сүт шай ет алма тамақ бөлме есік терезе үстел орындық күн түн
+    таң кеш апта ай жыл уақыт сағат адам ел тіл сөз мәтін сұрақ жауап бас көз қол аяқ жүрек ауа жер
+    тау өзен көл теңіз орман гүл ағаш ит мысық ат сиыр қой құс көлік автобус пойыз ұшақ жол дала аула
+    отбасы әже ата қыз ұл жігіт әйел дәрігер аурухана университет сынып тақта ойын музыка кино театр
+    спорт доп ақша баға түс әріп сурет хат газет журнал телефон компьютер бақша базар ас дастархан
+    қазақ достар ән би ой арман мереке демалыс қыс көктем жаз күз таңертең түскі кешкі
+    """.split()
+)
+
+OTHER_WORDS = frozenset(
+    """
+    жақсы жаман үлкен кіші кішкентай жаңа ескі әдемі ыстық суық жылы ұзын қысқа биік төмен көп аз бай
+    жас қарт тәтті дәмді көк қызыл сары ақ қара жасыл мен сен сіз ол біз сендер сіздер олар бұл осы сол
+    мына анау кім не қайда қашан қалай неше қанша қандай неге және бірақ өйткені сондықтан да де та те
+    ма ме ба бе па пе иә жоқ бар емес керек болады мүмкін өте тек әлі енді қазір бүгін ертең кеше
+    әрқашан кейде жиі сәлем сәлеметсіз рахмет кешіріңіз сау саубол қош бір екі үш төрт бес алты жеті
+    сегіз тоғыз он жиырма отыз қырық елу жүз мың кел оқы жаз сөйле айт біл көр тыңда іш же ұйықта тұр
+    отыр жүр істе ойна сүй ұна ал бер сат аш жап кір шық тап күт жүгір үйрен үйрет түсін ұмыт дайында
+    пісір жу тазала сал қал бол маған саған оған бізге сізге менің сенің сіздің оның біздің атым
+    """.split()
+)
+
+LEXICON = NOUN_STEMS | OTHER_WORDS
+
+BACK_VOWELS = set("аоұы")
+FRONT_VOWELS = set("әеөүі")
+VOWELS = BACK_VOWELS | FRONT_VOWELS | set("уиэюяё")
+VOICELESS = set("кқпстфхцчшщ")
+NASALS = set("мнң")
+PLURAL_SONORANTS = set("рйу")
+
+# Endings by case: (back, front) pairs per phonetic context.
+SUFFIXES = {
+    "dative": ("ға", "ге", "қа", "ке"),
+    "locative": ("да", "де", "та", "те"),
+    "ablative": ("дан", "ден", "тан", "тен", "нан", "нен"),
+    "genitive": ("ның", "нің", "дың", "дің", "тың", "тің"),
+    "accusative": ("ны", "ні", "ды", "ді", "ты", "ті"),
+    "plural": ("лар", "лер", "дар", "дер", "тар", "тер"),
+}
+SUFFIX_NAMES = {
+    "dative": "барыс септігі",
+    "locative": "жатыс септігі",
+    "ablative": "шығыс септігі",
+    "genitive": "ілік септігі",
+    "accusative": "табыс септігі",
+    "plural": "көптік жалғау",
+}
+
+# Latin letters that look like Cyrillic ones, and the Kazakh letter a Latin key often stands for.
+LATIN_LOOKALIKES = {"a": "а", "e": "е", "o": "о", "p": "р", "c": "с", "x": "х", "y": "у", "k": "к", "i": "і", "h": "һ"}
+LATIN_FOR_KAZAKH = {"a": "ә", "o": "ө", "u": "ү", "i": "і", "g": "ғ", "q": "қ", "n": "ң", "h": "һ", "k": "қ"}
+# Russian-layout letters typed instead of Kazakh ones.
+CYRILLIC_FOR_KAZAKH = {"а": "ә", "о": "ө", "у": "ұү", "к": "қ", "г": "ғ", "н": "ң", "и": "і", "х": "һ"}
+
+_WORD_RE = re.compile(r"[A-Za-zА-Яа-яЁёӘәҒғҚқҢңӨөҰұҮүҺһІі]+")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_CYRILLIC_RE = re.compile(r"[А-Яа-яЁёӘәҒғҚқҢңӨөҰұҮүҺһІі]")
+
+
+@dataclass
+class Finding:
+    type: str
+    severity: str
+    bad_excerpt: str
+    fix: str
+    why: str
+
+
+@dataclass
+class PrecheckResult:
+    findings: list[Finding] = field(default_factory=list)
+    # Set when the text is resolved locally: empty | too_short | wrong_script | matches_reference
+    verdict: str | None = None
+    score: int | None = None
+    message: str = ""
+
+    @property
+    def resolved(self) -> bool:
+        return self.verdict is not None
+
+    def issues(self) -> list[dict[str, Any]]:
+        return [asdict(finding) for finding in self.findings]
+
+    def prompt_hint(self) -> str:
+        if not self.findings:
+            return ""
+        lines = [f"- «{f.bad_excerpt}» → «{f.fix}» ({f.type})" for f in self.findings]
+        return (
+            "Local pre-check already found these issues; they are shown to the student as is. "
+            "Do NOT repeat them, report only other problems:\n" + "\n".join(lines)
+        )
+
+
+def looks_like_kazakh(text: str) -> bool:
+    """Lightweight heuristic to detect Kazakh text."""
+    if not text:
+        return False
+    lowered = text.lower()
+    if any(ch in KAZAKH_CHARS for ch in lowered):
+        return True
+    words = re.findall(r"[a-zа-яёғөңұүқһі]+", lowered)
+    if not words:
+        return False
+    if sum(1 for w in words if w in COMMON_KK_WORDS) >= 2:
+        return True
+    cyrillic_letters = [ch for ch in lowered if "а" <= ch <= "я" or ch in {"ё", "і"}]
+    if not cyrillic_letters:
+        return False
+    kaz_ratio = sum(1 for ch in lowered if ch in {"ә", "ғ", "қ", "ң", "ө", "ұ", "ү", "һ", "і"}) / len(cyrillic_letters)
+    return kaz_ratio >= 0.08
+
+
+def _last_vowel(stem: str) -> str | None:
+    for ch in reversed(stem):
+        if ch in VOWELS:
+            return ch
+    return None
+
+
+def expected_suffix(case: str, stem: str) -> str | None:
+    """The ending ``stem`` takes in ``case``, or None when harmony cannot be decided (loanwords)."""
+    vowel = _last_vowel(stem)
+    if vowel not in BACK_VOWELS and vowel not in FRONT_VOWELS:
+        return None
+    front = vowel in FRONT_VOWELS
+    last = stem[-1]
+    after_vowel = last in VOWELS and last != "у"
+    voiceless = last in VOICELESS
+    nasal = last in NASALS
+    if case == "dative":
+        pair = ("қа", "ке") if voiceless else ("ға", "ге")
+    elif case == "locative":
+        pair = ("та", "те") if voiceless else ("да", "де")
+    elif case == "ablative":
+        pair = ("тан", "тен") if voiceless else ("нан", "нен") if nasal else ("дан", "ден")
+    elif case == "genitive":
+        pair = ("ның", "нің") if after_vowel or nasal else ("тың", "тің") if voiceless else ("дың", "дің")
+    elif case == "accusative":
+        pair = ("ны", "ні") if after_vowel else ("ты", "ті") if voiceless else ("ды", "ді")
+    elif case == "plural":
+        if after_vowel or last in PLURAL_SONORANTS:
+            pair = ("лар", "лер")
+        elif voiceless:
+            pair = ("тар", "тер")
+        else:
+            pair = ("дар", "дер")
+    else:
+        return None
+    return pair[1] if front else pair[0]
+
+
+def _stems() -> dict[str, str]:
+    # Bare stems plus their regular plurals, so "балаларға" segments as бала+лар+ға.
+    stems = {stem: stem for stem in NOUN_STEMS}
+    for stem in NOUN_STEMS:
+        plural = expected_suffix("plural", stem)
+        if plural:
+            stems[stem + plural] = stem + plural
+    return stems
+
+
+_STEMS = _stems()
+
+
+def _segment(word: str) -> tuple[str, str, str] | None:
+    """(stem, case, ending) for a lexicon stem plus one known ending, whether or not it is correct."""
+    for case, endings in SUFFIXES.items():
+        for ending in sorted(endings, key=len, reverse=True):
+            if word.endswith(ending) and word[: -len(ending)] in _STEMS:
+                return word[: -len(ending)], case, ending
+    return None
+
+
+def is_known(word: str) -> bool:
+    if word in LEXICON:
+        return True
+    segment = _segment(word)
+    return bool(segment) and expected_suffix(segment[1], segment[0]) == segment[2]
+
+
+def _match_case(original: str, fixed: str) -> str:
+    if original[:1].isupper():
+        return fixed[:1].upper() + fixed[1:]
+    return fixed
+
+
+def _kazakh_letter_fix(word: str) -> str | None:
+    """A known word reachable by replacing one or two Russian-layout letters with Kazakh ones."""
+    positions = [i for i, ch in enumerate(word) if ch in CYRILLIC_FOR_KAZAKH]
+    for count in (1, 2):
+        for chosen in itertools.combinations(positions, count):
+            for letters in itertools.product(*(CYRILLIC_FOR_KAZAKH[word[i]] for i in chosen)):
+                chars = list(word)
+                for i, letter in zip(chosen, letters):
+                    chars[i] = letter
+                candidate = "".join(chars)
+                if is_known(candidate):
+                    return candidate
+    return None
+
+
+def _mixed_script_fix(word: str) -> str:
+    latin = [i for i, ch in enumerate(word) if _LATIN_RE.match(ch)]
+    options = [
+        [opt for opt in (LATIN_LOOKALIKES.get(word[i]), LATIN_FOR_KAZAKH.get(word[i])) if opt] or [word[i]] for i in latin
+    ]
+    fallback = None
+    for letters in itertools.product(*options[:4]):
+        chars = list(word)
+        for i, letter in zip(latin, letters):
+            chars[i] = letter
+        candidate = "".join(chars)
+        if fallback is None:
+            fallback = candidate
+        if is_known(candidate):
+            return candidate
+        fixed = _kazakh_letter_fix(candidate)
+        if fixed:
+            return fixed
+    return fallback or word
+
+
+def _word_findings(original: str) -> list[Finding]:
+    word = original.lower()
+    if _LATIN_RE.search(word):
+        if not _CYRILLIC_RE.search(word):
+            return []
+        fix = _mixed_script_fix(word)
+        return [
+            Finding(
+                type="spelling",
+                severity="high",
+                bad_excerpt=original,
+                fix=_match_case(original, fix),
+                why="Сөзде латын әрпі бар: казақ сөздері тек кирилл әріптерімен жазылады.",
+            )
+        ]
+    if is_known(word):
+        return []
+    segment = _segment(word)
+    if segment:
+        stem, case, ending = segment
+        expected = expected_suffix(case, stem)
+        if expected and expected != ending:
+            return [
+                Finding(
+                    type="grammar",
+                    severity="medium",
+                    bad_excerpt=original,
+                    fix=_match_case(original, stem + expected),
+                    why=f"«{stem}» сөзіне {SUFFIX_NAMES[case]} «-{expected}» түрінде жалғанады "
+                    "(үндестік заңы және соңғы дыбыс).",
+                )
+            ]
+    fix = _kazakh_letter_fix(word)
+    if fix:
+        return [
+            Finding(
+                type="spelling",
+                severity="medium",
+                bad_excerpt=original,
+                fix=_match_case(original, fix),
+                why="Қазақ әрпінің орнына орыс әрпі жазылған (ә, ғ, қ, ң, ө, ұ, ү, һ, і).",
+            )
+        ]
+    return []
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def precheck(text: str | None, *, reference: str | None = None, min_words: int = MIN_WORDS) -> PrecheckResult:
+    value = _normalize(text or "")
+    if not value:
+        return PrecheckResult(verdict="empty", score=0, message="Мәтін бос.")
+    if not _CYRILLIC_RE.search(value) and _LATIN_RE.search(value):
+        return PrecheckResult(
+            verdict="wrong_script", score=0, message="Мәтін кирилл әрпімен, қазақ тілінде жазылуы керек."
+        )
+    if reference and value == _normalize(reference):
+        return PrecheckResult(verdict="matches_reference", score=100, message="Мәтін үлгі жауаппен толық сәйкес.")
+
+    words = _WORD_RE.findall(value)
+    findings: list[Finding] = []
+    seen = set()
+    for word in words:
+        if word in seen:
+            continue
+        seen.add(word)
+        findings.extend(_word_findings(word))
+    if len(words) < min_words:
+        return PrecheckResult(
+            findings=findings,
+            verdict="too_short",
+            score=0,
+            message=f"Мәтін тым қысқа: кемінде {min_words} сөз жазыңыз.",
+        )
+    return PrecheckResult(findings=findings)
+
+
+__all__ = [
+    "COMMON_KK_WORDS",
+    "KAZAKH_CHARS",
+    "RULES_VERSION",
+    "Finding",
+    "PrecheckResult",
+    "expected_suffix",
+    "is_known",
+    "looks_like_kazakh",
+    "precheck",
+]
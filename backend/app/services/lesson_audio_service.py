@@ -0,0 +1,179 @@
+"""
+Pre-generate TTS audio for lesson content.
+
+Publishing a lesson queues a ``lesson_audio`` job (see ``job_service``) that
+walks its flashcards, pronunciation and audio blocks plus the ``flashcards`` /
+``pronunciation_items`` rows, synthesizes every text that has no audio yet
+through the shared :data:`~app.services.tts_service.tts_store` (at most
+``TTS_PREGENERATE_WORKERS`` at a time) and writes the clip URL back, so the
+first student does not wait for the speech engine.
+
+Synthesis runs without holding the lesson: URLs are written in a second pass
+that reloads the rows and only fills fields that are still empty, so edits made
+meanwhile are kept. ``backfill_tts_audio.py`` runs the same pass over the whole
+catalog.
+"""
+
+import asyncio
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable
+
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..db import models
+from . import job_service
+from .tts_service import TTSStore, audio_slots, normalize_text, tts_store
+
+logger = logging.getLogger(__name__)
+
+JOB_KIND = "lesson_audio"
+
+
+def _missing(owner: dict, field: str) -> bool:
+    return not owner.get(field) and not owner.get("audio_path")
+
+
+def _blocks(db: Session, lesson_id: int) -> list[models.LessonBlock]:
+    return (
+        db.query(models.LessonBlock)
+        .filter(models.LessonBlock.lesson_id == lesson_id, models.LessonBlock.is_deleted.is_(False))
+        .order_by(models.LessonBlock.order)
+        .all()
+    )
+
+
+def _rows(db: Session, lesson_id: int) -> list[tuple[Any, str]]:
+    """Flashcard / pronunciation rows of a lesson with the attribute holding their text."""
+    flashcards = db.query(models.Flashcard).filter(models.Flashcard.lesson_id == lesson_id).all()
+    items = db.query(models.PronunciationItem).filter(models.PronunciationItem.lesson_id == lesson_id).all()
+    return [(card, "front") for card in flashcards] + [(item, "word") for item in items]
+
+
+def missing_texts(db: Session, lesson_id: int) -> list[str]:
+    """Texts of a lesson that have no audio yet, in lesson order, without duplicates."""
+    texts: dict[str, str] = {}
+    for block in _blocks(db, lesson_id):
+        for owner, field, text in audio_slots(block.block_type, block.payload):
+            if _missing(owner, field):
+                texts.setdefault(normalize_text(text), text)
+    for row, attr in _rows(db, lesson_id):
+        text = (getattr(row, attr) or "").strip()
+        if text and not row.audio_url and not getattr(row, "audio_path", None):
+            texts.setdefault(normalize_text(text), text)
+    return list(texts.values())
+
+
+def synthesize_all(
+    session_factory: Callable[[], Session],
+    texts: Iterable[str],
+    *,
+    store: TTSStore = tts_store,
+    workers: int | None = None,
+) -> tuple[dict[str, str], list[str]]:
+    """Clip URLs by normalized text, at most ``workers`` syntheses at once; also returns failed texts."""
+    texts = list(texts)
+    if not texts:
+        return {}, []
+
+    def synthesize(text: str) -> str:
+        with session_factory() as db:
+            return store.get_or_create(db, text, pin=True)
+
+    urls: dict[str, str] = {}
+    failed: list[str] = []
+    workers = max(1, int(workers or get_settings().tts_pregenerate_workers))
+    with ThreadPoolExecutor(max_workers=min(workers, len(texts)), thread_name_prefix="tts-pregenerate") as pool:
+        futures = {text: pool.submit(synthesize, text) for text in texts}
+        for text, future in futures.items():
+            try:
+                urls[normalize_text(text)] = future.result()
+            except Exception as exc:
+                logger.warning("[tts] pre-generation failed for %r: %s", text[:40], exc)
+                failed.append(text)
+    return urls, failed
+
+
+def apply_urls(db: Session, lesson_id: int, urls: dict[str, str]) -> int:
+    """Write clip URLs into still-empty audio fields of the lesson; returns the number filled."""
+    filled = 0
+    for block in _blocks(db, lesson_id):
+        column = "data" if isinstance(block.data, dict) and block.data else "content"
+        payload = copy.deepcopy(getattr(block, column))
+        changed = 0
+        for owner, field, text in audio_slots(block.block_type, payload):
+            url = urls.get(normalize_text(text))
+            if url and _missing(owner, field):
+                owner[field] = url
+                changed += 1
+        if changed:
+            setattr(block, column, payload)
+            filled += changed
+    for row, attr in _rows(db, lesson_id):
+        url = urls.get(normalize_text(getattr(row, attr)))
+        if url and not row.audio_url and not getattr(row, "audio_path", None):
+            row.audio_url = url
+            filled += 1
+    db.commit()
+    return filled
+
+
+def pregenerate_lesson_audio(
+    session_factory: Callable[[], Session],
+    lesson_id: int,
+    *,
+    store: TTSStore = tts_store,
+    workers: int | None = None,
+) -> Dict[str, Any]:
+    with session_factory() as db:
+        texts = missing_texts(db, lesson_id)
+    urls, failed = synthesize_all(session_factory, texts, store=store, workers=workers)
+    with session_factory() as db:
+        filled = apply_urls(db, lesson_id, urls) if urls else 0
+    logger.info("[tts] lesson=%s texts=%s synthesized=%s failed=%s filled=%s", lesson_id, len(texts), len(urls), len(failed), filled)
+    return {"lesson_id": lesson_id, "texts": len(texts), "synthesized": len(urls), "failed": failed, "filled": filled}
+
+
+def pregenerate_catalog_audio(
+    session_factory: Callable[[], Session],
+    *,
+    lesson_ids: Iterable[int] | None = None,
+    store: TTSStore = tts_store,
+    workers: int | None = None,
+) -> list[Dict[str, Any]]:
+    """Run :func:`pregenerate_lesson_audio` for the given lessons, or every lesson that is not deleted."""
+    if lesson_ids is None:
+        with session_factory() as db:
+            lesson_ids = [
+                lesson_id
+                for (lesson_id,) in db.query(models.Lesson.id)
+                .filter(models.Lesson.is_deleted.is_(False))
+                .order_by(models.Lesson.id)
+                .all()
+            ]
+    return [pregenerate_lesson_audio(session_factory, lesson_id, store=store, workers=workers) for lesson_id in lesson_ids]
+
+
+def _validate_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        return {"lesson_id": int(payload["lesson_id"])}
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("lesson_id is required")
+
+
+@job_service.handler(JOB_KIND, validate=_validate_job)
+async def _run_lesson_audio_job(payload: Dict[str, Any], context: job_service.JobContext) -> Dict[str, Any]:
+    await context.stage("synthesizing")
+    return await asyncio.to_thread(pregenerate_lesson_audio, context.runner.session_factory, int(payload["lesson_id"]))
+
+
+__all__ = [
+    "JOB_KIND",
+    "apply_urls",
+    "missing_texts",
+    "pregenerate_catalog_audio",
+    "pregenerate_lesson_audio",
+    "synthesize_all",
+]
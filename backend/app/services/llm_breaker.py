@@ -0,0 +1,236 @@
+"""
+Circuit breaker and adaptive timeout for the upstream LLM provider.
+
+Every HTTP call made by :class:`~app.services.llm_client.LLMClient` is recorded
+against the breaker of its provider (base URL and model). When at least
+``min_calls`` calls in the last ``window_seconds`` ran and ``failure_rate`` of
+them failed with a timeout, network error, 429 or 5xx, the circuit opens: calls are refused
+at once for ``open_seconds`` (doubling on every failed probe, capped at
+``max_open_seconds``) so routes can fall back to the cache or the local
+baseline instead of each waiting out the full timeout. After the cool-down,
+``half_open_probes`` calls are let through; a success closes the circuit.
+
+The per-call timeout follows observed latency: ``timeout_multiplier`` times the
+p99 of recent successful calls, between ``min_timeout`` and the caller's limit.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from ..core.config import get_settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str = "llm",
+        *,
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 300.0,
+        half_open_probes: int = 1,
+        timeout_multiplier: float = 3.0,
+        min_timeout: float = 5.0,
+        min_samples: int = 20,
+    ) -> None:
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, int(min_calls))
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = max(1, int(half_open_probes))
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = max(1, int(min_samples))
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._latencies: deque[float] = deque(maxlen=256)
+        self._opened_at = 0.0
+        self._cooldown = open_seconds
+        self._probes = 0
+        self._trips = 0
+        self._rejected = 0
+        self._last_error: str | None = None
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._probes = 0
+        self._trips += 1
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self._cooldown:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; in half-open state this reserves a probe."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._latencies.append(latency)
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._cooldown = self.open_seconds
+                self._calls.clear()
+            self._calls.append((now, True))
+            self._prune(now)
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._last_error = error
+            if self._state == HALF_OPEN:
+                self._cooldown = min(self.max_open_seconds, self._cooldown * 2)
+                self._open(now)
+                return
+            self._calls.append((now, False))
+            self._prune(now)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if (
+                self._state == CLOSED
+                and len(self._calls) >= self.min_calls
+                and failures / len(self._calls) >= self.failure_rate
+            ):
+                self._open(now)
+
+    def record_censored(self, latency: float) -> None:
+        """
+        Latency of a call cancelled after ``latency`` seconds because another
+        provider answered first: a lower bound on its real latency. Kept with
+        the latency samples (so a provider that keeps losing hedges does not
+        look fast) but not counted as a success or a failure.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe whose call ended without a verdict (cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def retry_after(self) -> int:
+        with self._lock:
+            if self._state != OPEN:
+                return 1
+            remaining = self._cooldown - (time.monotonic() - self._opened_at)
+            return max(1, int(remaining + 0.999))
+
+    def _percentile(self, ordered: list[float], p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def percentile(self, p: float) -> float | None:
+        """Latency percentile of recent successful calls, or None until ``min_samples`` were seen."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return self._percentile(sorted(self._latencies), p)
+
+    def stats(self) -> dict[str, Any]:
+        """Cheap routing inputs: state, sample count, p50/p95 seconds and windowed failure rate."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._prune(now)
+            calls = len(self._calls)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            ordered = sorted(self._latencies)
+        return {
+            "state": state,
+            "samples": len(ordered),
+            "p50": self._percentile(ordered, 0.5) if ordered else None,
+            "p95": self._percentile(ordered, 0.95) if ordered else None,
+            "failure_rate": failures / calls if calls else 0.0,
+        }
+
+    def timeout(self, limit: float) -> float:
+        """Per-call timeout in seconds, never above ``limit``."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return limit
+            p99 = self._percentile(sorted(self._latencies), 0.99)
+        return max(self.min_timeout, min(limit, p99 * self.timeout_multiplier))
+
+    def snapshot(self, limit: float | None = None) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._prune(now)
+            failures = sum(1 for _, ok in self._calls if not ok)
+            ordered = sorted(self._latencies)
+            data: dict[str, Any] = {
+                "name": self.name,
+                "state": state,
+                "calls": len(self._calls),
+                "failures": failures,
+                "failure_rate": round(failures / len(self._calls), 3) if self._calls else 0.0,
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "last_error": self._last_error,
+                "latency_ms": {
+                    f"p{int(p * 100)}": round(self._percentile(ordered, p) * 1000, 1) if ordered else 0.0
+                    for p in (0.5, 0.95, 0.99)
+                },
+            }
+            if state == OPEN:
+                data["retry_after"] = max(1, int(self._cooldown - (now - self._opened_at) + 0.999))
+        if limit is not None:
+            data["timeout_seconds"] = round(self.timeout(limit), 2)
+        return data
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    """The shared breaker of a provider, so every client of one endpoint trips together."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                provider,
+                window_seconds=settings.llm_breaker_window_seconds,
+                min_calls=settings.llm_breaker_min_calls,
+                failure_rate=settings.llm_breaker_failure_rate,
+                open_seconds=settings.llm_breaker_open_seconds,
+                timeout_multiplier=settings.llm_timeout_multiplier,
+                min_timeout=settings.llm_timeout_min_seconds,
+            )
+            _breakers[provider] = breaker
+        return breaker
+
+
+__all__ = ["CLOSED", "HALF_OPEN", "OPEN", "CircuitBreaker", "breaker_for"]
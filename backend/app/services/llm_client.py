@@ -1,18 +1,101 @@
+import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
+import threading
 import time
-from typing import Any, Dict, Optional
+import weakref
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
 
+import httpx
 import requests
 
+from .llm_breaker import CircuitBreaker
+from .llm_queue import llm_queue
+from .llm_router import DEFAULT_BASE_URL, DEFAULT_MODEL, Provider, Router, build_router, load_providers
+
 logger = logging.getLogger(__name__)
 
+# Every LLMClient with an open async pool, so shutdown can close them all.
+_open_clients: "weakref.WeakSet[LLMClient]" = weakref.WeakSet()
+
 
 class LLMClientError(Exception):
     """Raised when the LLM request fails."""
 
 
+class LLMCircuitOpen(LLMClientError):
+    """Raised without calling upstream while the provider's circuit breaker is open."""
+
+    def __init__(self, message: str, retry_after: int = 1) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Upstream calls currently running, keyed by (event loop, request key). Shared by
+# every LLMClient instance so identical prompts from different routes coalesce.
+_inflight: Dict[tuple[int, str], "asyncio.Task[Any]"] = {}
+_inflight_lock = threading.Lock()
+single_flight_stats = {"calls": 0, "joined": 0}
+# Requests duplicated to a second provider, and how often the duplicate answered first.
+hedge_stats = {"hedged": 0, "won": 0}
+
+
+async def single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run ``factory()`` once for all concurrent callers with the same ``key``.
+
+    Followers await the leader's task (shielded, so a follower timing out does not
+    cancel it) and get a deep copy of its result or its exception.
+    """
+    loop = asyncio.get_running_loop()
+    slot = (id(loop), key)
+    with _inflight_lock:
+        single_flight_stats["calls"] += 1
+        task = _inflight.get(slot)
+        leader = task is None
+        if leader:
+            task = loop.create_task(factory())
+            _inflight[slot] = task
+
+            def _release(done: "asyncio.Task[Any]") -> None:
+                if not done.cancelled():
+                    done.exception()  # mark retrieved even if every caller gave up
+                with _inflight_lock:
+                    if _inflight.get(slot) is done:
+                        del _inflight[slot]
+
+            task.add_done_callback(_release)
+        else:
+            single_flight_stats["joined"] += 1
+    result = await asyncio.shield(task)
+    return result if leader else copy.deepcopy(result)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
 class LLMClient:
     def __init__(
         self,
@@ -20,51 +103,342 @@ class LLMClient:
         base_url: Optional[str] = None,
         model: Optional[str] = None,
         timeout_seconds: int = 60,
+        *,
+        providers: Optional[list[Provider]] = None,
+        router: Optional[Router] = None,
+        hedge_after: Optional[float] = None,
     ) -> None:
-        self.api_key = api_key or os.getenv("LLM_API_KEY")
-        self.base_url = (base_url or os.getenv("LLM_BASE_URL") or "https://api.groq.com/openai/v1").rstrip("/")
-        self.model = model or os.getenv("LLM_MODEL") or "llama-3.1-8b-instant"
+        if providers is None:
+            if api_key or base_url or model:
+                providers = [
+                    Provider(
+                        name="default",
+                        base_url=base_url or os.getenv("LLM_BASE_URL") or DEFAULT_BASE_URL,
+                        model=model or os.getenv("LLM_MODEL") or DEFAULT_MODEL,
+                        api_key=api_key or os.getenv("LLM_API_KEY"),
+                    )
+                ]
+            else:
+                providers = load_providers()
+        if not providers:
+            raise ValueError("LLMClient needs at least one provider")
+        self.providers = list(providers)
+        self.router = router or build_router(os.getenv("LLM_ROUTER"))
         self.timeout_seconds = timeout_seconds
+        # Hedging (LLM_HEDGE=0 disables): when the primary has not answered after its
+        # p95 latency (``hedge_after`` seconds if given, LLM_HEDGE_DEFAULT_SECONDS until
+        # enough samples, never below LLM_HEDGE_MIN_SECONDS), send the same request to
+        # the next provider and keep whichever answers first. A provider that fails
+        # hands the request to the next one.
+        self.hedge = (os.getenv("LLM_HEDGE") or "1").lower() not in {"0", "false", "no"}
+        self.hedge_after = hedge_after
+        self.hedge_min_seconds = _env_float("LLM_HEDGE_MIN_SECONDS", 0.5)
+        self.hedge_default_seconds = _env_float("LLM_HEDGE_DEFAULT_SECONDS", 5.0)
+        # Pool limits: LLM_POOL_MAX_CONNECTIONS / LLM_POOL_MAX_KEEPALIVE / LLM_POOL_KEEPALIVE_EXPIRY,
+        # LLM_CONNECT_TIMEOUT, and LLM_HTTP2=1 (needs the `h2` package, else HTTP/1.1 keep-alive).
+        self.max_connections = _env_int("LLM_POOL_MAX_CONNECTIONS", 32)
+        self.max_keepalive = _env_int("LLM_POOL_MAX_KEEPALIVE", 16)
+        self.keepalive_expiry = _env_int("LLM_POOL_KEEPALIVE_EXPIRY", 60)
+        self.connect_timeout = _env_int("LLM_CONNECT_TIMEOUT", 10)
+        self.http2 = (os.getenv("LLM_HTTP2") or "").lower() in {"1", "true", "yes"}
+        self._session: requests.Session | None = None
+        # One pool per event loop (request loop, job runner loop, test loops) and base URL.
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
 
-    def _request(self, prompt: str, extra_messages: list[dict] | None = None) -> Dict[str, Any]:
-        if not self.api_key:
+    # The primary (first configured) provider, kept as plain attributes for callers and tests.
+    @property
+    def api_key(self) -> Optional[str]:
+        return self.providers[0].api_key
+
+    @api_key.setter
+    def api_key(self, value: Optional[str]) -> None:
+        self.providers[0].api_key = value
+
+    @property
+    def base_url(self) -> str:
+        return self.providers[0].base_url
+
+    @base_url.setter
+    def base_url(self, value: str) -> None:
+        self.providers[0].base_url = value.rstrip("/")
+
+    @property
+    def model(self) -> str:
+        return self.providers[0].model
+
+    @model.setter
+    def model(self, value: str) -> None:
+        self.providers[0].model = value
+
+    def _payload(
+        self, prompt: str, extra_messages: list[dict] | None = None, provider: Provider | None = None
+    ) -> Dict[str, Any]:
+        provider = provider or self.providers[0]
+        if not provider.api_key:
             raise LLMClientError("LLM_API_KEY is not configured")
-        url = f"{self.base_url}/chat/completions"
         messages = [{"role": "user", "content": prompt}]
         if extra_messages:
             messages.extend(extra_messages)
-        payload = {
-            "model": self.model,
+        return {
+            "model": provider.model,
             "messages": messages,
             "temperature": 0.2,
         }
+
+    def _headers(self, provider: Provider | None = None) -> Dict[str, str]:
+        provider = provider or self.providers[0]
+        return {"Authorization": f"Bearer {provider.api_key}", "Content-Type": "application/json"}
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.providers[0].breaker
+
+    def describe_providers(self) -> list[Dict[str, Any]]:
+        return [provider.describe(self.timeout_seconds) for provider in self.providers]
+
+    def _ordered(self) -> list[Provider]:
+        """Configured providers in routing order."""
+        ordered = [provider for provider in self.router.order(self.providers) if provider.api_key]
+        if not ordered:
+            raise LLMClientError("LLM_API_KEY is not configured")
+        return ordered
+
+    @staticmethod
+    def _next_admitted(queue: list[Provider]) -> tuple[Provider, CircuitBreaker]:
+        """Pop providers off ``queue`` until one's breaker admits a call."""
+        retry_after: list[int] = []
+        while queue:
+            provider = queue.pop(0)
+            breaker = provider.breaker
+            if breaker.allow():
+                return provider, breaker
+            retry_after.append(breaker.retry_after())
+        raise LLMCircuitOpen("LLM provider unavailable (circuit open)", retry_after=min(retry_after, default=1))
+
+    @staticmethod
+    def _record(breaker: CircuitBreaker, status_code: int, started: float) -> None:
+        # Rate limits and server errors mean the provider is struggling; other 4xx are our problem.
+        if status_code == 429 or status_code >= 500:
+            breaker.record_failure(f"HTTP {status_code}")
+        else:
+            breaker.record_success(time.monotonic() - started)
+
+    @staticmethod
+    def _parse(status_code: int, text: str, load_json) -> Dict[str, Any]:
+        if status_code >= 400:
+            message = ""
+            try:
+                body = load_json()
+                message = body.get("error", {}).get("message") or body.get("message") or text
+            except Exception:
+                message = text
+            if status_code in {401, 403}:
+                raise LLMClientError(f"LLM authentication error ({status_code}): {message}")
+            if status_code == 429:
+                raise LLMClientError(f"LLM rate limit exceeded: {message}")
+            raise LLMClientError(f"LLM HTTP {status_code}: {message}")
         try:
-            resp = requests.post(
-                url,
-                headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            return load_json()
+        except Exception as exc:
+            raise LLMClientError("LLM returned non-JSON payload") from exc
+
+    def _request(self, prompt: str, extra_messages: list[dict] | None = None) -> Dict[str, Any]:
+        provider, breaker = self._next_admitted(self._ordered())
+        payload = self._payload(prompt, extra_messages, provider)
+        if self._session is None:
+            self._session = requests.Session()
+        started = time.monotonic()
+        try:
+            resp = self._session.post(
+                f"{provider.base_url}/chat/completions",
+                headers=self._headers(provider),
                 json=payload,
-                timeout=self.timeout_seconds,
+                timeout=(self.connect_timeout, breaker.timeout(self.timeout_seconds)),
             )
         except requests.Timeout as exc:
+            breaker.record_failure("timeout")
             raise LLMClientError("LLM request timed out") from exc
         except Exception as exc:  # pragma: no cover - network errors
+            breaker.record_failure(str(exc))
             raise LLMClientError(f"LLM request failed: {exc}") from exc
-        if resp.status_code >= 400:
-            message = ""
-            try:
-                body = resp.json()
-                message = body.get("error", {}).get("message") or body.get("message") or resp.text
-            except Exception:
-                message = resp.text
-            if resp.status_code in {401, 403}:
-                raise LLMClientError(f"LLM authentication error ({resp.status_code}): {message}")
-            if resp.status_code == 429:
-                raise LLMClientError(f"LLM rate limit exceeded: {message}")
-            raise LLMClientError(f"LLM HTTP {resp.status_code}: {message}")
+        self._record(breaker, resp.status_code, started)
+        return self._parse(resp.status_code, resp.text, resp.json)
+
+    def _pool(self, provider: Provider | None = None) -> httpx.AsyncClient:
+        # An httpx pool is bound to the event loop it was first used on, so each
+        # loop that calls the client gets (and keeps reusing) its own pool per provider.
+        base_url = (provider or self.providers[0]).base_url
+        pools = self._pools.setdefault(asyncio.get_running_loop(), {})
+        client = pools.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                http2=self.http2 and _http2_available(),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.timeout_seconds, connect=self.connect_timeout),
+            )
+            pools[base_url] = client
+            _open_clients.add(self)
+        return client
+
+    async def _send(
+        self,
+        provider: Provider,
+        breaker: CircuitBreaker,
+        prompt: str,
+        extra_messages: list[dict] | None,
+        timeout: float | None,
+    ) -> Dict[str, Any]:
+        payload = self._payload(prompt, extra_messages, provider)
+        request_timeout = httpx.Timeout(breaker.timeout(timeout or self.timeout_seconds), connect=self.connect_timeout)
+        started = time.monotonic()
         try:
-            return resp.json()
-        except Exception as exc:
-            raise LLMClientError("LLM returned non-JSON payload") from exc
+            resp = await self._pool(provider).post(
+                "/chat/completions", headers=self._headers(provider), json=payload, timeout=request_timeout
+            )
+        except httpx.TimeoutException as exc:
+            breaker.record_failure("timeout")
+            raise LLMClientError("LLM request timed out") from exc
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except Exception as exc:  # pragma: no cover - network errors
+            breaker.record_failure(str(exc))
+            raise LLMClientError(f"LLM request failed: {exc}") from exc
+        self._record(breaker, resp.status_code, started)
+        return self._parse(resp.status_code, resp.text, resp.json)
+
+    def _hedge_delay(self, breaker: CircuitBreaker) -> float:
+        if self.hedge_after is not None:
+            return self.hedge_after
+        p95 = breaker.percentile(0.95)
+        return max(self.hedge_min_seconds, p95 if p95 is not None else self.hedge_default_seconds)
+
+    async def _arequest(
+        self, prompt: str, extra_messages: list[dict] | None = None, timeout: float | None = None
+    ) -> Dict[str, Any]:
+        """
+        Send to the first admitted provider. If it is still running after its
+        hedge delay, send the same request to the next one and take the first
+        answer. If it fails, fail over to the next one. Losers cancelled by a
+        winning hedge leave a censored latency sample on their breaker.
+        """
+        queue = self._ordered()
+        running: dict[asyncio.Task, tuple[Provider, CircuitBreaker, float]] = {}
+        hedged: asyncio.Task | None = None
+        error: BaseException | None = None
+
+        def launch(provider: Provider, breaker: CircuitBreaker) -> asyncio.Task:
+            task = asyncio.ensure_future(self._send(provider, breaker, prompt, extra_messages, timeout))
+            running[task] = (provider, breaker, time.monotonic())
+            return task
+
+        launch(*self._next_admitted(queue))
+        try:
+            while running:
+                delay = None
+                primary, primary_breaker, _ = next(iter(running.values()))
+                if self.hedge and queue and len(running) == 1:
+                    delay = self._hedge_delay(primary_breaker)
+                done, _ = await asyncio.wait(running, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    try:
+                        backup, backup_breaker = self._next_admitted(queue)
+                    except LLMCircuitOpen:
+                        continue  # queue is empty now: keep waiting for the primary
+                    hedge_stats["hedged"] += 1
+                    logger.info("LLM hedge: %s slow, also asking %s", primary.name, backup.name)
+                    hedged = launch(backup, backup_breaker)
+                    continue
+                for task in done:
+                    provider = running.pop(task)[0]
+                    if task.exception() is None:
+                        if task is hedged:
+                            hedge_stats["won"] += 1
+                        now = time.monotonic()
+                        for _, loser_breaker, started in running.values():
+                            loser_breaker.record_censored(now - started)
+                        return task.result()
+                    error = task.exception()
+                    if not running and queue:
+                        try:
+                            backup, backup_breaker = self._next_admitted(queue)
+                        except LLMCircuitOpen:
+                            break
+                        logger.info("LLM failover: %s failed (%s), asking %s", provider.name, error, backup.name)
+                        launch(backup, backup_breaker)
+            assert error is not None
+            raise error
+        finally:
+            for task in running:
+                if not task.done():
+                    task.cancel()
+
+    async def astream_text(
+        self,
+        prompt: str,
+        *,
+        timeout: float | None = None,
+        user_id: Any = None,
+        lane: str = "interactive",
+    ) -> AsyncIterator[str]:
+        """
+        Yield content deltas as they arrive (OpenAI-compatible ``stream: true`` SSE).
+
+        Holds an llm_queue slot for the whole stream; streams are not coalesced or hedged.
+        """
+        if not prompt or not prompt.strip():
+            raise LLMClientError("Prompt is empty")
+        async with llm_queue.slot(user_id, lane):
+            provider, breaker = self._next_admitted(self._ordered())
+            payload = {**self._payload(prompt, provider=provider), "stream": True}
+            request_timeout = httpx.Timeout(
+                breaker.timeout(timeout or self.timeout_seconds), connect=self.connect_timeout
+            )
+            started = time.monotonic()
+            try:
+                async with self._pool(provider).stream(
+                    "POST", "/chat/completions", headers=self._headers(provider), json=payload, timeout=request_timeout
+                ) as resp:
+                    # Latency to the response headers, comparable with non-streamed calls.
+                    self._record(breaker, resp.status_code, started)
+                    if resp.status_code >= 400:
+                        body = (await resp.aread()).decode("utf-8", errors="replace")
+                        self._parse(resp.status_code, body, lambda: json.loads(body))
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            choice = (json.loads(data).get("choices") or [{}])[0]
+                        except (ValueError, AttributeError, IndexError):
+                            continue
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+            except httpx.TimeoutException as exc:
+                breaker.record_failure("timeout")
+                raise LLMClientError("LLM request timed out") from exc
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except httpx.HTTPError as exc:  # pragma: no cover - network errors
+                breaker.record_failure(str(exc))
+                raise LLMClientError(f"LLM request failed: {exc}") from exc
+
+    async def aclose(self) -> None:
+        """Close the pools of the running event loop (pools of other loops die with them)."""
+        for client in self._pools.pop(asyncio.get_running_loop(), {}).values():
+            if not client.is_closed:
+                await client.aclose()
 
     @staticmethod
     def _extract_text(data: Dict[str, Any]) -> str:
@@ -92,6 +466,84 @@ class LLMClient:
             raise LLMClientError("LLM returned an empty response")
         return text.strip()
 
+    def _flight_key(self, kind: str, prompt: str, dedupe_key: str | None) -> str:
+        digest = dedupe_key or hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{self.base_url}|{self.model}|{kind}|{digest}"
+
+    async def agenerate_text(
+        self,
+        prompt: str,
+        *,
+        timeout: float | None = None,
+        dedupe_key: str | None = None,
+        user_id: Any = None,
+        lane: str = "interactive",
+    ) -> str:
+        """
+        ``dedupe_key`` lets callers coalesce prompts they consider equivalent (e.g. a
+        cache key). ``user_id``/``lane`` place the call in the shared llm_queue, which
+        may raise LLMQueueFull.
+        """
+        if not prompt or not prompt.strip():
+            raise LLMClientError("Prompt is empty")
+        return await single_flight(
+            self._flight_key("text", prompt, dedupe_key),
+            lambda: self._agenerate_text(prompt, timeout, user_id, lane),
+        )
+
+    async def _agenerate_text(self, prompt: str, timeout: float | None, user_id: Any, lane: str) -> str:
+        async with llm_queue.slot(user_id, lane):
+            data = await self._arequest(prompt, timeout=timeout)
+        text = self._extract_text(data)
+        if not text:
+            raise LLMClientError("LLM returned an empty response")
+        return text.strip()
+
+    async def agenerate_json(
+        self,
+        prompt: str,
+        *,
+        max_retries: int = 2,
+        timeout: float | None = None,
+        dedupe_key: str | None = None,
+        user_id: Any = None,
+        lane: str = "interactive",
+    ) -> Dict[str, Any]:
+        if not prompt or not prompt.strip():
+            raise LLMClientError("Prompt is empty")
+        return await single_flight(
+            self._flight_key(f"json:{max_retries}", prompt, dedupe_key),
+            lambda: self._agenerate_json(prompt, max_retries, timeout, user_id, lane),
+        )
+
+    async def _agenerate_json(
+        self, prompt: str, max_retries: int, timeout: float | None, user_id: Any, lane: str
+    ) -> Dict[str, Any]:
+        async with llm_queue.slot(user_id, lane):
+            return await self._agenerate_json_attempts(prompt, max_retries, timeout)
+
+    async def _agenerate_json_attempts(self, prompt: str, max_retries: int, timeout: float | None) -> Dict[str, Any]:
+        last_error: Exception | None = None
+        attempts = max(1, max_retries + 1)
+        for attempt in range(attempts):
+            try:
+                extra = None
+                if attempt > 0:
+                    extra = [{"role": "system", "content": "Return ONLY valid JSON, no markdown"}]
+                data = await self._arequest(prompt, extra_messages=extra, timeout=timeout)
+                text = self._extract_text(data)
+                if not text:
+                    raise LLMClientError("LLM returned an empty response")
+                return json.loads(text)
+            except LLMCircuitOpen:
+                raise
+            except Exception as exc:
+                last_error = exc
+                logger.warning("LLM attempt %s failed: %s", attempt + 1, exc)
+                if attempt + 1 < attempts:
+                    await asyncio.sleep(0.5 * (attempt + 1))
+        raise LLMClientError(str(last_error) if last_error else "LLM request failed")
+
     def generate_json(self, prompt: str, *, max_retries: int = 2) -> Dict[str, Any]:
         if not prompt or not prompt.strip():
             raise LLMClientError("Prompt is empty")
@@ -107,6 +559,8 @@ class LLMClient:
                 if not text:
                     raise LLMClientError("LLM returned an empty response")
                 return json.loads(text)
+            except LLMCircuitOpen:
+                raise
             except Exception as exc:  # pragma: no cover - network
                 last_error = exc
                 logger.warning("LLM attempt %s failed: %s", attempt + 1, exc)
@@ -115,4 +569,10 @@ class LLMClient:
         raise LLMClientError(str(last_error) if last_error else "LLM request failed")
 
     def is_configured(self) -> bool:
-        return bool(self.api_key)
+        return any(provider.api_key for provider in self.providers)
+
+
+async def aclose_pools() -> None:
+    """Close every open async connection pool (app shutdown)."""
+    for client in list(_open_clients):
+        await client.aclose()
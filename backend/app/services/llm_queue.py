@@ -0,0 +1,220 @@
+"""
+In-process admission queue for upstream LLM calls.
+
+At most ``max_concurrency`` calls run at once; the rest wait in priority lanes
+(``interactive`` before ``bulk``) and, within a lane, are served round-robin per
+user so one student re-submitting in a loop cannot starve a class. When the
+queue is full, ``slot()`` raises :class:`LLMQueueFull` immediately so routes can
+answer 429 instead of tying up a worker for a minute.
+
+Slots are handed directly from a finishing call to the next waiter, which is
+woken on its own event loop, so the queue works across the loops TestClient and
+background workers create.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+from ..core.config import get_settings
+
+LANES = ("interactive", "bulk")
+
+
+class LLMQueueFull(Exception):
+    """Raised when an LLM call cannot even be queued."""
+
+    def __init__(self, message: str, retry_after: int = 1) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("future", "loop", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _Timings:
+    """Count/sum/max plus a window of recent samples for percentiles (seconds)."""
+
+    def __init__(self, window: int = 512) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        ordered = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1)
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+
+class LLMQueue:
+    def __init__(self, max_concurrency: int = 8, max_waiting: int = 100, max_waiting_per_user: int = 5) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_waiting = max(0, int(max_waiting))
+        self.max_waiting_per_user = max(1, int(max_waiting_per_user))
+        self._lock = threading.Lock()
+        self._running = 0
+        self._waiting: dict[str, "OrderedDict[Hashable, deque[_Waiter]]"] = {lane: OrderedDict() for lane in LANES}
+        self._depth = {lane: 0 for lane in LANES}
+        self._rejected = {lane: 0 for lane in LANES}
+        self._wait = {lane: _Timings() for lane in LANES}
+        self._service = {lane: _Timings() for lane in LANES}
+
+    @asynccontextmanager
+    async def slot(self, user_id: Hashable | None = None, lane: str = "interactive") -> AsyncIterator[None]:
+        lane = lane if lane in self._waiting else "interactive"
+        await self._acquire(user_id, lane)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._service[lane].add(time.perf_counter() - started)
+            self._release()
+
+    async def _acquire(self, user_id: Hashable | None, lane: str) -> None:
+        enqueued = time.perf_counter()
+        with self._lock:
+            if self._running < self.max_concurrency and not any(self._depth.values()):
+                self._running += 1
+                self._wait[lane].add(0.0)
+                return
+            user_waiters = self._waiting[lane].get(user_id)
+            if sum(self._depth.values()) >= self.max_waiting or (
+                user_id is not None and user_waiters and len(user_waiters) >= self.max_waiting_per_user
+            ):
+                self._rejected[lane] += 1
+                raise LLMQueueFull("LLM queue is full, retry later", retry_after=self._retry_after())
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiting[lane].setdefault(user_id, deque()).append(waiter)
+            self._depth[lane] += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._discard(lane, user_id, waiter)
+            if granted:
+                self._release()
+            raise
+        with self._lock:
+            self._wait[lane].add(time.perf_counter() - enqueued)
+
+    def _discard(self, lane: str, user_id: Hashable | None, waiter: _Waiter) -> None:
+        waiters = self._waiting[lane].get(user_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._depth[lane] -= 1
+            if not waiters:
+                del self._waiting[lane][user_id]
+
+    def _next_waiter(self) -> _Waiter | None:
+        for lane in LANES:
+            users = self._waiting[lane]
+            if not users:
+                continue
+            user_id, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            self._depth[lane] -= 1
+            # Round-robin: this user goes to the back of the lane.
+            del users[user_id]
+            if waiters:
+                users[user_id] = waiters
+            return waiter
+        return None
+
+    def _release(self) -> None:
+        with self._lock:
+            waiter = self._next_waiter()
+            if waiter is None:
+                self._running -= 1
+                return
+            waiter.granted = True
+        try:
+            waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+        except RuntimeError:
+            # The waiter's loop is gone; pass the slot on.
+            self._release()
+
+    def _retry_after(self) -> int:
+        served = [t for t in self._service.values() if t.count]
+        avg = sum(t.total for t in served) / max(1, sum(t.count for t in served)) if served else 1.0
+        backlog = sum(self._depth.values()) + self._running
+        return max(1, int(avg * backlog / self.max_concurrency + 0.999))
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "max_concurrency": self.max_concurrency,
+                "max_waiting": self.max_waiting,
+                "lanes": {
+                    lane: {
+                        "depth": self._depth[lane],
+                        "rejected": self._rejected[lane],
+                        "wait": self._wait[lane].snapshot(),
+                        "service": self._service[lane].snapshot(),
+                    }
+                    for lane in LANES
+                },
+            }
+
+
+async def wait_for_capacity(
+    factory: Callable[[], Awaitable[Any]],
+    attempts: int = 5,
+    on_wait: Callable[[], Awaitable[None]] | None = None,
+) -> Any:
+    """Run ``factory()`` for background work; while the queue is full, wait and retry instead of failing."""
+    for attempt in range(attempts):
+        try:
+            return await factory()
+        except LLMQueueFull as exc:
+            if attempt + 1 == attempts:
+                raise
+            if on_wait is not None:
+                await on_wait()
+            await asyncio.sleep(exc.retry_after)
+
+
+_settings = get_settings()
+llm_queue = LLMQueue(
+    max_concurrency=_settings.llm_queue_concurrency,
+    max_waiting=_settings.llm_queue_max_waiting,
+    max_waiting_per_user=_settings.llm_queue_max_waiting_per_user,
+)
+
+
+__all__ = ["LANES", "LLMQueue", "LLMQueueFull", "llm_queue", "wait_for_capacity"]
@@ -0,0 +1,142 @@
+"""
+Upstream LLM providers and the policy that picks between them.
+
+``LLM_PROVIDERS`` holds a JSON list of OpenAI-compatible endpoints::
+
+    [{"name": "groq", "base_url": "https://api.groq.com/openai/v1", "model": "llama-3.1-8b-instant", "weight": 2},
+     {"name": "backup", "base_url": "https://…/v1", "model": "…", "api_key_env": "BACKUP_API_KEY"}]
+
+Without it the single ``LLM_BASE_URL``/``LLM_MODEL``/``LLM_API_KEY`` provider
+is used, as before. Each provider keeps its own circuit breaker, whose latency
+and failure samples drive routing. ``weight`` (default 1) is a preference:
+``static`` routing tries heavier providers first, ``latency`` routing divides
+the expected latency by it and tries heavier unmeasured providers first. A
+router only orders providers; the client sends to the first admitted one,
+hedges to the next when it is slow and fails over when it errors (see
+``LLMClient``).
+"""
+
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Protocol, Sequence
+
+from .llm_breaker import OPEN, CircuitBreaker, breaker_for
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.groq.com/openai/v1"
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+
+@dataclass
+class Provider:
+    name: str
+    base_url: str
+    model: str
+    api_key: str | None = None
+    weight: float = 1.0
+
+    def __post_init__(self) -> None:
+        self.base_url = self.base_url.rstrip("/")
+        self.weight = max(0.01, float(self.weight))
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return breaker_for(f"{self.base_url}|{self.model}")
+
+    def describe(self, timeout_limit: float | None = None) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "model": self.model,
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "breaker": self.breaker.snapshot(timeout_limit),
+        }
+
+
+class Router(Protocol):
+    def order(self, providers: Sequence[Provider]) -> list[Provider]:
+        """Providers in the order they should be tried (first = primary, second = hedge)."""
+
+
+class StaticRouter:
+    """Heaviest first, configured order among equal weights; providers with an open circuit go last."""
+
+    def order(self, providers: Sequence[Provider]) -> list[Provider]:
+        return sorted(providers, key=lambda p: (p.breaker.state == OPEN, -p.weight))
+
+
+class LatencyRouter:
+    """
+    Cheapest expected latency first: p50 of recent successful calls plus
+    ``failure_penalty`` seconds per unit of failure rate, divided by weight.
+    Providers without samples yet are tried first (heaviest first) so they get
+    measured; equal scores go to the heavier provider.
+    """
+
+    def __init__(self, failure_penalty: float = 10.0) -> None:
+        self.failure_penalty = failure_penalty
+
+    def score(self, provider: Provider) -> float:
+        stats = provider.breaker.stats()
+        if stats["state"] == OPEN:
+            return float("inf")
+        if not stats["samples"]:
+            return 0.0
+        return (stats["p50"] + self.failure_penalty * stats["failure_rate"]) / provider.weight
+
+    def order(self, providers: Sequence[Provider]) -> list[Provider]:
+        return sorted(providers, key=lambda p: (self.score(p), -p.weight))
+
+
+ROUTERS = {"latency": LatencyRouter, "static": StaticRouter}
+
+
+def build_router(name: str | None) -> Router:
+    factory = ROUTERS.get((name or "latency").lower())
+    if factory is None:
+        logger.warning("Unknown LLM_ROUTER=%r, using latency routing", name)
+        factory = LatencyRouter
+    return factory()
+
+
+def load_providers(raw: str | None = None) -> list[Provider]:
+    """Providers from ``LLM_PROVIDERS`` (JSON list), else the single LLM_* provider."""
+    raw = raw if raw is not None else os.getenv("LLM_PROVIDERS")
+    default_key = os.getenv("LLM_API_KEY")
+    providers: list[Provider] = []
+    if raw and raw.strip():
+        try:
+            entries = json.loads(raw)
+        except ValueError:
+            logger.warning("LLM_PROVIDERS is not valid JSON, ignoring it")
+            entries = []
+        for index, entry in enumerate(entries if isinstance(entries, list) else []):
+            if not isinstance(entry, dict) or not entry.get("base_url") or not entry.get("model"):
+                logger.warning("LLM_PROVIDERS entry %s needs base_url and model, skipping", index)
+                continue
+            key_env = entry.get("api_key_env")
+            providers.append(
+                Provider(
+                    name=str(entry.get("name") or f"provider-{index}"),
+                    base_url=str(entry["base_url"]),
+                    model=str(entry["model"]),
+                    api_key=entry.get("api_key") or (os.getenv(key_env) if key_env else None) or default_key,
+                    weight=entry.get("weight") or 1.0,
+                )
+            )
+    if not providers:
+        providers.append(
+            Provider(
+                name="default",
+                base_url=os.getenv("LLM_BASE_URL") or DEFAULT_BASE_URL,
+                model=os.getenv("LLM_MODEL") or DEFAULT_MODEL,
+                api_key=default_key,
+            )
+        )
+    return providers
+
+
+__all__ = ["LatencyRouter", "Provider", "ROUTERS", "Router", "StaticRouter", "build_router", "load_providers"]
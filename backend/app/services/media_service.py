@@ -0,0 +1,215 @@
+"""
+Content-addressed store for uploaded media.
+
+An upload is streamed to a temp file while its sha256 is computed, then kept at
+``<upload_root>/<kind>/<sha[:2]>/<sha><ext>`` and indexed in ``media_objects``.
+Uploading the same bytes again (to any lesson, through any upload route)
+returns the URL of the existing object without writing a second copy, and the
+hash in the name lets those URLs be cached as immutable.
+
+``ref_count`` is the number of rows pointing at an object: any row of any table
+whose String, Text or JSON columns mention its sha256 (lesson blocks, course
+descriptions, user photos, dictionary images, ...). It is recounted by
+:func:`recount` rather than maintained at every edit site; :func:`collect_garbage`
+recounts and deletes objects nobody references once their last upload is older
+than a grace period, so a file uploaded (or uploaded again) a moment ago but not
+saved into a block yet is kept.
+"""
+
+import logging
+import mimetypes
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import JSON, String, Table, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.base import Base
+from .storage_service import _target_paths, stream_to_temp
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = ".incoming"
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+_EXT = re.compile(r"^\.[A-Za-z0-9]{1,10}$")
+
+
+def reference_columns() -> Dict[Table, list]:
+    """Every String/Text/JSON column of every table except ``media_objects``: where a media URL can hide."""
+    columns: Dict[Table, list] = {}
+    for table in Base.metadata.sorted_tables:
+        if table.name == models.MediaObject.__tablename__:
+            continue
+        found = [column for column in table.columns if isinstance(column.type, (String, JSON))]
+        if found:
+            columns[table] = found
+    return columns
+
+
+def _extension(upload: UploadFile) -> str:
+    ext = Path(upload.filename or "").suffix.lower()
+    if not _EXT.match(ext):
+        ext = mimetypes.guess_extension(upload.content_type or "") or ".bin"
+    return ext
+
+
+def _root() -> Path:
+    return Path(get_settings().upload_root)
+
+
+async def store_upload(db: Session, kind: str, upload: UploadFile, max_mb: int) -> dict:
+    """Store ``upload`` by content; a duplicate returns the existing object (``deduplicated: True``)."""
+    tmp_path, size, sha256 = await stream_to_temp(upload, _root() / STAGING_DIR, max_mb)
+    try:
+        # Session calls and file moves block: keep them off the event loop.
+        return await run_in_threadpool(
+            _index_upload, db, kind, tmp_path, size, sha256, _extension(upload), upload.content_type
+        )
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _touch(db: Session, obj: models.MediaObject) -> dict:
+    """A re-upload of ``obj`` restarts its garbage collection grace period."""
+    obj.last_uploaded_at = datetime.utcnow()
+    db.commit()
+    return _result(obj, deduplicated=True)
+
+
+def _index_upload(
+    db: Session, kind: str, tmp_path: Path, size: int, sha256: str, ext: str, content_type: str | None
+) -> dict:
+    root = _root()
+    existing = db.get(models.MediaObject, sha256)
+    if existing is not None:
+        target = root / existing.path
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)  # file lost on disk: restore it under the recorded path
+        return _touch(db, existing)
+
+    target, url = _target_paths(f"{kind}/{sha256[:2]}" if kind else sha256[:2], f"{sha256}{ext}")
+    os.replace(tmp_path, target)
+    now = datetime.utcnow()
+    obj = models.MediaObject(
+        sha256=sha256,
+        kind=kind,
+        path=target.relative_to(root).as_posix(),
+        url=url,
+        content_type=content_type,
+        size_bytes=size,
+        ref_count=0,
+        last_uploaded_at=now,
+    )
+    db.add(obj)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent upload of the same bytes indexed it first.
+        db.rollback()
+        return _touch(db, db.get(models.MediaObject, sha256))
+    logger.info("[media] stored sha=%s kind=%s bytes=%s", sha256[:12], kind or "-", size)
+    return _result(obj, deduplicated=False)
+
+
+def _result(obj: models.MediaObject, *, deduplicated: bool) -> dict:
+    return {
+        "path": str(_root() / obj.path),
+        "url": obj.url,
+        "filename": Path(obj.path).name,
+        "size": obj.size_bytes,
+        "sha256": obj.sha256,
+        "deduplicated": deduplicated,
+    }
+
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+
+
+def _referenced(values: Iterable[Any], known: set[str]) -> set[str]:
+    found: set[str] = set()
+    for text in _strings(list(values)):
+        found.update(sha for sha in _SHA256.findall(text) if sha in known)
+    return found
+
+
+def count_references(db: Session) -> Counter:
+    """Referencing rows per object sha256 (each row counts once per object)."""
+    known = {sha for (sha,) in db.query(models.MediaObject.sha256).all()}
+    counts: Counter = Counter()
+    if not known:
+        return counts
+    for columns in reference_columns().values():
+        for row in db.execute(select(*columns).execution_options(yield_per=500)):
+            counts.update(_referenced(row, known))
+    return counts
+
+
+def recount(db: Session) -> int:
+    """Store current reference counts in ``media_objects``; returns the number of referenced objects."""
+    counts = count_references(db)
+    now = datetime.utcnow()
+    for obj in db.query(models.MediaObject).all():
+        obj.ref_count = counts.get(obj.sha256, 0)
+        obj.counted_at = now
+    db.commit()
+    return sum(1 for count in counts.values() if count)
+
+
+def _remove_files(path: Path) -> None:
+    path.unlink(missing_ok=True)
+    path.with_name(f"{path.stem}_thumb.jpg").unlink(missing_ok=True)
+
+
+def collect_garbage(db: Session, *, grace_hours: float | None = None, dry_run: bool = False) -> dict:
+    """Recount, then delete unreferenced objects last uploaded over ``grace_hours`` ago (and their files)."""
+    grace_hours = get_settings().media_gc_grace_hours if grace_hours is None else grace_hours
+    referenced = recount(db)
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    garbage = (
+        db.query(models.MediaObject)
+        .filter(models.MediaObject.ref_count == 0, models.MediaObject.last_uploaded_at <= cutoff)
+        .all()
+    )
+    freed = sum(obj.size_bytes or 0 for obj in garbage)
+    urls = [obj.url for obj in garbage]
+    if not dry_run:
+        root = _root()
+        for obj in garbage:
+            _remove_files(root / obj.path)
+            db.delete(obj)
+        db.commit()
+    logger.info("[media] gc removed=%s freed=%s dry_run=%s", len(garbage), freed, dry_run)
+    return {
+        "referenced": referenced,
+        "removed": len(garbage),
+        "freed_bytes": freed,
+        "urls": urls,
+        "dry_run": dry_run,
+    }
+
+
+__all__ = [
+    "collect_garbage",
+    "count_references",
+    "recount",
+    "reference_columns",
+    "store_upload",
+]
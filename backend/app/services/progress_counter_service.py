@@ -0,0 +1,359 @@
+"""
+Materialized per-user completion counters for courses and modules.
+
+``UserCourseProgress`` / ``UserModuleProgress`` hold completed and total lesson
+counts. A lesson counts when it is active (not deleted, not archived) and the
+user's ``UserProgress`` row is ``done`` -- the same definition the catalog
+snapshot uses for /api/progress.
+
+Counters are kept up to date from a ``before_flush`` hook, so every ORM write
+path (admin soft-delete, archive/publish, lesson and module moves) adjusts them
+in the same transaction as the change itself. The hook only issues relative
+``SET col = col + delta`` updates, so concurrent writers never overwrite each
+other's increments. Progress writers that change ``UserProgress.status`` with
+Core statements (services.progress_ledger) call ``shift_done`` instead. Reads are single row lookups; a missing row is computed once
+from the source tables and stored. ``rebuild_counters`` repairs everything
+from scratch (see backfill_progress_counters.py).
+"""
+
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..db.upsert import upsert
+
+_ACTIVE = and_(models.Lesson.is_deleted.is_(False), models.Lesson.status != "archived")
+
+
+def _is_active(is_deleted, status) -> bool:
+    return not is_deleted and status != "archived"
+
+
+def _percent(completed: int, total: int) -> int:
+    return int((completed / total) * 100) if total else 0
+
+
+def _count(db: Session, user_id: int, scope_column, scope_id: int) -> Tuple[int, int]:
+    base = (
+        select(func.count(models.Lesson.id))
+        .select_from(models.Lesson)
+        .join(models.Module, models.Module.id == models.Lesson.module_id)
+        .where(scope_column == scope_id, _ACTIVE)
+    )
+    total = db.execute(base).scalar() or 0
+    completed = (
+        db.execute(
+            base.join(models.UserProgress, models.UserProgress.lesson_id == models.Lesson.id).where(
+                models.UserProgress.user_id == user_id, models.UserProgress.status == "done"
+            )
+        ).scalar()
+        or 0
+    )
+    return completed, total
+
+
+def _pending_row(db: Session, model, scope_attr: str, user_id: int, scope_id: int):
+    return next(
+        (
+            obj
+            for obj in db.new
+            if isinstance(obj, model) and obj.user_id == user_id and getattr(obj, scope_attr) == scope_id
+        ),
+        None,
+    )
+
+
+def _get_or_create(db: Session, model, scope_attr: str, user_id: int, scope_id: int):
+    row = _pending_row(db, model, scope_attr, user_id, scope_id) or (
+        db.query(model).filter(model.user_id == user_id, getattr(model, scope_attr) == scope_id).first()
+    )
+    if row is None:
+        scope_column = models.Module.course_id if model is models.UserCourseProgress else models.Module.id
+        completed, total = _count(db, user_id, scope_column, scope_id)
+        row = model(user_id=user_id, completed_lessons=completed, total_lessons=total, percent=_percent(completed, total))
+        setattr(row, scope_attr, scope_id)
+        db.add(row)
+    return row
+
+
+def get_course_counter(db: Session, user_id: int, course_id: int) -> models.UserCourseProgress:
+    return _get_or_create(db, models.UserCourseProgress, "course_id", user_id, course_id)
+
+
+def get_module_counters(db: Session, user_id: int, module_ids) -> Dict[int, models.UserModuleProgress]:
+    return {mid: _get_or_create(db, models.UserModuleProgress, "module_id", user_id, mid) for mid in module_ids}
+
+
+def _bump(row, completed_delta: int) -> None:
+    row.completed_lessons = max(0, (row.completed_lessons or 0) + completed_delta)
+    row.percent = _percent(row.completed_lessons, row.total_lessons or 0)
+
+
+def _percent_expr(model):
+    return case((model.total_lessons > 0, model.completed_lessons * 100 / model.total_lessons), else_=0)
+
+
+def _shift_totals(db: Session, lesson_id: Optional[int], course_id: Optional[int], module_id: Optional[int], delta: int) -> None:
+    """A lesson (de)activated: adjust totals for everyone, and completed for users who finished it."""
+    done_users = select(models.UserProgress.user_id).where(
+        models.UserProgress.lesson_id == lesson_id, models.UserProgress.status == "done"
+    )
+    for model, column, scope_id in (
+        (models.UserCourseProgress, models.UserCourseProgress.course_id, course_id),
+        (models.UserModuleProgress, models.UserModuleProgress.module_id, module_id),
+    ):
+        if scope_id is None:
+            continue
+        opts = {"synchronize_session": False}
+        db.execute(
+            update(model).where(column == scope_id).values(total_lessons=model.total_lessons + delta),
+            execution_options=opts,
+        )
+        db.execute(
+            update(model)
+            .where(column == scope_id, model.user_id.in_(done_users))
+            .values(completed_lessons=model.completed_lessons + delta),
+            execution_options=opts,
+        )
+        db.execute(
+            update(model)
+            .where(column == scope_id)
+            .values(percent=_percent_expr(model)),
+            execution_options=opts,
+        )
+
+
+def _previous(db: Session, obj, attr: str):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    if obj.id is None:
+        return None
+    model = type(obj)
+    return db.execute(select(getattr(model, attr)).where(model.id == obj.id)).scalar()
+
+
+def _course_of(db: Session, module_id: Optional[int]) -> Optional[int]:
+    if module_id is None:
+        return None
+    return db.execute(select(models.Module.course_id).where(models.Module.id == module_id)).scalar()
+
+
+def _lesson_changes(db: Session):
+    """Yield (lesson_id, module_id, course_id, delta) for lessons entering/leaving the active set."""
+    for lesson in db.new:
+        if isinstance(lesson, models.Lesson) and _is_active(lesson.is_deleted, lesson.status):
+            module = lesson.__dict__.get("module")
+            module_id = lesson.module_id if lesson.module_id is not None else getattr(module, "id", None)
+            course_id = _course_of(db, module_id) if module_id is not None else None
+            if course_id is None and module is not None:
+                course_id = module.course_id if module.course_id is not None else getattr(module.course, "id", None)
+            yield None, module_id, course_id, +1
+    for lesson in db.dirty:
+        if not isinstance(lesson, models.Lesson) or lesson.id is None:
+            continue
+        state = inspect(lesson)
+        if not any(state.attrs[a].history.has_changes() for a in ("is_deleted", "status", "module_id")):
+            continue
+        was = _is_active(_previous(db, lesson, "is_deleted"), _previous(db, lesson, "status"))
+        now = _is_active(lesson.is_deleted, lesson.status)
+        old_module = _previous(db, lesson, "module_id")
+        new_module = lesson.module_id
+        if was and (not now or old_module != new_module):
+            yield lesson.id, old_module, _course_of(db, old_module), -1
+        if now and (not was or old_module != new_module):
+            yield lesson.id, new_module, _course_of(db, new_module), +1
+    for lesson in db.deleted:
+        if isinstance(lesson, models.Lesson) and _is_active(
+            _previous(db, lesson, "is_deleted"), _previous(db, lesson, "status")
+        ):
+            module_id = _previous(db, lesson, "module_id")
+            yield lesson.id, module_id, _course_of(db, module_id), -1
+
+
+def _progress_changes(db: Session):
+    """Yield (UserProgress, delta) for rows entering/leaving the ``done`` state."""
+    for entry in db.new:
+        # Column default for status is "done".
+        if isinstance(entry, models.UserProgress) and (entry.status or "done") == "done":
+            yield entry, +1
+    for entry in db.dirty:
+        if isinstance(entry, models.UserProgress) and inspect(entry).attrs.status.history.has_changes():
+            was_done = _previous(db, entry, "status") == "done"
+            if was_done != (entry.status == "done"):
+                yield entry, +1 if entry.status == "done" else -1
+    for entry in db.deleted:
+        if isinstance(entry, models.UserProgress) and _previous(db, entry, "status") == "done":
+            yield entry, -1
+
+
+def _lesson_scope(db: Session, lesson_id: int) -> Tuple[Optional[int], Optional[int]]:
+    row = db.execute(
+        select(models.Module.course_id, models.Module.id)
+        .select_from(models.Lesson)
+        .join(models.Module, models.Module.id == models.Lesson.module_id)
+        .where(models.Lesson.id == lesson_id, _ACTIVE)
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _shift_completed(
+    db: Session, user_id: int, course_id: int, module_id: int, delta: int, *, counted: bool
+) -> None:
+    """
+    Add ``delta`` to a user's completed count for a course and a module with
+    relative updates. ``counted`` says whether the source tables already
+    include the change, which matters only when a counter row has to be created.
+    """
+    for model, scope_attr, scope_column, scope_id in (
+        (models.UserCourseProgress, "course_id", models.Module.course_id, course_id),
+        (models.UserModuleProgress, "module_id", models.Module.id, module_id),
+    ):
+        # A row added in this session but not inserted yet is not visible to UPDATE.
+        pending = _pending_row(db, model, scope_attr, user_id, scope_id)
+        if pending is not None:
+            _bump(pending, delta)
+            continue
+        # SET expressions all see the old row, so the percent uses the shifted count explicitly.
+        shifted = model.completed_lessons + delta
+        shifted_values = {
+            "completed_lessons": shifted,
+            "percent": case((model.total_lessons > 0, shifted * 100 / model.total_lessons), else_=0),
+        }
+        updated = db.execute(
+            update(model)
+            .where(model.user_id == user_id, getattr(model, scope_attr) == scope_id)
+            .values(**shifted_values),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        if updated:
+            _expire_loaded(db, model, scope_attr, user_id, scope_id)
+            continue
+        # A row created concurrently by another writer only needs the delta.
+        completed, total = _count(db, user_id, scope_column, scope_id)
+        if not counted:
+            completed = max(0, completed + delta)
+        upsert(
+            db,
+            model,
+            {"user_id": user_id, scope_attr: scope_id},
+            {"completed_lessons": completed, "total_lessons": total, "percent": _percent(completed, total)},
+            update_values=shifted_values,
+        )
+
+
+def _expire_loaded(db: Session, model, scope_attr: str, user_id: int, scope_id: int) -> None:
+    for obj in list(db.identity_map.values()):
+        if isinstance(obj, model) and obj.user_id == user_id and getattr(obj, scope_attr) == scope_id:
+            db.expire(obj, ["completed_lessons", "percent"])
+
+
+def shift_done(db: Session, user_id: int, lesson_id: int, delta: int) -> None:
+    """
+    Apply a ``done`` transition written with Core statements (which bypass the
+    flush hook below). Must run after the user_progress change is executed, so
+    that a counter row created here already counts it.
+    """
+    course_id, module_id = _lesson_scope(db, lesson_id)
+    if course_id is None or not delta:
+        return
+    _shift_completed(db, user_id, course_id, module_id, delta, counted=True)
+
+
+def _module_moves(db: Session):
+    """Yield (lesson_id, old course_id, new course_id) for active lessons of modules moved between courses."""
+    for module in db.dirty:
+        if not isinstance(module, models.Module) or module.id is None:
+            continue
+        if not inspect(module).attrs.course_id.history.has_changes():
+            continue
+        old_course, new_course = _previous(db, module, "course_id"), module.course_id
+        if old_course == new_course:
+            continue
+        lesson_ids = db.execute(
+            select(models.Lesson.id).where(models.Lesson.module_id == module.id, _ACTIVE)
+        ).scalars()
+        for lesson_id in lesson_ids:
+            yield lesson_id, old_course, new_course
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_counters(session, flush_context, instances) -> None:
+    if not any(
+        isinstance(obj, (models.UserProgress, models.Lesson, models.Module))
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        return
+    with session.no_autoflush:
+        for lesson_id, module_id, course_id, delta in list(_lesson_changes(session)):
+            _shift_totals(session, lesson_id, course_id, module_id, delta)
+        for lesson_id, old_course, new_course in list(_module_moves(session)):
+            _shift_totals(session, lesson_id, old_course, None, -1)
+            _shift_totals(session, lesson_id, new_course, None, +1)
+
+        # Queries here run before the flush, so the source tables do not count these changes yet.
+        for entry, delta in list(_progress_changes(session)):
+            course_id, module_id = _lesson_scope(session, entry.lesson_id)
+            if course_id is None:
+                continue
+            _shift_completed(session, entry.user_id, course_id, module_id, delta, counted=False)
+
+
+def rebuild_counters(db: Session, user_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Recompute every counter row from user_progress (optionally for one user).
+    Creates rows for (user, course/module) pairs with completed lessons,
+    fixes drifted rows and returns {"created": n, "updated": n, "unchanged": n}.
+    """
+    stats = {"created": 0, "updated": 0, "unchanged": 0}
+    for model, scope_attr, scope_column in (
+        (models.UserCourseProgress, "course_id", models.Module.course_id),
+        (models.UserModuleProgress, "module_id", models.Module.id),
+    ):
+        totals = dict(
+            db.execute(
+                select(scope_column, func.count(models.Lesson.id))
+                .select_from(models.Lesson)
+                .join(models.Module, models.Module.id == models.Lesson.module_id)
+                .where(_ACTIVE)
+                .group_by(scope_column)
+            ).all()
+        )
+        completed_query = (
+            select(models.UserProgress.user_id, scope_column, func.count(models.Lesson.id))
+            .select_from(models.UserProgress)
+            .join(models.Lesson, models.Lesson.id == models.UserProgress.lesson_id)
+            .join(models.Module, models.Module.id == models.Lesson.module_id)
+            .where(_ACTIVE, models.UserProgress.status == "done")
+            .group_by(models.UserProgress.user_id, scope_column)
+        )
+        rows_query = db.query(model)
+        if user_id is not None:
+            completed_query = completed_query.where(models.UserProgress.user_id == user_id)
+            rows_query = rows_query.filter(model.user_id == user_id)
+        completed = {(uid, sid): count for uid, sid, count in db.execute(completed_query).all()}
+        existing = {(row.user_id, getattr(row, scope_attr)): row for row in rows_query.all()}
+
+        for key in set(completed) | set(existing):
+            uid, sid = key
+            done, total = completed.get(key, 0), totals.get(sid, 0)
+            row = existing.get(key)
+            if row is None:
+                row = model(user_id=uid, completed_lessons=done, total_lessons=total, percent=_percent(done, total))
+                setattr(row, scope_attr, sid)
+                db.add(row)
+                stats["created"] += 1
+            elif (row.completed_lessons, row.total_lessons, row.percent) != (done, total, _percent(done, total)):
+                row.completed_lessons, row.total_lessons, row.percent = done, total, _percent(done, total)
+                stats["updated"] += 1
+            else:
+                stats["unchanged"] += 1
+    db.commit()
+    return stats
+
+
+__all__ = ["get_course_counter", "get_module_counters", "shift_done", "rebuild_counters"]
@@ -0,0 +1,396 @@
+"""
+Append-only progress ledger.
+
+Every student interaction that used to rewrite one of the progress rows is
+recorded as a single insert: lesson-level events go to ``progress_events``,
+item-level attempts to ``flashcard_attempts``, ``block_attempts``,
+``audio_task_attempts`` and ``pronunciation_attempts``, and the first
+completion of each block to ``block_completions``. The current-state tables are
+projections of the ledger, written in the same transaction with
+single-statement upserts (db.upsert) so parallel requests for the same lesson
+never race on a select-then-insert:
+
+* ``UserProgress``        -- lesson status / completion / time spent
+* ``UserLessonProgress``  -- started / finished state of the lesson player
+* ``LessonProgress``      -- score, time spent, completed flag, attempt summaries
+
+``UserLessonProgress.completed_blocks`` is no longer rewritten; step indexes are
+stored in the ``block_id`` column of ``lesson_step_finished`` events, read back
+with one DISTINCT over the ledger index and merged with values stored before it
+existed.
+"""
+
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..db import models
+from ..db.upsert import insert_ignore, upsert
+from . import progress_counter_service
+
+LESSON_COMPLETED = "lesson_completed"
+LESSON_PROGRESS = "lesson_progress"
+LESSON_STARTED = "lesson_started"
+LESSON_STEP_FINISHED = "lesson_step_finished"
+LESSON_FINISHED = "lesson_finished"
+
+# Status compare-and-set attempts before giving up on a row that keeps changing.
+STATUS_CAS_ATTEMPTS = 5
+
+
+class ProgressConflict(Exception):
+    """The lesson status kept changing under a concurrent writer; the request can be retried."""
+
+
+def append(
+    db: Session,
+    user_id: int,
+    event_type: str,
+    lesson_id: Optional[int] = None,
+    block_id: Optional[int] = None,
+    **payload,
+) -> models.ProgressEvent:
+    event = models.ProgressEvent(
+        user_id=user_id,
+        lesson_id=lesson_id,
+        block_id=block_id,
+        event_type=event_type,
+        payload=payload or None,
+        created_at=datetime.utcnow(),
+    )
+    db.add(event)
+    return event
+
+
+def events(db: Session, user_id: int, lesson_id: int, event_type: str) -> List[models.ProgressEvent]:
+    return (
+        db.query(models.ProgressEvent)
+        .filter(
+            models.ProgressEvent.user_id == user_id,
+            models.ProgressEvent.lesson_id == lesson_id,
+            models.ProgressEvent.event_type == event_type,
+        )
+        .order_by(models.ProgressEvent.id)
+        .all()
+    )
+
+
+def _row(db: Session, model, user_id: int, lesson_id: int):
+    return db.query(model).filter(model.user_id == user_id, model.lesson_id == lesson_id).first()
+
+
+def _touch_progress(db: Session, user_id: int, lesson_id: int, time_spent: int = 0, opened: bool = True) -> Row:
+    """Upsert the user_progress row (new rows start ``in_progress``); status is changed only by ``_set_status``."""
+    now = datetime.utcnow()
+    return upsert(
+        db,
+        models.UserProgress,
+        {"user_id": user_id, "lesson_id": lesson_id},
+        {"status": "in_progress", "last_opened_at": now},
+        update_values={"last_opened_at": now} if opened else None,
+        increment={"time_spent": int(time_spent or 0)},
+        returning=("id", "status", "time_spent"),
+    )
+
+
+def _set_status(db: Session, user_id: int, lesson_id: int, entry: Row, status: str, completed_at=None) -> Optional[str]:
+    """
+    Compare-and-set the row's status from the value last read, retrying up to
+    ``STATUS_CAS_ATTEMPTS`` times if a concurrent writer changed it, and shift
+    course/module counters on transitions into or out of ``done``. Returns
+    ``None`` if the row was deleted meanwhile.
+    """
+    model = models.UserProgress
+    values = {"status": status}
+    if completed_at is not None:
+        values["completed_at"] = completed_at
+    current = entry.status
+    for _ in range(STATUS_CAS_ATTEMPTS):
+        if current == status and completed_at is None:
+            return status
+        changed = db.execute(
+            update(model).where(model.id == entry.id, model.status == current).values(**values),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        if changed:
+            progress_counter_service.shift_done(db, user_id, lesson_id, int(status == "done") - int(current == "done"))
+            return status
+        current = db.execute(select(model.status).where(model.id == entry.id)).scalar_one_or_none()
+        if current is None:
+            return None
+    raise ProgressConflict(f"status of lesson {lesson_id} changed concurrently, retry")
+
+
+def _upsert_lesson_progress(
+    db: Session,
+    user_id: int,
+    lesson_id: int,
+    completed: bool = False,
+    score: Optional[int] = None,
+    **increment: int,
+) -> Row:
+    update_values = {}
+    if completed:
+        update_values["completed"] = True
+    if score is not None:
+        update_values["score"] = score
+    return upsert(
+        db,
+        models.LessonProgress,
+        {"user_id": user_id, "lesson_id": lesson_id},
+        {"completed": completed, "score": score},
+        update_values=update_values,
+        increment=increment,
+        returning=("id", "completed", "score", "time_spent", "flashcards_total", "flashcards_correct", "blocks_completed"),
+    )
+
+
+def _lesson_state(db: Session, user_id: int, lesson_id: int, finished: bool = False) -> Row:
+    now = datetime.utcnow()
+    model = models.UserLessonProgress
+    return upsert(
+        db,
+        model,
+        {"user_id": user_id, "lesson_id": lesson_id},
+        {"status": "finished", "finished_at": now} if finished else {"status": "in_progress"},
+        update_values={"status": "finished", "finished_at": func.coalesce(model.finished_at, now)} if finished else None,
+        returning=("id", "status"),
+    )
+
+
+# -- lesson-level events ----------------------------------------------------
+
+
+def lesson_completed(
+    db: Session,
+    user_id: int,
+    lesson_id: int,
+    passed: bool,
+    score: Optional[int],
+    time_spent: int,
+    answers: dict,
+    total_questions: int,
+) -> str:
+    """Lesson test submitted (POST /api/lessons/{id}/complete). Returns the new lesson status."""
+    append(
+        db, user_id, LESSON_COMPLETED, lesson_id,
+        answers=answers, total_questions=total_questions, passed=passed, score=score, time_spent=time_spent,
+    )
+    entry = _touch_progress(db, user_id, lesson_id, time_spent)
+    status = _set_status(
+        db, user_id, lesson_id, entry, "done" if passed else "in_progress", datetime.utcnow() if passed else None
+    )
+    _upsert_lesson_progress(db, user_id, lesson_id, completed=passed, score=score, time_spent=time_spent)
+    return status
+
+
+def lesson_progress(
+    db: Session,
+    user_id: int,
+    lesson_id: int,
+    time_spent: int = 0,
+    status: Optional[str] = None,
+    score: Optional[int] = None,
+) -> dict:
+    """Heartbeat from the lesson page (POST /api/lessons/{id}/progress). Returns {status, time_spent}."""
+    append(db, user_id, LESSON_PROGRESS, lesson_id, time_spent=time_spent, status=status, score=score)
+    entry = _touch_progress(db, user_id, lesson_id, time_spent)
+    current = _set_status(db, user_id, lesson_id, entry, status) if status else entry.status
+    if time_spent or score is not None or current == "done":
+        _upsert_lesson_progress(
+            db, user_id, lesson_id, completed=current == "done", score=score, time_spent=time_spent
+        )
+    return {"status": current, "time_spent": entry.time_spent}
+
+
+def lesson_started(db: Session, user_id: int, lesson_id: int) -> None:
+    append(db, user_id, LESSON_STARTED, lesson_id)
+    _lesson_state(db, user_id, lesson_id)
+
+
+def lesson_step_finished(db: Session, user_id: int, lesson_id: int, block_index: int) -> None:
+    append(db, user_id, LESSON_STEP_FINISHED, lesson_id, block_id=int(block_index))
+    _lesson_state(db, user_id, lesson_id)
+
+
+def lesson_finished(db: Session, user_id: int, lesson_id: int) -> None:
+    append(db, user_id, LESSON_FINISHED, lesson_id)
+    _lesson_state(db, user_id, lesson_id, finished=True)
+    # Course/module counters are keyed on UserProgress, so a finished lesson is "done" there too.
+    entry = _touch_progress(db, user_id, lesson_id, opened=False)
+    _set_status(
+        db, user_id, lesson_id, entry, "done", func.coalesce(models.UserProgress.completed_at, datetime.utcnow())
+    )
+
+
+def lesson_state(db: Session, user_id: int, lesson_id: int) -> dict:
+    """{status, completed_blocks} for the lesson player; call after the events are committed."""
+    entry = _row(db, models.UserLessonProgress, user_id, lesson_id)
+    if entry is None:
+        return {"status": "not_started", "completed_blocks": []}
+    completed = list(entry.completed_blocks or [])
+    event = models.ProgressEvent
+    steps = db.execute(
+        select(event.block_id)
+        .where(
+            event.user_id == user_id,
+            event.lesson_id == lesson_id,
+            event.event_type == LESSON_STEP_FINISHED,
+            event.block_id.isnot(None),
+        )
+        .group_by(event.block_id)
+        .order_by(func.min(event.id))
+    ).scalars()
+    completed.extend(idx for idx in steps if idx not in completed)
+    return {"status": entry.status, "completed_blocks": completed}
+
+
+# -- item-level attempts ---------------------------------------------------
+#
+# Block, flashcard, audio-task and pronunciation interactions are high-volume,
+# so each kind has its own append-only attempt table instead of a generic
+# progress_events row. LessonProgress keeps per-lesson summaries that are
+# adjusted with ``col = col + n`` in the upsert, never by rewriting the row.
+
+
+def finished_block_ids(db: Session, user_id: int, lesson_id: int) -> set:
+    """Ids (as strings) of blocks the user has reported finished in the lesson."""
+    completion = models.BlockCompletion
+    rows = db.execute(
+        select(completion.block_id).where(completion.user_id == user_id, completion.lesson_id == lesson_id)
+    )
+    return {row[0] for row in rows}
+
+
+def apply_batch(
+    db: Session,
+    user_id: int,
+    lesson: models.Lesson,
+    blocks: Iterable[dict] = (),
+    flashcards: Iterable[dict] = (),
+    steps: Iterable = (),
+    time_spent: int = 0,
+) -> Row:
+    """
+    Record a batch of interactions for one lesson with a fixed number of reads.
+
+    ``blocks`` items are ``{"block_id", "status", "time_spent"}``, ``flashcards``
+    items ``{"card_id", "correct"}`` (the summary counts the latest answer per
+    card), ``steps`` are lesson-player block indexes and ``time_spent`` is a
+    delta for the whole lesson. Marks the lesson done once every live block is
+    finished.
+    """
+    lesson_id = lesson.id
+    blocks, flashcards, steps = list(blocks), list(flashcards), list(steps)
+    up = _touch_progress(db, user_id, lesson_id, time_spent, opened=False)
+    lesson_done = False
+    deltas = {"blocks_completed": 0, "flashcards_total": 0, "flashcards_correct": 0, "time_spent": int(time_spent or 0)}
+
+    if blocks:
+        block_keys = []
+        for item in blocks:
+            block_key = str(item["block_id"])
+            spent = max(0, int(item.get("time_spent") or 0))
+            db.add(
+                models.BlockAttempt(
+                    user_id=user_id,
+                    lesson_id=lesson_id,
+                    block_id=block_key,
+                    status=item.get("status") or "done",
+                    time_spent=spent,
+                )
+            )
+            deltas["time_spent"] += spent
+            if block_key not in block_keys:
+                block_keys.append(block_key)
+        # Blocks finished for the first time are the rows this insert actually
+        # wrote, so concurrent batches for the same block count it once.
+        deltas["blocks_completed"] = insert_ignore(
+            db,
+            models.BlockCompletion,
+            [{"user_id": user_id, "lesson_id": lesson_id, "block_id": key} for key in block_keys],
+            keys=("user_id", "lesson_id", "block_id"),
+        )
+        lesson_block_ids = {str(b.id) for b in lesson.blocks if not getattr(b, "is_deleted", False)}
+        if lesson_block_ids and lesson_block_ids.issubset(finished_block_ids(db, user_id, lesson_id)):
+            lesson_done = True
+            _set_status(db, user_id, lesson_id, up, "done")
+
+    if flashcards:
+        attempt = models.FlashcardAttempt
+        card_keys = {str(item["card_id"]) for item in flashcards}
+        latest = dict(
+            db.execute(
+                select(attempt.card_id, attempt.correct)
+                .where(attempt.user_id == user_id, attempt.lesson_id == lesson_id, attempt.card_id.in_(card_keys))
+                .order_by(attempt.id)
+            ).all()
+        )
+        for item in flashcards:
+            card_key, correct = str(item["card_id"]), bool(item.get("correct"))
+            db.add(attempt(user_id=user_id, lesson_id=lesson_id, card_id=card_key, correct=correct))
+            deltas["flashcards_total"] += int(card_key not in latest)
+            deltas["flashcards_correct"] += int(correct) - int(bool(latest.get(card_key)))
+            latest[card_key] = correct
+
+    if steps:
+        for block_index in steps:
+            append(db, user_id, LESSON_STEP_FINISHED, lesson_id, block_id=int(block_index))
+        _lesson_state(db, user_id, lesson_id)
+
+    return _upsert_lesson_progress(db, user_id, lesson_id, completed=lesson_done, **deltas)
+
+
+def block_finished(
+    db: Session,
+    user_id: int,
+    lesson: models.Lesson,
+    block_id,
+    status: str = "done",
+    time_spent: Optional[int] = None,
+) -> Row:
+    return apply_batch(db, user_id, lesson, blocks=[{"block_id": block_id, "status": status, "time_spent": time_spent}])
+
+
+def flashcard_answered(db: Session, user_id: int, lesson: models.Lesson, card_id, correct: bool) -> Row:
+    return apply_batch(db, user_id, lesson, flashcards=[{"card_id": card_id, "correct": correct}])
+
+
+def flashcard_summary(lp: Row) -> dict:
+    return {"total": lp.flashcards_total or 0, "correct": lp.flashcards_correct or 0}
+
+
+def audio_task_submitted(db: Session, user_id: int, lesson_id: int, block_id: int, answer: str, correct: bool) -> None:
+    db.add(
+        models.AudioTaskAttempt(
+            user_id=user_id, lesson_id=lesson_id, block_id=int(block_id), answer=answer, correct=bool(correct)
+        )
+    )
+
+
+def pronunciation_recorded(db: Session, user_id: int, lesson_id: int, word: str, score, status: str) -> None:
+    db.add(models.PronunciationAttempt(user_id=user_id, lesson_id=lesson_id, word=word, score=score, status=status))
+
+
+__all__ = [
+    "ProgressConflict",
+    "STATUS_CAS_ATTEMPTS",
+    "append",
+    "events",
+    "lesson_completed",
+    "lesson_progress",
+    "lesson_started",
+    "lesson_step_finished",
+    "lesson_finished",
+    "lesson_state",
+    "finished_block_ids",
+    "apply_batch",
+    "block_finished",
+    "flashcard_answered",
+    "flashcard_summary",
+    "audio_task_submitted",
+    "pronunciation_recorded",
+]
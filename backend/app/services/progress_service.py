@@ -2,11 +2,15 @@ from datetime import datetime
 from math import ceil
 from typing import Any, Dict, Optional, List
 
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased, selectinload
 
+from ..core.lesson_cache import lesson_cache
 from ..db import models
+from ..db.upsert import upsert
 from ..utils.encoding_fix import clean_encoding
 from ..schemas.block import validate_block_payload
+from . import catalog_service
 
 
 def recommend_course_slug(age: int | None, target: str | None, level: str | None = None) -> str:
@@ -264,32 +268,6 @@ def normalize_block(block: models.LessonBlock, lesson: models.Lesson) -> dict:
     return normalized
 
 
-def calculate_course_progress(db: Session, user: Optional[models.User], course: models.Course):
-    lesson_ids = [
-        lesson.id
-        for module in course.modules
-        for lesson in module.lessons
-        if not getattr(lesson, "is_deleted", False) and getattr(lesson, "status", "draft") != "archived"
-    ]
-    progress_map = _get_progress_map(db, user.id if user else None, lesson_ids)
-    if not lesson_ids:
-        return 0, None, progress_map
-    completed = sum(1 for lid in lesson_ids if progress_map.get(lid) == "done")
-    progress_percent = int((completed / len(lesson_ids)) * 100) if lesson_ids else 0
-
-    next_lesson = None
-    for module in course.modules:
-        for lesson in module.lessons:
-            if progress_map.get(lesson.id) != "done":
-                next_lesson = lesson
-                break
-        if next_lesson:
-            break
-    if not next_lesson and course.modules and course.modules[0].lessons:
-        next_lesson = course.modules[0].lessons[0]
-    return progress_percent, next_lesson, progress_map
-
-
 def _get_progress_map(db: Session, user_id: int | None, lesson_ids: list[int]) -> dict[int, str]:
     if not user_id or not lesson_ids:
         return {}
@@ -302,14 +280,12 @@ def _get_progress_map(db: Session, user_id: int | None, lesson_ids: list[int]) -
 
 
 def list_courses_with_progress(db: Session, user: Optional[models.User]):
-    courses = (
-        db.query(models.Course)
-        .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-        .all()
-    )
+    catalog = catalog_service.get_catalog(db)
+    statuses = catalog_service.user_progress_statuses(db, user.id if user else None)
+    progress = catalog_service.courses_progress(catalog, statuses)
     payload = []
-    for course in courses:
-        percent, next_lesson, progress_map = calculate_course_progress(db, user, course)
+    for course in catalog.courses:
+        percent, next_lesson, progress_map = progress[course.id]
         payload.append(
             {
                 "course": course,
@@ -339,21 +315,88 @@ def module_with_progress(db: Session, module_id: int, user: Optional[models.User
     return module, progress_map
 
 
-def _ensure_user_progress(db: Session, user: models.User, lesson: models.Lesson) -> models.UserProgress:
+def _ensure_user_progress(db: Session, user: models.User, lesson_id: int):
+    # Lesson detail is a hot read path: only write when the row is missing, and then
+    # through the upsert so two tabs opening the lesson cannot hit the unique constraint.
     entry = (
         db.query(models.UserProgress)
-        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson.id)
+        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson_id)
         .first()
     )
-    if not entry:
-        entry = models.UserProgress(user_id=user.id, lesson_id=lesson.id, status="in_progress")
-        db.add(entry)
-        db.commit()
-        db.refresh(entry)
+    if entry is not None:
+        return entry
+    entry = upsert(
+        db,
+        models.UserProgress,
+        {"user_id": user.id, "lesson_id": lesson_id},
+        {"status": "in_progress"},
+        returning=("id", "status", "time_spent"),
+    )
+    db.commit()
     return entry
 
 
-def get_lesson_detail(db: Session, lesson_id: int, user: models.User, allow_unpublished: bool = False):
+def serialize_lesson_shell(lesson: models.Lesson, blocks: List[dict]) -> dict:
+    return {
+        "id": lesson.id,
+        "title": lesson.title,
+        "description": lesson.description,
+        "status": lesson.status,
+        "difficulty": lesson.difficulty,
+        "estimated_time": lesson.estimated_time,
+        "language": lesson.language,
+        "video_type": getattr(lesson, "video_type", None),
+        "video_url": getattr(lesson, "video_url", None),
+        "blocks_order": lesson.blocks_order or [],
+        "module": {
+            "id": lesson.module.id,
+            "order": lesson.module.order,
+            "course": {"slug": lesson.module.course.slug},
+        },
+        "blocks": blocks,
+        "flashcards": [_serialize_flashcard(fc) for fc in lesson.flashcards],
+        "quizzes": [_serialize_quiz(qz) for qz in lesson.quizzes],
+    }
+
+
+def _lesson_cache_key(db: Session, lesson_id: int):
+    # Everything the compiled payload is built from: the lesson's blocks,
+    # flashcards and quizzes plus the course tree used for navigation and
+    # progress. Counts catch deletions, which do not move max(updated_at).
+    def scalar(*columns, where):
+        return db.query(*columns).filter(where).correlate(models.Lesson).scalar_subquery()
+
+    course_id = scalar(models.Module.course_id, where=models.Module.id == models.Lesson.module_id)
+    course_modules = db.query(models.Module.id).filter(models.Module.course_id == course_id).correlate(models.Lesson)
+    course_lesson = aliased(models.Lesson)
+    in_course = course_lesson.module_id.in_(course_modules)
+    stamps = [
+        scalar(func.max(models.LessonBlock.updated_at), where=models.LessonBlock.lesson_id == models.Lesson.id),
+        scalar(func.count(models.Flashcard.id), where=models.Flashcard.lesson_id == models.Lesson.id),
+        scalar(func.max(models.Flashcard.updated_at), where=models.Flashcard.lesson_id == models.Lesson.id),
+        scalar(func.count(models.Quiz.id), where=models.Quiz.lesson_id == models.Lesson.id),
+        scalar(func.max(models.Quiz.updated_at), where=models.Quiz.lesson_id == models.Lesson.id),
+        scalar(models.Course.updated_at, where=models.Course.id == course_id),
+        scalar(func.count(models.Module.id), where=models.Module.course_id == course_id),
+        scalar(func.max(models.Module.updated_at), where=models.Module.course_id == course_id),
+        scalar(func.count(course_lesson.id), where=in_course),
+        scalar(func.max(course_lesson.updated_at), where=in_course),
+    ]
+    row = (
+        db.query(models.Lesson.version, models.Lesson.updated_at, *stamps)
+        .filter(models.Lesson.id == lesson_id)
+        .filter(models.Lesson.is_deleted.is_(False))
+        .filter(models.Lesson.status != "archived")
+        .first()
+    )
+    return tuple(row) if row else None
+
+
+def compile_lesson(db: Session, lesson_id: int) -> Optional[dict]:
+    """
+    Build the user-independent part of the lesson page: lesson shell with
+    normalized blocks plus the course/module lesson ids used for progress.
+    """
     lesson = (
         db.query(models.Lesson)
         .options(
@@ -373,57 +416,84 @@ def get_lesson_detail(db: Session, lesson_id: int, user: models.User, allow_unpu
     )
     if not lesson:
         return None
-    if getattr(lesson, "is_deleted", False):
+
+    course = lesson.module.course
+    lesson_ids = [l.id for m in course.modules for l in m.lessons] if course.modules else []
+    ordered_lessons = sorted(lesson.module.lessons, key=lambda l: l.order)
+    current_index = next((idx for idx, l in enumerate(ordered_lessons) if l.id == lesson.id), None)
+    prev_lesson = ordered_lessons[current_index - 1] if current_index and current_index > 0 else None
+    next_lesson = ordered_lessons[current_index + 1] if current_index is not None and current_index + 1 < len(ordered_lessons) else None
+
+    normalized_blocks = []
+    for b in ordered_blocks(lesson):
+        norm = normalize_block(b, lesson)
+        if norm:
+            normalized_blocks.append(norm)
+
+    return {
+        "lesson_id": lesson.id,
+        "course_id": course.id,
+        "status": getattr(lesson, "status", "draft"),
+        "lesson": serialize_lesson_shell(lesson, normalized_blocks),
+        "blocks": normalized_blocks,
+        "course_lesson_ids": lesson_ids,
+        "module_lesson_ids": [l.id for l in ordered_lessons],
+        "navigation": {
+            "prev_lesson_id": prev_lesson.id if prev_lesson else None,
+            "next_lesson_id": next_lesson.id if next_lesson else None,
+        },
+    }
+
+
+def get_compiled_lesson(db: Session, lesson_id: int) -> Optional[dict]:
+    key = _lesson_cache_key(db, lesson_id)
+    if key is None:
+        return None
+    compiled = lesson_cache.get(lesson_id, key)
+    if compiled is None:
+        compiled = compile_lesson(db, lesson_id)
+        if compiled is None:
+            return None
+        lesson_cache.put(lesson_id, key, compiled)
+    return compiled
+
+
+def get_lesson_detail(db: Session, lesson_id: int, user: models.User, allow_unpublished: bool = False):
+    compiled = get_compiled_lesson(db, lesson_id)
+    if not compiled:
         return None
-    if not allow_unpublished and getattr(lesson, "status", "draft") != "published":
+    if not allow_unpublished and compiled["status"] != "published":
         return None
 
-    progress_entry = _ensure_user_progress(db, user, lesson)
+    progress_entry = _ensure_user_progress(db, user, lesson_id)
     lesson_progress = (
         db.query(models.LessonProgress)
-        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson.id)
+        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson_id)
         .first()
     )
-    course = (
-        db.query(models.Course)
-        .filter(models.Course.id == lesson.module.course.id)
-        .first()
-    ) or lesson.module.course
 
-    lesson_ids = [l.id for m in course.modules for l in m.lessons] if course.modules else []
+    lesson_ids = compiled["course_lesson_ids"]
     progress_map = _get_progress_map(db, user.id, lesson_ids)
 
     completed = sum(1 for lid in lesson_ids if progress_map.get(lid) == "done") if lesson_ids else 0
     course_progress = int((completed / len(lesson_ids)) * 100) if lesson_ids else 0
 
-    module_lessons = lesson.module.lessons
-    module_completed = sum(1 for l in module_lessons if progress_map.get(l.id) == "done") if module_lessons else 0
-    module_progress = int((module_completed / len(module_lessons)) * 100) if module_lessons else 0
-
-    ordered_lessons = sorted(module_lessons, key=lambda l: l.order)
-    current_index = next((idx for idx, l in enumerate(ordered_lessons) if l.id == lesson.id), None)
-    prev_lesson = ordered_lessons[current_index - 1] if current_index and current_index > 0 else None
-    next_lesson = ordered_lessons[current_index + 1] if current_index is not None and current_index + 1 < len(ordered_lessons) else None
-
-    normalized_blocks = []
-    for b in ordered_blocks(lesson):
-        norm = normalize_block(b, lesson)
-        if norm:
-            normalized_blocks.append(norm)
+    module_lesson_ids = compiled["module_lesson_ids"]
+    module_completed = sum(1 for lid in module_lesson_ids if progress_map.get(lid) == "done") if module_lesson_ids else 0
+    module_progress = int((module_completed / len(module_lesson_ids)) * 100) if module_lesson_ids else 0
 
     return {
-        "lesson": lesson,
-        "blocks": normalized_blocks,
+        "lesson": compiled["lesson"],
+        "lesson_id": lesson_id,
+        "course_id": compiled["course_id"],
+        "blocks": compiled["blocks"],
         "progress_status": progress_entry.status,
         "score": lesson_progress.score if lesson_progress else None,
         "time_spent": (lesson_progress.time_spent if lesson_progress else None) or getattr(progress_entry, "time_spent", 0),
         "course_progress": course_progress,
         "module_progress": module_progress,
         "progress_map": progress_map,
-        "navigation": {
-            "prev_lesson_id": prev_lesson.id if prev_lesson else None,
-            "next_lesson_id": next_lesson.id if next_lesson else None,
-        },
+        "navigation": compiled["navigation"],
     }
 
 
@@ -436,21 +506,10 @@ def level_score(score: int, total_questions: int) -> int:
 
 
 def get_progress_for_user(db: Session, user_id: int, course_slug: Optional[str] = None) -> Dict:
-    user = db.get(models.User, user_id)
-    course = None
-    if course_slug:
-        course = (
-            db.query(models.Course)
-            .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-            .filter(models.Course.slug == course_slug)
-            .first()
-        )
-    if not course:
-        course = (
-            db.query(models.Course)
-            .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
-            .first()
-        )
+    catalog = catalog_service.get_catalog(db)
+    course = catalog.course(slug=course_slug) if course_slug else None
+    if not course and catalog.courses:
+        course = catalog.courses[0]
     if not course:
         return {
             "course_title": "",
@@ -467,47 +526,32 @@ def get_progress_for_user(db: Session, user_id: int, course_slug: Optional[str]
             "progress_map": {},
         }
 
-    lessons = [
-        l
-        for m in course.modules
-        for l in m.lessons
-        if not getattr(l, "is_deleted", False) and getattr(l, "status", "draft") != "archived"
-    ]
-    lesson_ids = [l.id for l in lessons]
-    progress_rows = (
-        db.query(models.UserProgress)
-        .filter(models.UserProgress.user_id == user_id, models.UserProgress.lesson_id.in_(lesson_ids))
-        .all()
-    )
-    progress_map = {row.lesson_id: row.status for row in progress_rows}
-    completed_lessons = sum(1 for lid in lesson_ids if progress_map.get(lid) == "done")
-    total_lessons = len(lesson_ids) if lesson_ids else 0
+    statuses = catalog_service.user_progress_statuses(db, user_id)
+    progress_map = catalog_service.restrict(statuses, course.active_lesson_ids)
+    done = {lid for lid, status in progress_map.items() if status == "done"}
+    completed_lessons = len(done)
+    total_lessons = len(course.active_lesson_ids)
     percent = int((completed_lessons / total_lessons) * 100) if total_lessons else 0
 
     completed_modules: List[dict] = []
     completed_module_names: List[str] = []
-    completed_lesson_titles: List[str] = []
+    completed_lesson_titles: List[str] = [catalog.lessons[lid].title for lid in course.lesson_ids if lid in done]
     certificates: List[dict] = []
-    next_lesson = None
-    for m in course.modules:
-        module_lessons = [l for l in m.lessons]
-        for l in module_lessons:
-            if not next_lesson and progress_map.get(l.id) != "done":
-                next_lesson = l
-            if progress_map.get(l.id) == "done":
-                completed_lesson_titles.append(clean_encoding(l.title))
-        if module_lessons and all(progress_map.get(l.id) == "done" for l in module_lessons):
-            completed_modules.append({"id": m.id, "name": clean_encoding(m.name), "order": m.order})
-            completed_module_names.append(clean_encoding(m.name or f"Модуль {m.order}"))
-            certificates.append({"id": m.id, "title": clean_encoding(m.name or f"Модуль {m.order}")})
-
-    if not next_lesson and course.modules and course.modules[0].lessons:
-        next_lesson = course.modules[0].lessons[0]
+    for m in catalog.course_modules(course):
+        if m.lesson_ids and done.issuperset(m.lesson_ids):
+            completed_modules.append({"id": m.id, "name": m.name, "order": m.order})
+            completed_module_names.append(m.name or f"Модуль {m.order}")
+            certificates.append({"id": m.id, "title": m.name or f"Модуль {m.order}"})
+
+    next_id = next((lid for lid in course.lesson_ids if lid not in done), None)
+    if next_id is None and course.module_ids:
+        first_module = catalog.modules[course.module_ids[0]]
+        next_id = first_module.lesson_ids[0] if first_module.lesson_ids else None
 
     return {
         "course_id": course.id,
         "course_slug": course.slug,
-        "course_title": clean_encoding(course.name),
+        "course_title": course.title,
         "completed_lessons": completed_lessons,
         "total_lessons": total_lessons,
         "percent": percent,
@@ -515,6 +559,6 @@ def get_progress_for_user(db: Session, user_id: int, course_slug: Optional[str]
         "completed_module_names": completed_module_names,
         "completed_lesson_titles": completed_lesson_titles,
         "certificates": certificates,
-        "next_lesson": serialize_lesson(next_lesson) if next_lesson else None,
+        "next_lesson": dict(catalog.lessons[next_id].payload) if next_id is not None else None,
         "progress_map": progress_map,
     }
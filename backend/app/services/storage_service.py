@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import hashlib
 import mimetypes
 import os
 import re
 import shutil
 import subprocess
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Dict, Tuple
 from uuid import uuid4
 
-from fastapi import HTTPException, UploadFile, status
+import anyio
+from fastapi import HTTPException, Request, UploadFile, status
+from fastapi.routing import APIRoute
 
 from ..core.config import get_settings
 
@@ -24,6 +27,11 @@ ALLOWED_AUDIO_MIMES = {
     "audio/aac",
 }
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Multipart boundaries and the small form fields sent next to a single file.
+FORM_OVERHEAD_BYTES = 64 * 1024
+_SUFFIX = re.compile(r"\.[A-Za-z0-9]{1,10}")
+
 
 def sanitize_filename(name: str) -> str:
     name = name or "upload"
@@ -31,21 +39,21 @@ def sanitize_filename(name: str) -> str:
     return name.strip("._") or "upload"
 
 
+def safe_suffix(filename: str | None, default: str) -> str:
+    """Lower-case extension of a client-supplied file name, or ``default`` if it has none (or an odd one)."""
+    suffix = Path(sanitize_filename(filename or "")).suffix.lower()
+    return suffix if _SUFFIX.fullmatch(suffix) else default
+
+
 def _target_paths(kind: str, filename: str) -> Tuple[Path, str]:
     settings = get_settings()
     root = Path(settings.upload_root)
-    target_dir = root / kind
+    target_dir = root / kind if kind else root
     target_dir.mkdir(parents=True, exist_ok=True)
-    url = f"{settings.cdn_base_url.rstrip('/')}/{kind}/{filename}"
+    url = "/".join(part for part in (settings.cdn_base_url.rstrip("/"), kind, filename) if part)
     return target_dir / filename, url
 
 
-def _write_file(target: Path, data: bytes) -> None:
-    target.parent.mkdir(parents=True, exist_ok=True)
-    with open(target, "wb") as f:
-        f.write(data)
-
-
 def validate_audio_file(file: UploadFile, size_bytes: int | None = None, max_mb: int = 15) -> None:
     mime = file.content_type or mimetypes.guess_type(file.filename or "")[0] or ""
     if mime and mime.lower() not in ALLOWED_AUDIO_MIMES:
@@ -60,21 +68,109 @@ def validate_audio_file(file: UploadFile, size_bytes: int | None = None, max_mb:
         )
 
 
-def store_upload(kind: str, upload: UploadFile, data: bytes) -> dict:
-    ext = Path(upload.filename or "").suffix or mimetypes.guess_extension(upload.content_type or "") or ".bin"
-    base = sanitize_filename(Path(upload.filename or "upload").stem)
-    filename = f"{base}_{uuid4().hex[:8]}{ext}"
+def _url_for(path: Path) -> str:
+    """Public URL of a file stored under ``upload_root``."""
+    settings = get_settings()
+    relative = path.resolve().relative_to(Path(settings.upload_root).resolve())
+    return "/".join([settings.cdn_base_url.rstrip("/"), *relative.parts])
+
+
+def _too_large(max_mb: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is too large (>{max_mb}MB)",
+    )
+
+
+def reject_oversized_request(request: Request, max_mb: int) -> None:
+    """413 from the declared ``Content-Length`` of a one-file upload, before the body is read."""
+    try:
+        length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        return
+    if length > max_mb * 1024 * 1024 + FORM_OVERHEAD_BYTES:
+        raise _too_large(max_mb)
+
+
+
+class UploadLimitRoute(APIRoute):
+    """
+    Route class that refuses bodies declared larger than the upload limit before
+    FastAPI parses the form. The limit is the settings field named in
+    ``limit_by_route`` for the route's name, else ``limit_setting``.
+    """
+
+    limit_setting = "upload_max_file_mb"
+    limit_by_route: Dict[str, str] = {}
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        setting = self.limit_by_route.get(self.name, self.limit_setting)
+
+        async def route_handler(request: Request):
+            reject_oversized_request(request, getattr(get_settings(), setting))
+            return await handler(request)
+
+        return route_handler
+
+
+class AudioUploadRoute(UploadLimitRoute):
+    limit_setting = "upload_max_audio_mb"
+
+
+class MediaUploadRoute(UploadLimitRoute):
+    limit_by_route = {
+        "upload_image": "upload_max_image_mb",
+        "upload_audio": "upload_max_audio_mb",
+        "upload_video": "upload_max_video_mb",
+    }
+
+async def stream_to_temp(upload: UploadFile, directory: Path, max_mb: int) -> Tuple[Path, int, str]:
+    """
+    Copy ``upload`` into a hidden temp file in ``directory`` in ``UPLOAD_CHUNK_SIZE``
+    chunks, computing its sha256 on the way; returns ``(temp path, size, sha256)``.
+
+    The copy stops with 413 as soon as ``max_mb`` is exceeded (up front when the
+    multipart size is known) and the temp file is removed on any error. Keep
+    ``directory`` on the target filesystem so the caller can ``os.replace`` it.
+    """
+    max_bytes = max_mb * 1024 * 1024
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(max_mb)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / f".{uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as fh:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large(max_mb)
+                digest.update(chunk)
+                await anyio.to_thread.run_sync(fh.write, chunk)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path, size, digest.hexdigest()
+
+
+async def stream_to_disk(upload: UploadFile, kind: str, filename: str, max_mb: int) -> dict:
+    """Stream ``upload`` (see :func:`stream_to_temp`) and rename it atomically to ``_target_paths(kind, filename)``."""
     target_path, url = _target_paths(kind, filename)
-    _write_file(target_path, data)
-    return {"path": str(target_path), "url": url, "filename": filename}
+    tmp_path, size, sha256 = await stream_to_temp(upload, target_path.parent, max_mb)
+    os.replace(tmp_path, target_path)
+    return {"path": str(target_path), "url": url, "filename": filename, "size": size, "sha256": sha256}
 
 
 def generate_video_thumbnail(video_path: Path) -> str | None:
+    thumb_name = f"{video_path.stem}_thumb.jpg"
+    thumb_path = video_path.parent / thumb_name
+    if thumb_path.exists():
+        return _url_for(thumb_path)
     ffmpeg = os.environ.get("FFMPEG_BIN") or "ffmpeg"
     if not shutil.which(ffmpeg):
         return None
-    thumb_name = f"{video_path.stem}_thumb.jpg"
-    thumb_path = video_path.parent / thumb_name
     try:
         subprocess.run(
             [
@@ -94,6 +190,4 @@ def generate_video_thumbnail(video_path: Path) -> str | None:
         )
     except Exception:
         return None
-    settings = get_settings()
-    url = f"{settings.cdn_base_url.rstrip('/')}/video/{thumb_path.name}"
-    return url
+    return _url_for(thumb_path)
@@ -0,0 +1,364 @@
+"""
+Shared text-to-speech store.
+
+Clips are keyed by (normalized text, lang, voice), so a word is synthesized once
+for every user and stored as ``AUDIO_DIR/<key>.mp3``, indexed in ``tts_audio``.
+Concurrent requests for the same clip wait on one synthesis (per process). A
+cache hit only reads the index: its use is counted in memory and written by
+:meth:`TTSStore.maintain`, which runs in a background thread at most every
+``TTS_MAINTENANCE_SECONDS``. It also keeps the store under ``TTS_CACHE_MAX_MB``
+by evicting the least recently used clips; clips of words referenced by lesson
+content are pinned and never evicted.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import unicodedata
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from gtts import gTTS
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..db import models
+from ..db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+AUDIO_DIR = Path(__file__).resolve().parents[1] / "static" / "audio"
+AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+AUDIO_URL_PREFIX = "/api/vocabulary/audio/"
+
+# (text, lang, voice) -> mp3 bytes
+Synthesizer = Callable[[str, str, str], bytes]
+
+
+def gtts_synthesizer(text: str, lang: str, voice: str) -> bytes:
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz): a playable clip without network access.
+_SILENT_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+def silent_synthesizer(text: str, lang: str, voice: str) -> bytes:
+    return _SILENT_FRAME
+
+
+SYNTHESIZERS: dict[str, Synthesizer] = {"gtts": gtts_synthesizer, "silent": silent_synthesizer}
+
+
+def get_synthesizer(name: str | None) -> Synthesizer:
+    synthesizer = SYNTHESIZERS.get((name or "gtts").lower())
+    if synthesizer is None:
+        logger.warning("Unknown TTS_SYNTHESIZER=%r, using gtts", name)
+        synthesizer = gtts_synthesizer
+    return synthesizer
+
+
+def normalize_text(text: str | None) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split()).lower()
+
+
+def tts_key(text: str, lang: str = "kk", voice: str = "default") -> str:
+    return hashlib.sha256(f"{lang}|{voice}|{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def audio_slots(block_type: str | None, payload: dict | None) -> list[tuple[dict, str, str]]:
+    """
+    ``(owner, url_field, text)`` for every text a block payload lets students listen to:
+    flashcard words, pronunciation items/phrase and audio transcripts. ``owner`` is the
+    dict inside ``payload`` whose ``url_field`` holds (or should hold) the clip URL.
+    """
+    payload = payload if isinstance(payload, dict) else {}
+    btype = (block_type or "").lower().replace("-", "_")
+    slots: list[tuple[dict, str, Any]] = []
+    if btype in {"flashcards", "flashcard"}:
+        slots = [
+            (card, "audio_url", card.get("word") or card.get("front"))
+            for card in payload.get("cards") or []
+            if isinstance(card, dict)
+        ]
+    elif btype == "pronunciation":
+        slots = [(item, "audio_url", item.get("word")) for item in payload.get("items") or [] if isinstance(item, dict)]
+        slots.append((payload, "sample_audio_url", payload.get("phrase")))
+    elif btype in {"audio", "audio_task"}:
+        slots = [(payload, "audio_url", payload.get("transcript"))]
+    return [(owner, field, str(text).strip()) for owner, field, text in slots if text and str(text).strip()]
+
+
+def block_texts(block_type: str | None, payload: dict | None) -> list[str]:
+    """Texts a block payload asks students to listen to (see :func:`audio_slots`)."""
+    return [text for _, _, text in audio_slots(block_type, payload)]
+
+
+def lesson_texts(db: Session) -> set[str]:
+    """Normalized texts referenced by any lesson (blocks, flashcards, pronunciation items)."""
+    texts: set[str] = set()
+    blocks = (
+        db.query(models.LessonBlock.block_type, models.LessonBlock.data, models.LessonBlock.content)
+        .filter(models.LessonBlock.is_deleted.is_(False))
+        .all()
+    )
+    for block_type, data, content in blocks:
+        texts.update(normalize_text(t) for t in block_texts(block_type, data or content))
+    texts.update(normalize_text(front) for (front,) in db.query(models.Flashcard.front).all())
+    texts.update(normalize_text(word) for (word,) in db.query(models.PronunciationItem.word).all())
+    texts.discard("")
+    return texts
+
+
+class TTSStore:
+    def __init__(
+        self,
+        directory: Path = AUDIO_DIR,
+        *,
+        max_bytes: int = 512 * 1024 * 1024,
+        synthesizer: Synthesizer = gtts_synthesizer,
+        lang: str = "kk",
+        voice: str = "default",
+        wait_timeout: float = 120.0,
+        session_factory: Callable[[], Session] = SessionLocal,
+        maintenance_seconds: float = 60.0,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.synthesizer = synthesizer
+        self.lang = lang
+        self.voice = voice
+        self.wait_timeout = wait_timeout
+        self.session_factory = session_factory
+        self.maintenance_seconds = maintenance_seconds
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        # key -> (hits, last used) not written to tts_audio yet
+        self._usage: dict[str, tuple[int, datetime]] = {}
+        self._maintenance_lock = threading.Lock()
+        self._maintenance_thread: threading.Thread | None = None
+        self._maintained_at = time.monotonic()
+        self.stats = {"hits": 0, "misses": 0, "joined": 0, "evicted": 0}
+
+    def url_for(self, key: str) -> str:
+        return f"{AUDIO_URL_PREFIX}{key}.mp3"
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.mp3"
+
+    def get_or_create(
+        self, db: Session, text: str, *, lang: str | None = None, voice: str | None = None, pin: bool = False
+    ) -> str:
+        """URL of the clip for ``text``; synthesizes it once if missing."""
+        normalized = normalize_text(text)
+        if not normalized:
+            raise ValueError("Text is empty")
+        lang = lang or self.lang
+        voice = voice or self.voice
+        key = tts_key(normalized, lang, voice)
+        row = db.get(models.TTSAudio, key)
+        if row is not None and self.path_for(key).exists():
+            if pin and not row.pinned:
+                row.pinned = True
+                db.commit()
+            with self._lock:
+                hits, _ = self._usage.get(key, (0, None))
+                self._usage[key] = (hits + 1, datetime.utcnow())
+                self.stats["hits"] += 1
+            self._schedule_maintenance()
+            return self.url_for(key)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.stats["joined"] += 1
+        if not leader:
+            return future.result(timeout=self.wait_timeout)
+        try:
+            url = self._create(db, key, " ".join(text.split()), normalized, lang, voice, pin, row)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(url)
+            return url
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _create(
+        self,
+        db: Session,
+        key: str,
+        spoken: str,
+        normalized: str,
+        lang: str,
+        voice: str,
+        pin: bool,
+        row: models.TTSAudio | None,
+    ) -> str:
+        audio = self.synthesizer(spoken, lang, voice)
+        if not audio:
+            raise ValueError("Synthesizer returned no audio")
+        path = self.path_for(key)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{key}.{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(audio)
+        os.replace(tmp, path)
+
+        if row is None:
+            row = models.TTSAudio(key=key, text=normalized, lang=lang, voice=voice, filename=path.name, hits=0)
+        row.size_bytes = len(audio)
+        row.hits = (row.hits or 0) + 1
+        row.last_used_at = datetime.utcnow()
+        row.pinned = bool(row.pinned or pin)
+        db.add(row)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker indexed the same clip first; the file is identical.
+            db.rollback()
+        self.stats["misses"] += 1
+        logger.info("[tts] synthesized key=%s lang=%s voice=%s bytes=%s", key[:12], lang, voice, len(audio))
+        self._schedule_maintenance()
+        return self.url_for(key)
+
+    def pin_texts(self, db: Session, texts: Iterable[str], *, lang: str | None = None, voice: str | None = None) -> int:
+        keys = {tts_key(text, lang or self.lang, voice or self.voice) for text in texts if normalize_text(text)}
+        if not keys:
+            return 0
+        rows = db.query(models.TTSAudio).filter(models.TTSAudio.key.in_(keys), models.TTSAudio.pinned.is_(False)).all()
+        for row in rows:
+            row.pinned = True
+        db.commit()
+        return len(rows)
+
+    def refresh_pins(self, db: Session) -> int:
+        """Pin exactly the clips whose text some lesson references; returns the pinned count."""
+        referenced = lesson_texts(db)
+        pinned = 0
+        for row in db.query(models.TTSAudio).all():
+            wanted = row.text in referenced
+            if bool(row.pinned) != wanted:
+                row.pinned = wanted
+            pinned += wanted
+        db.commit()
+        return pinned
+
+    def flush_usage(self, db: Session) -> int:
+        """Write hits counted in memory to ``tts_audio``; returns the number of clips updated."""
+        with self._lock:
+            usage, self._usage = self._usage, {}
+        for key, (hits, last_used_at) in usage.items():
+            db.execute(
+                update(models.TTSAudio)
+                .where(models.TTSAudio.key == key)
+                .values(hits=models.TTSAudio.hits + hits, last_used_at=last_used_at)
+            )
+        db.commit()
+        return len(usage)
+
+    def maintain(self, db: Session) -> int:
+        """Flush usage counters and evict down to ``max_bytes``; returns the number of clips evicted."""
+        with self._maintenance_lock:
+            self.flush_usage(db)
+            return self.evict(db)
+
+    def _maintain_in_background(self) -> None:
+        try:
+            with self.session_factory() as db:
+                self.maintain(db)
+        except Exception as exc:  # pragma: no cover - retried on the next run
+            logger.warning("[tts] maintenance failed: %s", exc)
+
+    def _schedule_maintenance(self) -> None:
+        """Start :meth:`maintain` in a background thread unless one ran in the last ``maintenance_seconds``."""
+        with self._lock:
+            running = self._maintenance_thread is not None and self._maintenance_thread.is_alive()
+            if running or time.monotonic() - self._maintained_at < self.maintenance_seconds:
+                return
+            self._maintained_at = time.monotonic()
+            self._maintenance_thread = threading.Thread(
+                target=self._maintain_in_background, name="tts-maintenance", daemon=True
+            )
+            self._maintenance_thread.start()
+
+    def total_bytes(self, db: Session) -> int:
+        return int(db.query(func.coalesce(func.sum(models.TTSAudio.size_bytes), 0)).scalar() or 0)
+
+    def evict(self, db: Session) -> int:
+        """Drop least recently used unpinned clips until the store fits ``max_bytes`` (see :meth:`maintain`)."""
+        total = self.total_bytes(db)
+        if total <= self.max_bytes:
+            return 0
+        self.refresh_pins(db)
+        evicted = 0
+        candidates = (
+            db.query(models.TTSAudio)
+            .filter(models.TTSAudio.pinned.is_(False))
+            .order_by(models.TTSAudio.last_used_at.asc())
+            .all()
+        )
+        for row in candidates:
+            if total <= self.max_bytes:
+                break
+            self.path_for(row.key).unlink(missing_ok=True)
+            total -= row.size_bytes or 0
+            db.delete(row)
+            evicted += 1
+        db.commit()
+        self.stats["evicted"] += evicted
+        if evicted:
+            logger.info("[tts] evicted %s clips, store now %s bytes", evicted, total)
+        return evicted
+
+    def snapshot(self, db: Session) -> dict[str, Any]:
+        count = db.query(func.count(models.TTSAudio.key)).scalar()
+        pinned = db.query(func.count(models.TTSAudio.key)).filter(models.TTSAudio.pinned.is_(True)).scalar()
+        return {
+            "clips": int(count or 0),
+            "pinned": int(pinned or 0),
+            "bytes": self.total_bytes(db),
+            "max_bytes": self.max_bytes,
+            **self.stats,
+        }
+
+
+_settings = get_settings()
+tts_store = TTSStore(
+    max_bytes=_settings.tts_cache_max_mb * 1024 * 1024,
+    synthesizer=get_synthesizer(_settings.tts_synthesizer),
+    maintenance_seconds=_settings.tts_maintenance_seconds,
+)
+
+
+__all__ = [
+    "AUDIO_DIR",
+    "AUDIO_URL_PREFIX",
+    "Synthesizer",
+    "SYNTHESIZERS",
+    "TTSStore",
+    "audio_slots",
+    "block_texts",
+    "get_synthesizer",
+    "gtts_synthesizer",
+    "lesson_texts",
+    "normalize_text",
+    "silent_synthesizer",
+    "tts_key",
+    "tts_store",
+]
@@ -1,19 +1,14 @@
-import hashlib
 import logging
 import random
 from datetime import date, datetime, timedelta
-from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-from gtts import gTTS
 from sqlalchemy import func
 from sqlalchemy.orm import Session, selectinload
 
 from ..db import models
 from ..utils.encoding_fix import clean_encoding
-
-AUDIO_DIR = Path(__file__).resolve().parents[1] / "static" / "audio"
-AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+from .tts_service import AUDIO_DIR, tts_store
 
 ALLOWED_MODES = {"repeat", "mc", "write", "multiple_choice"}
 _CACHE_TTL = timedelta(seconds=45)
@@ -171,11 +166,10 @@ def extract_words_from_blocks(blocks: List[dict]) -> List[dict]:
     return words
 
 
-def sync_lesson_vocabulary(user_id: int, lesson: models.Lesson, blocks: List[dict], db: Session) -> int:
+def sync_lesson_vocabulary(user_id: int, lesson_id: int, course_id: Optional[int], blocks: List[dict], db: Session) -> int:
     """Sync flashcard/pronunciation words into user's dictionary. Returns count of newly added words."""
-    if not lesson or not lesson.module or not lesson.module.course:
+    if not lesson_id or not course_id:
         return 0
-    course_id = lesson.module.course.id
     # Extract words from normalized blocks only - don't duplicate from lesson.flashcards
     # because they're already included in the normalized blocks via normalize_block -> _collect_flashcards
     words = extract_words_from_blocks(blocks)
@@ -200,7 +194,7 @@ def sync_lesson_vocabulary(user_id: int, lesson: models.Lesson, blocks: List[dic
             course_id,
             fields,
             db,
-            source_lesson_id=lesson.id,
+            source_lesson_id=lesson_id,
             source_block_id=item.get("source_block_id"),
             status="new",
         )
@@ -465,14 +459,9 @@ def mc_options(word: models.VocabularyWord, db: Session) -> list[str]:
     return options_list
 
 
-def tts_for_word(user_id: int, text: str) -> str:
+def tts_for_word(text: str, db: Session) -> str:
+    """Audio URL for a word from the shared TTS store (one clip per word for all users)."""
     cleaned = (text or "").strip()
     if not cleaned:
         raise ValueError("Word is empty")
-    digest = hashlib.sha1(f"{user_id}:{cleaned}".encode()).hexdigest()[:16]
-    filename = f"{user_id}-{digest}.mp3"
-    filepath = AUDIO_DIR / filename
-    if not filepath.exists():
-        tts = gTTS(text=cleaned, lang="kk")
-        tts.save(filepath)
-    return f"/api/vocabulary/audio/{filename}"
+    return tts_store.get_or_create(db, cleaned)
@@ -0,0 +1,32 @@
+"""
+Backfill / repair materialized course and module progress counters.
+
+Usage:
+  python backfill_progress_counters.py [--user-id 42]
+
+Recomputes user_course_progress / user_module_progress from user_progress for
+every user (or a single one), creating missing rows and fixing drifted ones.
+Safe to re-run; run it once after the 20260310_add_progress_counters migration.
+"""
+
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.progress_counter_service import rebuild_counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, default=None, help="only rebuild counters for this user")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        stats = rebuild_counters(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"created={stats['created']} updated={stats['updated']} unchanged={stats['unchanged']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Pre-generate TTS audio for the whole catalog.
+
+Usage:
+  python backfill_tts_audio.py [--lesson-id 7 ...] [--workers 4] [--synthesizer gtts|silent]
+
+Synthesizes every flashcard word, pronunciation item/phrase and audio transcript
+that has no audio yet (the same pass publishing a lesson queues) and writes the
+clip URLs back into lesson blocks, flashcards and pronunciation items. Safe to
+re-run: texts that already have audio are skipped.
+"""
+
+import argparse
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.services.lesson_audio_service import pregenerate_catalog_audio
+from app.services.tts_service import SYNTHESIZERS, tts_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lesson-id", type=int, action="append", default=None, help="only these lessons (repeatable)")
+    parser.add_argument("--workers", type=int, default=get_settings().tts_pregenerate_workers, help="parallel syntheses")
+    parser.add_argument("--synthesizer", choices=sorted(SYNTHESIZERS), default=None, help="override TTS_SYNTHESIZER")
+    args = parser.parse_args()
+
+    if args.synthesizer:
+        tts_store.synthesizer = SYNTHESIZERS[args.synthesizer]
+    reports = pregenerate_catalog_audio(SessionLocal, lesson_ids=args.lesson_id, workers=args.workers)
+    with SessionLocal() as db:
+        tts_store.maintain(db)
+    for report in reports:
+        failed = f" failed={len(report['failed'])}" if report["failed"] else ""
+        print(f"lesson={report['lesson_id']} texts={report['texts']} filled={report['filled']}{failed}")
+    print(
+        f"lessons={len(reports)} synthesized={sum(r['synthesized'] for r in reports)} "
+        f"filled={sum(r['filled'] for r in reports)} failed={sum(len(r['failed']) for r in reports)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Throughput of batch free-writing grading against a stub OpenAI-compatible server.
+
+Usage:
+  python benchmarks/bench_batch_grading.py [--submissions 200] [--latency 0.2] [--duplicates 0.25]
+
+The stub answers every /chat/completions call after ``--latency`` seconds, so
+the numbers show what bounded parallelism and answer dedup buy over grading
+one submission at a time (the old one-request-per-answer flow), not LLM speed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+
+def start_stub(latency: float) -> tuple[ThreadingHTTPServer, dict]:
+    stats = {"calls": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            stats["calls"] += 1
+            time.sleep(latency)
+            content = json.dumps({"score": 72, "level": "good", "feedback": "Жақсы", "corrections": []})
+            data = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def make_submissions(count: int, duplicates: float) -> list[dict]:
+    unique = max(1, int(count * (1 - duplicates)))
+    return [
+        {"prompt": "Өзіңіз туралы жазыңыз.", "student_answer": f"Менің атым Оқушы {i % unique}.", "language": "kk"}
+        for i in range(count)
+    ]
+
+
+async def run_batch(service, submissions: list[dict], concurrency: int) -> float:
+    started = time.perf_counter()
+    async for _ in service.check_many(submissions, concurrency=concurrency):
+        pass
+    return time.perf_counter() - started
+
+
+async def run_sequential(service, submissions: list[dict]) -> float:
+    started = time.perf_counter()
+    for item in submissions:
+        await service.check(**item, rubric=None)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--duplicates", type=float, default=0.25)
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    server, stats = start_stub(args.latency)
+    host, port = server.server_address
+    os.environ["LLM_API_KEY"] = "bench"
+    os.environ["LLM_QUEUE_CONCURRENCY"] = str(max(args.concurrency))
+
+    from app.services.free_writing_service import FreeWritingService
+    from app.services.llm_client import LLMClient
+
+    submissions = make_submissions(args.submissions, args.duplicates)
+    sequential_count = min(len(submissions), 20)
+    client = LLMClient(base_url=f"http://{host}:{port}/v1", model="stub", timeout_seconds=30)
+
+    service = FreeWritingService(client=client)
+    elapsed = asyncio.run(run_sequential(service, submissions[:sequential_count]))
+    print(f"sequential        : {sequential_count / elapsed:7.1f} submissions/s ({sequential_count} in {elapsed:.2f}s)")
+
+    for concurrency in args.concurrency:
+        stats["calls"] = 0
+        elapsed = asyncio.run(run_batch(FreeWritingService(client=client), submissions, concurrency))
+        print(
+            f"batch concurrency={concurrency:<3}: {len(submissions) / elapsed:7.1f} submissions/s "
+            f"({len(submissions)} in {elapsed:.2f}s, {stats['calls']} LLM calls)"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
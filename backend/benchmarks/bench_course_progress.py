@@ -0,0 +1,131 @@
+"""
+Micro-benchmark for per-user course progress over the whole catalog.
+
+Usage:
+  python benchmarks/bench_course_progress.py [--courses 10] [--lessons 200] [--repeat 50]
+
+Compares the previous per-course strategy (ORM tree + one
+``UserProgress ... IN (...)`` query per course) with the catalog snapshot and
+one bucketed pass over a single user-progress query, on a temp SQLite file.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+
+def seed(db, models, courses: int, lessons: int, modules_per_course: int = 10):
+    user = models.User(email="bench@example.com", hashed_password="x", age=20, target="", daily_minutes=10, level="")
+    db.add(user)
+    db.flush()
+    per_module = max(1, lessons // modules_per_course)
+    for c in range(courses):
+        course = models.Course(slug=f"course-{c}", name=f"Course {c}", description="", audience="")
+        db.add(course)
+        for m in range(modules_per_course):
+            module = models.Module(name=f"M{m}", order=m + 1, course=course)
+            db.add(module)
+            for l in range(per_module):
+                db.add(models.Lesson(module=module, title=f"L{c}.{m}.{l}", status="published", order=l + 1))
+    db.flush()
+    # Roughly a third of each course finished.
+    for lesson_id in [row[0] for row in db.query(models.Lesson.id).all()][::3]:
+        db.add(models.UserProgress(user_id=user.id, lesson_id=lesson_id, status="done"))
+    db.commit()
+    return user
+
+
+def per_course_baseline(db, models, user):
+    from sqlalchemy.orm import selectinload
+
+    courses = (
+        db.query(models.Course)
+        .options(selectinload(models.Course.modules).selectinload(models.Module.lessons))
+        .all()
+    )
+    result = {}
+    for course in courses:
+        lesson_ids = [
+            l.id
+            for m in course.modules
+            for l in m.lessons
+            if not l.is_deleted and l.status != "archived"
+        ]
+        rows = (
+            db.query(models.UserProgress)
+            .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id.in_(lesson_ids))
+            .all()
+        )
+        progress_map = {row.lesson_id: row.status for row in rows}
+        done = sum(1 for lid in lesson_ids if progress_map.get(lid) == "done")
+        next_lesson = next((l for m in course.modules for l in m.lessons if progress_map.get(l.id) != "done"), None)
+        result[course.id] = (int(done / len(lesson_ids) * 100) if lesson_ids else 0, next_lesson, progress_map)
+    return result
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=10)
+    parser.add_argument("--lessons", type=int, default=200, help="lessons per course")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+
+        from app.db import models
+        from app.db.base import Base
+        from app.services import catalog_service
+        from app.services.progress_service import list_courses_with_progress
+
+        engine = create_engine(os.environ["DATABASE_URL"])
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        user = seed(db, models, args.courses, args.lessons)
+
+        def cold():
+            catalog_service.catalog_cache.clear()
+            db.expire_all()
+            list_courses_with_progress(db, user)
+
+        def warm():
+            list_courses_with_progress(db, user)
+
+        def baseline():
+            db.expire_all()
+            per_course_baseline(db, models, user)
+
+        rows = [
+            ("per-course queries (previous)", timed(baseline, args.repeat)),
+            ("snapshot, cold rebuild", timed(cold, args.repeat)),
+            ("snapshot, warm", timed(warm, args.repeat)),
+        ]
+        db.close()
+        engine.dispose()
+
+    print(f"courses={args.courses} lessons/course={args.lessons} repeat={args.repeat}")
+    for name, ms in rows:
+        print(f"{name:<32}{ms:>10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Requests/s for the hot read endpoints in sync (threadpool) vs async (AsyncSession) DB mode.
+
+Usage:
+  python benchmarks/bench_db_modes.py [--requests 400] [--concurrency 64] [--lessons 20]
+
+Each mode runs in its own interpreter (``deps.read_db`` is chosen at import
+time from ASYNC_DB_ENABLED) against the same seeded SQLite file: ``sqlite`` for
+sync mode, ``sqlite+aiosqlite`` for async mode. Requests go through httpx.ASGITransport, so
+the numbers measure the app stack, not the network.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+
+def seed(db_path: Path, lessons: int) -> dict:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.security import build_session_token, get_password_hash
+    from app.db import models
+    from app.db.base import Base
+
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = models.User(
+        email="bench@example.com",
+        hashed_password=get_password_hash("secret"),
+        age=25,
+        target="general",
+        daily_minutes=10,
+        level="A1",
+    )
+    course = models.Course(slug="kazpro", name="KazPro", description="", audience="adult")
+    module = models.Module(name="M1", order=1, course=course)
+    db.add_all([user, course, module])
+    db.flush()
+    first_lesson = None
+    for idx in range(1, lessons + 1):
+        lesson = models.Lesson(module=module, title=f"Lesson {idx}", status="published", order=idx, language="kk")
+        db.add(lesson)
+        db.flush()
+        db.add_all(
+            [
+                models.LessonBlock(lesson_id=lesson.id, block_type="theory", content={"markdown": "Сәлем"}, order=1),
+                models.LessonBlock(
+                    lesson_id=lesson.id,
+                    block_type="flashcards",
+                    content={"cards": [{"word": f"сөз{idx}-{n}", "translation": f"word{n}"} for n in range(8)]},
+                    order=2,
+                ),
+            ]
+        )
+        first_lesson = first_lesson or lesson
+    db.commit()
+    payload = {"token": build_session_token(user.id), "lesson_id": first_lesson.id}
+    db.close()
+    engine.dispose()
+    return payload
+
+
+async def _drive(client, path: str, headers: dict, total: int, concurrency: int) -> float:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with sem:
+            resp = await client.get(path, headers=headers)
+            resp.raise_for_status()
+
+    await one()  # warm-up: creates progress rows / dictionary entries once
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+def worker(args) -> None:
+    import httpx
+
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return {
+                f"/api/lessons/{args.lesson_id}": await _drive(
+                    client, f"/api/lessons/{args.lesson_id}", headers, args.requests, args.concurrency
+                ),
+                "/api/progress": await _drive(client, "/api/progress", headers, args.requests, args.concurrency),
+            }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--lessons", type=int, default=20)
+    parser.add_argument("--worker", choices=["sync", "async"], help=argparse.SUPPRESS)
+    parser.add_argument("--token", help=argparse.SUPPRESS)
+    parser.add_argument("--lesson-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "UPLOAD_ROOT": str(Path(tmp) / "uploads")}
+        os.environ.update(env)
+        info = seed(db_path, args.lessons)
+
+        results = {}
+        for mode in ("sync", "async"):
+            proc = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--worker",
+                    mode,
+                    "--requests",
+                    str(args.requests),
+                    "--concurrency",
+                    str(args.concurrency),
+                    "--token",
+                    info["token"],
+                    "--lesson-id",
+                    str(info["lesson_id"]),
+                ],
+                env={**env, "ASYNC_DB_ENABLED": "true" if mode == "async" else "false"},
+                capture_output=True,
+                text=True,
+                check=True,
+                cwd=str(ROOT),
+            )
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"requests={args.requests} concurrency={args.concurrency}")
+    print(f"{'endpoint':<24}{'sync req/s':>14}{'async req/s':>14}")
+    for endpoint in results["sync"]:
+        print(f"{endpoint:<24}{results['sync'][endpoint]:>14.1f}{results['async'][endpoint]:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Recount media references and remove unreferenced uploads.
+
+Usage:
+  python gc_media.py [--dry-run] [--grace-hours 24]
+
+Recounts media_objects.ref_count by scanning every String, Text and JSON
+column of every table (except media_objects itself) for stored URLs, then
+deletes objects nobody references that are older than the grace period, with
+their files.
+Files uploaded before the content-addressed store (not in media_objects) are
+never touched.
+"""
+
+import argparse
+
+from app.core.config import get_settings
+from app.db.session import SessionLocal
+from app.services.media_service import collect_garbage
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    parser.add_argument("--grace-hours", type=float, default=get_settings().media_gc_grace_hours, help="keep younger objects")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = collect_garbage(db, grace_hours=args.grace_hours, dry_run=args.dry_run)
+    finally:
+        db.close()
+    for url in report["urls"]:
+        print(f"{'would remove' if args.dry_run else 'removed'} {url}")
+    print(f"referenced={report['referenced']} removed={report['removed']} freed_bytes={report['freed_bytes']}")
+
+
+if __name__ == "__main__":
+    main()
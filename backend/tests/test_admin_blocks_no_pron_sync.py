@@ -1,9 +1,10 @@
 import sys
+from datetime import datetime, timedelta
 from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, delete, update
 from sqlalchemy.orm import sessionmaker
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -15,6 +16,8 @@ from app.db.base import Base  # noqa: E402
 from app.db import models  # noqa: E402
 from app.db.session import get_db  # noqa: E402
 from app.core.security import get_password_hash  # noqa: E402
+from app.core.lesson_cache import lesson_cache  # noqa: E402
+from app.services.progress_service import _lesson_cache_key  # noqa: E402
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_admin_blocks.db"
@@ -26,6 +29,7 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def setup_db():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    lesson_cache.clear()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -115,3 +119,49 @@ def test_reorder_canonical_no_conflict(client, db_session):
     # Ensure only reorderable blocks swapped
     updated = db_session.get(models.LessonBlock, task.id)
     assert updated.order == 1 or updated.order == 2
+
+
+def test_block_edit_invalidates_compiled_lesson(client, db_session):
+    create_admin(db_session)
+    headers = auth_headers(client)
+    lesson, _ = bootstrap_lesson(db_session)
+    theory = models.LessonBlock(lesson_id=lesson.id, block_type="theory", content={"markdown": "before"}, order=2)
+    db_session.add(theory)
+    db_session.commit()
+    db_session.refresh(theory)
+
+    def theory_markdown():
+        resp = client.get(f"/api/lessons/{lesson.id}", headers=headers)
+        assert resp.status_code == 200
+        block = next(b for b in resp.json()["lesson"]["blocks"] if b["id"] == theory.id)
+        return block["content"]["rich_text"]
+
+    assert theory_markdown() == "before"
+    assert len(lesson_cache) == 1
+
+    resp = client.patch(f"/api/admin/lessons/blocks/{theory.id}", headers=headers, json={"content": {"markdown": "after"}})
+    assert resp.status_code == 200
+    assert theory_markdown() == "after"
+
+
+def test_lesson_cache_key_tracks_rows_edited_elsewhere(db_session):
+    lesson, _ = bootstrap_lesson(db_session)
+    card = models.Flashcard(lesson_id=lesson.id, front="a", back="b")
+    quiz = models.Quiz(lesson_id=lesson.id, question="q", options=["a"], correct_option=0)
+    db_session.add_all([card, quiz])
+    db_session.commit()
+    later = datetime.utcnow() + timedelta(minutes=1)
+
+    # Core statements skip the mapper events, like a write from another worker process.
+    key = _lesson_cache_key(db_session, lesson.id)
+    for statement in (
+        update(models.Flashcard).where(models.Flashcard.id == card.id).values(back="c", updated_at=later),
+        update(models.Quiz).where(models.Quiz.id == quiz.id).values(question="q2", updated_at=later),
+        update(models.Module).where(models.Module.id == lesson.module_id).values(name="M2", updated_at=later),
+        delete(models.Flashcard).where(models.Flashcard.id == card.id),
+    ):
+        db_session.execute(statement)
+        db_session.commit()
+        new_key = _lesson_cache_key(db_session, lesson.id)
+        assert new_key != key
+        key = new_key
@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_async_db.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    app.dependency_overrides.pop(deps.read_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_hot_routes_run_on_an_async_session():
+    with TestingSessionLocal() as db:
+        course = models.Course(slug="c", name="Course", description="", audience="")
+        module = models.Module(name="M1", description="", order=1, course=course)
+        lesson = models.Lesson(module=module, title="L", status="draft", order=1, language="kk", blocks_order=[])
+        db.add_all([course, module, lesson])
+        db.flush()
+        db.add(models.LessonBlock(lesson_id=lesson.id, block_type="theory", content={"markdown": "Сәлем"}, order=1))
+        db.commit()
+        lesson_id = lesson.id
+
+    sessions = []
+
+    async def override_read_db():
+        async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL.replace("sqlite", "sqlite+aiosqlite", 1))
+        try:
+            async with async_sessionmaker(bind=async_engine)() as db:
+                sessions.append(db)
+                yield db
+        finally:
+            await async_engine.dispose()
+
+    app.dependency_overrides[deps.read_db] = override_read_db
+    client = TestClient(app)
+
+    resp = client.get(f"/api/lessons/{lesson_id}?preview=1")
+    assert resp.status_code == 200
+    assert resp.json()["lesson"]["title"] == "L"
+    assert client.get("/api/courses").status_code == 200
+    assert len(sessions) == 2
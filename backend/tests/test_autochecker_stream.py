@@ -0,0 +1,120 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import llm_result_cache  # noqa: E402
+from app.services.llm_client import LLMClientError  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch):
+    app.dependency_overrides[deps.require_user] = lambda: object()
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    llm_result_cache.clear()
+    yield
+    llm_result_cache.clear()
+    app.dependency_overrides.pop(deps.require_user, None)
+
+
+def _fake_stream(payload, calls=None):
+    text = "```json\n" + json.dumps(payload, ensure_ascii=False) + "\n```"
+
+    async def astream_text(prompt, *args, **kwargs):
+        if calls is not None:
+            calls.append(prompt)
+        for i in range(0, len(text), 16):
+            yield text[i : i + 16]
+
+    return astream_text
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for chunk in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in chunk.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_html_stream_forwards_tokens_then_validated_result(monkeypatch):
+    calls = []
+    payload = {
+        "overall_score": 120,
+        "categories": {"grammar": 80, "vocabulary": 75, "word_order": 70, "clarity": 90},
+        "mistakes": [],
+        "mentor_feedback": "Жақсы",
+        "improved_version": "Мен мектепке барамын.",
+        "recommendations": [],
+    }
+    monkeypatch.setattr(autochecker.llm_client, "astream_text", _fake_stream(payload, calls))
+    client = TestClient(app)
+
+    resp = client.post("/api/autochecker/html/stream", json={"text": "Мен мектепке барамын."})
+    events = _events(resp.text)
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert [name for name, _ in events[:-1]] == ["token"] * (len(events) - 1)
+    assert len(events) > 2
+    name, result = events[-1]
+    assert name == "result"
+    assert result["overall_score"] == 100  # clamped by _normalize_schema
+    assert result["cached"] is False
+
+    again = _events(client.post("/api/autochecker/html/stream", json={"text": "Мен мектепке барамын."}).text)
+    assert again == [("result", {**result, "cached": True})]
+    assert len(calls) == 1
+
+
+def test_html_stream_reports_incomplete_payload(monkeypatch):
+    monkeypatch.setattr(autochecker.llm_client, "astream_text", _fake_stream({"overall_score": 10}))
+    client = TestClient(app)
+
+    events = _events(client.post("/api/autochecker/html/stream", json={"text": "Сәлем, достар!"}).text)
+
+    assert events[-1][0] == "result"
+    assert events[-1][1]["error"] == "LLM returned incomplete payload"
+
+
+def test_text_check_stream_normalizes_result(monkeypatch):
+    payload = {
+        "language": "kk",
+        "level": "A1",
+        "score": 88,
+        "summary": {"grammar": 8, "lexicon": 7, "spelling": 9, "punctuation": 8},
+        "issues": [],
+        "corrected_text": "Сәлем, бұл тест.",
+    }
+    monkeypatch.setattr(autochecker.llm_client, "astream_text", _fake_stream(payload))
+    client = TestClient(app)
+
+    events = _events(
+        client.post("/api/autochecker/text-check/stream", json={"text": "Сәлем, бұл тест.", "level": "A1"}).text
+    )
+
+    name, result = events[-1]
+    assert name == "result"
+    assert result["language"] == "kk"
+    assert result["corrected_text"] == "Сәлем, бұл тест."
+
+
+def test_text_check_stream_error_event(monkeypatch):
+    async def failing(prompt, *args, **kwargs):
+        raise LLMClientError("upstream down")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(autochecker.llm_client, "astream_text", failing)
+    client = TestClient(app)
+
+    events = _events(client.post("/api/autochecker/text-check/stream", json={"text": "Сәлем, достар!"}).text)
+
+    assert events == [("error", {"ok": False, "error": "LLM error", "details": "upstream down", "request_id": events[0][1]["request_id"]})]
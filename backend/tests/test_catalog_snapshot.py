@@ -0,0 +1,142 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.core.security import build_session_token, get_password_hash  # noqa: E402
+from app.services import catalog_service  # noqa: E402
+from app.services.catalog_service import catalog_cache, get_catalog  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_catalog.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def seed(db):
+    user = models.User(
+        email="student@example.com",
+        hashed_password=get_password_hash("secret"),
+        age=20,
+        target="",
+        daily_minutes=10,
+        level="",
+    )
+    courses = []
+    for idx in (1, 2):
+        course = models.Course(slug=f"c{idx}", name=f"Course {idx}", description="", audience="")
+        module = models.Module(name=f"M{idx}", order=1, course=course)
+        db.add_all([course, module])
+        for order in (1, 2):
+            db.add(models.Lesson(module=module, title=f"L{idx}.{order}", status="published", order=order))
+        courses.append(course)
+    db.add(user)
+    db.commit()
+    return user, courses
+
+
+def test_progress_endpoints_share_snapshot(client, db_session):
+    user, (course, _) = seed(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+    first = course.modules[0].lessons[0]
+    db_session.add(models.UserProgress(user_id=user.id, lesson_id=first.id, status="done"))
+    db_session.commit()
+
+    courses = client.get("/api/courses", headers=headers).json()["courses"]
+    assert [c["slug"] for c in courses] == ["c1", "c2"]
+    assert courses[0]["progress_percent"] == 50
+    assert courses[0]["next_lesson"]["title"] == "L1.2"
+
+    modules = client.get("/api/modules", params={"course_slug": "c1"}, headers=headers).json()
+    assert modules[0]["progress_map"] == {str(first.id): "done"}
+
+    progress = client.get("/api/progress", headers=headers).json()
+    assert progress["completed_lessons"] == 1 and progress["total_lessons"] == 2
+    assert progress["completed_lesson_titles"] == ["L1.1"]
+
+
+def test_admin_writes_rebuild_only_touched_course(db_session):
+    _, (course, other) = seed(db_session)
+    before = get_catalog(db_session)
+    assert get_catalog(db_session) is before
+
+    module = course.modules[0]
+    db_session.add(models.Lesson(module=module, title="L1.3", status="published", order=3))
+    db_session.commit()
+
+    after = get_catalog(db_session)
+    assert after is not before
+    assert len(after.course(course_id=course.id).active_lesson_ids) == 3
+    assert after.course(course_id=other.id) is before.course(course_id=other.id)
+
+    lesson = module.lessons[0]
+    lesson.status = "archived"
+    db_session.flush()
+    db_session.rollback()
+    assert get_catalog(db_session) is after
+
+
+def test_batched_progress_covers_every_course(db_session):
+    user, (course, other) = seed(db_session)
+    lessons = course.modules[0].lessons
+    other_lessons = other.modules[0].lessons
+    db_session.add_all(
+        [
+            models.UserProgress(user_id=user.id, lesson_id=lessons[0].id, status="done"),
+            models.UserProgress(user_id=user.id, lesson_id=lessons[1].id, status="in_progress"),
+            models.UserProgress(user_id=user.id, lesson_id=other_lessons[0].id, status="done"),
+        ]
+    )
+    db_session.commit()
+
+    catalog = get_catalog(db_session)
+    statuses = catalog_service.user_progress_statuses(db_session, user.id)
+    batched = catalog_service.courses_progress(catalog, statuses)
+    summary = {cid: (percent, nxt["title"], progress_map) for cid, (percent, nxt, progress_map) in batched.items()}
+    assert summary == {
+        course.id: (50, "L1.2", {lessons[0].id: "done", lessons[1].id: "in_progress"}),
+        other.id: (50, "L2.2", {other_lessons[0].id: "done"}),
+    }
+    assert catalog_service.courses_progress(catalog, statuses, [other.id]) == {other.id: batched[other.id]}
@@ -0,0 +1,102 @@
+import asyncio
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import llm_result_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch):
+    app.dependency_overrides[deps.require_admin] = lambda: object()
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    llm_result_cache.clear()
+    yield
+    llm_result_cache.clear()
+    app.dependency_overrides.pop(deps.require_admin, None)
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = {"n": 0, "active": 0, "peak": 0}
+
+    async def fake_generate_json(prompt, *args, **kwargs):
+        calls["n"] += 1
+        calls["active"] += 1
+        calls["peak"] = max(calls["peak"], calls["active"])
+        await asyncio.sleep(0.01)
+        calls["active"] -= 1
+        if "FAIL" in prompt:
+            raise autochecker.LLMClientError("bad answer")
+        return {"score": 75, "level": "good", "feedback": "ok", "corrections": ["a", "b"]}
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    return calls
+
+
+def _submissions():
+    return [
+        {"id": "s1", "prompt": "Task", "answer": "Менің атым Алма."},
+        {"id": "s2", "prompt": "Task", "answer": "Менің  атым Алма. "},
+        {"id": "s3", "prompt": "Task", "student_answer": "Мен оқимын.", "rubric": "grammar"},
+        {"id": "s4", "prompt": "Task", "answer": "FAIL"},
+        {"id": "s5", "prompt": "Task", "answer": "Бүгін күн жылы."},
+    ]
+
+
+def test_batch_streams_ndjson_and_dedupes(llm_calls):
+    client = TestClient(app)
+
+    resp = client.post(
+        "/api/autochecker/free-writing/batch", json={"submissions": _submissions(), "concurrency": 2}
+    )
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    by_id = {line["id"]: line for line in lines if "id" in line}
+    assert by_id["s1"]["score"] == 75
+    assert by_id["s2"]["duplicate_of"] == 0
+    assert by_id["s4"] == {"index": 3, "id": "s4", "ok": False, "error": "bad answer"}
+    summary = lines[-1]["summary"]
+    assert summary["total"] == 5
+    assert summary["unique"] == 4
+    assert summary["graded"] == 4
+    assert summary["failed"] == 1
+    assert llm_calls["peak"] <= 2
+    assert llm_calls["n"] == 4
+
+
+def test_batch_csv_report(llm_calls):
+    client = TestClient(app)
+
+    resp = client.post("/api/autochecker/free-writing/batch", json={"submissions": _submissions(), "format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+
+    assert resp.headers["content-disposition"].startswith("attachment")
+    assert [row["id"] for row in rows] == ["s1", "s2", "s3", "s4", "s5"]
+    assert rows[0]["corrections"] == "a | b"
+    assert rows[3]["ok"] == "False"
+
+
+def test_batch_validates_every_submission():
+    client = TestClient(app)
+
+    resp = client.post(
+        "/api/autochecker/free-writing/batch",
+        json={"submissions": [{"prompt": "Task", "answer": "ok"}, {"prompt": "", "answer": "x"}]},
+    )
+
+    assert resp.status_code == 400
+    assert resp.json()["details"][0]["index"] == 1
@@ -20,7 +20,7 @@ class DummyLLMClient:
     def is_configured(self) -> bool:
         return True
 
-    async def generate_json(self, *args, **kwargs):
+    async def agenerate_json(self, *args, **kwargs):
         return self.payload
 
 
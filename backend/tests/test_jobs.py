@@ -0,0 +1,199 @@
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import llm_result_cache  # noqa: E402
+from app.core.security import build_session_token, get_password_hash  # noqa: E402
+from app.services.job_service import job_runner  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_jobs.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(job_runner, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    llm_result_cache.clear()
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def _user(db, email="student@example.com"):
+    user = models.User(
+        email=email,
+        hashed_password=get_password_hash("secret"),
+        age=20,
+        target="",
+        daily_minutes=10,
+        level="",
+    )
+    db.add(user)
+    db.commit()
+    return user, {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+
+def _wait(client, job_id, headers, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get(f"/api/jobs/{job_id}", headers=headers).json()
+        if data["status"] in ("done", "failed"):
+            return data
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_free_writing_job_runs_in_background(client, db_session, monkeypatch):
+    async def fake_generate_json(prompt, *args, **kwargs):
+        return {"score": 88, "level": "excellent", "feedback": "Жақсы", "corrections": []}
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    user, headers = _user(db_session)
+
+    resp = client.post(
+        "/api/jobs",
+        headers=headers,
+        json={"kind": "free_writing", "payload": {"prompt": "Task", "student_answer": "Answer"}},
+    )
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+
+    data = _wait(client, job_id, headers)
+    assert data["status"] == "done"
+    assert data["result"]["score"] == 88
+    stored = db_session.get(models.Job, job_id)
+    db_session.refresh(stored)
+    assert stored.user_id == user.id
+    assert stored.finished_at is not None
+
+
+def test_failed_job_records_error_and_streams_result(client, db_session, monkeypatch):
+    async def failing(prompt, *args, **kwargs):
+        raise autochecker.LLMClientError("upstream down")
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", failing)
+    _, headers = _user(db_session)
+
+    job_id = client.post(
+        "/api/jobs",
+        headers=headers,
+        json={"kind": "free_writing", "payload": {"prompt": "Task", "student_answer": "Answer"}},
+    ).json()["job_id"]
+
+    with client.stream("GET", f"/api/jobs/{job_id}/events", headers=headers) as stream:
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        body = "".join(stream.iter_text())
+
+    assert "event: result" in body
+    assert "upstream down" in body
+    assert client.get(f"/api/jobs/{job_id}", headers=headers).json()["status"] == "failed"
+
+
+def test_jobs_validate_input_and_are_private(client, db_session, monkeypatch):
+    async def fake_generate_json(prompt, *args, **kwargs):
+        return {}
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    _, headers = _user(db_session)
+    _, other_headers = _user(db_session, "other@example.com")
+
+    assert client.post("/api/jobs", headers=headers, json={"kind": "nope"}).status_code == 400
+    assert (
+        client.post("/api/jobs", headers=headers, json={"kind": "free_writing", "payload": {"prompt": ""}}).status_code
+        == 400
+    )
+    job_id = client.post(
+        "/api/jobs", headers=headers, json={"kind": "autochecker_html", "payload": {"text": "Сәлем, достар!"}}
+    ).json()["job_id"]
+
+    assert client.get(f"/api/jobs/{job_id}", headers=other_headers).status_code == 404
+    assert _wait(client, job_id, headers)["status"] == "done"
+
+
+def test_audio_job_reads_the_upload_from_disk(client, db_session, monkeypatch, tmp_path):
+    monkeypatch.setattr(autochecker.job_service, "input_dir", lambda: tmp_path)
+    seen = {}
+
+    async def fake_process_audio(db, audio_bytes, phrase, mime_type=None):
+        seen["audio"] = audio_bytes
+        return {"phrase": phrase, "score": 1}
+
+    monkeypatch.setattr(autochecker.service, "process_audio", fake_process_audio)
+    _, headers = _user(db_session)
+
+    empty = client.post(
+        "/api/jobs/audio", headers=headers, data={"phrase": "Сәлем"}, files={"audio": ("a.webm", b"")}
+    )
+    assert empty.status_code == 400
+    job_id = client.post(
+        "/api/jobs/audio", headers=headers, data={"phrase": "Сәлем"}, files={"audio": ("a.webm", b"RIFF1234")}
+    ).json()["job_id"]
+
+    assert _wait(client, job_id, headers)["status"] == "done"
+    assert seen["audio"] == b"RIFF1234"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sweep_fails_abandoned_jobs_and_expires_finished_ones(db_session):
+    now = datetime.utcnow()
+    db_session.add_all(
+        [
+            models.Job(
+                id="stale", kind="free_writing", status="running", stage="running", updated_at=now - timedelta(hours=1)
+            ),
+            models.Job(id="fresh", kind="free_writing", status="queued", stage="queued", updated_at=now),
+            models.Job(id="old", kind="free_writing", status="done", stage="done", finished_at=now - timedelta(days=30)),
+            models.Job(id="recent", kind="free_writing", status="failed", stage="failed", finished_at=now),
+        ]
+    )
+    db_session.commit()
+
+    assert job_runner.sweep(now) == {"failed": 1, "removed": 1}
+
+    db_session.expire_all()
+    stale = db_session.get(models.Job, "stale")
+    assert stale.status == "failed" and "resubmit" in stale.error
+    assert db_session.get(models.Job, "fresh").status == "queued"
+    assert db_session.get(models.Job, "old") is None
+    assert db_session.get(models.Job, "recent") is not None
@@ -0,0 +1,147 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import llm_result_cache  # noqa: E402
+from app.services.kazakh_precheck import expected_suffix, precheck  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch):
+    app.dependency_overrides[deps.require_user] = lambda: object()
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    llm_result_cache.clear()
+    yield
+    llm_result_cache.clear()
+    app.dependency_overrides.pop(deps.require_user, None)
+
+
+def _fixes(report):
+    return {(f.bad_excerpt, f.fix, f.type) for f in report.findings}
+
+
+def test_trivial_texts_are_resolved_locally():
+    assert precheck("   ").verdict == "empty"
+    assert precheck("Сәлем").verdict == "too_short"
+    assert precheck("Hello, my friend").verdict == "wrong_script"
+    matched = precheck("Мен  мектепке барамын.", reference="Мен мектепке барамын.")
+    assert matched.verdict == "matches_reference"
+    assert matched.score == 100
+    assert not precheck("Мен мектепке барамын.", reference="Мен үйге барамын.").resolved
+
+
+def test_latin_letters_and_russian_layout_are_flagged():
+    report = precheck("Cәлем достар! Салем, мен кал.")
+    assert ("Cәлем", "Сәлем", "spelling") in _fixes(report)
+    assert ("Салем", "Сәлем", "spelling") in _fixes(report)
+    assert ("кал", "қал", "spelling") in _fixes(report)
+    assert ("сaлем", "сәлем", "spelling") in _fixes(precheck("Достар, сaлем!"))
+
+
+def test_case_endings_follow_harmony_and_consonant_rules():
+    assert expected_suffix("dative", "мектеп") == "ке"
+    assert expected_suffix("dative", "кітап") == "қа"
+    assert expected_suffix("genitive", "адам") == "ның"
+    assert expected_suffix("plural", "көл") == "дер"
+
+    report = precheck("Мен мектепқа бардым, кітапға қарадым, балаларға айттым.")
+    assert ("мектепқа", "мектепке", "grammar") in _fixes(report)
+    assert ("кітапға", "кітапқа", "grammar") in _fixes(report)
+    assert not any(f.bad_excerpt == "балаларға" for f in report.findings)
+    assert precheck("Мен қалада тұрамын, адамдар көп.").findings == []
+
+
+def test_html_short_circuits_and_injects_findings(monkeypatch):
+    prompts = []
+
+    async def fake_generate_json(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return {
+            "overall_score": 70,
+            "categories": {"grammar": 60, "vocabulary": 80, "word_order": 70, "clarity": 70},
+            "mistakes": [{"fragment": "мектепқа", "issue": "grammar", "explanation": "x", "suggestion": "мектепке"}],
+            "mentor_feedback": "",
+            "improved_version": "Мен мектепке барамын.",
+            "recommendations": [],
+        }
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    client = TestClient(app)
+
+    short = client.post("/api/autochecker/html", json={"text": "Сәлем"}).json()
+    assert short["model"] == "local-precheck"
+    assert short["precheck"] == "too_short"
+    same = client.post(
+        "/api/autochecker/html", json={"text": "Мен мектепке барамын.", "reference": "Мен мектепке барамын."}
+    ).json()
+    assert same["overall_score"] == 100
+    assert prompts == []
+
+    data = client.post("/api/autochecker/html", json={"text": "Мен мектепқа барамын."}).json()
+    assert len(prompts) == 1
+    assert "«мектепқа» → «мектепке»" in prompts[0]
+    assert [m["fragment"] for m in data["mistakes"]] == ["мектепқа"]
+
+
+def test_text_check_merges_local_issues(monkeypatch):
+    prompts = []
+
+    async def fake_generate_json(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return {
+            "score": 80,
+            "summary": {"grammar": 8, "lexicon": 8, "spelling": 7, "punctuation": 9},
+            "issues": [{"type": "punctuation", "severity": "low", "bad_excerpt": "барамын", "fix": "барамын.", "why": "Нүкте"}],
+            "corrected_text": "Сәлем, мен мектепке барамын.",
+        }
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    client = TestClient(app)
+
+    local = client.post("/api/autochecker/text-check", json={"text": "Hello there", "level": "A1"}).json()
+    assert local["score"] == 0
+    assert prompts == []
+
+    data = client.post("/api/autochecker/text-check", json={"text": "Салем, мен мектепқа барамын", "level": "A1"}).json()
+    assert "Local pre-check" in prompts[0]
+    assert [issue["bad_excerpt"] for issue in data["issues"]] == ["Салем", "мектепқа", "барамын"]
+
+
+def test_russian_input_skips_the_kazakh_precheck(monkeypatch):
+    prompts = []
+
+    async def fake_generate_json(prompt, *args, **kwargs):
+        prompts.append(prompt)
+        return {
+            "overall_score": 90,
+            "categories": {"grammar": 90, "vocabulary": 90, "word_order": 90, "clarity": 90},
+            "mistakes": [],
+            "mentor_feedback": "",
+            "improved_version": "Я купил кол и сала на базаре.",
+            "recommendations": [],
+        }
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    client = TestClient(app)
+
+    data = client.post("/api/autochecker/html", json={"text": "Я купил кол и сала на базаре", "language": "ru"}).json()
+    assert data["mistakes"] == []
+    assert "Local pre-check" not in prompts[0]
+
+    hello = client.post("/api/autochecker/html", json={"text": "Привет"}).json()
+    assert hello.get("precheck") is None
+    assert len(prompts) == 2
+
+    checked = client.post(
+        "/api/autochecker/text-check", json={"text": "Я купил кол и сала на базаре", "language": "ru", "level": "A1"}
+    ).json()
+    assert "кол" not in [issue["bad_excerpt"] for issue in checked.get("issues", [])]
@@ -0,0 +1,155 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.services.job_service import job_runner  # noqa: E402
+from app.services.lesson_audio_service import pregenerate_catalog_audio, pregenerate_lesson_audio  # noqa: E402
+from app.services.tts_service import TTSStore, silent_synthesizer, tts_key, tts_store  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_lesson_audio.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db(monkeypatch):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(job_runner, "session_factory", TestingSessionLocal)
+    yield
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(deps.require_admin, None)
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class CountingSynthesizer:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls: list[str] = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, lang: str, voice: str) -> bytes:
+        with self._lock:
+            self.calls.append(text)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return silent_synthesizer(text, lang, voice)
+
+
+def bootstrap_lesson(db, slug="c1"):
+    course = models.Course(slug=slug, name="Course", description="", audience="")
+    module = models.Module(name="M1", description="", order=1, course=course)
+    lesson = models.Lesson(module=module, title="Lesson", status="draft", order=1, language="kk", blocks_order=[])
+    db.add_all([course, module, lesson])
+    db.commit()
+    blocks = [
+        models.LessonBlock(
+            lesson_id=lesson.id,
+            block_type="flashcards",
+            content={},
+            data={"cards": [{"word": "Су", "translation": "Вода"}, {"word": "Ай", "translation": "Луна", "audio_url": "/uploads/audio/ai.mp3"}]},
+            order=1,
+        ),
+        models.LessonBlock(
+            lesson_id=lesson.id,
+            block_type="pronunciation",
+            content={"items": [{"word": "су"}, {"word": "Күн"}]},
+            data=None,
+            order=2,
+        ),
+        models.LessonBlock(
+            lesson_id=lesson.id,
+            block_type="audio",
+            content={},
+            data={"transcript": "Бүгін күн ашық.", "translation": "Сегодня солнечно."},
+            order=3,
+        ),
+        models.Flashcard(lesson_id=lesson.id, front="Жел", back="Ветер", order=1),
+    ]
+    db.add_all(blocks)
+    db.commit()
+    return lesson
+
+
+def test_pregenerate_fills_missing_audio_once_per_text(tmp_path, db_session):
+    lesson = bootstrap_lesson(db_session)
+    synth = CountingSynthesizer(delay=0.05)
+    store = TTSStore(tmp_path, synthesizer=synth, session_factory=TestingSessionLocal)
+
+    report = pregenerate_lesson_audio(TestingSessionLocal, lesson.id, store=store, workers=2)
+
+    assert sorted(synth.calls) == sorted(["Су", "Күн", "Бүгін күн ашық.", "Жел"])
+    assert synth.peak <= 2
+    assert report["failed"] == [] and report["filled"] == 5
+
+    db_session.expire_all()
+    blocks = {b.block_type: b for b in db_session.query(models.LessonBlock).all()}
+    cards = blocks["flashcards"].data["cards"]
+    assert cards[0]["audio_url"] == store.url_for(tts_key("су"))
+    assert cards[1]["audio_url"] == "/uploads/audio/ai.mp3"
+    items = blocks["pronunciation"].content["items"]
+    assert items[0]["audio_url"] == cards[0]["audio_url"]
+    assert items[1]["audio_url"] == store.url_for(tts_key("күн"))
+    assert blocks["audio"].data["audio_url"] == store.url_for(tts_key("бүгін күн ашық."))
+    assert db_session.query(models.Flashcard).one().audio_url == store.url_for(tts_key("жел"))
+    assert all(row.pinned for row in db_session.query(models.TTSAudio).all())
+
+    again = pregenerate_catalog_audio(TestingSessionLocal, store=store)
+    assert again[0]["texts"] == 0 and len(synth.calls) == 4
+
+
+def test_publish_queues_audio_job(tmp_path, monkeypatch, db_session):
+    lesson = bootstrap_lesson(db_session)
+    synth = CountingSynthesizer()
+    monkeypatch.setattr(tts_store, "directory", tmp_path)
+    monkeypatch.setattr(tts_store, "synthesizer", synth)
+
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[deps.require_admin] = lambda: object()
+    resp = TestClient(app).post(f"/api/admin/lessons/{lesson.id}/publish")
+    assert resp.status_code == 200
+    job_id = resp.json()["audio_job_id"]
+
+    deadline = time.time() + 5
+    job = job_runner.load(job_id)
+    while job.status not in ("done", "failed") and time.time() < deadline:
+        time.sleep(0.05)
+        job = job_runner.load(job_id)
+    assert job.status == "done", job.error
+    assert job.result["filled"] == 5
+    db_session.expire_all()
+    assert db_session.query(models.Flashcard).one().audio_url.startswith("/api/vocabulary/audio/")
+    assert (tmp_path / f"{tts_key('жел')}.mp3").exists()
@@ -0,0 +1,128 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import llm_result_cache  # noqa: E402
+from app.services import llm_breaker  # noqa: E402
+from app.services.llm_breaker import CircuitBreaker  # noqa: E402
+from app.services.llm_client import LLMCircuitOpen, LLMClient, LLMClientError  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch):
+    app.dependency_overrides[deps.require_user] = lambda: object()
+    app.dependency_overrides[deps.require_admin] = lambda: object()
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    monkeypatch.setattr(llm_breaker, "_breakers", {})
+    llm_result_cache.clear()
+    yield
+    app.dependency_overrides.pop(deps.require_user, None)
+    app.dependency_overrides.pop(deps.require_admin, None)
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        breaker.record_failure("HTTP 503")
+
+
+def test_breaker_opens_on_failure_rate_and_probes_half_open():
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5, open_seconds=0.05)
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure("HTTP 500")
+    assert breaker.state == "closed"
+    breaker.record_failure("timeout")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure("HTTP 503")
+    assert breaker.state == "open"
+    assert breaker.snapshot()["retry_after"] >= 1
+
+    time.sleep(0.11)  # cool-down doubled after the failed probe
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+    assert breaker.snapshot()["trips"] == 2
+
+
+def test_timeout_adapts_to_observed_latency():
+    breaker = CircuitBreaker(min_timeout=0.5, min_samples=5, timeout_multiplier=3.0)
+    assert breaker.timeout(60) == 60
+    for _ in range(5):
+        breaker.record_success(0.4)
+    assert breaker.timeout(60) == pytest.approx(1.2)
+    assert breaker.timeout(1.0) == 1.0
+
+
+def test_client_records_upstream_failures_and_fails_fast(monkeypatch):
+    calls = []
+
+    def handle(request):
+        calls.append(request)
+        return httpx.Response(503, json={"error": {"message": "overloaded"}})
+
+    client = LLMClient(api_key="k", base_url="http://breaker.test/v1", model="m")
+    monkeypatch.setattr(
+        client, "_pool", lambda provider=None: httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handle))
+    )
+
+    async def scenario():
+        for _ in range(client.breaker.min_calls):
+            with pytest.raises(LLMClientError):
+                await client.agenerate_text("hello")
+        with pytest.raises(LLMCircuitOpen):
+            await client.agenerate_json("hello", max_retries=2)
+
+    asyncio.run(scenario())
+    assert len(calls) == client.breaker.min_calls
+    assert client.breaker.state == "open"
+
+
+def test_routes_fall_back_while_circuit_open(monkeypatch):
+    def unreachable(provider=None):
+        raise AssertionError("LLM must not be called while the circuit is open")
+
+    monkeypatch.setattr(autochecker.llm_client, "_pool", unreachable)
+    _trip(autochecker.llm_client.breaker)
+    client = TestClient(app)
+
+    html = client.post("/api/autochecker/html", json={"text": "Мен мектепке барамын."}).json()
+    assert html["model"] == "fallback-local"
+
+    text_check = client.post("/api/autochecker/text-check", json={"text": "Мен мектепке барамын."})
+    assert text_check.status_code == 503
+    assert int(text_check.headers["Retry-After"]) >= 1
+
+    health = client.get("/api/autochecker/health")
+    assert health.status_code == 503
+    assert health.json()["breaker"]["state"] == "open"
+    llm_health = client.get("/api/llm/health")
+    assert llm_health.json()["breaker"]["failures"] == autochecker.llm_client.breaker.min_calls
+
+
+def test_health_reports_closed_breaker_without_calling_llm(monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise AssertionError("health must not call the LLM")
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_text", unreachable)
+    client = TestClient(app)
+
+    resp = client.get("/api/autochecker/health")
+    assert resp.status_code == 200
+    assert resp.json()["breaker"]["state"] == "closed"
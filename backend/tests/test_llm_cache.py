@@ -0,0 +1,164 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import LLMResultCache, MemoryBackend, SQLiteBackend, llm_result_cache, make_key  # noqa: E402
+from app.services.free_writing_service import FreeWritingService  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch):
+    app.dependency_overrides[deps.require_user] = lambda: object()
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    llm_result_cache.clear()
+    yield
+    llm_result_cache.clear()
+    app.dependency_overrides.pop(deps.require_user, None)
+
+
+def _html_payload():
+    return {
+        "overall_score": 80,
+        "categories": {"grammar": 80, "vocabulary": 75, "word_order": 70, "clarity": 90},
+        "mistakes": [],
+        "mentor_feedback": "Жақсы",
+        "improved_version": "Мен мектепке барамын.",
+        "recommendations": [],
+    }
+
+
+def test_key_normalizes_text_and_separates_params():
+    base = make_key("free_writing", "v1", "m", "Мен  мектепке\nбарамын.", level="A1")
+    assert base == make_key("free_writing", "v1", "m", " Мен мектепке барамын. ", level="A1")
+    assert base != make_key("free_writing", "v1", "m", "Мен мектепке барамын.", level="A2")
+    assert base != make_key("free_writing", "v2", "m", "Мен мектепке барамын.", level="A1")
+    assert base != make_key("free_writing", "v1", "other", "Мен мектепке барамын.", level="A1")
+
+
+def test_memory_backend_evicts_lru_and_expires():
+    backend = MemoryBackend(max_entries=2, ttl_seconds=60)
+    backend.put("a", {"v": 1})
+    backend.put("b", {"v": 2})
+    assert backend.get("a") == {"v": 1}
+    backend.put("c", {"v": 3})
+    assert backend.get("b") is None
+    assert len(backend) == 2
+
+    short = MemoryBackend(ttl_seconds=0.01)
+    short.put("a", {"v": 1})
+    time.sleep(0.02)
+    assert short.get("a") is None
+
+
+def test_sqlite_backend_survives_reopen_and_bounds_size(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    backend = SQLiteBackend(str(path), max_entries=2, ttl_seconds=60)
+    backend.put("a", {"v": 1})
+    backend.put("b", {"v": 2})
+    backend.put("c", {"v": 3})
+    assert len(backend) == 2
+    assert backend.get("a") is None
+
+    reopened = SQLiteBackend(str(path), max_entries=2, ttl_seconds=60)
+    assert reopened.get("c") == {"v": 3}
+
+
+def test_html_check_served_from_cache(monkeypatch):
+    calls = []
+
+    async def fake_generate_json(prompt: str, *args, **kwargs):
+        calls.append(prompt)
+        return _html_payload()
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    client = TestClient(app)
+
+    first = client.post("/api/autochecker/html", json={"text": "Мен мектепке барамын."}).json()
+    second = client.post("/api/autochecker/html", json={"text": "Мен  мектепке барамын. "}).json()
+
+    assert len(calls) == 1
+    assert first["cached"] is False
+    assert second["cached"] is True
+    assert second["overall_score"] == first["overall_score"]
+
+
+def test_html_failures_are_not_cached(monkeypatch):
+    calls = []
+
+    async def fake_generate_json(prompt: str, *args, **kwargs):
+        calls.append(prompt)
+        return {"overall_score": 10}
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
+    client = TestClient(app)
+
+    client.post("/api/autochecker/html", json={"text": "Сәлем, достар!"})
+    client.post("/api/autochecker/html", json={"text": "Сәлем, достар!"})
+
+    assert len(calls) == 2
+
+
+def test_free_writing_cache_keyed_by_rubric():
+    class CountingClient:
+        model = "dummy"
+
+        def __init__(self):
+            self.calls = 0
+
+        def is_configured(self):
+            return True
+
+        async def agenerate_json(self, *args, **kwargs):
+            self.calls += 1
+            return {"score": 70, "level": "good", "feedback": "ok", "corrections": []}
+
+    client = CountingClient()
+    service = FreeWritingService(client=client, cache=LLMResultCache(MemoryBackend()))
+
+    async def check(rubric):
+        return await service.check(prompt="Task", student_answer="Answer", rubric=rubric, language="kk")
+
+    first = asyncio.run(check("r1"))
+    second = asyncio.run(check("r1"))
+    asyncio.run(check("r2"))
+
+    assert client.calls == 2
+    assert first.cached is False
+    assert second.cached is True
+    assert second.score == 70
+
+
+def test_html_cache_key_includes_reference_and_language():
+    base = autochecker._html_cache_key("Мен мектепке барамын.", "m")
+    assert base != autochecker._html_cache_key("Мен мектепке барамын.", "m", reference="Мен үйге барамын.")
+    assert base != autochecker._html_cache_key("Мен мектепке барамын.", "m", language="ru")
+
+
+def test_sqlite_backend_is_used_off_the_event_loop(tmp_path, monkeypatch):
+    cache = LLMResultCache(SQLiteBackend(str(tmp_path / "cache.sqlite3")))
+    threads = []
+    real_to_thread = asyncio.to_thread
+
+    async def to_thread(func, *args):
+        threads.append(func.__name__)
+        return await real_to_thread(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+
+    async def roundtrip():
+        await cache.aput("k", {"v": 1})
+        return await cache.aget("k")
+
+    assert asyncio.run(roundtrip()) == {"v": 1}
+    assert threads == ["put", "get"]
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.services.llm_client import LLMClient, LLMClientError  # noqa: E402
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        server.peers.add(self.client_address)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][0]["content"]
+        server.requests.append(body)
+        if prompt == "slow":
+            time.sleep(0.5)
+        if prompt == "denied":
+            return self._reply(401, {"error": {"message": "bad key"}})
+        if prompt == "busy":
+            return self._reply(429, {"error": {"message": "slow down"}})
+        content = json.dumps({"echo": prompt}) if prompt.startswith("json:") else f"re: {prompt}"
+        if body.get("stream"):
+            return self._stream(content)
+        self._reply(200, {"choices": [{"message": {"content": content}}]})
+
+    def _stream(self, content):
+        pieces = [content[i : i + 4] for i in range(0, len(content), 4)]
+        lines = [f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n" for piece in pieces]
+        data = ("".join(lines) + "data: [DONE]\n\n").encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.peers = set()
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(stub_server, monkeypatch):
+    monkeypatch.setenv("LLM_API_KEY", "test-key")
+    host, port = stub_server.server_address
+    return LLMClient(base_url=f"http://{host}:{port}/v1", model="stub-model", timeout_seconds=5)
+
+
+def test_async_generate_reuses_pooled_connection(client, stub_server):
+    async def run():
+        first = await client.agenerate_text("hello")
+        second = await client.agenerate_json("json:ping")
+        await client.aclose()
+        return first, second
+
+    text, data = asyncio.run(run())
+
+    assert text == "re: hello"
+    assert data == {"echo": "json:ping"}
+    assert [r["model"] for r in stub_server.requests] == ["stub-model", "stub-model"]
+    assert len(stub_server.peers) == 1
+
+
+def test_async_concurrent_calls_share_pool(client, stub_server):
+    async def run():
+        results = await asyncio.gather(*(client.agenerate_text(f"q{i}") for i in range(8)))
+        await client.aclose()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [f"re: q{i}" for i in range(8)]
+    assert len(stub_server.peers) <= client.max_connections
+
+
+def test_async_error_mapping_and_timeout(client):
+    async def run(prompt, **kwargs):
+        try:
+            return await client.agenerate_text(prompt, **kwargs)
+        finally:
+            await client.aclose()
+
+    with pytest.raises(LLMClientError, match="authentication error"):
+        asyncio.run(run("denied"))
+    with pytest.raises(LLMClientError, match="rate limit"):
+        asyncio.run(run("busy"))
+    with pytest.raises(LLMClientError, match="timed out"):
+        asyncio.run(run("slow", timeout=0.1))
+
+
+def test_sync_client_uses_session(client, stub_server):
+    assert client.generate_text("one") == "re: one"
+    assert client.generate_json("json:two") == {"echo": "json:two"}
+    assert len(stub_server.peers) == 1
+
+
+def test_identical_concurrent_calls_share_one_upstream_request(client, stub_server):
+    other = LLMClient(base_url=client.base_url, model=client.model, timeout_seconds=5)
+
+    async def run():
+        results = await asyncio.gather(
+            client.agenerate_json("json:same"),
+            client.agenerate_json("json:same"),
+            other.agenerate_json("json:same"),
+            client.agenerate_json("json:different"),
+        )
+        await client.aclose()
+        await other.aclose()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results[:3] == [{"echo": "json:same"}] * 3
+    assert results[0] is not results[1]
+    prompts = [r["messages"][0]["content"] for r in stub_server.requests]
+    assert sorted(prompts) == ["json:different", "json:same"]
+
+
+def test_single_flight_shares_errors_and_releases_key(client, stub_server):
+    async def run():
+        results = await asyncio.gather(
+            client.agenerate_text("denied", dedupe_key="k"),
+            client.agenerate_text("denied", dedupe_key="k"),
+            return_exceptions=True,
+        )
+        again = await client.agenerate_text("hello", dedupe_key="k")
+        await client.aclose()
+        return results, again
+
+    results, again = asyncio.run(run())
+
+    assert all(isinstance(r, LLMClientError) for r in results)
+    assert again == "re: hello"
+    assert len(stub_server.requests) == 2
+
+
+def test_astream_text_yields_deltas(client, stub_server):
+    async def run():
+        deltas = [delta async for delta in client.astream_text("json:streamed")]
+        with pytest.raises(LLMClientError, match="rate limit"):
+            async for _ in client.astream_text("busy"):
+                pass
+        await client.aclose()
+        return deltas
+
+    deltas = asyncio.run(run())
+
+    assert len(deltas) > 1
+    assert json.loads("".join(deltas)) == {"echo": "json:streamed"}
+    assert stub_server.requests[0]["stream"] is True
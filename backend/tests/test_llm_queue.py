@@ -0,0 +1,131 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.api.routes import autochecker  # noqa: E402
+from app.core.llm_cache import llm_result_cache  # noqa: E402
+from app.services.llm_queue import LLMQueue, LLMQueueFull  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def setup(monkeypatch):
+    app.dependency_overrides[deps.require_user] = lambda: object()
+    app.dependency_overrides[deps.require_admin] = lambda: object()
+    monkeypatch.setattr(autochecker.llm_client, "api_key", "test-key")
+    llm_result_cache.clear()
+    yield
+    app.dependency_overrides.pop(deps.require_user, None)
+    app.dependency_overrides.pop(deps.require_admin, None)
+
+
+def test_priority_lanes_and_round_robin_per_user():
+    queue = LLMQueue(max_concurrency=1, max_waiting=10)
+    order = []
+
+    async def job(name, user_id, lane):
+        async with queue.slot(user_id, lane):
+            order.append(name)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def holder():
+            async with queue.slot("holder"):
+                await release.wait()
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(job("bulk-a", "a", "bulk")),
+            asyncio.create_task(job("a1", "a", "interactive")),
+            asyncio.create_task(job("a2", "a", "interactive")),
+            asyncio.create_task(job("b1", "b", "interactive")),
+        ]
+        await asyncio.sleep(0)
+        assert queue.snapshot()["lanes"]["interactive"]["depth"] == 3
+        release.set()
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(run())
+
+    assert order == ["a1", "b1", "a2", "bulk-a"]
+    snapshot = queue.snapshot()
+    assert snapshot["running"] == 0
+    assert snapshot["lanes"]["interactive"]["service"]["count"] == 4
+    assert snapshot["lanes"]["bulk"]["wait"]["count"] == 1
+
+
+def test_full_queue_rejects_fast_and_cancelled_waiters_leave():
+    queue = LLMQueue(max_concurrency=1, max_waiting=2, max_waiting_per_user=1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def holder():
+            async with queue.slot("holder"):
+                await release.wait()
+
+        async def job(user_id):
+            async with queue.slot(user_id):
+                return user_id
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(job("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMQueueFull):
+            async with queue.slot("a"):
+                pass
+        cancelled = asyncio.create_task(job("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMQueueFull) as exc:
+            async with queue.slot("c"):
+                pass
+        assert exc.value.retry_after >= 1
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert queue.snapshot()["lanes"]["interactive"]["depth"] == 1
+        release.set()
+        return await waiting, first
+
+    result, _ = asyncio.run(run())
+
+    assert result == "a"
+    assert queue.snapshot()["running"] == 0
+    assert queue.snapshot()["lanes"]["interactive"]["rejected"] == 2
+
+
+def test_routes_answer_429_when_queue_full(monkeypatch):
+    async def full(*args, **kwargs):
+        raise LLMQueueFull("LLM queue is full, retry later", retry_after=7)
+
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", full)
+    client = TestClient(app)
+
+    html = client.post("/api/autochecker/html", json={"text": "Сәлем, достар!"})
+    text_check = client.post("/api/autochecker/text-check", json={"text": "Сәлем, достар!"})
+    free_writing = client.post(
+        "/api/autochecker/free-writing/check", json={"prompt": "Task", "student_answer": "Answer"}
+    )
+
+    for response in (html, text_check, free_writing):
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "7"
+
+
+def test_queue_metrics_endpoint():
+    client = TestClient(app)
+    data = client.get("/api/autochecker/queue").json()
+
+    assert set(data["lanes"]) == {"interactive", "bulk"}
+    assert {"depth", "rejected", "wait", "service"} <= set(data["lanes"]["interactive"])
+    assert "joined" in data["single_flight"]
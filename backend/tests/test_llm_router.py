@@ -0,0 +1,182 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.services import llm_breaker, llm_client as llm_client_module  # noqa: E402
+from app.services.llm_client import LLMClient  # noqa: E402
+from app.services.llm_router import LatencyRouter, Provider, StaticRouter, load_providers  # noqa: E402
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible stub that answers with its own name after ``server.latency``."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        time.sleep(self.server.latency)
+        content = json.dumps({"provider": self.server.name, "model": body["model"]})
+        data = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(llm_breaker, "_breakers", {})
+    monkeypatch.setattr(llm_client_module, "hedge_stats", {"hedged": 0, "won": 0})
+
+
+@pytest.fixture
+def stub_servers():
+    servers = []
+
+    def start(name, latency):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _ProviderHandler)
+        server.daemon_threads = True
+        server.name, server.latency, server.requests, server.status = name, latency, [], 200
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        host, port = server.server_address
+        return server, Provider(name=name, base_url=f"http://{host}:{port}/v1", model=f"{name}-model", api_key="k")
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _ask(client, prompt="json:hello"):
+    async def run():
+        try:
+            return await client.agenerate_json(prompt, max_retries=0)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_hedge_takes_the_faster_provider(stub_servers):
+    slow, slow_provider = stub_servers("slow", 1.0)
+    fast, fast_provider = stub_servers("fast", 0.0)
+    client = LLMClient(providers=[slow_provider, fast_provider], router=StaticRouter(), hedge_after=0.05)
+
+    started = time.perf_counter()
+    result = _ask(client)
+
+    assert result == {"provider": "fast", "model": "fast-model"}
+    assert time.perf_counter() - started < 0.8
+    assert len(slow.requests) == 1 and len(fast.requests) == 1
+    assert llm_client_module.hedge_stats == {"hedged": 1, "won": 1}
+
+
+def test_hedge_loser_leaves_a_censored_latency_sample(stub_servers):
+    _, slow_provider = stub_servers("slow", 1.0)
+    _, fast_provider = stub_servers("fast", 0.0)
+    client = LLMClient(providers=[slow_provider, fast_provider], router=StaticRouter(), hedge_after=0.05)
+
+    assert _ask(client)["provider"] == "fast"
+    samples = list(slow_provider.breaker._latencies)
+    assert len(samples) == 1 and 0.05 <= samples[0] < 1.0
+    assert slow_provider.breaker.stats()["failure_rate"] == 0
+
+
+def test_fast_error_fails_over_to_next_provider(stub_servers):
+    broken, broken_provider = stub_servers("broken", 0.0)
+    broken.status = 503
+    backup, backup_provider = stub_servers("backup", 0.0)
+    client = LLMClient(providers=[broken_provider, backup_provider], router=StaticRouter(), hedge_after=5)
+
+    started = time.perf_counter()
+    assert _ask(client)["provider"] == "backup"
+    assert time.perf_counter() - started < 2
+    assert len(broken.requests) == 1 and len(backup.requests) == 1
+    assert llm_client_module.hedge_stats["hedged"] == 0
+
+
+def test_no_hedge_when_primary_answers_in_time(stub_servers):
+    primary, primary_provider = stub_servers("primary", 0.0)
+    backup, backup_provider = stub_servers("backup", 0.0)
+    client = LLMClient(providers=[primary_provider, backup_provider], router=StaticRouter(), hedge_after=0.5)
+
+    assert _ask(client)["provider"] == "primary"
+    assert backup.requests == []
+    assert llm_client_module.hedge_stats["hedged"] == 0
+
+
+def test_open_circuit_routes_to_next_provider(stub_servers):
+    _, down = stub_servers("down", 0.0)
+    up, up_provider = stub_servers("up", 0.0)
+    for _ in range(down.breaker.min_calls):
+        down.breaker.record_failure("HTTP 503")
+    client = LLMClient(providers=[down, up_provider], router=StaticRouter())
+
+    assert _ask(client)["provider"] == "up"
+    assert len(up.requests) == 1
+
+
+def test_latency_router_prefers_fast_reliable_weighted_providers():
+    fast = Provider(name="fast", base_url="http://fast.test/v1", model="m")
+    slow = Provider(name="slow", base_url="http://slow.test/v1", model="m")
+    flaky = Provider(name="flaky", base_url="http://flaky.test/v1", model="m")
+    fresh = Provider(name="fresh", base_url="http://fresh.test/v1", model="m")
+    for _ in range(5):
+        fast.breaker.record_success(0.2)
+        slow.breaker.record_success(1.5)
+        flaky.breaker.record_success(0.1)
+    flaky.breaker.record_failure("HTTP 500")
+    router = LatencyRouter()
+
+    assert [p.name for p in router.order([slow, flaky, fast, fresh])] == ["fresh", "fast", "slow", "flaky"]
+    slow.weight = 10
+    assert router.order([fast, slow])[0].name == "slow"
+
+
+def test_static_router_tries_heavier_providers_first():
+    first = Provider(name="first", base_url="http://first.test/v1", model="m")
+    second = Provider(name="second", base_url="http://second.test/v1", model="m")
+    heavy = Provider(name="heavy", base_url="http://heavy.test/v1", model="m", weight=3)
+    router = StaticRouter()
+
+    assert [p.name for p in router.order([first, second, heavy])] == ["heavy", "first", "second"]
+    assert [p.name for p in LatencyRouter().order([first, heavy])] == ["heavy", "first"]
+    for _ in range(heavy.breaker.min_calls):
+        heavy.breaker.record_failure("HTTP 503")
+    assert [p.name for p in router.order([first, second, heavy])] == ["first", "second", "heavy"]
+
+
+def test_load_providers_reads_json_list(monkeypatch):
+    monkeypatch.setenv("LLM_API_KEY", "default-key")
+    monkeypatch.setenv("BACKUP_KEY", "backup-key")
+    raw = json.dumps(
+        [
+            {"name": "main", "base_url": "https://a.test/v1/", "model": "a", "weight": 2},
+            {"name": "backup", "base_url": "https://b.test/v1", "model": "b", "api_key_env": "BACKUP_KEY"},
+            {"name": "broken"},
+        ]
+    )
+
+    providers = load_providers(raw)
+
+    assert [(p.name, p.base_url, p.api_key, p.weight) for p in providers] == [
+        ("main", "https://a.test/v1", "default-key", 2.0),
+        ("backup", "https://b.test/v1", "backup-key", 1.0),
+    ]
+    assert load_providers("")[0].name == "default"
@@ -0,0 +1,118 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.core.media import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, MediaStaticFiles, is_hashed_name  # noqa: E402
+from app.services import vocabulary_service as vocab  # noqa: E402
+from app.services.tts_service import tts_key  # noqa: E402
+
+CLIP = bytes(range(256)) * 64  # 16 KiB
+
+
+@pytest.fixture
+def tts_clip():
+    path = vocab.AUDIO_DIR / f"{tts_key('кеш тесті')}.mp3"
+    path.write_bytes(CLIP)
+    yield f"/api/vocabulary/audio/{path.name}"
+    path.unlink(missing_ok=True)
+
+
+@pytest.fixture
+def uploads_client(tmp_path):
+    (tmp_path / "audio").mkdir()
+    (tmp_path / "audio" / "lesson_3f9a1c2e.mp3").write_bytes(CLIP)
+    (tmp_path / "audio" / "intro.mp3").write_bytes(CLIP)
+    (tmp_path / "audio" / f"{'ab' * 32}.mp3").write_bytes(CLIP)
+    media_app = FastAPI()
+    media_app.mount("/uploads", MediaStaticFiles(directory=str(tmp_path)), name="uploads")
+    return TestClient(media_app), tmp_path
+
+
+def test_hashed_names():
+    assert is_hashed_name(f"{tts_key('су')}.mp3")
+    assert is_hashed_name("word_1a2b3c4d.mp3")
+    assert not is_hashed_name("intro.mp3")
+    assert not is_hashed_name("lesson_20260315.mp3")
+
+
+def test_tts_audio_revalidation_sends_no_body(tts_clip):
+    client = TestClient(app)
+    first = client.get(tts_clip)
+    assert first.status_code == 200
+    assert first.content == CLIP
+    assert first.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    etag = first.headers["etag"]
+    assert etag == f'"{tts_key("кеш тесті")}"'
+
+    revalidated = client.get(tts_clip, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    saved = len(first.content) - len(revalidated.content)
+    assert saved == len(CLIP)
+
+    stale = client.get(tts_clip, headers={"If-None-Match": '"something-else"'})
+    assert stale.status_code == 200 and stale.content == CLIP
+
+
+def test_tts_audio_range_requests(tts_clip):
+    client = TestClient(app)
+    etag = client.get(tts_clip).headers["etag"]
+
+    part = client.get(tts_clip, headers={"Range": "bytes=1024-2047"})
+    assert part.status_code == 206
+    assert part.headers["content-range"] == f"bytes 1024-2047/{len(CLIP)}"
+    assert part.content == CLIP[1024:2048]
+    assert len(part.content) == len(CLIP) // 16
+
+    resumed = client.get(tts_clip, headers={"Range": "bytes=15360-", "If-Range": etag})
+    assert resumed.status_code == 206 and resumed.content == CLIP[15360:]
+
+    changed = client.get(tts_clip, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'})
+    assert changed.status_code == 200 and changed.content == CLIP
+
+    unsatisfiable = client.get(tts_clip, headers={"Range": f"bytes={len(CLIP)}-"})
+    assert unsatisfiable.status_code == 416
+
+
+def test_uploads_cache_policy_and_conditional_get(uploads_client):
+    client, root = uploads_client
+    hashed = client.get("/uploads/audio/lesson_3f9a1c2e.mp3")
+    plain = client.get("/uploads/audio/intro.mp3")
+    assert hashed.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert plain.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    # a content-addressed name is its own ETag; other files get a stat-based one
+    content_addressed = client.get(f"/uploads/audio/{'ab' * 32}.mp3")
+    assert content_addressed.headers["etag"] == f'"{"ab" * 32}"'
+    assert plain.headers["etag"].startswith('"') and plain.headers["etag"] != hashed.headers["etag"]
+
+    by_date = client.get("/uploads/audio/intro.mp3", headers={"If-Modified-Since": plain.headers["last-modified"]})
+    assert by_date.status_code == 304 and by_date.content == b""
+    same = client.get("/uploads/audio/intro.mp3", headers={"If-None-Match": plain.headers["etag"]})
+    assert same.status_code == 304
+
+    os.utime(root / "audio" / "intro.mp3", (1, 1))
+    touched = client.get("/uploads/audio/intro.mp3", headers={"If-None-Match": plain.headers["etag"]})
+    assert touched.status_code == 200
+    assert touched.headers["etag"] != plain.headers["etag"]
+
+
+def test_flashcard_flips_transfer_the_clip_once(tts_clip):
+    client = TestClient(app)
+    etag = None
+    transferred = 0
+    for _ in range(10):
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = client.get(tts_clip, headers=headers)
+        etag = resp.headers["etag"]
+        transferred += len(resp.content)
+    assert transferred == len(CLIP)
@@ -0,0 +1,158 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.core.security import build_session_token, get_password_hash  # noqa: E402
+from app.services.catalog_service import catalog_cache  # noqa: E402
+from app.services.progress_counter_service import get_course_counter, rebuild_counters  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_progress_counters.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def seed(db):
+    user = models.User(
+        email="student@example.com",
+        hashed_password=get_password_hash("secret"),
+        age=20,
+        target="",
+        daily_minutes=10,
+        level="",
+    )
+    course = models.Course(slug="c1", name="Course", description="", audience="")
+    module = models.Module(name="M1", order=1, course=course)
+    lessons = [models.Lesson(module=module, title=f"L{i}", status="published", order=i) for i in range(1, 5)]
+    db.add_all([user, course, module, *lessons])
+    db.commit()
+    return user, course, module, lessons
+
+
+def counter(db, user, course):
+    db.expire_all()
+    return (
+        db.query(models.UserCourseProgress)
+        .filter(models.UserCourseProgress.user_id == user.id, models.UserCourseProgress.course_id == course.id)
+        .one()
+    )
+
+
+def test_writes_keep_counters_in_sync(client, db_session):
+    user, course, module, lessons = seed(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+    assert client.get(f"/api/progress/course/{course.id}", headers=headers).json()["percent"] == 0
+
+    assert client.post(f"/api/lessons/{lessons[0].id}/complete", headers=headers, json={}).status_code == 200
+    assert client.post(f"/api/progress/lesson/{lessons[1].id}/finish", headers=headers).status_code == 200
+    row = counter(db_session, user, course)
+    assert (row.completed_lessons, row.total_lessons, row.percent) == (2, 4, 50)
+
+    # Soft-deleting a completed lesson shrinks both counts; archiving an open one only the total.
+    lessons[0].is_deleted = True
+    lessons[2].status = "archived"
+    db_session.commit()
+    row = counter(db_session, user, course)
+    assert (row.completed_lessons, row.total_lessons, row.percent) == (1, 2, 50)
+
+    lessons[2].status = "published"
+    db_session.add(models.Lesson(module_id=module.id, title="L5", status="published", order=5))
+    db_session.commit()
+    payload = client.get(f"/api/progress/course/{course.id}", headers=headers).json()
+    assert (payload["completed_lessons"], payload["total_lessons"], payload["percent"]) == (1, 4, 25)
+    assert payload["modules"] == [{"module_id": module.id, "percent": 25, "completed_lessons": 1, "total_lessons": 4}]
+
+
+def test_rebuild_repairs_drift(db_session):
+    user, course, _, lessons = seed(db_session)
+    db_session.add(models.UserProgress(user_id=user.id, lesson_id=lessons[0].id, status="done"))
+    db_session.commit()
+    row = counter(db_session, user, course)
+    row.completed_lessons, row.percent = 3, 75
+    db_session.commit()
+
+    stats = rebuild_counters(db_session)
+    assert stats["updated"] == 1
+    row = counter(db_session, user, course)
+    assert (row.completed_lessons, row.total_lessons, row.percent) == (1, 4, 25)
+    assert rebuild_counters(db_session)["updated"] == 0
+
+
+def test_orm_completions_increment_in_sql(db_session):
+    user, course, _, lessons = seed(db_session)
+    db_session.add(models.UserProgress(user_id=user.id, lesson_id=lessons[0].id, status="done"))
+    db_session.commit()
+    assert counter(db_session, user, course).completed_lessons == 1
+
+    # Another writer counts a completion after this session loaded the row.
+    other = TestingSessionLocal()
+    other.add(models.UserProgress(user_id=user.id, lesson_id=lessons[1].id, status="done"))
+    other.commit()
+    other.close()
+
+    db_session.add(models.UserProgress(user_id=user.id, lesson_id=lessons[2].id, status="done"))
+    db_session.commit()
+    row = counter(db_session, user, course)
+    assert (row.completed_lessons, row.total_lessons, row.percent) == (3, 4, 75)
+
+
+def test_module_move_shifts_both_courses(db_session):
+    user, course, module, lessons = seed(db_session)
+    target = models.Course(slug="c2", name="Course 2", description="", audience="")
+    other_module = models.Module(name="M2", order=1, course=target)
+    db_session.add_all([target, other_module, models.Lesson(module=other_module, title="T1", status="published", order=1)])
+    db_session.add(models.UserProgress(user_id=user.id, lesson_id=lessons[0].id, status="done"))
+    db_session.commit()
+    assert get_course_counter(db_session, user.id, target.id).total_lessons == 1
+    db_session.commit()
+
+    module.course_id = target.id
+    db_session.commit()
+    source_row, target_row = counter(db_session, user, course), counter(db_session, user, target)
+    assert (source_row.completed_lessons, source_row.total_lessons, source_row.percent) == (0, 0, 0)
+    assert (target_row.completed_lessons, target_row.total_lessons, target_row.percent) == (1, 5, 20)
+    assert rebuild_counters(db_session)["updated"] == 0
@@ -0,0 +1,283 @@
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.core.security import AUTH_COOKIE_NAME, build_session_token, get_password_hash  # noqa: E402
+from app.services import progress_ledger  # noqa: E402
+from app.services.catalog_service import catalog_cache  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_progress_ledger.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def seed(db):
+    user = models.User(
+        email="student@example.com",
+        hashed_password=get_password_hash("secret"),
+        age=20,
+        target="",
+        daily_minutes=10,
+        level="",
+    )
+    course = models.Course(slug="c1", name="Course", description="", audience="")
+    module = models.Module(name="M1", order=1, course=course)
+    lesson = models.Lesson(module=module, title="L1", status="published", order=1)
+    db.add_all([user, course, module, lesson])
+    db.flush()
+    blocks = [
+        models.LessonBlock(lesson_id=lesson.id, block_type="theory", content={"rich_text": "Сәлем"}, order=1),
+        models.LessonBlock(lesson_id=lesson.id, block_type="flashcards", content={"cards": []}, order=2),
+    ]
+    db.add_all(blocks)
+    db.commit()
+    return user, lesson, blocks
+
+
+def ledger(db, user, event_type=None):
+    db.expire_all()
+    query = db.query(models.ProgressEvent).filter(models.ProgressEvent.user_id == user.id)
+    if event_type:
+        query = query.filter(models.ProgressEvent.event_type == event_type)
+    return query.order_by(models.ProgressEvent.id).all()
+
+
+def lesson_status(db, user, lesson):
+    db.expire_all()
+    return (
+        db.query(models.UserProgress)
+        .filter(models.UserProgress.user_id == user.id, models.UserProgress.lesson_id == lesson.id)
+        .one()
+        .status
+    )
+
+
+def test_every_write_path_appends_one_row(client, db_session):
+    user, lesson, blocks = seed(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+    calls = [
+        ("post", f"/api/progress/lesson/{lesson.id}/start", None),
+        ("post", f"/api/progress/lesson/{lesson.id}/block-finished", {"block_index": 0}),
+        ("post", "/api/progress/flashcards", {"lesson_id": lesson.id, "card_id": 1, "correct": True}),
+        ("post", "/api/progress/block-finished", {"lesson_id": lesson.id, "block_id": blocks[0].id}),
+        ("post", f"/api/lessons/{lesson.id}/progress", {"time_spent": 30}),
+        ("post", f"/api/lessons/{lesson.id}/complete", {}),
+        ("post", f"/api/progress/lesson/{lesson.id}/finish", None),
+    ]
+    for method, path, body in calls:
+        resp = getattr(client, method)(path, headers=headers, json=body)
+        assert resp.status_code == 200, (path, resp.text)
+
+    assert [e.event_type for e in ledger(db_session, user)] == [
+        "lesson_started",
+        "lesson_step_finished",
+        "lesson_progress",
+        "lesson_completed",
+        "lesson_finished",
+    ]
+    lp = (
+        db_session.query(models.LessonProgress)
+        .filter(models.LessonProgress.user_id == user.id, models.LessonProgress.lesson_id == lesson.id)
+        .one()
+    )
+    assert lp.details is None
+    assert lp.time_spent == 30
+    assert (lp.flashcards_total, lp.flashcards_correct, lp.blocks_completed) == (1, 1, 1)
+    assert db_session.query(models.FlashcardAttempt).count() == 1
+    assert db_session.query(models.BlockAttempt).count() == 1
+
+
+def test_projections_are_derived_from_the_ledger(client, db_session):
+    user, lesson, blocks = seed(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+    assert client.get(f"/api/progress/lesson/{lesson.id}", headers=headers).json()["status"] == "not_started"
+    for idx in (0, 1, 1):
+        state = client.post(
+            f"/api/progress/lesson/{lesson.id}/block-finished", headers=headers, json={"block_index": idx}
+        ).json()
+    assert state == {"status": "in_progress", "completed_blocks": [0, 1]}
+    rejected = client.post(
+        f"/api/progress/lesson/{lesson.id}/block-finished", headers=headers, json={"block_index": "intro"}
+    )
+    assert rejected.status_code == 400
+
+    for card_id, correct in ((1, False), (2, True), (1, True)):
+        summary = client.post(
+            "/api/progress/flashcards",
+            headers=headers,
+            json={"lesson_id": lesson.id, "card_id": card_id, "correct": correct},
+        ).json()["summary"]
+    assert summary == {"total": 2, "correct": 2}
+
+    first = client.post(
+        "/api/progress/block-finished", headers=headers, json={"lesson_id": lesson.id, "block_id": blocks[0].id}
+    ).json()
+    assert first["blocks_completed"] == 1
+    assert lesson_status(db_session, user, lesson) == "in_progress"
+
+    last = client.post(
+        "/api/progress/block-finished", headers=headers, json={"lesson_id": lesson.id, "block_id": blocks[1].id}
+    ).json()
+    assert last["blocks_completed"] == 2
+    assert lesson_status(db_session, user, lesson) == "done"
+
+
+def test_attempts_are_rows_not_json(client, db_session):
+    user, lesson, blocks = seed(db_session)
+    audio = models.LessonBlock(
+        lesson_id=lesson.id,
+        block_type="audio_task",
+        content={"audio_url": "/a.mp3", "correct_answer": "сәлем", "options": ["сәлем", "рақмет"]},
+        order=3,
+    )
+    db_session.add(audio)
+    db_session.add(models.UserLessonProgress(user_id=user.id, lesson_id=lesson.id, status="in_progress", completed_blocks=[0]))
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+    for option in (1, 0):
+        client.post("/api/audio-task/submit", headers=headers, json={"block_id": audio.id, "selected_option": option})
+    attempts = db_session.query(models.AudioTaskAttempt).order_by(models.AudioTaskAttempt.id).all()
+    assert [(a.block_id, a.correct) for a in attempts] == [(audio.id, False), (audio.id, True)]
+
+    # Step indexes stored before the ledger existed are still reported.
+    state = client.post(
+        f"/api/progress/lesson/{lesson.id}/block-finished", headers=headers, json={"block_index": 1}
+    ).json()
+    assert state["completed_blocks"] == [0, 1]
+
+    for block in (blocks[0], blocks[0]):
+        resp = client.post(
+            "/api/progress/block-finished", headers=headers, json={"lesson_id": lesson.id, "block_id": block.id}
+        ).json()
+    assert resp["blocks_completed"] == 1
+    assert db_session.query(models.BlockAttempt).count() == 2
+
+
+def test_batch_applies_everything_in_one_request(client, db_session):
+    user, lesson, blocks = seed(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+    url = f"/api/progress/lesson/{lesson.id}/batch"
+
+    resp = client.post(
+        url,
+        headers=headers,
+        json={
+            "blocks": [{"block_id": blocks[0].id, "time_spent": 5}],
+            "flashcards": [{"card_id": 1, "correct": False}, {"card_id": 2, "correct": True}, {"card_id": 1, "correct": True}],
+            "steps": [0],
+            "time_spent": 20,
+        },
+    )
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == {
+        "ok": True,
+        "status": "in_progress",
+        "time_spent": 20,
+        "blocks_completed": 1,
+        "flashcards": {"total": 2, "correct": 2},
+        "completed_blocks": [0],
+    }
+
+    # sendBeacon: JSON Blob, no Authorization header, authenticated by the session cookie.
+    beacon = json.dumps({"blocks": [{"block_id": blocks[1].id}], "steps": [1]})
+    client.cookies.set(AUTH_COOKIE_NAME, build_session_token(user.id))
+    resp = client.post(url, content=beacon, headers={"Content-Type": "application/json"})
+    client.cookies.clear()
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert (body["status"], body["blocks_completed"], body["completed_blocks"]) == ("done", 2, [0, 1])
+    assert lesson_status(db_session, user, lesson) == "done"
+
+
+def test_batch_rejects_anonymous_and_malformed(client, db_session):
+    user, lesson, blocks = seed(db_session)
+    url = f"/api/progress/lesson/{lesson.id}/batch"
+    assert client.post(url, json={"blocks": []}).status_code == 401
+    # A session token in the body is not a credential.
+    assert client.post(url, json={"token": build_session_token(user.id), "blocks": []}).status_code == 401
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+    plain = json.dumps({"blocks": [{"block_id": blocks[0].id}]})
+    assert client.post(url, headers={**headers, "Content-Type": "text/plain"}, content=plain).status_code == 422
+    assert client.post(url, headers={**headers, "Content-Type": "application/json"}, content="not json").status_code == 422
+    assert client.post(url, headers=headers, json={"blocks": [{"status": "done"}]}).status_code == 400
+    bad_time = {"blocks": [{"block_id": blocks[0].id, "time_spent": "abc"}]}
+    assert client.post(url, headers=headers, json=bad_time).status_code == 400
+    assert db_session.query(models.BlockAttempt).count() == 0
+
+    negative = {"blocks": [{"block_id": blocks[0].id, "time_spent": -30}], "time_spent": -5}
+    assert client.post(url, headers=headers, json=negative).status_code == 200
+    assert [a.time_spent for a in db_session.query(models.BlockAttempt)] == [0]
+
+
+def test_status_cas_stops_on_missing_row_and_is_capped(db_session, monkeypatch):
+    user, lesson, _ = seed(db_session)
+    entry = progress_ledger._touch_progress(db_session, user.id, lesson.id)
+    db_session.commit()
+
+    gone = SimpleNamespace(id=entry.id + 1000, status="in_progress")
+    assert progress_ledger._set_status(db_session, user.id, lesson.id, gone, "done") is None
+
+    # Another writer flips the status between every compare-and-set.
+    calls = []
+    real_execute = db_session.execute
+
+    def execute(statement, *args, **kwargs):
+        if statement.is_update:
+            calls.append(statement)
+            real_execute(update(models.UserProgress).values(status=f"other-{len(calls)}"))
+        return real_execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", execute)
+    stale = SimpleNamespace(id=entry.id, status="stale")
+    with pytest.raises(progress_ledger.ProgressConflict):
+        progress_ledger._set_status(db_session, user.id, lesson.id, stale, "done")
+    assert len(calls) == progress_ledger.STATUS_CAS_ATTEMPTS
@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.core.security import build_session_token, get_password_hash  # noqa: E402
+from app.services.catalog_service import catalog_cache  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_progress_upsert.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    catalog_cache.clear()
+    yield
+    catalog_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client():
+    # A fresh session per request, like production, so parallel requests really race.
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+def seed():
+    db = TestingSessionLocal()
+    user = models.User(
+        email="student@example.com",
+        hashed_password=get_password_hash("secret"),
+        age=20,
+        target="",
+        daily_minutes=10,
+        level="",
+    )
+    course = models.Course(slug="c1", name="Course", description="", audience="")
+    module = models.Module(name="M1", order=1, course=course)
+    lessons = [models.Lesson(module=module, title=f"L{i}", status="published", order=i) for i in (1, 2)]
+    db.add_all([user, course, module, *lessons])
+    db.commit()
+    ids = user.id, course.id, [lesson.id for lesson in lessons]
+    db.close()
+    return ids
+
+
+def fire(client, calls, workers=8):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda call: client.post(call[0], headers=call[1], json=call[2]), calls))
+
+
+def test_parallel_completions_for_same_lesson(client):
+    user_id, course_id, lesson_ids = seed()
+    headers = {"Authorization": f"Bearer {build_session_token(user_id)}"}
+    lesson_id = lesson_ids[0]
+    calls = [(f"/api/lessons/{lesson_id}/complete", headers, {"time_spent": 5})] * 8
+    calls += [(f"/api/lessons/{lesson_id}/progress", headers, {"time_spent": 1})] * 8
+
+    responses = fire(client, calls)
+    assert [r.status_code for r in responses] == [200] * len(calls), [r.text for r in responses if r.status_code != 200]
+
+    db = TestingSessionLocal()
+    rows = db.query(models.UserProgress).filter_by(user_id=user_id, lesson_id=lesson_id).all()
+    assert len(rows) == 1
+    assert (rows[0].status, rows[0].time_spent) == ("done", 8 * 5 + 8)
+    lp = db.query(models.LessonProgress).filter_by(user_id=user_id, lesson_id=lesson_id).one()
+    assert (lp.completed, lp.time_spent) == (True, 8 * 5 + 8)
+    counter = db.query(models.UserCourseProgress).filter_by(user_id=user_id, course_id=course_id).one()
+    assert (counter.completed_lessons, counter.total_lessons, counter.percent) == (1, 2, 50)
+    db.close()
+
+
+def test_parallel_block_batches_and_lesson_player(client):
+    user_id, course_id, lesson_ids = seed()
+    headers = {"Authorization": f"Bearer {build_session_token(user_id)}"}
+    lesson_id = lesson_ids[1]
+    calls = [
+        (
+            f"/api/progress/lesson/{lesson_id}/batch",
+            headers,
+            {
+                "blocks": [{"block_id": f"b{n % 2}", "time_spent": 2}],
+                "flashcards": [{"card_id": n % 3, "correct": True}],
+                "time_spent": 3,
+            },
+        )
+        for n in range(6)
+    ]
+    calls += [(f"/api/progress/lesson/{lesson_id}/start", headers, None)] * 4
+    calls += [(f"/api/progress/lesson/{lesson_id}/finish", headers, None)] * 4
+
+    responses = fire(client, calls)
+    assert [r.status_code for r in responses] == [200] * len(calls), [r.text for r in responses if r.status_code != 200]
+
+    db = TestingSessionLocal()
+    assert db.query(models.UserLessonProgress).filter_by(user_id=user_id, lesson_id=lesson_id).one().status == "finished"
+    up = db.query(models.UserProgress).filter_by(user_id=user_id, lesson_id=lesson_id).one()
+    assert (up.status, up.time_spent) == ("done", 6 * 3)
+    lp = db.query(models.LessonProgress).filter_by(user_id=user_id, lesson_id=lesson_id).one()
+    assert db.query(models.FlashcardAttempt).count() == 6
+    # Three distinct cards, the latest answer for each correct.
+    assert (lp.flashcards_total, lp.flashcards_correct) == (3, 3)
+    assert (lp.blocks_completed, lp.time_spent) == (2, 6 * 3 + 6 * 2)
+    completions = db.query(models.BlockCompletion).filter_by(user_id=user_id, lesson_id=lesson_id).all()
+    assert sorted(row.block_id for row in completions) == ["b0", "b1"]
+    counter = db.query(models.UserCourseProgress).filter_by(user_id=user_id, course_id=course_id).one()
+    assert counter.completed_lessons == 1
+    db.close()
+
+
+def test_parallel_batches_count_each_block_once(client):
+    user_id, _, lesson_ids = seed()
+    headers = {"Authorization": f"Bearer {build_session_token(user_id)}"}
+    lesson_id = lesson_ids[0]
+    calls = [
+        (f"/api/progress/lesson/{lesson_id}/batch", headers, {"blocks": [{"block_id": "b1"}, {"block_id": f"b{n % 2 + 2}"}]})
+        for n in range(8)
+    ]
+
+    responses = fire(client, calls)
+    assert [r.status_code for r in responses] == [200] * len(calls), [r.text for r in responses if r.status_code != 200]
+
+    db = TestingSessionLocal()
+    assert db.query(models.BlockAttempt).count() == 16
+    assert db.query(models.BlockCompletion).count() == 3
+    lp = db.query(models.LessonProgress).filter_by(user_id=user_id, lesson_id=lesson_id).one()
+    assert lp.blocks_completed == 3
+    db.close()
@@ -20,6 +20,7 @@ from app.db import models
 from app.db.session import get_db
 from app.core.security import get_password_hash
 from app.core.config import get_settings
+from app.api.routes import pronunciation as pronunciation_routes
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_pronunciation.db"
@@ -139,3 +140,33 @@ def test_pronunciation_check_persists_result(client, db_session, tmp_path):
     settings = get_settings()
     audio_path = Path(settings.upload_root) / "pronunciation" / Path(data["audio_url"]).name
     assert audio_path.exists() is True
+
+
+def test_pronunciation_check_sanitizes_extension_and_rejects_large_bodies(client, db_session, monkeypatch):
+    user = create_user(db_session)
+    course = create_course(db_session)
+    word = create_word(db_session, user.id, course.id)
+    headers = {"Authorization": f"Bearer {auth_token(client)}"}
+
+    resp = client.post(
+        "/api/pronunciation/check",
+        headers=headers,
+        files={"audio": ("rec./deep/nested/dir", b"fake audio data", "audio/wav")},
+        data={"word_id": str(word.id)},
+    )
+    assert resp.status_code == 200
+    stored = Path(get_settings().upload_root) / "pronunciation" / Path(resp.json()["audio_url"]).name
+    assert stored.suffix == ".wav" and stored.exists()
+
+    async def never_parsed(*args, **kwargs):
+        raise AssertionError("the form should not be parsed")
+
+    monkeypatch.setattr(get_settings(), "upload_max_audio_mb", 0)
+    monkeypatch.setattr(pronunciation_routes, "stream_to_disk", never_parsed)
+    too_large = client.post(
+        "/api/pronunciation/check",
+        headers=headers,
+        files={"audio": ("big.wav", b"\0" * (128 * 1024), "audio/wav")},
+        data={"word_id": str(word.id)},
+    )
+    assert too_large.status_code == 413
@@ -46,7 +46,7 @@ def _issues(count: int):
 def test_kazakh_input_returns_kazakh(monkeypatch, client):
     prompts: list[str] = []
 
-    def fake_generate_json(prompt: str, *args, **kwargs):
+    async def fake_generate_json(prompt: str, *args, **kwargs):
         prompts.append(prompt)
         return {
             "language": "kk",
@@ -57,7 +57,7 @@ def test_kazakh_input_returns_kazakh(monkeypatch, client):
             "corrected_text": "Сәлем, бұл тест.",
         }
 
-    monkeypatch.setattr(autochecker.llm_client, "generate_json", fake_generate_json)
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
     monkeypatch.setattr(autochecker.llm_client, "is_configured", lambda: True)
 
     resp = client.post("/api/autochecker/text-check", json={"text": "Сәлем, бұл тест.", "language": "kk", "level": "A1"})
@@ -72,7 +72,7 @@ def test_kazakh_input_returns_kazakh(monkeypatch, client):
 def test_ru_language_overrides_to_kazakh(monkeypatch, client):
     prompts: list[str] = []
 
-    def fake_generate_json(prompt: str, *args, **kwargs):
+    async def fake_generate_json(prompt: str, *args, **kwargs):
         prompts.append(prompt)
         return {
             "language": "kk",
@@ -83,7 +83,7 @@ def test_ru_language_overrides_to_kazakh(monkeypatch, client):
             "corrected_text": "Мен қазақ тілінде жазамын.",
         }
 
-    monkeypatch.setattr(autochecker.llm_client, "generate_json", fake_generate_json)
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
     monkeypatch.setattr(autochecker.llm_client, "is_configured", lambda: True)
 
     resp = client.post("/api/autochecker/text-check", json={"text": "Мен қазақ тілінде жазамын.", "language": "ru", "level": "A1"})
@@ -116,11 +116,11 @@ def test_level_controls_issue_cap(monkeypatch, client):
         },
     ]
 
-    def fake_generate_json(prompt: str, *args, **kwargs):
+    async def fake_generate_json(prompt: str, *args, **kwargs):
         prompts.append(prompt)
         return payloads.pop(0)
 
-    monkeypatch.setattr(autochecker.llm_client, "generate_json", fake_generate_json)
+    monkeypatch.setattr(autochecker.llm_client, "agenerate_json", fake_generate_json)
     monkeypatch.setattr(autochecker.llm_client, "is_configured", lambda: True)
 
     resp_a1 = client.post("/api/autochecker/text-check", json={"text": "Сәлем, мәтін.", "language": "kk", "level": "A1"})
@@ -0,0 +1,139 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.services.tts_service import TTSStore, tts_key  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_tts.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class FakeSynthesizer:
+    def __init__(self, delay: float = 0.0, size: int = 100):
+        self.delay = delay
+        self.size = size
+        self.calls: list[str] = []
+
+    def __call__(self, text: str, lang: str, voice: str) -> bytes:
+        self.calls.append(text)
+        time.sleep(self.delay)
+        return b"\xff" * self.size
+
+
+def test_same_word_is_synthesized_once(tmp_path, db_session):
+    synth = FakeSynthesizer()
+    store = TTSStore(tmp_path, synthesizer=synth, session_factory=TestingSessionLocal)
+
+    first = store.get_or_create(db_session, "Сәлем")
+    second = store.get_or_create(db_session, "  сәлем ")
+
+    assert first == second == f"/api/vocabulary/audio/{tts_key('сәлем')}.mp3"
+    assert synth.calls == ["Сәлем"]
+    assert (tmp_path / f"{tts_key('сәлем')}.mp3").read_bytes() == b"\xff" * 100
+    row = db_session.get(models.TTSAudio, tts_key("сәлем"))
+    assert row.hits == 1 and row.size_bytes == 100  # the hit is not written on the request path
+    assert store.stats["hits"] == 1 and store.stats["misses"] == 1
+
+    assert store.flush_usage(db_session) == 1
+    db_session.refresh(row)
+    assert row.hits == 2
+
+
+def test_concurrent_requests_share_one_synthesis(tmp_path):
+    synth = FakeSynthesizer(delay=0.2)
+    store = TTSStore(tmp_path, synthesizer=synth, session_factory=TestingSessionLocal)
+    urls = []
+
+    def request():
+        db = TestingSessionLocal()
+        try:
+            urls.append(store.get_or_create(db, "Кітап"))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(synth.calls) == 1
+    assert len(set(urls)) == 1 and len(urls) == 5
+    assert store.stats["joined"] == 4
+
+
+def test_eviction_keeps_clips_referenced_by_lessons(tmp_path, db_session):
+    course = models.Course(slug="c", name="Course", description="", audience="")
+    module = models.Module(name="M1", description="", order=1, course=course)
+    lesson = models.Lesson(module=module, title="L", status="published", order=1, language="kk", blocks_order=[])
+    block = models.LessonBlock(lesson=lesson, block_type="flashcards", content={"cards": [{"word": "Су"}]}, order=1)
+    db_session.add_all([course, module, lesson, block])
+    db_session.commit()
+
+    store = TTSStore(
+        tmp_path, synthesizer=FakeSynthesizer(size=100), max_bytes=250, session_factory=TestingSessionLocal
+    )
+    store.get_or_create(db_session, "Су")
+    store.get_or_create(db_session, "Жел")
+    store.get_or_create(db_session, "Ай")
+    store.get_or_create(db_session, "Күн")
+    assert db_session.query(models.TTSAudio).count() == 4  # nothing evicted on the request path
+
+    assert store.maintain(db_session) == 2
+    remaining = {row.text for row in db_session.query(models.TTSAudio).all()}
+    assert remaining == {"су", "күн"}
+    assert db_session.get(models.TTSAudio, tts_key("су")).pinned
+    assert not (tmp_path / f"{tts_key('жел')}.mp3").exists()
+    assert (tmp_path / f"{tts_key('су')}.mp3").exists()
+    assert store.snapshot(db_session)["bytes"] <= 250
+
+
+def test_maintenance_runs_in_background_at_most_once_per_interval(tmp_path, db_session):
+    store = TTSStore(
+        tmp_path,
+        synthesizer=FakeSynthesizer(size=100),
+        max_bytes=150,
+        session_factory=TestingSessionLocal,
+        maintenance_seconds=0,
+    )
+    store.get_or_create(db_session, "Су")
+    store.get_or_create(db_session, "Жел")
+    store._maintenance_thread.join(timeout=5)
+
+    assert db_session.query(models.TTSAudio).count() == 1
+    assert store.stats["evicted"] == 1
+
+    store.maintenance_seconds = 3600
+    store.get_or_create(db_session, "Ай")
+    store._maintenance_thread.join(timeout=5)
+    assert db_session.query(models.TTSAudio).count() == 2
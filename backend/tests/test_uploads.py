@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import io
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.api import deps  # noqa: E402
+from app.core.config import get_settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.api.routes import upload as upload_routes  # noqa: E402
+from app.services import storage_service  # noqa: E402
+from app.services.media_service import collect_garbage  # noqa: E402
+from app.services.storage_service import stream_to_disk  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_uploads.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def upload_root(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upload_root", str(tmp_path))
+    monkeypatch.setattr(settings, "cdn_base_url", "/uploads")
+    app.dependency_overrides[deps.require_admin] = lambda: object()
+    yield tmp_path
+    app.dependency_overrides.pop(deps.require_admin, None)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def _files(root: Path) -> list[Path]:
+    return sorted(p for p in root.rglob("*") if p.is_file())
+
+
+def test_upload_is_stored_by_content_hash(client, upload_root, monkeypatch):
+    monkeypatch.setattr(storage_service, "UPLOAD_CHUNK_SIZE", 1024)
+    data = bytes(range(256)) * 40
+    sha = hashlib.sha256(data).hexdigest()
+    resp = client.post("/api/upload/image", files={"file": ("Сурет 1.PNG", data, "image/png")})
+
+    assert resp.status_code == 200
+    assert resp.json() == {"url": f"/uploads/image/{sha[:2]}/{sha}.png", "filename": f"{sha}.png"}
+    assert _files(upload_root) == [upload_root / "image" / sha[:2] / f"{sha}.png"]
+    assert _files(upload_root)[0].read_bytes() == data
+
+
+def test_duplicate_uploads_return_the_existing_object(client, upload_root, db_session):
+    data = b"mascot" * 500
+    first = client.post("/api/upload/image", files={"file": ("mascot.png", data, "image/png")}).json()
+    again = client.post("/api/upload/image", files={"file": ("mascot-copy.png", data, "image/png")}).json()
+    admin = client.post("/api/admin/upload", files={"file": ("m.png", data, "image/png")}).json()
+
+    assert first["url"] == again["url"] == admin["url"]
+    assert len(_files(upload_root)) == 1
+    assert db_session.query(models.MediaObject).count() == 1
+
+
+def test_garbage_collector_keeps_referenced_objects(client, upload_root, db_session):
+    used = client.post("/api/upload/audio", files={"file": ("used.mp3", b"used" * 100, "audio/mpeg")}).json()["url"]
+    card = client.post("/api/upload/image", files={"file": ("card.png", b"card" * 100, "image/png")}).json()["url"]
+    orphan = client.post("/api/upload/image", files={"file": ("old.png", b"old" * 100, "image/png")}).json()["url"]
+
+    course = models.Course(slug="c", name="Course", description="", audience="")
+    module = models.Module(name="M1", description="", order=1, course=course)
+    lesson = models.Lesson(module=module, title="L", status="draft", order=1, language="kk", blocks_order=[])
+    db_session.add_all([course, module, lesson])
+    db_session.commit()
+    db_session.add_all(
+        [
+            models.LessonBlock(lesson_id=lesson.id, block_type="audio", content={}, data={"audio_url": used}, order=1),
+            models.LessonBlock(lesson_id=lesson.id, block_type="theory", content={"markdown": f"![x](https://cdn.test{used})"}, order=2),
+            models.Flashcard(lesson_id=lesson.id, front="Су", back="Вода", image_url=card),
+        ]
+    )
+    db_session.commit()
+
+    assert collect_garbage(db_session)["removed"] == 0  # the orphan is still within the grace period
+    report = collect_garbage(db_session, grace_hours=0)
+
+    assert report["removed"] == 1 and report["urls"] == [orphan]
+    counts = {obj.url: obj.ref_count for obj in db_session.query(models.MediaObject).all()}
+    assert counts == {used: 2, card: 1}
+    assert not (upload_root / orphan.removeprefix("/uploads/")).exists()
+    assert (upload_root / used.removeprefix("/uploads/")).exists()
+
+
+def test_garbage_collector_scans_every_text_column(client, upload_root, db_session):
+    photo = client.post("/api/upload/image", files={"file": ("me.png", b"me" * 100, "image/png")}).json()["url"]
+    cover = client.post("/api/upload/image", files={"file": ("c.png", b"cover" * 100, "image/png")}).json()["url"]
+    user = models.User(
+        email="u@example.com", hashed_password="x", age=20, target="", daily_minutes=10, level="", photo_url=photo
+    )
+    course = models.Course(slug="c", name="Course", description=f"<img src='{cover}'>", audience="")
+    db_session.add_all([user, course])
+    db_session.commit()
+
+    report = collect_garbage(db_session, grace_hours=0)
+
+    assert report["removed"] == 0 and report["referenced"] == 2
+
+
+def test_reupload_restarts_the_grace_period(client, upload_root, db_session):
+    data = b"draft" * 100
+    url = client.post("/api/upload/image", files={"file": ("d.png", data, "image/png")}).json()["url"]
+    obj = db_session.query(models.MediaObject).one()
+    obj.created_at = obj.last_uploaded_at = datetime.utcnow() - timedelta(days=2)
+    db_session.commit()
+
+    again = client.post("/api/upload/image", files={"file": ("d2.png", data, "image/png")}).json()
+    assert again["url"] == url
+
+    assert collect_garbage(db_session, grace_hours=24)["removed"] == 0
+    db_session.refresh(obj)
+    assert obj.last_uploaded_at > datetime.utcnow() - timedelta(hours=1)
+
+
+def test_oversized_audio_is_rejected_without_leftovers(client, upload_root, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_max_audio_mb", 1)
+    resp = client.post(
+        "/api/upload/audio", files={"file": ("long.mp3", b"\x00" * (1024 * 1024 + 1), "audio/mpeg")}
+    )
+
+    assert resp.status_code == 413
+    assert _files(upload_root) == []
+
+
+
+def test_declared_length_is_checked_against_the_route_limit(client, upload_root, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upload_max_image_mb", 0)
+    monkeypatch.setattr(settings, "upload_max_file_mb", 1)
+    store = upload_routes.store_upload
+
+    async def never_parsed(*args, **kwargs):
+        raise AssertionError("the form should not be parsed")
+
+    monkeypatch.setattr(upload_routes, "store_upload", never_parsed)
+    body = b"\x89PNG" + b"\x00" * (128 * 1024)
+    resp = client.post("/api/upload/image", files={"file": ("big.png", body, "image/png")})
+    assert resp.status_code == 413
+
+    monkeypatch.setattr(upload_routes, "store_upload", store)
+    resp = client.post("/api/admin/upload", files={"file": ("big.png", body, "image/png")})
+    assert resp.status_code == 200
+    assert len(_files(upload_root)) == 1
+
+def test_stream_aborts_once_limit_is_crossed(upload_root, monkeypatch):
+    monkeypatch.setattr(storage_service, "UPLOAD_CHUNK_SIZE", 64 * 1024)
+    source = io.BytesIO(b"\x01" * (3 * 1024 * 1024))
+    upload = UploadFile(file=source, filename="big.bin")  # size unknown: limit enforced while copying
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(stream_to_disk(upload, "video", "big.bin", max_mb=1))
+
+    assert exc.value.status_code == 413
+    assert source.tell() <= 1024 * 1024 + 64 * 1024
+    assert list((upload_root / "video").iterdir()) == []
+
+
+def test_stream_reports_size_and_sha256(upload_root):
+    data = b"dedup me" * 1000
+    stored = asyncio.run(stream_to_disk(UploadFile(file=io.BytesIO(data), filename="a.bin"), "audio", "a.bin", max_mb=1))
+
+    assert stored["size"] == len(data)
+    assert stored["sha256"] == hashlib.sha256(data).hexdigest()
+    assert stored["url"] == "/uploads/audio/a.bin"
@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.main import app  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.session import get_db  # noqa: E402
+from app.core.security import build_session_token, get_password_hash  # noqa: E402
+from app.core.user_cache import UserCache, user_cache  # noqa: E402
+
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_user_cache.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def setup_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+    yield
+    user_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def client(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            pass
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def create_user(db, email="user@example.com", role="user"):
+    user = models.User(
+        email=email,
+        hashed_password=get_password_hash("secret"),
+        age=20,
+        target="",
+        daily_minutes=10,
+        level="",
+        role=role,
+    )
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def test_cache_returns_detached_copies(db_session):
+    user = create_user(db_session)
+    cache = UserCache(max_entries=2, ttl_seconds=60)
+    cache.put("t1", user)
+
+    first = cache.get("t1")
+    second = cache.get("t1")
+    assert first is not second
+    assert first.id == user.id and first.email == user.email
+
+    cache.put("t2", user)
+    cache.put("t3", user)
+    assert cache.get("t1") is None  # evicted (LRU, max 2)
+
+    cache.invalidate_user(user.id)
+    assert cache.get("t2") is None and cache.get("t3") is None
+
+
+def test_update_me_invalidates_cached_user(client, db_session):
+    user = create_user(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+    assert client.get("/api/auth/me", headers=headers).json()["full_name"] == "user"
+    assert len(user_cache) == 1
+
+    resp = client.put("/api/users/me", headers=headers, json={"name": "Aigerim"})
+    assert resp.status_code == 200
+    assert client.get("/api/auth/me", headers=headers).json()["full_name"] == "Aigerim"
+
+
+def test_role_change_invalidates_cached_user(client, db_session):
+    user = create_user(db_session)
+    headers = {"Authorization": f"Bearer {build_session_token(user.id)}"}
+
+    assert client.get("/api/auth/me", headers=headers).json()["is_admin"] is False
+
+    user.role = "admin"
+    db_session.commit()
+
+    assert client.get("/api/auth/me", headers=headers).json()["is_admin"] is True
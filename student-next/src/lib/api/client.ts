@@ -19,7 +19,7 @@ const resolveApiBase = (): string => {
   return normalized.endsWith("/api") ? normalized : `${normalized}/api`;
 };
 
-const apiBase = resolveApiBase();
+export const apiBase = resolveApiBase();
 
 export const setTokenProvider = (provider: TokenProvider) => {
   tokenProvider = provider;
@@ -1,10 +1,43 @@
-import client from "./client";
+import client, { apiBase } from "./client";
+
+export type ProgressBatch = {
+  blocks?: { block_id: number | string; status?: string; time_spent?: number }[];
+  flashcards?: { card_id: number | string; correct: boolean }[];
+  steps?: number[];
+  time_spent?: number;
+};
 
 export const progressApi = {
   async blockFinished(payload: { lesson_id: number | string; block_id: number | string; status?: string; time_spent?: number }) {
     const { data } = await client.post("/progress/block-finished", payload);
     return data;
   },
+
+  async batch(lessonId: number | string, payload: ProgressBatch) {
+    const { data } = await client.post(`/progress/lesson/${lessonId}/batch`, payload);
+    return data;
+  },
+
+  // Fire-and-forget flush for pagehide/unload: beacons cannot carry an Authorization header,
+  // so the request is authenticated by the httpOnly session cookie.
+  beacon(lessonId: number | string, payload: ProgressBatch): boolean {
+    const url = `${apiBase}/progress/lesson/${lessonId}/batch`;
+    const body = JSON.stringify(payload);
+    if (typeof navigator !== "undefined" && typeof navigator.sendBeacon === "function") {
+      if (navigator.sendBeacon(url, new Blob([body], { type: "application/json" }))) return true;
+    }
+    if (typeof fetch === "function") {
+      fetch(url, {
+        method: "POST",
+        body,
+        keepalive: true,
+        credentials: "include",
+        headers: { "Content-Type": "application/json" },
+      }).catch(() => {});
+      return true;
+    }
+    return false;
+  },
 };
 
 export default progressApi;
@@ -29,7 +29,8 @@ export default function LessonPage() {
   const [newWordsAdded, setNewWordsAdded] = useState<number>(0);
   const [resultScore, setResultScore] = useState<{ score: number; total: number; reason: string } | null>(null);
 
-  const { blocks, currentIndex, completedBlockIds, setLesson, markBlockComplete, markAllComplete, saveProgress, reset, goToBlock } = useProgressStore();
+  const { blocks, currentIndex, completedBlockIds, setLesson, markBlockComplete, markAllComplete, saveProgress, flushProgress, reset, goToBlock } =
+    useProgressStore();
   const previewMode = preview === "1";
   const stubModeActive = MOCK_CHECKS_ENABLED;
   const [backendCompleted, setBackendCompleted] = useState(false);
@@ -77,8 +78,25 @@ export default function LessonPage() {
       }
     };
     load();
-    return () => reset();
-  }, [id, previewMode, reset, setLesson, normalizeType]);
+    return () => {
+      flushProgress({ beacon: true });
+      reset();
+    };
+  }, [id, previewMode, reset, setLesson, flushProgress, normalizeType]);
+
+  useEffect(() => {
+    if (previewMode) return;
+    const flushOnHide = () => {
+      if (document.visibilityState === "hidden") flushProgress({ beacon: true });
+    };
+    const flushOnPageHide = () => flushProgress({ beacon: true });
+    document.addEventListener("visibilitychange", flushOnHide);
+    window.addEventListener("pagehide", flushOnPageHide);
+    return () => {
+      document.removeEventListener("visibilitychange", flushOnHide);
+      window.removeEventListener("pagehide", flushOnPageHide);
+    };
+  }, [previewMode, flushProgress]);
   const safeCurrentIndex = Number.isFinite(currentIndex) ? currentIndex : 0;
   const currentBlock = useMemo(() => blocks[safeCurrentIndex], [blocks, safeCurrentIndex]);
   const stepTargets = useMemo(
@@ -164,6 +182,7 @@ export default function LessonPage() {
       return;
     }
     try {
+      await flushProgress().catch(() => {});
       const res = await lessonsApi.completeLesson(id as string, { score: stubScore.score, total_questions: stubScore.total });
       await saveProgress({ status: "done", score: stubScore.score });
       setNextLessonId(res?.next_lesson_id ?? null);
@@ -1,5 +1,6 @@
 import { create } from "zustand";
 import { lessonsApi } from "@/lib/api/lessons";
+import { progressApi, ProgressBatch } from "@/lib/api/progress";
 import { LessonBlock } from "@/types/lesson";
 
 type ProgressState = {
@@ -9,6 +10,9 @@ type ProgressState = {
   currentIndex: number;
   completedBlockIds: (number | string)[];
   startedAt: number | null;
+  // Block completions not yet sent; flushed as one /progress/lesson/{id}/batch request.
+  pendingBlocks: NonNullable<ProgressBatch["blocks"]>;
+  lastFlushAt: number | null;
 };
 
 type ProgressActions = {
@@ -17,6 +21,7 @@ type ProgressActions = {
   markAllComplete: (blockIds: (number | string)[]) => void;
   goToBlock: (index: number) => void;
   saveProgress: (payload?: { status?: string; score?: number; answers?: Record<string, any>; block_id?: number | string }) => Promise<void>;
+  flushProgress: (opts?: { beacon?: boolean }) => Promise<void>;
   reset: () => void;
 };
 
@@ -25,6 +30,8 @@ const clampIndex = (index: number, total: number) => {
   const safeIndex = coerceIndex(index);
   return Math.max(0, Math.min(safeIndex, Math.max(total - 1, 0)));
 };
+const BATCH_SIZE = 10;
+
 const normalizeBlockId = (blockId: number | string | undefined, fallbackIndex: number) =>
   (blockId ?? `idx-${fallbackIndex}`).toString();
 
@@ -35,6 +42,8 @@ export const useProgressStore = create<ProgressState & ProgressActions>((set, ge
   currentIndex: 0,
   completedBlockIds: [],
   startedAt: null,
+  pendingBlocks: [],
+  lastFlushAt: null,
 
   setLesson: (lessonId, blocks) =>
     set({
@@ -44,6 +53,8 @@ export const useProgressStore = create<ProgressState & ProgressActions>((set, ge
       currentIndex: 0,
       completedBlockIds: [],
       startedAt: Date.now(),
+      pendingBlocks: [],
+      lastFlushAt: Date.now(),
     }),
 
   markBlockComplete: (blockId, nextIndexOverride) => {
@@ -67,20 +78,51 @@ export const useProgressStore = create<ProgressState & ProgressActions>((set, ge
   },
 
   saveProgress: async (payload = {}) => {
-    const { currentLessonId, startedAt } = get();
+    const { currentLessonId } = get();
     if (!currentLessonId) return;
-    const time_spent = startedAt ? Math.floor((Date.now() - startedAt) / 1000) : undefined;
     if (payload.block_id !== undefined) {
-      await lessonsApi.blockFinished({
-        lesson_id: currentLessonId,
-        block_id: payload.block_id,
-        status: payload.status,
-        time_spent,
-      });
-    } else {
-      await lessonsApi.saveProgress(currentLessonId, { ...payload, time_spent });
+      const pendingBlocks = [...get().pendingBlocks, { block_id: payload.block_id, status: payload.status }];
+      set({ pendingBlocks });
+      if (pendingBlocks.length >= BATCH_SIZE) await get().flushProgress();
+      return;
+    }
+    await get().flushProgress();
+    const { lastFlushAt } = get();
+    const time_spent = lastFlushAt ? Math.floor((Date.now() - lastFlushAt) / 1000) : undefined;
+    set({ lastFlushAt: Date.now() });
+    await lessonsApi.saveProgress(currentLessonId, { ...payload, time_spent });
+  },
+
+  flushProgress: async (opts = {}) => {
+    const { currentLessonId, pendingBlocks, lastFlushAt } = get();
+    if (!currentLessonId || !pendingBlocks.length) return;
+    const batch: ProgressBatch = {
+      blocks: pendingBlocks,
+      time_spent: lastFlushAt ? Math.floor((Date.now() - lastFlushAt) / 1000) : 0,
+    };
+    set({ pendingBlocks: [], lastFlushAt: Date.now() });
+    if (opts.beacon) {
+      progressApi.beacon(currentLessonId, batch);
+      return;
+    }
+    try {
+      await progressApi.batch(currentLessonId, batch);
+    } catch (err) {
+      // Keep the completions for the next flush.
+      set({ pendingBlocks: [...pendingBlocks, ...get().pendingBlocks] });
+      throw err;
     }
   },
 
-  reset: () => set({ currentLesson: null, currentLessonId: null, blocks: [], currentIndex: 0, completedBlockIds: [], startedAt: null }),
+  reset: () =>
+    set({
+      currentLesson: null,
+      currentLessonId: null,
+      blocks: [],
+      currentIndex: 0,
+      completedBlockIds: [],
+      startedAt: null,
+      pendingBlocks: [],
+      lastFlushAt: null,
+    }),
 }));